@@ -86,3 +86,28 @@ class IsAdminOrReadOnly(permissions.BasePermission):
             request.user.is_authenticated and 
             request.user.role == 'Admin'
         )
+
+
+class IsAdmin(permissions.BasePermission):
+    """
+    Permission class that only allows admins to access the view.
+    
+    Used for operational endpoints such as ingestion and cache metrics.
+    """
+    
+    def has_permission(self, request, view):
+        """
+        Check if the user is authenticated and has the 'Admin' role.
+        
+        Args:
+            request: The HTTP request object
+            view: The view being accessed
+            
+        Returns:
+            bool: True if user is an authenticated admin, False otherwise
+        """
+        return (
+            request.user and 
+            request.user.is_authenticated and 
+            request.user.role == 'Admin'
+        )
@@ -86,7 +86,7 @@ from .serializers import UserSerializer
     ),
     destroy=extend_schema(
         summary="Delete user",
-        description="Permanently delete a user account from the system.",
+        description="Permanently delete a user account from the system. Their receipt events are kept, with the username recorded at the time.",
         tags=['Users'],
     ),
 )
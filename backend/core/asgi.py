@@ -2,6 +2,14 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Verify-qr and verify requests are answered by async views (see
+manifests/async_views.py) unless ASYNC_VERIFY_VIEWS is set to false, behind
+a lean fast path that skips the middleware stack unless
+VERIFY_FAST_PATH_ENABLED is off (see manifests/fast_path.py). Every other
+endpoint runs the sync DRF views on Django's thread pool.
+
+Run it with an ASGI server, e.g.:
+    gunicorn core.asgi:application -k uvicorn.workers.UvicornWorker -w 4
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -9,8 +17,16 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Read by core/settings.py (ROOT_URLCONF), which is loaded below
+os.environ.setdefault('ASYNC_VERIFY_VIEWS', 'true')
 
 application = get_asgi_application()
+
+if settings.ASYNC_VERIFY_VIEWS and settings.VERIFY_FAST_PATH_ENABLED:
+    from manifests.fast_path import AsyncVerifyFastPath
+
+    application = AsyncVerifyFastPath(application)
@@ -0,0 +1,83 @@
+"""
+Shared helpers for the bench_* management commands.
+
+These commands are run by hand against a development or staging database to
+compare an optimized path with the code it replaces.
+"""
+import statistics
+import time
+
+from rest_framework.test import APIRequestFactory
+
+
+class Rollback(Exception):
+    """Raised inside transaction.atomic() to discard seeded benchmark data."""
+
+
+def list_queryset(viewset_class, params, user):
+    """
+    Build the queryset a ViewSet's list action would paginate.
+
+    Runs the view's get_queryset() and filter backends (search, ordering)
+    for the given query params without going through the HTTP stack.
+
+    Args:
+        viewset_class: ViewSet class to instantiate
+        params: Dict of query params
+        user: User to attach to the request
+
+    Returns:
+        QuerySet: Filtered, ordered queryset
+    """
+    view = viewset_class()
+    view.action_map = {'get': 'list'}
+    view.args = ()
+    view.kwargs = {}
+    view.format_kwarg = None
+    request = view.initialize_request(APIRequestFactory().get('/', params))
+    request.user = user
+    view.request = request
+    return view.filter_queryset(view.get_queryset())
+
+
+def time_calls(func, inputs):
+    """
+    Call func once per input and collect latency statistics.
+
+    Args:
+        func: Callable taking one argument
+        inputs: Sequence of arguments
+
+    Returns:
+        dict: count, total seconds, per-second rate and p50/p99 latency in microseconds
+    """
+    latencies = []
+    started = time.perf_counter()
+    for value in inputs:
+        call_started = time.perf_counter()
+        func(value)
+        latencies.append(time.perf_counter() - call_started)
+    total = time.perf_counter() - started
+    return summarize(latencies, total)
+
+
+def summarize(latencies, total):
+    """Summarize a list of per-call latencies (seconds) measured over `total` seconds."""
+    if not latencies:
+        return {'count': 0, 'seconds': total, 'per_second': 0.0, 'p50_us': 0.0, 'p99_us': 0.0}
+    ordered = sorted(latencies)
+    return {
+        'count': len(ordered),
+        'seconds': total,
+        'per_second': len(ordered) / total if total else 0.0,
+        'p50_us': statistics.median(ordered) * 1e6,
+        'p99_us': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e6,
+    }
+
+
+def format_stats(label, stats):
+    """One-line report for a time_calls()/summarize() result."""
+    return (
+        f"{label:<32} {stats['per_second']:>12,.0f}/s   "
+        f"p50 {stats['p50_us']:>10,.1f}µs   p99 {stats['p99_us']:>10,.1f}µs"
+    )
@@ -0,0 +1,340 @@
+"""
+Tag-invalidated response cache for read-heavy DRF endpoints.
+
+verify-qr, manifest detail and the medicine list are read far more often than
+the rows behind them change. ResponseCacheMixin caches the serialized data of
+selected actions in the configured cache backend (see CACHES and
+RESPONSE_CACHE in settings), so repeated reads skip the database and the
+serializer.
+
+Invalidation is by tag rather than by key:
+- Each cached response carries the tags of the rows it was built from, e.g.
+  "lot:<id>", "distributor:<id>", "medicine:<id>", or a list tag such as
+  "lots" for list pages.
+- Every tag has a version token in the cache. A response is stored together
+  with the tokens its tags had when it was built, and is only served while
+  all of them are unchanged.
+- invalidate_tags() replaces the tokens, typically from post_save and
+  post_delete signals, which makes every response built from those rows stale
+  at once without knowing their keys.
+
+Tokens are random rather than counters, so a token evicted from the cache
+comes back as a new value and can never revalidate an old response.
+
+Hit, miss and invalidation counters are kept in the same cache (per process
+with the local memory backend, shared with the file and Redis backends) and
+served by GET /api/admin/cache-stats/.
+"""
+import hashlib
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'rc:'
+_STATS_EVENTS = ('hits', 'misses', 'stores', 'not_admitted')
+
+
+def _settings():
+    return getattr(settings, 'RESPONSE_CACHE', {})
+
+
+def is_enabled():
+    """Return True if RESPONSE_CACHE['ENABLED'] is set."""
+    return bool(_settings().get('ENABLED'))
+
+
+def get_cache():
+    """The cache backend holding responses, tag tokens and counters."""
+    return caches[_settings().get('ALIAS', 'default')]
+
+
+def _tag_key(tag):
+    return f'{KEY_PREFIX}tag:{tag}'
+
+
+def _stats_key(namespace, event):
+    return f'{KEY_PREFIX}stats:{namespace}:{event}'
+
+
+def _increment(cache, key):
+    """Increment a counter, creating it if missing or evicted."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                pass  # Evicted again in between; losing one count is fine
+
+
+def _record(namespace, event):
+    _increment(get_cache(), _stats_key(namespace, event))
+    _register_namespace(namespace)
+
+
+_known_namespaces = set()
+
+
+def _register_namespace(namespace):
+    """Remember namespaces (in the cache too) so cache_stats() can list them."""
+    if namespace in _known_namespaces:
+        return
+    cache = get_cache()
+    key = f'{KEY_PREFIX}stats:namespaces'
+    namespaces = set(cache.get(key) or ())
+    if namespace not in namespaces:
+        namespaces.add(namespace)
+        cache.set(key, sorted(namespaces), timeout=None)
+    _known_namespaces.add(namespace)
+
+
+def tag_tokens(tags):
+    """
+    Current version token of each tag, creating tokens for unknown tags.
+
+    Args:
+        tags: Iterable of tag strings
+
+    Returns:
+        dict: {tag: token}
+    """
+    cache = get_cache()
+    tags = list(tags)
+    found = cache.get_many([_tag_key(tag) for tag in tags])
+    tokens = {}
+    for tag in tags:
+        token = found.get(_tag_key(tag))
+        if token is None:
+            token = uuid.uuid4().hex
+            if not cache.add(_tag_key(tag), token, timeout=None):
+                # Another worker created it first; use theirs
+                token = cache.get(_tag_key(tag), token)
+        tokens[tag] = token
+    return tokens
+
+
+def invalidate_tags(*tags):
+    """
+    Make every cached response carrying any of these tags stale.
+
+    Inside a transaction the tags are invalidated again on commit, so a
+    response rebuilt from not-yet-committed data in between doesn't survive.
+    """
+    tags = [tag for tag in tags if tag]
+    if not tags:
+        return
+
+    def invalidate():
+        cache = get_cache()
+        cache.set_many({_tag_key(tag): uuid.uuid4().hex for tag in tags}, timeout=None)
+        _increment(cache, f'{KEY_PREFIX}stats:invalidations')
+
+    try:
+        invalidate()
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(invalidate)
+    except Exception:
+        # A cache outage must not fail the write that triggered it
+        logger.exception('Failed to invalidate response cache tags %s', tags)
+
+
+def cache_stats():
+    """
+    Hit/miss counters per cached endpoint.
+
+    Returns:
+        dict: Backend, settings and per-namespace counters with hit rates
+    """
+    cache = get_cache()
+    namespaces = cache.get(f'{KEY_PREFIX}stats:namespaces') or []
+    keys = [_stats_key(namespace, event) for namespace in namespaces for event in _STATS_EVENTS]
+    counters = cache.get_many(keys)
+
+    endpoints = {}
+    totals = dict.fromkeys(_STATS_EVENTS, 0)
+    for namespace in namespaces:
+        stats = {event: counters.get(_stats_key(namespace, event), 0) for event in _STATS_EVENTS}
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+        endpoints[namespace] = stats
+        for event in _STATS_EVENTS:
+            totals[event] += stats[event]
+
+    lookups = totals['hits'] + totals['misses']
+    return {
+        'enabled': is_enabled(),
+        'backend': f'{type(cache).__module__}.{type(cache).__name__}',
+        'timeout': _settings().get('TIMEOUT', 300),
+        'hits': totals['hits'],
+        'misses': totals['misses'],
+        'stores': totals['stores'],
+        'not_admitted': totals['not_admitted'],
+        'hit_rate': round(totals['hits'] / lookups, 4) if lookups else None,
+        'invalidations': cache.get(f'{KEY_PREFIX}stats:invalidations', 0),
+        'endpoints': endpoints,
+    }
+
+
+def response_cache_key(namespace, host, path, query_lists):
+    """
+    Cache key of a response.
+
+    Args:
+        namespace: Endpoint namespace, e.g. "lotmanifest.verify_qr"
+        host: Validated request host (part of the key because pagination links are absolute)
+        path: Request path
+        query_lists: (param, [values]) pairs, e.g. QueryDict.lists()
+
+    Returns:
+        str: Cache key
+    """
+    query = '&'.join(f'{key}={value}' for key, value in sorted(query_lists))
+    digest = hashlib.sha1(f'{host}{path}?{query}'.encode('utf-8')).hexdigest()
+    return f'{KEY_PREFIX}resp:{namespace}:{digest}'
+
+
+def lookup_response(namespace, key):
+    """
+    Return the cached entry under key if all its tags are current, counting a hit or miss.
+
+    Returns:
+        dict: {'data', 'status', 'tags'}, or None on a miss
+    """
+    entry = get_cache().get(key)
+    if entry is not None and tag_tokens(entry['tags']) == entry['tags']:
+        _record(namespace, 'hits')
+        return entry
+    _record(namespace, 'misses')
+    return None
+
+
+def store_response(namespace, key, data, status, tokens, timeout=None, admitted=True):
+    """
+    Store response data with the tag tokens taken before it was built.
+
+    Args:
+        namespace: Endpoint namespace (for the counters)
+        key: Key from response_cache_key()
+        data: Serializable response data
+        status: HTTP status code
+        tokens: {tag: token} from tag_tokens(), taken before the rows were read
+        timeout: Seconds (default RESPONSE_CACHE['TIMEOUT'])
+        admitted: False to only count the response as not admitted
+    """
+    try:
+        if admitted:
+            get_cache().set(
+                key,
+                {'data': data, 'status': status, 'tags': tokens},
+                timeout=timeout or _settings().get('TIMEOUT', 300),
+            )
+            _record(namespace, 'stores')
+        else:
+            _record(namespace, 'not_admitted')
+    except Exception:
+        logger.exception('Response cache store failed for %s', key)
+
+
+class ResponseCacheMixin:
+    """
+    Cache the responses of selected ViewSet actions, invalidated by tags.
+
+    Views list the cached actions in `response_cache_actions` and wrap them:
+
+        def retrieve(self, request, *args, **kwargs):
+            return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    The wrapped call runs after authentication and permission checks, so
+    cached data is only served to requests that could have fetched it. The
+    key is the action and the host, path and sorted query params; responses
+    must therefore not depend on who is asking.
+
+    Tags come from:
+    - get_object(): get_cache_tags(obj) of the object a detail action loads
+    - note_cache_tags(): tags of rows an action reads some other way
+    - `response_cache_list_tags`: tags of list pages, e.g. ["lots"], so a
+      page goes stale on any change to the listed model
+
+    Only 200 responses are stored, and only if admit_response() agrees
+    (e.g. LotManifestViewSet only admits frequently scanned lots).
+    """
+
+    response_cache_actions = ()
+    response_cache_list_tags = ()
+    response_cache_timeout = None
+
+    def get_cache_tags(self, obj):
+        """Tags of a loaded object; override per view."""
+        return []
+
+    def get_object(self):
+        obj = super().get_object()
+        self.note_cache_tags(self.get_cache_tags(obj))
+        return obj
+
+    def note_cache_tags(self, tags):
+        """Add tags to the response being built, for actions that don't use get_object()."""
+        if getattr(self, '_response_cache_tokens', None) is not None:
+            self._response_cache_tokens.update(tag_tokens(tags))
+
+    def admit_response(self):
+        """Return False to serve a freshly built response without storing it."""
+        return True
+
+    def get_response_cache_namespace(self):
+        return f'{self.basename}.{self.action}'
+
+    def get_response_cache_key(self, request):
+        return response_cache_key(
+            self.get_response_cache_namespace(), request.get_host(), request.path, request.query_params.lists()
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """
+        Serve the handler's response from the cache while its tags are current.
+
+        Args:
+            handler: Action implementation returning the uncached Response
+            request: The DRF request
+            *args, **kwargs: Passed on to the handler
+
+        Returns:
+            Response: Cached (X-Cache: HIT) or freshly built (X-Cache: MISS)
+        """
+        if not is_enabled() or self.action not in self.response_cache_actions:
+            return handler(request, *args, **kwargs)
+
+        namespace = self.get_response_cache_namespace()
+        key = self.get_response_cache_key(request)
+        try:
+            entry = lookup_response(namespace, key)
+            if entry is not None:
+                response = Response(entry['data'], status=entry['status'])
+                response['X-Cache'] = 'HIT'
+                return response
+        except Exception:
+            logger.exception('Response cache lookup failed for %s', key)
+            return handler(request, *args, **kwargs)
+
+        # Tokens are taken before the rows are read (list tags here, object
+        # tags in get_object), so a change committed while the response is
+        # being built leaves the stored entry already stale
+        self._response_cache_tokens = tag_tokens(self.response_cache_list_tags if self.action == 'list' else ())
+        try:
+            response = handler(request, *args, **kwargs)
+        finally:
+            tokens, self._response_cache_tokens = self._response_cache_tokens, None
+        if response.status_code == 200 and tokens:
+            store_response(
+                namespace, key, response.data, response.status_code, tokens,
+                timeout=self.response_cache_timeout, admitted=self.admit_response(),
+            )
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,133 @@
+"""
+HTTP conditional requests (ETag / Last-Modified) for DRF list and detail reads.
+
+Dashboards such as the pharmacist inventory and distributor batch pages
+refresh the same lists over and over. ConditionalRequestMixin gives list and
+retrieve responses validators, and answers a matching If-None-Match with
+304 Not Modified before the rows are loaded or serialized.
+
+The validator comes from one aggregate query over the same filtered
+queryset the action would serve (for retrieve, narrowed to the looked-up
+row): the row count and the latest updated_at, plus the latest updated_at
+of the related rows the serializer shows (`conditional_related`, e.g. a
+lot's medicine and distributor). An insert or update moves the maximum and
+a delete changes the count, so the ETag changes with the response. It also
+covers the request path and query string (page, ordering, filters), host,
+negotiated format and user (responses depend on who is asking), and
+CONDITIONAL_REQUESTS['VERSION'], to be bumped when serialized output changes.
+
+Writes that bypass save() (QuerySet.update(), bulk_update()) must set
+updated_at themselves, or clients keep stale copies.
+
+Responses carry `Cache-Control: private, no-cache`, so browsers keep them
+but revalidate on every use, and shared caches don't mix users.
+If-Modified-Since is honoured for retrieve only (Last-Modified of a list
+doesn't move when rows are deleted).
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import parse_etags, quote_etag
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _settings():
+    return getattr(settings, 'CONDITIONAL_REQUESTS', {})
+
+
+def is_enabled():
+    """Return True if CONDITIONAL_REQUESTS['ENABLED'] is set."""
+    return bool(_settings().get('ENABLED', True))
+
+
+class NotModified(Exception):
+    """Raised from initial() when the client's copy is current."""
+
+
+class ConditionalRequestMixin:
+    """
+    ETag and Last-Modified validators for a ViewSet's list and retrieve actions.
+
+    Views set `conditional_related` to the relations whose updated_at shows
+    in the serialized output; the model and those relations need an
+    `updated_at` (auto_now) field.
+    """
+
+    conditional_actions = ('list', 'retrieve')
+    conditional_related = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._validators = None
+        if request.method not in ('GET', 'HEAD') or self.action not in self.conditional_actions or not is_enabled():
+            return
+        self._validators = self.get_validators(request)
+        if self._validators is not None and self._not_modified(request, *self._validators):
+            raise NotModified
+
+    def get_validators(self, request):
+        """
+        Compute the response's validators with one aggregate query.
+
+        Returns:
+            tuple: (ETag, last modified datetime or None), or None when the
+            action must answer without validators (e.g. 404, bad filters)
+        """
+        timestamps = {'updated_at': Max('updated_at')}
+        for relation in self.conditional_related:
+            timestamps[f'{relation}_updated_at'] = Max(f'{relation}__updated_at')
+        try:
+            queryset = self.filter_queryset(self.get_queryset())
+            if self.action == 'retrieve':
+                lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+                queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            values = queryset.order_by().aggregate(row_count=Count('pk'), **timestamps)
+        except (ValidationError, ValueError):
+            return None  # Invalid lookup or filter values; the action reports them
+        if self.action == 'retrieve' and not values['row_count']:
+            return None
+
+        last_modified = max((value for value in (values[name] for name in timestamps) if value), default=None)
+        key = '|'.join([
+            str(_settings().get('VERSION', '1')),
+            request.get_host(),
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            str(request.user.pk),
+            str(values['row_count']),
+            *(values[name].isoformat() if values[name] else '' for name in timestamps),
+        ])
+        return quote_etag(hashlib.sha1(key.encode('utf-8')).hexdigest()), last_modified
+
+    def _not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            # Weak comparison (RFC 9110 13.1.2)
+            return any(tag == '*' or tag.removeprefix('W/') == etag for tag in parse_etags(if_none_match))
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return (
+            self.action == 'retrieve'
+            and if_modified_since is not None
+            and last_modified is not None
+            and int(last_modified.timestamp()) <= if_modified_since
+        )
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, '_validators', None)
+        if validators is not None and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            etag, last_modified = validators
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+            response['Cache-Control'] = 'private, no-cache'
+        return response
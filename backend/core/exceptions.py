@@ -0,0 +1,28 @@
+"""
+Project-wide DRF exception handling.
+
+Deletes that the schema refuses (a PROTECT or RESTRICT foreign key, e.g. a
+shipment root whose lots still exist) raise ProtectedError or
+RestrictedError from the ORM. DRF doesn't handle
+them, so they used to become a 500; they are answered with 409 Conflict
+naming what blocks the delete.
+"""
+from django.db.models import ProtectedError, RestrictedError
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as drf_exception_handler
+
+
+def exception_handler(exc, context):
+    """DRF's exception handler, plus 409 Conflict for deletes blocked by related rows."""
+    if isinstance(exc, (ProtectedError, RestrictedError)):
+        related = exc.protected_objects if isinstance(exc, ProtectedError) else exc.restricted_objects
+        blocking = sorted({str(obj._meta.verbose_name_plural) for obj in related})
+        return Response(
+            {
+                'error': f"Cannot delete: it is referenced by {', '.join(blocking)}",
+                'count': len(related),
+            },
+            status=status.HTTP_409_CONFLICT,
+        )
+    return drf_exception_handler(exc, context)
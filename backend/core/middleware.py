@@ -0,0 +1,96 @@
+"""
+Project middleware.
+
+WhiteNoiseMiddleware is WhiteNoise's static file middleware made async
+capable. WhiteNoise's own class is sync only, and one sync middleware makes
+Django run the rest of the chain, views included, on a thread under ASGI
+(see core/asgi.py), which would take away what the async views gain.
+Under WSGI it behaves exactly like the original.
+
+It also serves the published verification pages (see
+manifests/published_pages.py) at the QR code URLs. They are published
+while the server runs, so they are looked up on disk per request rather
+than indexed at startup; requests without a published page go on to the
+live views.
+"""
+import os
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.utils.cache import patch_vary_headers
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+from whitenoise.responders import IsDirectoryError, MissingFileError
+
+from manifests import published_pages
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoise static file middleware that runs natively under ASGI.
+
+    Static files are looked up and served on a thread (file system access);
+    every other request goes straight to the async handler.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, **kwargs):
+        # Set first: the base class runs immutable_file_test() while indexing
+        self.pages_root = published_pages.root() if published_pages.is_served() else None
+        super().__init__(get_response, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.serve_page(request)
+        if response is not None:
+            return response
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.pages_root is not None:
+            response = await sync_to_async(self.serve_page)(request)
+            if response is not None:
+                return response
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+    def serve_page(self, request):
+        """
+        Serve a published verification page.
+
+        Returns:
+            HttpResponse: The file response, or None if the path has no
+            published page (or isn't a page path)
+        """
+        if self.pages_root is None or request.method not in ('GET', 'HEAD'):
+            return None
+        accept = request.headers.get('Accept', '')
+        found = published_pages.file_for_url(
+            request.path_info,
+            wants_json='application/json' in accept and 'text/html' not in accept,
+        )
+        if found is None:
+            return None
+        name, negotiated = found
+        try:
+            static_file = self.get_static_file(os.path.join(self.pages_root, name), request.path_info)
+        except (MissingFileError, IsDirectoryError):
+            return None
+        response = self.serve(static_file, request)
+        if negotiated:
+            patch_vary_headers(response, ('Accept',))
+        return response
+
+    def immutable_file_test(self, path, url):
+        if self.pages_root is not None and published_pages.is_versioned(url):
+            return True
+        return super().immutable_file_test(path, url)
@@ -0,0 +1,312 @@
+"""
+Pagination classes for high-volume list endpoints.
+
+The project default is DRF's PageNumberPagination (see REST_FRAMEWORK in
+settings), which runs a COUNT(*) per request and an OFFSET scan that gets
+slower the deeper a client pages. This module adds two opt-in alternatives:
+
+- KeysetPagination: cursor pagination keyed on (ordering field, id), so every
+  page is an index range scan regardless of how deep the client is.
+- EstimatedCountPageNumberPagination: the usual page numbers, but the total
+  count comes from PostgreSQL planner statistics instead of COUNT(*).
+
+ViewSets opt in through PaginationModeMixin and clients pick a mode with
+?pagination=cursor or ?pagination=estimated.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a (field, id) keyset.
+
+    Each page is fetched with a predicate on the last row seen rather than an
+    OFFSET, so page N costs the same as page 1. The id tie-breaker makes the
+    order total, so rows sharing a timestamp are never skipped or repeated.
+
+    Subclasses set `ordering` to a two-item tuple such as ('-created_at', '-id').
+    Any ?ordering= param is ignored in this mode.
+    """
+
+    ordering = ('-created_at', '-id')
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = self._ordering(reverse)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+
+        # Fetch one extra row to know whether another page follows
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.page = results
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        """Build the absolute URL of the page after (or before) `instance`."""
+        values = [str(getattr(instance, name)) for name in self._field_names()]
+        token = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, model):
+        """
+        Decode the ?cursor= param into typed keyset values.
+
+        Returns:
+            tuple: (values or None, reverse flag)
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            token = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(self._field_names(), token['v'], strict=True)
+            ]
+            return values, bool(token.get('r', False))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound('Invalid cursor')
+
+    def _field_names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def _ordering(self, reverse):
+        if not reverse:
+            return list(self.ordering)
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def _after(self, values, reverse):
+        """
+        Keyset predicate for rows strictly after `values` in page order.
+
+        Written as `a <= x AND (a < x OR id < y)` rather than an OR of two
+        branches so the leading column stays an index range condition.
+        """
+        (field, tiebreak), (value, tiebreak_value) = self._field_names(), values
+        descending = self.ordering[0].startswith('-') != reverse
+        op = 'lt' if descending else 'gt'
+        bound = 'lte' if descending else 'gte'
+        tiebreak_op = 'lt' if self.ordering[1].startswith('-') != reverse else 'gt'
+        return Q(**{f'{field}__{bound}': value}) & (
+            Q(**{f'{field}__{op}': value}) | Q(**{f'{tiebreak}__{tiebreak_op}': tiebreak_value})
+        )
+
+
+class CreatedAtKeysetPagination(KeysetPagination):
+    """Keyset pagination for append-mostly logs ordered newest first."""
+
+    ordering = ('-created_at', '-id')
+
+
+class ExpiryDateKeysetPagination(KeysetPagination):
+    """Keyset pagination for lot manifests ordered by expiry date (latest first)."""
+
+    ordering = ('-expiry_date', '-id')
+
+
+# Below this many estimated rows an exact COUNT(*) is cheap enough to run
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def estimate_count(queryset):
+    """
+    Estimate the number of rows in a queryset from planner statistics.
+
+    Unfiltered querysets read pg_class.reltuples; filtered ones read the row
+    estimate from EXPLAIN. Small results, non-PostgreSQL databases and tables
+    that have never been analyzed fall back to an exact count.
+
+    Args:
+        queryset: The QuerySet to count
+
+    Returns:
+        int: Estimated row count
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            estimate = row[0] if row else -1
+        else:
+            sql, params = queryset.order_by().values('pk').query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = int(plan[0]['Plan']['Plan Rows'])
+
+    if estimate < EXACT_COUNT_THRESHOLD:
+        return queryset.count()
+    return estimate
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    """Django paginator whose count comes from estimate_count()."""
+
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+
+class EstimatedCountPageNumberPagination(PageNumberPagination):
+    """
+    PageNumberPagination with an estimated total count.
+
+    Responses carry `count_is_estimate: true` so clients can label totals as
+    approximate. The last page may be reported slightly off when statistics
+    are stale.
+    """
+
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_is_estimate', True),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_estimate'] = {'type': 'boolean'}
+        return response_schema
+
+
+class PaginationModeMixin:
+    """
+    ViewSet mixin that lets clients opt into an alternative pagination mode.
+
+    Set `pagination_modes` to a dict of mode name to pagination class. A
+    request with ?pagination=<mode> uses that class; anything else falls back
+    to the view's regular pagination_class.
+    """
+
+    pagination_modes = {}
+    pagination_mode_query_param = 'pagination'
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.pagination_class
+            request = getattr(self, 'request', None)
+            if request is not None and hasattr(request, 'query_params'):
+                mode = request.query_params.get(self.pagination_mode_query_param)
+                pagination_class = self.pagination_modes.get(mode, pagination_class)
+            self._paginator = pagination_class() if pagination_class else None
+        return self._paginator
+
+
+def pagination_mode_parameters(keyset_class):
+    """
+    OpenAPI query parameters for a list action of a PaginationModeMixin view.
+
+    Args:
+        keyset_class: The view's KeysetPagination subclass for ?pagination=cursor
+
+    Returns:
+        list: OpenApiParameters for pagination, cursor and page_size
+    """
+    keyset = ', '.join(field.lstrip('-') for field in keyset_class.ordering)
+    return [
+        OpenApiParameter(
+            name='pagination',
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            description=f'Opt into an alternative pagination mode: "cursor" (keyset on {keyset}, constant time per page) or "estimated" (page numbers with an estimated count)',
+            enum=['cursor', 'estimated'],
+        ),
+        OpenApiParameter(
+            name='cursor',
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            description='Opaque cursor from the next/previous link (pagination=cursor only)'
+        ),
+        OpenApiParameter(
+            name=keyset_class.page_size_query_param,
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description=f'Results per page (pagination=cursor only, max {keyset_class.max_page_size})'
+        ),
+    ]
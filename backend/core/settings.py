@@ -57,7 +57,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Must be before CommonMiddleware
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.WhiteNoiseMiddleware',  # WhiteNoise, async capable for ASGI
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -66,7 +66,12 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'core.urls'
+# ASGI deployment mode (see core/asgi.py): core.urls_asgi answers verify-qr
+# and verify with the async views in manifests/async_views.py. core/asgi.py
+# turns this on; WSGI workers keep the sync views.
+ASYNC_VERIFY_VIEWS = os.getenv('ASYNC_VERIFY_VIEWS', 'false').lower() == 'true'
+
+ROOT_URLCONF = 'core.urls_asgi' if ASYNC_VERIFY_VIEWS else 'core.urls'
 
 TEMPLATES = [
     {
@@ -99,10 +104,11 @@ WSGI_APPLICATION = 'core.wsgi.application'
 DATABASE_URL = os.getenv('DATABASE_URL')
 
 if DATABASE_URL:
-    # Use the database settings from DATABASE_URL in production
+    # Use the database settings from DATABASE_URL in production. Persistent
+    # connections are off under ASGI, where Django opens them per request thread
     DATABASES = {
         
-        'default': dj_database_url.config(default=DATABASE_URL, conn_max_age=600)
+        'default': dj_database_url.config(default=DATABASE_URL, conn_max_age=0 if ASYNC_VERIFY_VIEWS else 600)
         
     }
 else:
@@ -118,6 +124,58 @@ else:
         }
     }
 
+# Cache backend, picked with CACHE_BACKEND:
+# - locmem (default): per process, nothing to run
+# - file: shared by all workers on a host, in CACHE_LOCATION (a directory)
+# - redis: shared by all hosts, CACHE_LOCATION=redis://127.0.0.1:6379/1
+#   (needs the redis package)
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'rxverify'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': _CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv('CACHE_LOCATION', _CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 50000} if CACHE_BACKEND != 'redis' else {},
+    },
+    # Rendered QR labels (see QR_LABEL_CACHE), apart from 'default' so a large
+    # archive download can't evict cached responses or the lot change feed.
+    # Per process and bounded: 5000 labels of ~5 KB is ~25 MB per worker.
+    'qr_labels': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rxverify-qr-labels',
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('QR_LABEL_CACHE_MAX_ENTRIES', '5000'))},
+    },
+}
+
+# Response cache for read-heavy endpoints (see core/cache.py): verify-qr,
+# manifest and medicine reads, invalidated by model signals. Off by default
+# with locmem, where an invalidation only reaches the worker that made the
+# change and other workers could serve stale data until TIMEOUT
+RESPONSE_CACHE = {
+    'ENABLED': os.getenv('RESPONSE_CACHE_ENABLED', 'false' if CACHE_BACKEND == 'locmem' else 'true').lower() == 'true',
+    'ALIAS': 'default',
+    'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300')),
+}
+
+
+# Request coalescing for verify-qr bursts (see core/singleflight.py).
+# Concurrent scans of one lot share a computation whose result is reused for
+# RESULT_TTL seconds; CROSS_WORKER also coalesces across processes through a
+# lock in the CACHE backend (needs a shared backend, i.e. file or redis)
+SINGLE_FLIGHT = {
+    'ENABLED': os.getenv('SINGLE_FLIGHT_ENABLED', 'true').lower() == 'true',
+    'RESULT_TTL': 0.5,
+    'CROSS_WORKER': CACHE_BACKEND != 'locmem',
+    'CACHE': 'default',
+    'LOCK_TIMEOUT': 2.0,  # Compute anyway if the lock holder takes longer
+    'POLL_INTERVAL': 0.01,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -182,6 +240,8 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # 409 Conflict for deletes blocked by PROTECT/RESTRICT foreign keys
+    'EXCEPTION_HANDLER': 'core.exceptions.exception_handler',
 }
 
 # JWT Configuration
@@ -229,6 +289,131 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
 ]
 
+# Write-behind receipt ingestion (see logs/spool.py)
+# When enabled, POST /api/receipts/ appends to a durable local spool and
+# answers 202; run `manage.py flush_receipt_spool --loop` (or set
+# FLUSH_THREAD) to drain the spool into the database in batches.
+RECEIPT_SPOOL = {
+    'ENABLED': os.getenv('RECEIPT_SPOOL_ENABLED', 'false').lower() == 'true',
+    'DIR': os.getenv('RECEIPT_SPOOL_DIR', os.path.join(BASE_DIR, 'spool', 'receipts')),
+    'SEGMENT_BYTES': 4 * 1024 * 1024,  # Rotate segments at 4 MB
+    'MAX_BYTES': 256 * 1024 * 1024,  # Answer 503 once 256 MB are waiting
+    'ROTATE_INTERVAL': 1.0,  # Publish idle segments after 1 second
+    'FLUSH_THREAD': os.getenv('RECEIPT_SPOOL_FLUSH_THREAD', 'false').lower() == 'true',
+    'FLUSH_INTERVAL': 1.0,
+    'FLUSH_BATCH_SIZE': 5000,
+}
+
+# Receipt hash chain (see logs/chain.py): an HMAC-authenticated checkpoint is
+# stored every this many receipts; `manage.py verify_receipt_chain` resumes
+# from the last verified one
+RECEIPT_CHAIN_CHECKPOINT_INTERVAL = 10000
+
+# Receipts posted directly are inserted unchained and chained in a batch by
+# each worker's chainer thread this many seconds later, so requests never
+# wait on the chain head lock. 0 disables the thread (chain with
+# `manage.py verify_receipt_chain --backfill` instead).
+RECEIPT_CHAIN_INTERVAL = float(os.getenv('RECEIPT_CHAIN_INTERVAL', '1.0'))
+
+# Medicine autocomplete index (see pharmaceuticals/autocomplete.py)
+# Rebuilt on Medicine changes in-process, and at least this often (seconds)
+# to pick up changes made by other workers.
+MEDICINE_AUTOCOMPLETE_TTL = 60
+
+# Fuzzy batch number index (see manifests/batch_index.py)
+# Lots changed by other workers are replayed from the lot change feed; with
+# locmem or file they are polled this often (seconds) instead. The index is rebuilt
+# from scratch (compacting removed entries) every hour. Each worker that
+# serves fuzzy lookups holds the index in memory: about 300 bytes per lot,
+# i.e. ~3 GB per worker at ten million lots.
+LOT_BATCH_INDEX_SYNC_INTERVAL = 5
+LOT_BATCH_INDEX_REBUILD_INTERVAL = 3600
+
+# QR label archive downloads (see manifests/label_cache.py)
+# Rendered labels are cached by content hash in this cache alias, and cache
+# misses are rendered on a shared pool of this many threads per process.
+QR_LABEL_CACHE = 'qr_labels'
+QR_LABEL_CACHE_TIMEOUT = 7 * 24 * 3600
+QR_ARCHIVE_RENDER_THREADS = int(os.getenv('QR_ARCHIVE_RENDER_THREADS', '4'))
+
+# Cross-worker feed of lot changes (see manifests/lot_changes.py): workers
+# publish the lots they save and delete in this cache, and the negative-lookup
+# filter and the fuzzy batch number index of other workers replay them. Needs
+# a cache shared by all workers with an atomic incr (redis; the file backend's
+# incr can hand two workers the same entry number)
+LOT_CHANGES_CACHE = 'default'
+
+# Negative-lookup filter (see manifests/lot_filter.py): a per-worker Bloom
+# filter of lot ids and short codes that answers 404 for unknown lots on the
+# public verification endpoints without a query. New lots from other workers
+# come from the lot change feed, so it only runs with redis: with locmem or
+# file, other workers' lots could be rejected until the next rebuild, and
+# the filter stays off even if enabled here
+LOT_FILTER = {
+    'ENABLED': os.getenv('LOT_FILTER_ENABLED', 'true' if CACHE_BACKEND == 'redis' else 'false').lower() == 'true',
+    'FALSE_POSITIVE_RATE': 0.01,
+    'HEADROOM': 1.25,  # Sized for 25% more lots than at build time
+    'REBUILD_INTERVAL': 3600,
+}
+
+# Heavy-hitter tracking of scanned lots (see manifests/hot_lots.py): a
+# count-min sketch of DEPTH x WIDTH counters (1 MB by default, fixed however
+# many lots are scanned) and the TOP_K most scanned lots per worker. Only lots
+# scanned at least ADMISSION_THRESHOLD times on a worker have their verify-qr
+# and detail responses cached. Counts halve every DECAY_INTERVAL seconds, and
+# each worker publishes its top lots to CACHE every PUBLISH_INTERVAL seconds
+HOT_LOTS = {
+    'ENABLED': os.getenv('HOT_LOTS_ENABLED', 'true').lower() == 'true',
+    'WIDTH': 65536,
+    'DEPTH': 4,
+    'TOP_K': 100,
+    'ADMISSION_THRESHOLD': int(os.getenv('HOT_LOTS_ADMISSION_THRESHOLD', '5')),
+    'DECAY_INTERVAL': 600,
+    'PUBLISH_INTERVAL': 10,
+    'CACHE': 'default',
+}
+
+# Lean WSGI fast path for patient QR scans (see manifests/fast_path.py):
+# GET /api/manifests/{id}/verify-qr/ skips the middleware and DRF stacks.
+# Under ASGI it also serves admin POST /api/manifests/{id}/verify/ calls.
+VERIFY_FAST_PATH_ENABLED = os.getenv('VERIFY_FAST_PATH_ENABLED', 'true').lower() == 'true'
+
+# Threads per process for Ed25519 checks of the async verification views
+# (ASGI deployment, see manifests/async_views.py)
+VERIFY_SIGNATURE_THREADS = int(os.getenv('VERIFY_SIGNATURE_THREADS', '4'))
+
+# Static verification pages (see manifests/published_pages.py): each lot's
+# verify-qr JSON and a small HTML page are written under ROOT, at the QR code
+# paths (verify/{id}, V/{code}), whenever its verification row changes. Sync
+# ROOT to a static host or CDN that falls back to this server, and/or let
+# WhiteNoise serve it (SERVE); paths without a file go to the live views.
+# `manage.py publish_verification_pages` publishes every lot.
+VERIFICATION_PAGES = {
+    'ENABLED': os.getenv('VERIFICATION_PAGES_ENABLED', 'false').lower() == 'true',
+    'ROOT': os.getenv('VERIFICATION_PAGES_ROOT', os.path.join(BASE_DIR, 'published')),
+    'SERVE': os.getenv('VERIFICATION_PAGES_SERVE', 'true').lower() == 'true',
+}
+
+# HTTP conditional requests (see core/conditional.py): lot, medicine,
+# distributor and crowd flag lists and details carry ETag/Last-Modified
+# validators and answer a matching If-None-Match with 304. Bump VERSION when
+# serialized output changes, so clients don't revalidate old copies.
+CONDITIONAL_REQUESTS = {
+    'ENABLED': os.getenv('CONDITIONAL_REQUESTS_ENABLED', 'true').lower() == 'true',
+    'VERSION': '1',
+}
+
+# Largest shipment accepted by POST /api/manifests/shipments/ (one Merkle tree)
+SHIPMENT_MAX_LOTS = 100000
+
+# Re-sign jobs (see manifests/signing.py): a RUNNING job without a checkpoint
+# for this many seconds is assumed crashed and may be resumed elsewhere
+RESIGN_JOB_STALE_AFTER = 300
+
+# GET /api/manifests/{id}/qr.png browser cache lifetime (seconds) for URLs
+# without the ?v= content hash; versioned URLs are cached as immutable
+QR_IMAGE_MAX_AGE = 3600
+
 # DRF Spectacular (Swagger/OpenAPI) Configuration
 SPECTACULAR_SETTINGS = {
     'TITLE': 'RxVerify Lite API',
@@ -250,5 +435,6 @@ SPECTACULAR_SETTINGS = {
         {'name': 'Manifests', 'description': 'Lot manifest and signature verification'},
         {'name': 'Receipts', 'description': 'Receipt event tracking'},
         {'name': 'Flags', 'description': 'Crowdsourced quality reports'},
+        {'name': 'Admin', 'description': 'Operational metrics'},
     ],
 }
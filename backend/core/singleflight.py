@@ -0,0 +1,189 @@
+"""
+Request coalescing ("single-flight") for bursts of identical reads.
+
+When a story about a counterfeit batch breaks, thousands of patients scan
+the same lot within minutes. Without coalescing every request loads the lot,
+counts its flags and checks its Ed25519 signature on its own, so database
+load grows with the number of concurrent scans.
+
+coalesce(key, compute) makes concurrent callers share one computation:
+- Within a process, the first caller for a key (the leader) runs compute()
+  while later callers wait for its result. The result is then reused for
+  RESULT_TTL seconds (well under a second by default), which only smooths
+  bursts and never serves noticeably stale data.
+- Across worker processes, the leader takes a lock in the cache backend
+  with cache.add(). Leaders in other workers that find the lock taken poll
+  the cache for the published result instead of computing it, and only
+  compute it themselves if the lock holder fails or takes longer than
+  LOCK_TIMEOUT. Published results live for RESULT_TTL rounded up to whole
+  seconds. With the local memory backend the lock is per process, so only
+  the in-process coalescing applies.
+
+Exceptions (e.g. Http404) propagate to every in-process waiter and are
+never published to the cache.
+"""
+import math
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+KEY_PREFIX = 'sf:'
+
+
+def _settings():
+    return getattr(settings, 'SINGLE_FLIGHT', {})
+
+
+class _Call:
+    """One in-flight computation and the threads waiting for it."""
+
+    __slots__ = ('done', 'result', 'error', 'expires_at')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.expires_at = 0.0
+
+
+class SingleFlight:
+    """
+    Per-process coalescing of concurrent calls with the same key.
+
+    Finished results are kept for `result_ttl` seconds; expired ones are
+    pruned as new calls come in.
+    """
+
+    def __init__(self, result_ttl=0.5):
+        self.result_ttl = result_ttl
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {'leaders': 0, 'shared': 0}
+
+    def do(self, key, compute):
+        """
+        Run compute() once for all concurrent callers with this key.
+
+        Returns:
+            tuple: (result, shared) where shared is True if another caller computed it
+        """
+        now = time.monotonic()
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and call.done.is_set() and call.expires_at <= now:
+                call = None
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.stats['leaders'] += 1
+                if len(self._calls) > 1024:
+                    self._prune(now)
+            else:
+                leader = False
+                self.stats['shared'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = compute()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                # Failures are not reused: the next caller retries
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            raise
+        finally:
+            call.expires_at = time.monotonic() + self.result_ttl
+            call.done.set()
+        return call.result, False
+
+    def _prune(self, now):
+        """Drop expired results. Caller holds _lock."""
+        for key in [key for key, call in self._calls.items() if call.done.is_set() and call.expires_at <= now]:
+            del self._calls[key]
+
+
+_flight = None
+_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    """The process-wide SingleFlight, configured from SINGLE_FLIGHT settings."""
+    global _flight
+    if _flight is None:
+        with _flight_lock:
+            if _flight is None:
+                _flight = SingleFlight(result_ttl=_settings().get('RESULT_TTL', 0.5))
+    return _flight
+
+
+def _coalesce_across_workers(key, compute):
+    """
+    Compute under a cache lock, or wait for another worker's published result.
+
+    Returns:
+        The result (published results must be picklable)
+    """
+    config = _settings()
+    cache = caches[config.get('CACHE', 'default')]
+    result_key = f'{KEY_PREFIX}result:{key}'
+    lock_key = f'{KEY_PREFIX}lock:{key}'
+    lock_timeout = config.get('LOCK_TIMEOUT', 5.0)
+    # Cache timeouts are whole seconds on some backends
+    result_timeout = max(1, math.ceil(config.get('RESULT_TTL', 0.5)))
+
+    published = cache.get(result_key)
+    if published is not None:
+        return published['value']
+
+    token = uuid.uuid4().hex
+    if not cache.add(lock_key, token, timeout=max(1, math.ceil(lock_timeout))):
+        deadline = time.monotonic() + lock_timeout
+        interval = config.get('POLL_INTERVAL', 0.01)
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            published = cache.get(result_key)
+            if published is not None:
+                return published['value']
+            if cache.get(lock_key) is None:
+                break  # Holder failed without publishing; compute it ourselves
+        return compute()
+
+    try:
+        value = compute()
+        cache.set(result_key, {'value': value}, timeout=result_timeout)
+        return value
+    finally:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+def coalesce(key, compute):
+    """
+    Share one computation of `compute()` among concurrent callers of `key`.
+
+    Returns compute()'s result directly when SINGLE_FLIGHT['ENABLED'] is off.
+
+    Args:
+        key: String identifying the computation, e.g. "verify-qr:<lot id>"
+        compute: Zero-argument callable
+
+    Returns:
+        The computed (possibly shared) result
+    """
+    config = _settings()
+    if not config.get('ENABLED', True):
+        return compute()
+    if config.get('CROSS_WORKER', True):
+        result, _ = get_single_flight().do(key, lambda: _coalesce_across_workers(key, compute))
+    else:
+        result, _ = get_single_flight().do(key, compute)
+    return result
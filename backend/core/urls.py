@@ -6,6 +6,8 @@ This module integrates all app URL patterns and provides:
 - JWT authentication endpoints
 - Swagger/OpenAPI documentation UI
 - Django admin interface
+- Admin operational endpoints (response cache statistics)
+- Verification pages at the QR code URLs (/verify/{id}, /V/{code})
 
 API Documentation:
 - Swagger UI: /api/docs/
@@ -16,6 +18,8 @@ from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 
+from .views import cache_stats
+
 urlpatterns = [
     # Django admin interface
     path('admin/', admin.site.urls),
@@ -42,4 +46,11 @@ urlpatterns = [
     
     # Crowdsourced Quality Reporting (reports app)
     path('api/', include('reports.urls')),
+    
+    # Response cache hit rates (admin only)
+    path('api/admin/cache-stats/', cache_stats, name='cache-stats'),
+    
+    # Patient verification pages QR codes link to (live fallback of the
+    # published pages, see manifests/published_pages.py)
+    path('', include('manifests.page_urls')),
 ]
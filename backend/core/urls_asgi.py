@@ -0,0 +1,19 @@
+"""
+URL configuration of the ASGI deployment (ASYNC_VERIFY_VIEWS, see core/asgi.py).
+
+The verification endpoints are answered by the async views in
+manifests/async_views.py; everything else, including ids that are not
+UUIDs, resolves to the routes of core/urls.py. The OpenAPI schema documents
+the DRF views, which answer identically.
+"""
+from django.urls import path
+
+from manifests import async_views
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/manifests/<uuid:pk>/verify-qr/', async_views.verify_qr, name='lotmanifest-verify-qr-async'),
+    path('api/manifests/<uuid:pk>/verify/', async_views.verify, name='lotmanifest-verify-async'),
+    *sync_urlpatterns,
+]
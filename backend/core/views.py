@@ -0,0 +1,38 @@
+"""
+Project-level API views that don't belong to a single app.
+"""
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.types import OpenApiTypes
+
+from accounts.permissions import IsAdmin
+from .cache import cache_stats as get_cache_stats
+
+
+@extend_schema(
+    summary="Response cache statistics",
+    description="""
+    Hit, miss and store counts of the response cache, overall and per cached
+    endpoint (e.g. `lotmanifest.verify_qr`), with hit rates and the number of
+    tag invalidations.
+    
+    Counters live in the cache backend: per worker process with the local
+    memory backend, shared by all workers with the file and Redis backends.
+    
+    **Admin-only access.**
+    """,
+    tags=['Admin'],
+    responses={200: OpenApiTypes.OBJECT},
+)
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def cache_stats(request):
+    """
+    Report response cache hit rates.
+    
+    Returns:
+        Response: Backend, totals and per-endpoint counters
+    """
+    return Response(get_cache_stats(), status=status.HTTP_200_OK)
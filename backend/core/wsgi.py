@@ -2,6 +2,9 @@
 WSGI config for core project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+Patient QR scans (GET /api/manifests/{id}/verify-qr/) are answered by a lean
+fast path in front of Django unless VERIFY_FAST_PATH_ENABLED is off (see
+manifests/fast_path.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
@@ -9,8 +12,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+if settings.VERIFY_FAST_PATH_ENABLED:
+    from manifests.fast_path import VerifyQrFastPath
+
+    application = VerifyQrFastPath(application)
@@ -1,4 +1,6 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+
+from manifests.signing import create_resign_job, start_resign_job
 from .models import Distributor
 
 
@@ -20,3 +22,20 @@ class DistributorAdmin(admin.ModelAdmin):
             'fields': ('public_key', 'is_verified_regulator')
         }),
     )
+    
+    actions = ['resign_lot_manifests']
+    
+    def resign_lot_manifests(self, request, queryset):
+        """Admin action to re-sign all lots of the selected distributors (e.g. after a key change)."""
+        for distributor in queryset:
+            job, created = create_resign_job(distributor, created_by=request.user)
+            start_resign_job(job.pk)
+            self.message_user(
+                request,
+                f"{distributor.name}: re-sign job #{job.pk} {'started' if created else 'resumed'}. "
+                f"Progress is shown under Re-sign Jobs; if the server restarts mid-way, "
+                f"run `manage.py resign_manifests --resume`.",
+                messages.SUCCESS,
+            )
+    
+    resign_lot_manifests.short_description = "Re-sign all lot manifests (after a key change)"
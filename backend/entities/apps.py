@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class EntitiesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'entities'
+    
+    def ready(self):
+        """Import signals when the app is ready."""
+        import entities.signals
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 00:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entities', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='distributor',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Last modification time (used for HTTP validators, see core/conditional.py)'),
+        ),
+    ]
@@ -12,6 +12,11 @@ class Distributor(models.Model):
         default=False,
         help_text="Whether this distributor is verified by regulatory authorities"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        help_text="Last modification time (used for HTTP validators, see core/conditional.py)"
+    )
     
     def __str__(self):
         return self.name
@@ -0,0 +1,27 @@
+"""
+Django signals for distributors.
+
+This module invalidates cached responses that show a distributor or depend
+on its public key (lot signature checks).
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Distributor
+from core.cache import invalidate_tags
+
+
+@receiver(post_save, sender=Distributor)
+@receiver(post_delete, sender=Distributor)
+def invalidate_distributor_responses(sender, instance, **kwargs):
+    """
+    Invalidate cached responses of a distributor's lots and medicines.
+    
+    Lot and medicine lists show distributor names, so they are invalidated too.
+    
+    Args:
+        sender: The Distributor model class
+        instance: The Distributor instance being saved or deleted
+        **kwargs: Additional keyword arguments
+    """
+    invalidate_tags(f'distributor:{instance.pk}', 'lots', 'medicines')
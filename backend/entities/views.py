@@ -11,6 +11,7 @@ from drf_spectacular.types import OpenApiTypes
 from .models import Distributor
 from .serializers import DistributorSerializer
 from accounts.permissions import IsAdminOrReadOnly
+from core.conditional import ConditionalRequestMixin
 
 
 @extend_schema_view(
@@ -83,11 +84,11 @@ from accounts.permissions import IsAdminOrReadOnly
     ),
     destroy=extend_schema(
         summary="Delete distributor",
-        description="Permanently delete a distributor from the system. Requires admin role.",
+        description="Permanently delete a distributor from the system. Requires admin role. Its medicines and lots are deleted too; their receipt events are kept.",
         tags=['Distributors'],
     ),
 )
-class DistributorViewSet(viewsets.ModelViewSet):
+class DistributorViewSet(ConditionalRequestMixin, viewsets.ModelViewSet):
     """
     ViewSet for pharmaceutical distributor management.
     
@@ -99,6 +100,7 @@ class DistributorViewSet(viewsets.ModelViewSet):
     - Delete distributors (admin only)
     - Filter by verification status
     - Search by name
+    - ETag validators and 304 answers for list and retrieve (see core/conditional.py)
     
     Permissions:
     - Read & Create: All authenticated users
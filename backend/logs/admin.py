@@ -1,16 +1,19 @@
 from django.contrib import admin
-from .models import ReceiptEvent
+from .chain import append_receipts
+from .models import ReceiptChainCheckpoint, ReceiptEvent
 
 
 @admin.register(ReceiptEvent)
 class ReceiptEventAdmin(admin.ModelAdmin):
     """Admin configuration for the ReceiptEvent model."""
     
-    list_display = ['id', 'user', 'lot', 'created_at', 'get_location_summary']
+    list_display = ['id', 'username', 'batch_number', 'user', 'lot', 'created_at', 'get_location_summary']
     list_filter = ['created_at', 'user', 'lot__medicine']
-    search_fields = ['user__username', 'lot__batch_number']
+    search_fields = ['username', 'batch_number', 'user__username', 'lot__batch_number']
     ordering = ['-created_at']
-    readonly_fields = ['id', 'created_at']
+    readonly_fields = [
+        'id', 'created_at', 'user_ref', 'username', 'lot_ref', 'batch_number', 'sequence', 'prev_hash', 'entry_hash'
+    ]
     autocomplete_fields = ['user', 'lot']
     
     fieldsets = (
@@ -20,11 +23,33 @@ class ReceiptEventAdmin(admin.ModelAdmin):
         ('Relationships', {
             'fields': ('user', 'lot')
         }),
+        ('Recorded At Receipt', {
+            'fields': ('user_ref', 'username', 'lot_ref', 'batch_number'),
+            'description': (
+                'Covered by the hash chain. Deleting the user or lot clears the '
+                'links above but keeps the receipt and these snapshots.'
+            ),
+        }),
         ('Location Data', {
             'fields': ('location_coord',)
         }),
+        ('Hash Chain', {
+            'fields': ('sequence', 'prev_hash', 'entry_hash'),
+            'classes': ('collapse',)
+        }),
     )
     
+    def has_change_permission(self, request, obj=None):
+        # Receipts are immutable audit logs; an edit would break the hash chain
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+    
+    def save_model(self, request, obj, form, change):
+        """Append receipts added in the admin to the hash chain."""
+        append_receipts([obj])
+    
     def get_location_summary(self, obj):
         """Display a summary of location coordinates."""
         if obj.location_coord:
@@ -32,3 +57,23 @@ class ReceiptEventAdmin(admin.ModelAdmin):
         return "No location"
     
     get_location_summary.short_description = 'Location'
+
+
+
+@admin.register(ReceiptChainCheckpoint)
+class ReceiptChainCheckpointAdmin(admin.ModelAdmin):
+    """Admin configuration for receipt chain checkpoints (read-only)."""
+    
+    list_display = ['sequence', 'entry_hash', 'created_at', 'verified_at']
+    ordering = ['-sequence']
+    readonly_fields = ['sequence', 'entry_hash', 'mac', 'created_at', 'verified_at']
+    
+    def has_add_permission(self, request):
+        # Checkpoints are written by the chain and verify_receipt_chain
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,383 @@
+"""
+Hash chain over receipt events.
+
+ReceiptEvent is an audit log, so every receipt is chained to its
+predecessor: it gets the next global sequence number, its predecessor's
+hash (prev_hash) and its own hash
+
+    entry_hash = SHA-256(prev_hash || canonical JSON of the receipt)
+
+Editing, inserting or deleting a receipt in the database breaks the chain
+from that point on. Deleting a lot or user (or a medicine or distributor,
+through its lots) keeps their receipts: the foreign keys are SET_NULL, and
+the hash covers snapshots of the lot and user ids, batch number and
+username taken when the receipt was recorded, not the foreign keys.
+
+Appends are serialized by locking the single ReceiptChainHead row, which
+holds the last sequence and hash, so receipts are only ever chained in
+batches: a direct POST inserts its receipt unchained (record_receipts())
+and wakes this process's chainer thread, which appends every pending
+receipt under one lock (chain_pending()) after RECEIPT_CHAIN_INTERVAL
+seconds. The write-behind spool appends a whole segment per lock. Until it
+is chained, a receipt is not covered by the chain (at most about
+RECEIPT_CHAIN_INTERVAL seconds; `verify_receipt_chain --backfill` chains
+any left behind by a crash).
+
+Every RECEIPT_CHAIN_CHECKPOINT_INTERVAL receipts a checkpoint records the
+chain hash at that sequence, authenticated with an HMAC keyed by
+SECRET_KEY, which someone with only database access cannot forge.
+verify_receipt_chain starts from the last verified checkpoint and only
+re-hashes the receipts after it, so an audit costs time proportional to
+the receipts added since the previous audit.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+logger = logging.getLogger(__name__)
+
+GENESIS_HASH = '0' * 64
+
+_CHECKPOINT_SALT = 'logs.chain.checkpoint'
+
+
+class ChainError(Exception):
+    """Raised when the receipt chain does not verify."""
+
+    def __init__(self, sequence, message):
+        super().__init__(f'Receipt chain broken at sequence {sequence}: {message}')
+        self.sequence = sequence
+
+
+def _canonical_uuid(value):
+    return str(uuid.UUID(str(value)))
+
+
+def receipt_digest_input(receipt):
+    """
+    Canonical serialization of the receipt fields covered by the chain.
+
+    The batch number and username snapshots are left out when empty, so
+    receipts chained before they existed keep their hashes.
+
+    Returns:
+        bytes: Sorted-key compact JSON
+    """
+    fields = {
+        'sequence': receipt.sequence,
+        'id': _canonical_uuid(receipt.id),
+        'lot': _canonical_uuid(receipt.lot_ref),
+        'user': _canonical_uuid(receipt.user_ref),
+        'created_at': receipt.created_at.astimezone(dt_timezone.utc).isoformat(),
+        'location_coord': receipt.location_coord,
+    }
+    if receipt.batch_number:
+        fields['batch_number'] = receipt.batch_number
+    if receipt.username:
+        fields['username'] = receipt.username
+    return json.dumps(
+        fields,
+        sort_keys=True,
+        separators=(',', ':'),
+    ).encode('utf-8')
+
+
+def entry_hash(prev_hash, receipt):
+    """Chain hash of a receipt given its predecessor's hash."""
+    return hashlib.sha256(prev_hash.encode('ascii') + receipt_digest_input(receipt)).hexdigest()
+
+
+def checkpoint_mac(sequence, chain_hash):
+    """HMAC authenticating a checkpoint (keyed by SECRET_KEY, never stored in the database)."""
+    return salted_hmac(_CHECKPOINT_SALT, f'{sequence}:{chain_hash}', algorithm='sha256').hexdigest()
+
+
+def _lock_head():
+    """Lock and return the chain head row (created at genesis if missing)."""
+    from .models import ReceiptChainHead
+
+    head, _ = ReceiptChainHead.objects.select_for_update().get_or_create(pk=ReceiptChainHead.SINGLETON_ID)
+    return head
+
+
+def _link(head, receipts):
+    """
+    Assign sequence, prev_hash and entry_hash to receipts after the (locked) head.
+
+    Returns:
+        list: Unsaved checkpoints for sequences that hit the checkpoint interval
+    """
+    from .models import ReceiptChainCheckpoint
+
+    interval = getattr(settings, 'RECEIPT_CHAIN_CHECKPOINT_INTERVAL', 10000)
+    checkpoints = []
+    for receipt in receipts:
+        head.sequence += 1
+        receipt.sequence = head.sequence
+        receipt.prev_hash = head.entry_hash
+        receipt.entry_hash = entry_hash(receipt.prev_hash, receipt)
+        head.entry_hash = receipt.entry_hash
+        if head.sequence % interval == 0:
+            checkpoints.append(ReceiptChainCheckpoint(
+                sequence=head.sequence,
+                entry_hash=head.entry_hash,
+                mac=checkpoint_mac(head.sequence, head.entry_hash),
+            ))
+    return checkpoints
+
+
+def append_receipts(receipts, batch_size=1000, skip_inserted=False):
+    """
+    Chain and insert new receipts, in the given order.
+
+    Takes the chain head lock, so concurrent appends are serialized. Call
+    inside the transaction that should commit the receipts, or on its own.
+
+    Args:
+        receipts: List of unsaved ReceiptEvent instances
+        batch_size: Rows per INSERT statement
+        skip_inserted: Leave out receipts whose id is already in the
+            database (a replayed spool segment). Checked under the head
+            lock, so concurrent replays insert each receipt once.
+
+    Returns:
+        list: The inserted receipts, with sequence, prev_hash and entry_hash set
+    """
+    from .models import ReceiptChainCheckpoint, ReceiptEvent
+
+    if not receipts:
+        return receipts
+
+    with transaction.atomic():
+        head = _lock_head()
+        if skip_inserted:
+            inserted = set()
+            for start in range(0, len(receipts), batch_size):
+                ids = [receipt.id for receipt in receipts[start:start + batch_size]]
+                inserted.update(ReceiptEvent.objects.filter(id__in=ids).values_list('id', flat=True))
+            receipts = [receipt for receipt in receipts if receipt.id not in inserted]
+            if not receipts:
+                return receipts
+        for receipt in receipts:
+            receipt.fill_snapshot()
+        checkpoints = _link(head, receipts)
+        ReceiptEvent.objects.bulk_create(receipts, batch_size=batch_size)
+        ReceiptChainCheckpoint.objects.bulk_create(checkpoints)
+        head.save(update_fields=['sequence', 'entry_hash', 'updated_at'])
+    return receipts
+
+
+def record_receipts(receipts, batch_size=1000):
+    """
+    Insert new receipts unchained, for the chainer to append in a batch.
+
+    Takes no lock, so concurrent requests don't wait for each other. The
+    chainer thread is woken when the transaction commits.
+
+    Args:
+        receipts: List of unsaved ReceiptEvent instances
+        batch_size: Rows per INSERT statement
+
+    Returns:
+        list: The inserted receipts (sequence, prev_hash and entry_hash unset)
+    """
+    from .models import ReceiptEvent
+
+    for receipt in receipts:
+        receipt.fill_snapshot()
+    ReceiptEvent.objects.bulk_create(receipts, batch_size=batch_size)
+    transaction.on_commit(wake_chainer)
+    return receipts
+
+
+def chain_pending(batch_size=5000, progress=None):
+    """
+    Chain receipts that have no sequence yet.
+
+    These are receipts recorded by record_receipts(), and receipts inserted
+    before the chain existed. They are appended after the current head in
+    (created_at, id) order, a batch per head lock.
+
+    Returns:
+        int: Number of receipts chained
+    """
+    from .models import ReceiptChainCheckpoint, ReceiptEvent
+
+    chained = 0
+    while True:
+        with transaction.atomic():
+            head = _lock_head()
+            batch = list(
+                ReceiptEvent.objects.filter(sequence__isnull=True)
+                .order_by('created_at', 'id')
+                .only('id', 'lot_ref', 'user_ref', 'batch_number', 'username', 'created_at', 'location_coord')[:batch_size]
+            )
+            if not batch:
+                return chained
+            checkpoints = _link(head, batch)
+            ReceiptEvent.objects.bulk_update(batch, ['sequence', 'prev_hash', 'entry_hash'], batch_size=1000)
+            ReceiptChainCheckpoint.objects.bulk_create(checkpoints)
+            head.save(update_fields=['sequence', 'entry_hash', 'updated_at'])
+        chained += len(batch)
+        if progress is not None:
+            progress(chained)
+
+
+_chainer = None
+_chainer_lock = threading.Lock()
+_chainer_wake = threading.Event()
+
+
+def wake_chainer():
+    """
+    Have this process's chainer thread chain pending receipts soon.
+
+    The thread waits RECEIPT_CHAIN_INTERVAL seconds after the first wake-up,
+    so receipts recorded meanwhile share one head lock. With an interval of
+    0 there is no thread, and `verify_receipt_chain --backfill` chains them.
+    """
+    interval = getattr(settings, 'RECEIPT_CHAIN_INTERVAL', 1.0)
+    if not interval:
+        return
+    global _chainer
+    if _chainer is None or not _chainer.is_alive():
+        with _chainer_lock:
+            if _chainer is None or not _chainer.is_alive():
+                _chainer = threading.Thread(
+                    target=_chain_loop, args=(interval,), name='receipt-chainer', daemon=True
+                )
+                _chainer.start()
+    _chainer_wake.set()
+
+
+def _chain_loop(interval):
+    while True:
+        _chainer_wake.wait()
+        time.sleep(interval)
+        # Receipts recorded from here on wake the next round
+        _chainer_wake.clear()
+        close_old_connections()
+        try:
+            chain_pending()
+        except Exception:
+            logger.exception('Chaining pending receipts failed; will retry')
+            _chainer_wake.set()
+
+
+def verify_chain(full=False, chunk_size=5000, progress=None):
+    """
+    Verify the receipt chain from the last verified checkpoint (or genesis).
+
+    Checks that sequences are contiguous up to the chain head, that each receipt links to its
+    predecessor's hash, that each entry_hash matches the receipt's current
+    data, and that checkpoints in the range match the chain and carry a
+    valid HMAC. On success the verified head becomes a new verified
+    checkpoint, which is where the next run starts.
+
+    Receipts at or before the starting checkpoint are not re-read; run with
+    full=True for a complete audit.
+
+    Args:
+        full: Verify from genesis instead of the last verified checkpoint
+        chunk_size: Receipts read per query (keyset on sequence)
+        progress: Optional callable(verified_count, sequence)
+
+    Returns:
+        dict: start and end sequence, receipts verified, head hash
+
+    Raises:
+        ChainError: At the first inconsistency
+    """
+    from .models import ReceiptChainCheckpoint, ReceiptChainHead, ReceiptEvent
+
+    # Receipts up to the head as of now must all be present
+    head_sequence = (
+        ReceiptChainHead.objects.filter(pk=ReceiptChainHead.SINGLETON_ID)
+        .values_list('sequence', flat=True)
+        .first()
+    ) or 0
+    start_sequence, running_hash = 0, GENESIS_HASH
+    if not full:
+        anchor = (
+            ReceiptChainCheckpoint.objects.filter(verified_at__isnull=False)
+            .order_by('-sequence')
+            .first()
+        )
+        if anchor is not None:
+            if not hmac.compare_digest(anchor.mac, checkpoint_mac(anchor.sequence, anchor.entry_hash)):
+                raise ChainError(anchor.sequence, 'checkpoint HMAC does not match (checkpoint edited)')
+            anchored = ReceiptEvent.objects.filter(sequence=anchor.sequence).values_list('entry_hash', flat=True).first()
+            if anchored != anchor.entry_hash:
+                raise ChainError(anchor.sequence, 'receipt at the last verified checkpoint was changed or deleted')
+            start_sequence, running_hash = anchor.sequence, anchor.entry_hash
+
+    checkpoints = {
+        checkpoint.sequence: checkpoint
+        for checkpoint in ReceiptChainCheckpoint.objects.filter(sequence__gt=start_sequence, verified_at__isnull=True)
+    }
+    fields = (
+        'id', 'lot_ref', 'user_ref', 'batch_number', 'username', 'created_at', 'location_coord',
+        'sequence', 'prev_hash', 'entry_hash',
+    )
+    expected = start_sequence + 1
+    verified = 0
+    while True:
+        chunk = list(
+            ReceiptEvent.objects.filter(sequence__gte=expected)
+            .order_by('sequence')
+            .only(*fields)[:chunk_size]
+        )
+        if not chunk:
+            break
+        for receipt in chunk:
+            if receipt.sequence != expected:
+                raise ChainError(expected, f'receipts {expected}..{receipt.sequence - 1} are missing (deleted?)')
+            if receipt.prev_hash != running_hash:
+                raise ChainError(receipt.sequence, 'prev_hash does not link to the previous receipt')
+            if entry_hash(running_hash, receipt) != receipt.entry_hash:
+                raise ChainError(receipt.sequence, f'receipt {receipt.id} was modified')
+            running_hash = receipt.entry_hash
+            checkpoint = checkpoints.get(receipt.sequence)
+            if checkpoint is not None and (
+                checkpoint.entry_hash != running_hash
+                or not hmac.compare_digest(checkpoint.mac, checkpoint_mac(checkpoint.sequence, checkpoint.entry_hash))
+            ):
+                raise ChainError(receipt.sequence, 'checkpoint does not match the chain')
+            expected += 1
+            verified += 1
+        if progress is not None:
+            progress(verified, expected - 1)
+
+    end_sequence = expected - 1
+    if end_sequence < head_sequence:
+        raise ChainError(expected, f'receipts {expected}..{head_sequence} are missing (deleted?)')
+    now = timezone.now()
+    with transaction.atomic():
+        ReceiptChainCheckpoint.objects.filter(
+            sequence__gt=start_sequence, sequence__lte=end_sequence, verified_at__isnull=True
+        ).update(verified_at=now)
+        if end_sequence > start_sequence:
+            ReceiptChainCheckpoint.objects.update_or_create(
+                sequence=end_sequence,
+                defaults={
+                    'entry_hash': running_hash,
+                    'mac': checkpoint_mac(end_sequence, running_hash),
+                    'verified_at': now,
+                },
+            )
+    return {
+        'start_sequence': start_sequence,
+        'end_sequence': end_sequence,
+        'verified': verified,
+        'head_hash': running_hash,
+    }
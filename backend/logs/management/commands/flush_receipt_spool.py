@@ -0,0 +1,71 @@
+"""
+Django management command to drain the write-behind receipt spool.
+
+Usage:
+    # Flush everything that is waiting, once
+    python manage.py flush_receipt_spool
+
+    # Run as a long-lived flusher next to the web workers
+    python manage.py flush_receipt_spool --loop --interval 0.5
+
+    # Show spool depth and flush lag without flushing
+    python manage.py flush_receipt_spool --stats
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from logs.spool import get_receipt_spool
+
+
+class Command(BaseCommand):
+    help = 'Drain spooled receipt events into the database with bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep flushing until interrupted',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds between flushes in --loop mode (default: 1.0)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows per INSERT statement (default: 5000)',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print spool metrics and exit',
+        )
+
+    def handle(self, *args, **options):
+        spool = get_receipt_spool()
+        if spool is None:
+            raise CommandError('Receipt spool is disabled (set RECEIPT_SPOOL_ENABLED=true)')
+
+        if options['stats']:
+            self.stdout.write(json.dumps(spool.stats(), indent=2))
+            return
+
+        while True:
+            close_old_connections()
+            result = spool.drain(batch_size=options['batch_size'])
+            if result['segments'] or not options['loop']:
+                stats = spool.stats()
+                self.stdout.write(
+                    f"Flushed {result['records']} receipts from {result['segments']} segments "
+                    f"in {result['seconds']:.2f}s (dropped {result['dropped']}, "
+                    f"lag {stats['flush_lag_seconds']:.1f}s, pending {stats['pending_bytes']} bytes)"
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0001_initial'),
+        ('manifests', '0004_access_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='receiptevent',
+            index=models.Index(fields=['-created_at'], name='receipt_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receiptevent',
+            index=models.Index(fields=['lot', '-created_at'], name='receipt_lot_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receiptevent',
+            index=models.Index(fields=['user', '-created_at'], name='receipt_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0002_access_path_indexes'),
+        ('manifests', '0005_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='receiptevent',
+            name='receipt_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='receiptevent',
+            index=models.Index(fields=['-created_at', '-id'], name='receipt_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:20
+
+from django.db import migrations, models
+
+
+def create_chain_head(apps, schema_editor):
+    """Create the single chain head row, at genesis."""
+    ReceiptChainHead = apps.get_model('logs', 'ReceiptChainHead')
+    ReceiptChainHead.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0004_receiptevent_created_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceiptChainCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.BigIntegerField(unique=True)),
+                ('entry_hash', models.CharField(max_length=64)),
+                ('mac', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('verified_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Receipt Chain Checkpoint',
+                'verbose_name_plural': 'Receipt Chain Checkpoints',
+                'db_table': 'receipt_chain_checkpoints',
+                'ordering': ['-sequence'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReceiptChainHead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.BigIntegerField(default=0)),
+                ('entry_hash', models.CharField(default='0000000000000000000000000000000000000000000000000000000000000000', max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Receipt Chain Head',
+                'db_table': 'receipt_chain_head',
+            },
+        ),
+        migrations.AddField(
+            model_name='receiptevent',
+            name='entry_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='receiptevent',
+            name='prev_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='receiptevent',
+            name='sequence',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        # Existing receipts stay unchained (sequence NULL) until
+        # `manage.py verify_receipt_chain --backfill` chains them in batches
+        migrations.RunPython(create_chain_head, migrations.RunPython.noop),
+    ]
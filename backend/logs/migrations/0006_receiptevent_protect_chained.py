@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-19 00:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0005_receipt_chain'),
+        ('manifests', '0010_lotverificationview'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='receiptevent',
+            name='lot',
+            field=models.ForeignKey(help_text='Lot manifest that was scanned/received', on_delete=django.db.models.deletion.PROTECT, related_name='receipt_events', to='manifests.lotmanifest'),
+        ),
+        migrations.AlterField(
+            model_name='receiptevent',
+            name='user',
+            field=models.ForeignKey(help_text='User who scanned/received the lot', on_delete=django.db.models.deletion.PROTECT, related_name='receipt_events', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
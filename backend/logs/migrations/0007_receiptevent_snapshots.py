@@ -0,0 +1,82 @@
+# Generated by Django 5.0.1 on 2026-10-19 12:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_snapshots(apps, schema_editor):
+    """
+    Copy user and lot ids into the snapshots of existing receipts.
+
+    The chain hash already covered these ids, so chained receipts keep
+    verifying. Batch number and username snapshots are only filled for
+    receipts that aren't chained yet: adding them to a chained receipt would
+    change its hash.
+    """
+    ReceiptEvent = apps.get_model('logs', 'ReceiptEvent')
+    ReceiptEvent.objects.update(user_ref=models.F('user_id'), lot_ref=models.F('lot_id'))
+
+    unchained = ReceiptEvent.objects.filter(sequence__isnull=True).select_related('user', 'lot').order_by('pk')
+    batch = []
+    for receipt in unchained.iterator(chunk_size=2000):
+        receipt.username = receipt.user.username
+        receipt.batch_number = receipt.lot.batch_number
+        batch.append(receipt)
+        if len(batch) >= 2000:
+            ReceiptEvent.objects.bulk_update(batch, ['username', 'batch_number'])
+            batch = []
+    ReceiptEvent.objects.bulk_update(batch, ['username', 'batch_number'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0006_receiptevent_protect_chained'),
+        ('manifests', '0011_lotmanifest_shipment_restrict'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receiptevent',
+            name='user_ref',
+            field=models.UUIDField(editable=False, null=True, help_text='Id of the user at the time of the receipt'),
+        ),
+        migrations.AddField(
+            model_name='receiptevent',
+            name='username',
+            field=models.CharField(blank=True, editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='receiptevent',
+            name='lot_ref',
+            field=models.UUIDField(editable=False, null=True, help_text='Id of the lot at the time of the receipt'),
+        ),
+        migrations.AddField(
+            model_name='receiptevent',
+            name='batch_number',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_snapshots, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='receiptevent',
+            name='user_ref',
+            field=models.UUIDField(editable=False, help_text='Id of the user at the time of the receipt'),
+        ),
+        migrations.AlterField(
+            model_name='receiptevent',
+            name='lot_ref',
+            field=models.UUIDField(editable=False, help_text='Id of the lot at the time of the receipt'),
+        ),
+        migrations.AlterField(
+            model_name='receiptevent',
+            name='lot',
+            field=models.ForeignKey(help_text='Lot manifest that was scanned/received (cleared if the lot is deleted)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='receipt_events', to='manifests.lotmanifest'),
+        ),
+        migrations.AlterField(
+            model_name='receiptevent',
+            name='user',
+            field=models.ForeignKey(help_text='User who scanned/received the lot (cleared if the user is deleted)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='receipt_events', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
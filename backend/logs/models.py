@@ -1,5 +1,8 @@
 import uuid
 from django.db import models
+from django.utils import timezone
+
+from .chain import GENESIS_HASH
 
 
 class ReceiptEvent(models.Model):
@@ -9,25 +12,107 @@ class ReceiptEvent(models.Model):
     location_coord = models.JSONField(
         help_text="Geographic coordinates in JSON format (e.g., {'lat': 40.7128, 'lng': -74.0060})"
     )
+    # Receipts outlive their user and lot: deleting either clears the link,
+    # and the snapshot fields below (covered by the hash chain, see
+    # logs/chain.py) keep who received what
     user = models.ForeignKey(
         'accounts.User',
-        on_delete=models.CASCADE,
+        on_delete=models.SET_NULL,
+        null=True,
         related_name='receipt_events',
-        help_text="User who scanned/received the lot"
+        help_text="User who scanned/received the lot (cleared if the user is deleted)"
     )
     lot = models.ForeignKey(
         'manifests.LotManifest',
-        on_delete=models.CASCADE,
+        on_delete=models.SET_NULL,
+        null=True,
         related_name='receipt_events',
-        help_text="Lot manifest that was scanned/received"
+        help_text="Lot manifest that was scanned/received (cleared if the lot is deleted)"
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Snapshots taken when the receipt is recorded (see fill_snapshot()).
+    # Receipts chained before the snapshots existed have no batch number or
+    # username snapshot; their hash covers the ids only.
+    user_ref = models.UUIDField(editable=False, help_text="Id of the user at the time of the receipt")
+    username = models.CharField(max_length=150, blank=True, editable=False)
+    lot_ref = models.UUIDField(editable=False, help_text="Id of the lot at the time of the receipt")
+    batch_number = models.CharField(max_length=100, blank=True, editable=False)
+    # Set when the receipt is accepted (not when it is inserted), so receipts
+    # flushed later from the write-behind spool keep their real timestamp
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Hash chain (see logs/chain.py); set by append_receipts() or
+    # chain_pending(), null until the chainer has appended the receipt
+    sequence = models.BigIntegerField(null=True, blank=True, unique=True, editable=False)
+    prev_hash = models.CharField(max_length=64, blank=True, editable=False)
+    entry_hash = models.CharField(max_length=64, blank=True, editable=False)
     
     def __str__(self):
-        return f"Receipt by {self.user.username} - Lot {self.lot.batch_number}"
+        return f"Receipt by {self.username or self.user_ref} - Lot {self.batch_number or self.lot_ref}"
+    
+    def fill_snapshot(self):
+        """Copy the user and lot references into the snapshot fields."""
+        self.user_ref = self.user_id
+        self.lot_ref = self.lot_id
+        if not self.username:
+            self.username = self.user.username
+        if not self.batch_number:
+            self.batch_number = self.lot.batch_number
     
     class Meta:
         db_table = 'receipt_events'
         verbose_name = 'Receipt Event'
         verbose_name_plural = 'Receipt Events'
         ordering = ['-created_at']
+        indexes = [
+            # Default listing, keyset pagination and the date_from/date_to range filters
+            models.Index(fields=['-created_at', '-id'], name='receipt_created_id_idx'),
+            # lot and user filters, ordered newest first
+            models.Index(fields=['lot', '-created_at'], name='receipt_lot_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='receipt_user_created_idx'),
+        ]
+
+
+class ReceiptChainHead(models.Model):
+    """
+    The last link of the receipt chain (a single row).
+    
+    Appends lock this row, so its sequence and hash always describe the
+    last committed receipt.
+    """
+    
+    SINGLETON_ID = 1
+    
+    sequence = models.BigIntegerField(default=0)
+    entry_hash = models.CharField(max_length=64, default=GENESIS_HASH)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Receipt chain head at {self.sequence}"
+    
+    class Meta:
+        db_table = 'receipt_chain_head'
+        verbose_name = 'Receipt Chain Head'
+
+
+class ReceiptChainCheckpoint(models.Model):
+    """
+    Chain hash at a sequence, authenticated with an HMAC (see logs/chain.py).
+    
+    Written every RECEIPT_CHAIN_CHECKPOINT_INTERVAL receipts and at the end
+    of every verification; verified_at marks where the next verification
+    can start.
+    """
+    
+    sequence = models.BigIntegerField(unique=True)
+    entry_hash = models.CharField(max_length=64)
+    mac = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    verified_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Checkpoint {self.sequence}"
+    
+    class Meta:
+        db_table = 'receipt_chain_checkpoints'
+        verbose_name = 'Receipt Chain Checkpoint'
+        verbose_name_plural = 'Receipt Chain Checkpoints'
+        ordering = ['-sequence']
@@ -5,13 +5,27 @@ from .models import ReceiptEvent
 class ReceiptEventSerializer(serializers.ModelSerializer):
     """Serializer for the ReceiptEvent model."""
     
-    user_username = serializers.CharField(source='user.username', read_only=True)
-    lot_batch_number = serializers.CharField(source='lot.batch_number', read_only=True)
+    user_username = serializers.SerializerMethodField()
+    lot_batch_number = serializers.SerializerMethodField()
     
     class Meta:
         model = ReceiptEvent
         fields = [
             'id', 'location_coord', 'user', 'user_username', 
-            'lot', 'lot_batch_number', 'created_at'
+            'lot', 'lot_batch_number', 'created_at', 'sequence', 'entry_hash'
         ]
-        read_only_fields = ['id', 'user', 'created_at']
+        read_only_fields = ['id', 'user', 'created_at', 'sequence', 'entry_hash']
+        # Null only once the lot has been deleted
+        extra_kwargs = {'lot': {'allow_null': False}}
+    
+    def get_user_username(self, obj) -> str:
+        """Username recorded with the receipt (kept after the user is deleted)."""
+        if obj.username:
+            return obj.username
+        return obj.user.username if obj.user_id else ''
+    
+    def get_lot_batch_number(self, obj) -> str:
+        """Batch number recorded with the receipt (kept after the lot is deleted)."""
+        if obj.batch_number:
+            return obj.batch_number
+        return obj.lot.batch_number if obj.lot_id else ''
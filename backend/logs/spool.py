@@ -0,0 +1,491 @@
+"""
+Write-behind spool for receipt event ingestion.
+
+During delivery peaks every POST /api/receipts/ doing its own INSERT and
+commit makes the database the bottleneck. When RECEIPT_SPOOL['ENABLED'] is
+set, validated receipts are instead appended to a durable local spool and
+acknowledged right away; a flusher later drains the spool into the database
+with bulk_create in large batches.
+
+Spool layout (one directory, shared by all worker processes on a host):
+    receipts-<opened_ns>-<pid>.open                 active segment of a live process
+    receipts-<opened_ns>-<pid>.seg                  closed segment, ready to flush
+    receipts-<opened_ns>-<pid>.flushing-<flusher>   segment claimed by flusher process <flusher>
+    stats.json                                      metrics from the last flush
+
+Durability:
+- Each record is one JSON line. Writers share fsync calls (group commit):
+  concurrent appends that land before an fsync starts are covered by it, so
+  a request is only acknowledged once its record is on disk.
+- Receipt ids are assigned before spooling and ids already in the database
+  are skipped (under the chain head lock), so replaying a segment after a
+  crash is idempotent, even if two flushers replay it at once.
+- A segment is appended to the receipt hash chain (logs/chain.py) under one
+  lock of the chain head, in spool order.
+- .open segments whose writer is gone, and .flushing segments whose flusher
+  is gone, are recovered on the next flush. A torn last line from a crash
+  mid-write is skipped.
+
+Backpressure: appends raise SpoolFull once the spool directory exceeds
+MAX_BYTES, and the API answers 503 with Retry-After until the flusher catches up.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .chain import append_receipts
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = 'receipts-'
+STATS_FILENAME = 'stats.json'
+
+
+class SpoolFull(Exception):
+    """Raised when the spool has reached its size limit."""
+
+
+def _pid_alive(pid):
+    """Return True if a process with this pid exists on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _parse_segment_name(name):
+    """
+    Split a segment filename into (opened_ns, owner_pid, state).
+
+    owner_pid is the writer's pid for .open and .seg segments, and the
+    flusher's pid for .flushing-<pid> segments.
+
+    Returns:
+        tuple or None: None if the name is not a spool segment
+    """
+    if not name.startswith(SEGMENT_PREFIX):
+        return None
+    stem, _, state = name.rpartition('.')
+    parts = stem[len(SEGMENT_PREFIX):].split('-')
+    state, _, flusher = state.partition('-')
+    if len(parts) != 2 or state not in ('open', 'seg', 'flushing') or bool(flusher) != (state == 'flushing'):
+        return None
+    try:
+        return int(parts[0]), int(flusher or parts[1]), state
+    except ValueError:
+        return None
+
+
+class ReceiptSpool:
+    """
+    Append-only, segment-rotated spool of receipt events.
+
+    One instance per process writes to its own .open segment. Any process
+    can drain closed segments with drain().
+    """
+
+    def __init__(self, directory, segment_bytes=4 * 1024 * 1024, max_bytes=256 * 1024 * 1024,
+                 rotate_interval=1.0):
+        self.directory = str(directory)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        # _sync_lock is always taken before _lock
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._fd = None
+        self._path = None
+        self._opened_at = 0.0
+        self._segment_size = 0
+        self._written_seq = 0
+        self._synced_seq = 0
+
+        self._spool_bytes = 0
+        self._spool_bytes_checked_at = 0.0
+
+        self._rotator = None
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def append(self, receipt):
+        """
+        Durably spool a validated, unsaved ReceiptEvent.
+
+        Returns once the record has been fsynced (possibly by another
+        writer's fsync).
+
+        Raises:
+            SpoolFull: If the spool directory is over its size limit
+        """
+        if self._spool_size() >= self.max_bytes:
+            raise SpoolFull(f'Receipt spool is over {self.max_bytes} bytes')
+
+        line = json.dumps({
+            'id': str(receipt.id),
+            'lot': str(receipt.lot_id),
+            'user': str(receipt.user_id),
+            'location_coord': receipt.location_coord,
+            'created_at': receipt.created_at.isoformat(),
+        }, separators=(',', ':')).encode('utf-8') + b'\n'
+
+        with self._lock:
+            if self._fd is None:
+                self._open_segment()
+            os.write(self._fd, line)
+            self._segment_size += len(line)
+            self._spool_bytes += len(line)
+            self._written_seq += 1
+            seq = self._written_seq
+
+        self._sync(seq)
+        self._ensure_rotator()
+
+    def _open_segment(self):
+        """Open a new active segment. Caller holds _lock."""
+        opened_ns = time.time_ns()
+        self._path = os.path.join(self.directory, f'{SEGMENT_PREFIX}{opened_ns}-{os.getpid()}.open')
+        self._fd = os.open(self._path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o640)
+        self._opened_at = time.monotonic()
+        self._segment_size = 0
+
+    def _sync(self, seq):
+        """Group commit: fsync once for every record written so far."""
+        with self._sync_lock:
+            if self._synced_seq >= seq:
+                return
+            with self._lock:
+                fd = self._fd
+                target = self._written_seq
+            os.fsync(fd)
+            self._synced_seq = target
+            if self._segment_size >= self.segment_bytes:
+                self._rotate_locked()
+
+    def rotate(self, min_age=0.0):
+        """
+        Close the active segment so flushers can pick it up.
+
+        Args:
+            min_age: Only rotate if the segment has been open this many seconds
+        """
+        with self._sync_lock:
+            if self._fd is None or self._segment_size == 0:
+                return
+            if time.monotonic() - self._opened_at < min_age:
+                return
+            self._rotate_locked()
+
+    def _rotate_locked(self):
+        """fsync, close and publish the active segment. Caller holds _sync_lock."""
+        with self._lock:
+            fd, path = self._fd, self._path
+            self._fd = None
+            self._path = None
+            self._segment_size = 0
+            target = self._written_seq
+        os.fsync(fd)
+        os.close(fd)
+        self._synced_seq = target
+        os.rename(path, path[:-len('.open')] + '.seg')
+
+    def _ensure_rotator(self):
+        """Start the background thread that publishes idle segments."""
+        if self._rotator is not None and self._rotator.is_alive():
+            return
+        with self._lock:
+            if self._rotator is not None and self._rotator.is_alive():
+                return
+            self._rotator = threading.Thread(target=self._rotate_loop, name='receipt-spool-rotator', daemon=True)
+            self._rotator.start()
+
+    def _rotate_loop(self):
+        while True:
+            time.sleep(self.rotate_interval)
+            try:
+                self.rotate(min_age=self.rotate_interval)
+            except OSError:
+                logger.exception('Failed to rotate receipt spool segment')
+
+    def _spool_size(self):
+        """Total bytes in the spool directory, rescanned at most once a second."""
+        now = time.monotonic()
+        if now - self._spool_bytes_checked_at >= 1.0:
+            total = 0
+            for entry in os.scandir(self.directory):
+                if _parse_segment_name(entry.name):
+                    try:
+                        total += entry.stat().st_size
+                    except FileNotFoundError:
+                        pass  # Flushed while scanning
+            self._spool_bytes = total
+            self._spool_bytes_checked_at = now
+        return self._spool_bytes
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+
+    def recover(self):
+        """
+        Release segments left behind by processes that are no longer running.
+
+        An .open segment belongs to its writer, a .flushing one to the
+        flusher that claimed it (usually another process).
+
+        Returns:
+            int: Number of segments recovered
+        """
+        recovered = 0
+        for name in os.listdir(self.directory):
+            parsed = _parse_segment_name(name)
+            if not parsed:
+                continue
+            _, pid, state = parsed
+            if state == 'seg' or _pid_alive(pid):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                os.rename(path, os.path.join(self.directory, name.rsplit('.', 1)[0] + '.seg'))
+                recovered += 1
+            except FileNotFoundError:
+                pass  # Another flusher got there first
+        return recovered
+
+    def drain(self, batch_size=5000, max_segments=None):
+        """
+        Flush closed segments into the database, oldest first.
+
+        Each segment is claimed by renaming it to .flushing-<pid of this
+        process>, inserted with bulk_create in one transaction, then deleted.
+
+        Args:
+            batch_size: Rows per INSERT statement
+            max_segments: Stop after this many segments (None = all)
+
+        Returns:
+            dict: Counts for this drain (segments, records, dropped, seconds)
+        """
+        started = time.monotonic()
+        self.recover()
+        result = {'segments': 0, 'records': 0, 'dropped': 0}
+
+        for name in sorted(os.listdir(self.directory)):
+            if max_segments is not None and result['segments'] >= max_segments:
+                break
+            parsed = _parse_segment_name(name)
+            if not parsed or parsed[2] != 'seg':
+                continue
+
+            path = os.path.join(self.directory, name)
+            claimed = f"{path[:-len('.seg')]}.flushing-{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue  # Claimed by another flusher
+
+            try:
+                dropped, inserted = self._flush_segment(claimed, batch_size)
+            except Exception:
+                # Release the claim so the next drain retries this segment
+                os.rename(claimed, path)
+                raise
+
+            os.unlink(claimed)
+            result['segments'] += 1
+            result['records'] += inserted
+            result['dropped'] += dropped
+
+        result['seconds'] = time.monotonic() - started
+        self._write_stats(result)
+        return result
+
+    def _flush_segment(self, path, batch_size):
+        """
+        Insert one claimed segment in a single transaction.
+
+        Returns:
+            tuple: (dropped, inserted) record counts
+        """
+        from .models import ReceiptEvent
+        from manifests.models import LotManifest
+        from accounts.models import User
+
+        records = self._read_segment(path)
+
+        # Lots or users deleted since spooling would fail the whole batch; the
+        # others give the receipts their batch number and username snapshots
+        lot_ids = {record['lot'] for record in records}
+        user_ids = {record['user'] for record in records}
+        batch_numbers = {
+            str(pk): batch_number
+            for pk, batch_number in LotManifest.objects.filter(id__in=lot_ids).values_list('id', 'batch_number')
+        }
+        usernames = {
+            str(pk): username
+            for pk, username in User.objects.filter(id__in=user_ids).values_list('id', 'username')
+        }
+
+        events = []
+        dropped = 0
+        for record in records:
+            if record['lot'] not in batch_numbers or record['user'] not in usernames:
+                dropped += 1
+                logger.warning('Dropping spooled receipt %s: lot or user no longer exists', record['id'])
+                continue
+            events.append(ReceiptEvent(
+                id=uuid.UUID(record['id']),
+                lot_id=record['lot'],
+                user_id=record['user'],
+                batch_number=batch_numbers[record['lot']],
+                username=usernames[record['user']],
+                location_coord=record['location_coord'],
+                created_at=parse_datetime(record['created_at']),
+            ))
+
+        # A segment replayed after a crash was partly or fully inserted
+        # already; those receipts keep their place in the chain
+        events = append_receipts(events, batch_size=batch_size, skip_inserted=True)
+        return dropped, len(events)
+
+    def _read_segment(self, path):
+        """Parse a segment file, skipping a torn trailing line."""
+        records = []
+        with open(path, 'rb') as segment:
+            for line_number, line in enumerate(segment, start=1):
+                if not line.endswith(b'\n'):
+                    logger.warning('Skipping torn record at %s:%d', path, line_number)
+                    break
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.warning('Skipping corrupt record at %s:%d', path, line_number)
+        return records
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def _write_stats(self, result):
+        stats = self._read_stats()
+        stats.update({
+            'last_flush_at': timezone.now().isoformat(),
+            'last_flush_segments': result['segments'],
+            'last_flush_records': result['records'],
+            'last_flush_seconds': round(result['seconds'], 4),
+            'total_flushed': stats.get('total_flushed', 0) + result['records'],
+            'total_dropped': stats.get('total_dropped', 0) + result['dropped'],
+        })
+        tmp_path = os.path.join(self.directory, f'.{STATS_FILENAME}.{os.getpid()}')
+        with open(tmp_path, 'w') as tmp:
+            json.dump(stats, tmp)
+        os.replace(tmp_path, os.path.join(self.directory, STATS_FILENAME))
+
+    def _read_stats(self):
+        try:
+            with open(os.path.join(self.directory, STATS_FILENAME)) as stats_file:
+                return json.load(stats_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def stats(self):
+        """
+        Current spool depth and flush lag.
+
+        flush_lag_seconds is the age of the oldest segment still waiting to
+        be flushed (an upper bound on how stale the database is).
+
+        Returns:
+            dict: Spool metrics
+        """
+        pending = {'open': 0, 'seg': 0, 'flushing': 0}
+        pending_bytes = 0
+        oldest_ns = None
+        for entry in os.scandir(self.directory):
+            parsed = _parse_segment_name(entry.name)
+            if not parsed:
+                continue
+            opened_ns, _, state = parsed
+            try:
+                size = entry.stat().st_size
+            except FileNotFoundError:
+                continue
+            if size == 0:
+                continue
+            pending[state] += 1
+            pending_bytes += size
+            oldest_ns = opened_ns if oldest_ns is None else min(oldest_ns, opened_ns)
+
+        stats = self._read_stats()
+        stats.update({
+            'pending_segments': pending,
+            'pending_bytes': pending_bytes,
+            'max_bytes': self.max_bytes,
+            'flush_lag_seconds': round((time.time_ns() - oldest_ns) / 1e9, 3) if oldest_ns else 0.0,
+        })
+        return stats
+
+
+def start_flusher_thread(spool, interval=1.0, batch_size=5000):
+    """Start a daemon thread that drains the spool every `interval` seconds."""
+    def flush_loop():
+        while True:
+            time.sleep(interval)
+            close_old_connections()
+            try:
+                spool.drain(batch_size=batch_size)
+            except Exception:
+                logger.exception('Receipt spool flush failed; will retry')
+
+    thread = threading.Thread(target=flush_loop, name='receipt-spool-flusher', daemon=True)
+    thread.start()
+    return thread
+
+
+_spool = None
+_spool_lock = threading.Lock()
+
+
+def get_receipt_spool():
+    """
+    Return the process-wide spool, or None if write-behind mode is disabled.
+
+    The first call also starts the in-process flusher thread when
+    RECEIPT_SPOOL['FLUSH_THREAD'] is set.
+    """
+    global _spool
+    config = getattr(settings, 'RECEIPT_SPOOL', {})
+    if not config.get('ENABLED'):
+        return None
+    if _spool is None:
+        with _spool_lock:
+            if _spool is None:
+                spool = ReceiptSpool(
+                    config['DIR'],
+                    segment_bytes=config.get('SEGMENT_BYTES', 4 * 1024 * 1024),
+                    max_bytes=config.get('MAX_BYTES', 256 * 1024 * 1024),
+                    rotate_interval=config.get('ROTATE_INTERVAL', 1.0),
+                )
+                if config.get('FLUSH_THREAD'):
+                    start_flusher_thread(
+                        spool,
+                        interval=config.get('FLUSH_INTERVAL', 1.0),
+                        batch_size=config.get('FLUSH_BATCH_SIZE', 5000),
+                    )
+                _spool = spool
+    return _spool
@@ -1,3 +1,203 @@
-from django.test import TestCase
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import date, datetime, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import User
+from entities.models import Distributor
+from manifests.models import LotManifest
+from pharmaceuticals.models import Medicine
+
+from . import chain
+from .chain import ChainError, append_receipts, chain_pending, verify_chain
+from .models import ReceiptChainHead, ReceiptEvent
+from .spool import ReceiptSpool
+
+
+class ChainedReceiptDeletionTests(APITestCase):
+    """Deleting a receipt's lot or user keeps the receipt and the chain intact."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='pw', role='Admin')
+        self.pharmacist = User.objects.create_user(username='pharmacist', password='pw', role='Pharmacist')
+        self.distributor = Distributor.objects.create(name='Acme Pharma', public_key='test-key')
+        self.medicine = Medicine.objects.create(name='Paracetamol', distributor=self.distributor)
+        self.lot = LotManifest.objects.create(
+            batch_number='PCM-2026-KE-00142', expiry_date=date(2030, 1, 1),
+            medicine=self.medicine, distributor=self.distributor,
+        )
+        append_receipts([
+            ReceiptEvent(location_coord={'lat': -1.29, 'lng': 36.82}, user=self.pharmacist, lot=self.lot),
+        ])
+        self.client.force_authenticate(self.admin)
+
+    def assert_deleted_and_kept(self, url):
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        receipt = ReceiptEvent.objects.get()
+        self.assertEqual((receipt.username, receipt.batch_number), ('pharmacist', 'PCM-2026-KE-00142'))
+        self.assertEqual((receipt.user_ref, receipt.lot_ref), (self.pharmacist.pk, self.lot.pk))
+        self.assertEqual(verify_chain(full=True)['end_sequence'], 1)
+        return receipt
+
+    def test_lot_with_receipts_is_deleted(self):
+        receipt = self.assert_deleted_and_kept(f'/api/manifests/{self.lot.pk}/')
+        self.assertIsNone(receipt.lot_id)
+
+        self.client.force_authenticate(self.pharmacist)
+        response = self.client.get('/api/receipts/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['lot_batch_number'], 'PCM-2026-KE-00142')
+
+    def test_user_with_receipts_is_deleted(self):
+        receipt = self.assert_deleted_and_kept(f'/api/users/{self.pharmacist.pk}/')
+        self.assertIsNone(receipt.user_id)
+
+    def test_distributor_whose_lots_have_receipts_is_deleted(self):
+        receipt = self.assert_deleted_and_kept(f'/api/distributors/{self.distributor.pk}/')
+        self.assertIsNone(receipt.lot_id)
+        self.assertFalse(Medicine.objects.exists())
+
+    def test_edited_snapshot_breaks_the_chain(self):
+        ReceiptEvent.objects.update(batch_number='PCM-2026-KE-00999')
+        with self.assertRaises(ChainError):
+            verify_chain(full=True)
+
+
+class ReceiptChainingTests(APITestCase):
+    """Posted receipts are inserted unchained and chained in batches."""
+
+    def setUp(self):
+        self.pharmacist = User.objects.create_user(username='pharmacist', password='pw', role='Pharmacist')
+        distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        medicine = Medicine.objects.create(name='Paracetamol', distributor=distributor)
+        self.lot = LotManifest.objects.create(
+            batch_number='PCM-2026-KE-00142', expiry_date=date(2030, 1, 1),
+            medicine=medicine, distributor=distributor,
+        )
+        self.client.force_authenticate(self.pharmacist)
+
+    def test_posts_take_no_chain_lock(self):
+        with mock.patch.object(chain, '_lock_head', wraps=chain._lock_head) as lock_head, \
+                mock.patch.object(chain, 'wake_chainer') as wake_chainer:
+            for _ in range(3):
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.post(
+                        '/api/receipts/', {'location_coord': {'lat': -1.29, 'lng': 36.82}, 'lot': str(self.lot.pk)},
+                        format='json',
+                    )
+                self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+                self.assertIsNone(response.data['sequence'])
+        lock_head.assert_not_called()
+        self.assertEqual(wake_chainer.call_count, 3)
+
+        # The chainer appends all three under one lock
+        self.assertEqual(chain_pending(), 3)
+        self.assertEqual(ReceiptChainHead.objects.get().sequence, 3)
+        self.assertEqual(verify_chain(full=True)['end_sequence'], 3)
+        receipt = ReceiptEvent.objects.get(sequence=1)
+        self.assertEqual((receipt.username, receipt.batch_number), ('pharmacist', 'PCM-2026-KE-00142'))
+
+    @override_settings(RECEIPT_CHAIN_INTERVAL=0)
+    def test_chainer_thread_can_be_disabled(self):
+        with mock.patch.object(chain.threading, 'Thread') as thread:
+            chain.wake_chainer()
+        thread.assert_not_called()
+
+
+class ReceiptSpoolRecoveryTests(TestCase):
+    """Recovery and replay of spool segments (spool.py)."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.spool = ReceiptSpool(directory)
+        user = User.objects.create_user(username='pharmacist', password='pw', role='Pharmacist')
+        distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        medicine = Medicine.objects.create(name='Paracetamol', distributor=distributor)
+        lot = LotManifest.objects.create(
+            batch_number='PCM-2026-KE-00142', expiry_date=date(2030, 1, 1),
+            medicine=medicine, distributor=distributor,
+        )
+        for _ in range(3):
+            self.spool.append(ReceiptEvent(location_coord={'lat': -1.29, 'lng': 36.82}, user=user, lot=lot))
+        self.spool.rotate()
+        self.segment = os.listdir(directory)[0]
+        exited = subprocess.Popen(['true'])
+        exited.wait()
+        self.dead_pid = exited.pid
+
+    def claim(self, flusher_pid):
+        """Rename the segment as flusher_pid claiming it would."""
+        claimed = f"{self.segment[:-len('.seg')]}.flushing-{flusher_pid}"
+        os.rename(os.path.join(self.spool.directory, self.segment), os.path.join(self.spool.directory, claimed))
+        return claimed
+
+    def test_segment_of_crashed_flusher_is_recovered(self):
+        # The writer (this process) is alive; the flusher that claimed it is not
+        self.claim(self.dead_pid)
+        self.assertEqual(self.spool.recover(), 1)
+        self.assertEqual(os.listdir(self.spool.directory), [self.segment])
+        self.assertEqual(self.spool.drain()['records'], 3)
+
+    def test_segment_of_live_flusher_is_left_alone(self):
+        # The writer exited (e.g. a recycled worker) while this process flushes
+        opened_ns = self.segment[len('receipts-'):].split('-')[0]
+        claimed = f'receipts-{opened_ns}-{self.dead_pid}.flushing-{os.getpid()}'
+        os.rename(os.path.join(self.spool.directory, self.segment), os.path.join(self.spool.directory, claimed))
+        self.assertEqual(self.spool.recover(), 0)
+        self.assertEqual(os.listdir(self.spool.directory), [claimed])
+
+    def test_replayed_segment_is_inserted_once(self):
+        path = os.path.join(self.spool.directory, self.segment)
+        self.assertEqual(self.spool._flush_segment(path, batch_size=2), (0, 3))
+        self.assertEqual(self.spool._flush_segment(path, batch_size=2), (0, 0))
+        self.assertEqual(ReceiptEvent.objects.count(), 3)
+        self.assertEqual(verify_chain(full=True)['end_sequence'], 3)
+
+
+@override_settings(TIME_ZONE='Europe/London')
+class ReceiptDateRangeTests(APITestCase):
+    """date_from/date_to on /api/receipts/ cover whole local days."""
+
+    def setUp(self):
+        self.pharmacist = User.objects.create_user(username='pharmacist', password='pw', role='Pharmacist')
+        distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        medicine = Medicine.objects.create(name='Paracetamol', distributor=distributor)
+        lot = LotManifest.objects.create(
+            batch_number='PCM-2026-KE-00142', expiry_date=date(2030, 1, 1),
+            medicine=medicine, distributor=distributor,
+        )
+        # 2026-10-25 is 25 hours long in London (clocks go back at 02:00 BST)
+        self.times = [
+            datetime(2026, 10, 24, 22, 30, tzinfo=dt_timezone.utc),  # 23:30 BST on the 24th
+            datetime(2026, 10, 24, 23, 30, tzinfo=dt_timezone.utc),  # 00:30 BST on the 25th
+            datetime(2026, 10, 25, 23, 30, tzinfo=dt_timezone.utc),  # 23:30 GMT on the 25th
+            datetime(2026, 10, 26, 0, 30, tzinfo=dt_timezone.utc),  # 00:30 GMT on the 26th
+        ]
+        append_receipts([
+            ReceiptEvent(location_coord={'lat': -1.29, 'lng': 36.82}, user=self.pharmacist, lot=lot, created_at=created_at)
+            for created_at in self.times
+        ])
+        self.client.force_authenticate(self.pharmacist)
+
+    def created_at(self, query):
+        response = self.client.get(f'/api/receipts/?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(item['created_at'] for item in response.data['results'])
+
+    def test_day_across_dst_change_is_included_whole(self):
+        self.assertEqual(len(self.created_at('date_from=2026-10-25&date_to=2026-10-25')), 2)
+
+    def test_date_to_ends_at_local_midnight(self):
+        self.assertEqual(len(self.created_at('date_to=2026-10-24')), 1)
+        self.assertEqual(len(self.created_at('date_to=2026-10-25')), 3)
+
+    def test_invalid_dates_are_ignored(self):
+        self.assertEqual(len(self.created_at('date_from=2026-02-30&date_to=soon')), 4)
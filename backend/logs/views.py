@@ -4,14 +4,54 @@ API views for receipt event tracking.
 This module provides ViewSets for receipt event operations with automatic
 user association and role-based permissions.
 """
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 
+from .chain import record_receipts
 from .models import ReceiptEvent
 from .serializers import ReceiptEventSerializer
-from accounts.permissions import IsPharmacist
+from .spool import SpoolFull, get_receipt_spool
+from accounts.permissions import IsAdmin, IsPharmacist
+from core.pagination import (
+    CreatedAtKeysetPagination,
+    EstimatedCountPageNumberPagination,
+    PaginationModeMixin,
+    pagination_mode_parameters,
+)
+
+
+def _start_of_day(value, days=0):
+    """
+    Convert a YYYY-MM-DD query param into an aware datetime at local midnight.
+    
+    Args:
+        value: Raw query param value (may be None)
+        days: Days to add to the date before taking its midnight, e.g. 1 for
+            the exclusive end of a date_to range
+    
+    Returns:
+        datetime or None: Start of the day in the current timezone, or None
+        if the value is missing or not a valid date
+    """
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        return None  # Ignore invalid dates such as 2026-02-30
+    if day is None:
+        return None
+    # Add days to the date, not to the aware midnight: a day across a DST
+    # change in TIME_ZONE is 23 or 25 hours long, and aware arithmetic only
+    # accounts for that with some tzinfo implementations
+    return timezone.make_aware(datetime.combine(day + timedelta(days=days), time.min))
 
 
 @extend_schema_view(
@@ -50,6 +90,7 @@ from accounts.permissions import IsPharmacist
                     OpenApiExample('End of Month', value='2026-01-31'),
                 ]
             ),
+            *pagination_mode_parameters(CreatedAtKeysetPagination),
         ],
     ),
     retrieve=extend_schema(
@@ -65,6 +106,8 @@ from accounts.permissions import IsPharmacist
         **Auto-Populated Fields:**
         - `user`: Automatically set to authenticated pharmacist (DO NOT include this field!)
         - `created_at`: Auto-timestamp
+        - `sequence`, `entry_hash`: Position and hash in the tamper-evident receipt chain
+          (null in the response: receipts are chained in batches about a second later)
         
         **Location Format:**
         - Provide GPS coordinates as JSON: {"lat": latitude, "lng": longitude}
@@ -73,6 +116,13 @@ from accounts.permissions import IsPharmacist
         
         **Immutability:**
         Receipt events are audit logs and CANNOT be updated or deleted after creation.
+        Each receipt is hash-chained to its predecessor, so edits or deletions made
+        directly in the database are detected by `manage.py verify_receipt_chain`.
+        
+        **Write-behind mode:**
+        When the receipt spool is enabled the event is durably queued and the
+        response is 202 Accepted; it appears in listings after the next flush.
+        A 503 with Retry-After means the spool is full.
         
         **Pharmacist-only access.**
         """,
@@ -114,7 +164,7 @@ from accounts.permissions import IsPharmacist
         ],
     ),
 )
-class ReceiptEventViewSet(viewsets.ModelViewSet):
+class ReceiptEventViewSet(PaginationModeMixin, viewsets.ModelViewSet):
     """
     ViewSet for receipt event tracking.
     
@@ -125,6 +175,7 @@ class ReceiptEventViewSet(viewsets.ModelViewSet):
     - Automatic user association with authenticated user
     - Filter by user, lot, and date
     - Search by location
+    - Opt-in cursor (?pagination=cursor) or estimated-count pagination
     
     Permissions:
     - Create: Only pharmacists can create receipt events
@@ -147,6 +198,12 @@ class ReceiptEventViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at']
     ordering = ['-created_at']  # Default ordering (newest first)
     
+    # Clients syncing long histories can opt into keyset pagination
+    pagination_modes = {
+        'cursor': CreatedAtKeysetPagination,
+        'estimated': EstimatedCountPageNumberPagination,
+    }
+    
     def get_queryset(self):
         """
         Optionally filter receipt events by user or lot.
@@ -172,14 +229,16 @@ class ReceiptEventViewSet(viewsets.ModelViewSet):
         if lot_id:
             queryset = queryset.filter(lot_id=lot_id)
         
-        # Filter by date range if params provided
-        date_from = self.request.query_params.get('date_from', None)
+        # Filter by date range if params provided.
+        # Dates are turned into half-open timestamp ranges so the created_at
+        # indexes can be used (created_at__date wraps the column in a cast).
+        date_from = _start_of_day(self.request.query_params.get('date_from', None))
         if date_from:
-            queryset = queryset.filter(created_at__date__gte=date_from)
+            queryset = queryset.filter(created_at__gte=date_from)
         
-        date_to = self.request.query_params.get('date_to', None)
-        if date_to:
-            queryset = queryset.filter(created_at__date__lte=date_to)
+        date_to_end = _start_of_day(self.request.query_params.get('date_to', None), days=1)
+        if date_to_end:
+            queryset = queryset.filter(created_at__lt=date_to_end)
         
         return queryset
     
@@ -194,5 +253,66 @@ class ReceiptEventViewSet(viewsets.ModelViewSet):
         Args:
             serializer: The ReceiptEventSerializer instance
         """
-        # Automatically set the user to the authenticated user
-        serializer.save(user=self.request.user)
+        # Automatically set the user to the authenticated user. The receipt
+        # is chained in a batch shortly after (see logs/chain.py), so
+        # concurrent requests don't queue on the chain head lock
+        receipt = ReceiptEvent(user=self.request.user, **serializer.validated_data)
+        record_receipts([receipt])
+        serializer.instance = receipt
+    
+    def create(self, request, *args, **kwargs):
+        """
+        Create a receipt event, write-behind when the receipt spool is enabled.
+        
+        With RECEIPT_SPOOL['ENABLED'], the validated receipt is durably
+        appended to the local spool and acknowledged with 202 Accepted; it
+        reaches the database on the next flush. The response body is the same
+        as a synchronous create (id and created_at are assigned up front).
+        
+        Returns:
+            Response: 201 (direct insert), 202 (spooled) or 503 (spool full)
+        """
+        spool = get_receipt_spool()
+        if spool is None:
+            return super().create(request, *args, **kwargs)
+        
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        receipt = ReceiptEvent(user=request.user, **serializer.validated_data)
+        
+        try:
+            spool.append(receipt)
+        except SpoolFull:
+            return Response(
+                {'detail': 'Receipt ingestion is backlogged. Please retry shortly.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '5'},
+            )
+        
+        return Response(self.get_serializer(receipt).data, status=status.HTTP_202_ACCEPTED)
+    
+    @extend_schema(
+        summary="Receipt spool status",
+        description="""
+        Write-behind ingestion metrics: pending segments and bytes, flush lag
+        (age of the oldest unflushed segment) and statistics from the last flush.
+        
+        Returns `{"enabled": false}` when the spool is disabled.
+        
+        **Admin-only access.**
+        """,
+        tags=['Receipts'],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=['get'], permission_classes=[IsAdmin], url_path='spool-status')
+    def spool_status(self, request):
+        """
+        Report write-behind spool metrics.
+        
+        Returns:
+            Response: Spool depth, flush lag and last flush statistics
+        """
+        spool = get_receipt_spool()
+        if spool is None:
+            return Response({'enabled': False}, status=status.HTTP_200_OK)
+        return Response({'enabled': True, **spool.stats()}, status=status.HTTP_200_OK)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import LotManifest
+from .models import LotManifest, LotVerificationView, ResignJob, ShipmentRoot
 
 
 @admin.register(LotManifest)
@@ -10,7 +10,7 @@ class LotManifestAdmin(admin.ModelAdmin):
     list_filter = ['expiry_date', 'distributor', 'medicine']
     search_fields = ['batch_number', 'medicine__name', 'distributor__name']
     ordering = ['-expiry_date']
-    readonly_fields = ['id']
+    readonly_fields = ['id', 'shipment', 'merkle_index', 'merkle_proof']
     autocomplete_fields = ['medicine', 'distributor']
     
     fieldsets = (
@@ -23,6 +23,10 @@ class LotManifestAdmin(admin.ModelAdmin):
         ('Verification', {
             'fields': ('digital_signature', 'trust_score')
         }),
+        ('Shipment Signature', {
+            'fields': ('shipment', 'merkle_index', 'merkle_proof'),
+            'classes': ('collapse',),
+        }),
     )
     
     actions = ['verify_signatures']
@@ -36,3 +40,53 @@ class LotManifestAdmin(admin.ModelAdmin):
         self.message_user(request, f"{verified_count} out of {queryset.count()} signatures verified successfully.")
     
     verify_signatures.short_description = "Verify digital signatures"
+
+
+@admin.register(ShipmentRoot)
+class ShipmentRootAdmin(admin.ModelAdmin):
+    """Admin configuration for the ShipmentRoot model."""
+    
+    list_display = ['merkle_root', 'distributor', 'leaf_count', 'created_at']
+    list_filter = ['distributor']
+    search_fields = ['merkle_root', 'distributor__name']
+    ordering = ['-created_at']
+    readonly_fields = ['id', 'distributor', 'merkle_root', 'leaf_count', 'root_signature', 'created_by', 'created_at']
+    
+    def has_add_permission(self, request):
+        # Shipments are registered through POST /api/manifests/shipments/
+        return False
+
+
+@admin.register(ResignJob)
+class ResignJobAdmin(admin.ModelAdmin):
+    """Admin configuration for the ResignJob model (read-only progress view)."""
+    
+    list_display = ['distributor', 'status', 'signed_count', 'total', 'created_at', 'updated_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['distributor__name']
+    ordering = ['-created_at']
+    readonly_fields = [
+        'distributor', 'status', 'public_key', 'last_lot_id', 'signed_count', 'total',
+        'error', 'created_by', 'created_at', 'updated_at', 'started_at', 'finished_at',
+    ]
+    
+    def has_add_permission(self, request):
+        # Jobs are created from the Distributor admin action or resign_manifests
+        return False
+
+
+@admin.register(LotVerificationView)
+class LotVerificationViewAdmin(admin.ModelAdmin):
+    """Admin configuration for the LotVerificationView projection (read-only)."""
+    
+    list_display = ['batch_number', 'medicine_name', 'distributor_name', 'trust_status', 'is_authentic', 'flags_count', 'refreshed_at']
+    list_filter = ['trust_status', 'is_authentic']
+    search_fields = ['batch_number', 'short_code', 'medicine_name', 'distributor_name']
+    ordering = ['-refreshed_at']
+    
+    def has_add_permission(self, request):
+        # Rows are maintained by signals and rebuild_verification_views
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
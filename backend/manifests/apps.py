@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ManifestsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'manifests'
+    
+    def ready(self):
+        """Import signals when the app is ready."""
+        import manifests.signals
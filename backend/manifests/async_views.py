@@ -0,0 +1,247 @@
+"""
+Async verification endpoints for the ASGI deployment (see core/asgi.py).
+
+Under WSGI every verify-qr or verify request holds a worker thread for as
+long as the database takes to answer, so a slow database caps concurrent
+scans at the number of threads. These views are coroutines: while one
+scan waits on its query, the event loop serves others.
+
+- verify_qr: GET /api/manifests/{id}/verify-qr/ (public), same response,
+  response cache entries and hot-lot counting as LotManifestViewSet.verify_qr
+- verify: POST /api/manifests/{id}/verify/ (admins, JWT), same response as
+  LotManifestViewSet.verify
+
+Database reads use Django's async ORM (aget, afirst, acount). Ed25519 checks are
+CPU-bound and run on a thread pool of VERIFY_SIGNATURE_THREADS threads
+(PyNaCl releases the GIL while libsodium verifies). The response cache
+and projection refresh are sync code and run through sync_to_async; the
+negative-lookup filter answers known ids without leaving the event loop.
+Concurrent scans of a lot are not coalesced (core/singleflight.py blocks
+threads); each is one row read.
+
+core/urls_asgi.py routes the two endpoints here ahead of the DRF views.
+Requests these views don't answer themselves go to the DRF views
+(on a thread): the browsable API (text/html, ?format=), other methods,
+and verify requests without a valid admin Bearer token, which DRF answers
+with its usual 401/403 (and CSRF checks for session logins).
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import hot_lots, lot_filter, verification_view
+from .models import LotManifest
+from .verification import abuild_verification_payload, signature_result
+from .views import LotManifestViewSet
+from accounts.permissions import IsAdminOrReadOnly
+from core.cache import is_enabled, lookup_response, response_cache_key, store_response, tag_tokens
+
+# Response cache namespace of LotManifestViewSet.verify_qr (shared entries)
+CACHE_NAMESPACE = 'lotmanifest.verify_qr'
+
+_NOT_FOUND = {'detail': 'Not found.'}
+
+_renderer = JSONRenderer()
+_authentication = JWTAuthentication()
+_permission = IsAdminOrReadOnly()
+
+# The DRF views, for requests handled by the sync stack (basename as
+# registered in manifests/urls.py, which the response cache key includes)
+_drf_verify_qr = sync_to_async(LotManifestViewSet.as_view(
+    {'get': 'verify_qr'}, basename='lotmanifest', **LotManifestViewSet.verify_qr.kwargs
+))
+_drf_verify = sync_to_async(LotManifestViewSet.as_view(
+    {'post': 'verify'}, basename='lotmanifest', **LotManifestViewSet.verify.kwargs
+))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Process-wide thread pool for Ed25519 checks."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'VERIFY_SIGNATURE_THREADS', 4),
+                    thread_name_prefix='verify-signature',
+                )
+    return _executor
+
+
+def _wants_json(request):
+    """False for requests DRF would answer differently (browsable API, ?format=)."""
+    return 'text/html' not in request.headers.get('Accept', '') and 'format' not in request.GET
+
+
+def _json(data, status, allow, cache=None):
+    """JSON response with the headers DRF would add (middleware adds the rest)."""
+    response = HttpResponse(_renderer.render(data), status=status, content_type='application/json')
+    response['Allow'] = allow
+    if cache:
+        response['X-Cache'] = cache
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+def _lookup(request, lot_id):
+    """
+    Response cache lookup of a scan, in one hop.
+
+    Returns:
+        tuple: (cache key, cached entry or None, lot tag tokens or None)
+    """
+    key = response_cache_key(CACHE_NAMESPACE, request.get_host(), request.path, request.GET.lists())
+    entry = lookup_response(CACHE_NAMESPACE, key)
+    if entry is not None:
+        return key, entry, None
+    # Taken before the read, so a refresh committed meanwhile leaves the
+    # stored response already stale
+    return key, None, tag_tokens([f'lot:{lot_id}'])
+
+
+def _store(key, payload, tokens, tags, lot_id):
+    tokens.update(tag_tokens(tags))
+    store_response(CACHE_NAMESPACE, key, payload, 200, tokens, admitted=hot_lots.is_hot(lot_id))
+
+
+async def scan_response(request, lot_id):
+    """
+    Answer a verify-qr scan like LotManifestViewSet.verify_qr does.
+
+    Args:
+        request: The HTTP request object
+        lot_id: uuid.UUID of the lot
+
+    Returns:
+        HttpResponse: The JSON response, or None for requests the DRF view
+        must answer (other methods, browsable API)
+    """
+    if request.method != 'GET' or not _wants_json(request):
+        return None
+    allow = 'GET, HEAD, OPTIONS'
+
+    if not await lot_filter.alot_might_exist(lot_id):
+        return _json(_NOT_FOUND, 404, allow)
+    key = tokens = None
+    if is_enabled():
+        key, entry, tokens = await sync_to_async(_lookup)(request, lot_id)
+        if entry is not None:
+            hot_lots.record_scan(lot_id)
+            return _json(entry['data'], entry['status'], allow, cache='HIT')
+
+    result = await verification_view.aread_payload(lot_id)
+    if result is None:
+        # No row yet: answer from the source rows and create it
+        lot_manifest = await (
+            LotManifest.objects.select_related('medicine', 'distributor', 'shipment').filter(pk=lot_id).afirst()
+        )
+        if lot_manifest is None:
+            lot_filter.record_false_positive()
+            return _json(_NOT_FOUND, 404, allow)
+        payload = await abuild_verification_payload(lot_manifest, executor=_get_executor())
+        await sync_to_async(verification_view.refresh_lots)([lot_manifest.pk])
+        tags = [f'distributor:{lot_manifest.distributor_id}', f'medicine:{lot_manifest.medicine_id}']
+    else:
+        payload, tags = result
+
+    if key:
+        await sync_to_async(_store)(key, payload, tokens, tags, lot_id)
+    hot_lots.record_scan(lot_id)
+    return _json(payload, 200, allow, cache='MISS' if key else None)
+
+
+def _authenticate_admin(request):
+    """
+    Authenticate a Bearer token and check the verify permission.
+
+    Returns:
+        bool: True if the request comes from an admin; False to let DRF
+        answer it (no or invalid token, other roles)
+    """
+    try:
+        user_auth = _authentication.authenticate(request)
+    except APIException:
+        return False
+    if user_auth is None:
+        return False
+    request.user = user_auth[0]
+    return _permission.has_permission(request, None)
+
+
+async def signature_response(request, lot_id):
+    """
+    Answer an admin's signature check like LotManifestViewSet.verify does.
+
+    Args:
+        request: The HTTP request object (no body required)
+        lot_id: uuid.UUID of the lot
+
+    Returns:
+        HttpResponse: The JSON response, or None for requests the DRF view
+        must answer (other methods, no valid admin Bearer token)
+    """
+    if request.method != 'POST' or not request.headers.get('Authorization', '').startswith('Bearer '):
+        return None
+    if not await sync_to_async(_authenticate_admin)(request):
+        return None
+    allow = 'POST, OPTIONS'
+
+    try:
+        lot_manifest = await LotManifest.objects.select_related('distributor', 'shipment').aget(pk=lot_id)
+    except LotManifest.DoesNotExist:
+        return _json(_NOT_FOUND, 404, allow)
+    hot_lots.record_scan(lot_manifest.pk)
+
+    loop = asyncio.get_running_loop()
+    is_authentic = await loop.run_in_executor(_get_executor(), lot_manifest.verify_signature)
+    return _json(signature_result(lot_manifest, is_authentic), 200, allow)
+
+
+async def verify_qr(request, pk):
+    """
+    Async GET /api/manifests/{id}/verify-qr/ (see LotManifestViewSet.verify_qr).
+
+    Args:
+        request: The HTTP request object
+        pk: uuid.UUID of the lot (from the URL converter)
+
+    Returns:
+        HttpResponse: Patient-friendly verification data
+    """
+    response = await scan_response(request, pk)
+    if response is None:
+        response = await _drf_verify_qr(request, pk=str(pk))
+    return response
+
+
+@csrf_exempt
+async def verify(request, pk):
+    """
+    Async POST /api/manifests/{id}/verify/ (see LotManifestViewSet.verify).
+
+    CSRF exemption is safe: this view only acts on Bearer tokens, and
+    everything else (session logins included) goes to the DRF view.
+
+    Args:
+        request: The HTTP request object
+        pk: uuid.UUID of the lot (from the URL converter)
+
+    Returns:
+        HttpResponse: Signature verification result
+    """
+    response = await signature_response(request, pk)
+    if response is None:
+        response = await _drf_verify(request, pk=str(pk))
+    return response
@@ -0,0 +1,404 @@
+"""
+Fuzzy batch-number index for mistyped or partially legible codes.
+
+LotManifestViewSet's ?search= only finds exact substrings, so a pharmacist
+who types "PCM-2026-KF-0O142" from damaged packaging gets nothing back. This
+module keeps an in-process trigram index over normalized batch numbers and
+ranks candidates by edit distance.
+
+How a lookup works:
+1. Normalize the query (uppercase, separators removed).
+2. q-gram lemma: one edit changes at most 3 trigrams, so any batch number
+   within distance d shares at least one of any 3d+1 distinct query
+   trigrams. Candidates are the union of the postings of the 3d+1 rarest
+   query trigrams, which keeps the candidate set small even with tens of
+   millions of lots.
+3. Candidates sharing too few trigrams are dropped, the rest are scored with
+   a bounded Levenshtein distance and the nearest are returned.
+4. The distance is widened one step at a time (0, 1, 2, ...) and the search
+   stops once enough matches are found, since batch numbers sharing a common
+   prefix make the wider probes much less selective.
+
+Memory: postings are array('I') of integer slots and lot ids are packed
+16-byte UUIDs, but each worker process still holds about 300 bytes per lot
+(measured with 14-character batch numbers), i.e. about 3 GB per worker at
+ten million lots. The index is only built by the first fuzzy lookup in a
+worker, so workers that never serve one don't pay for it.
+
+Maintenance is incremental. LotManifest signals upsert/remove entries in
+this process, and lots other workers save or delete are replayed from the
+lot change feed (see lot_changes.py) before each search. If the feed can't
+tell what changed, the index is rebuilt in the background. With a cache
+that can't carry the feed (locmem or file, see lot_changes.is_shared()),
+lots modified elsewhere are polled through the updated_at index every
+LOT_BATCH_INDEX_SYNC_INTERVAL seconds instead; deletions made elsewhere then
+wait for the rebuild. A full rebuild (which also compacts tombstones)
+happens every LOT_BATCH_INDEX_REBUILD_INTERVAL seconds.
+
+Syncs read the database without holding the module lock: one thread syncs
+while concurrent lookups keep searching the index as it is.
+"""
+import heapq
+import re
+import threading
+import time
+import uuid
+from array import array
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import lot_changes
+
+_SEPARATORS = re.compile(r'[^0-9A-Z]+')
+
+# Polled lots modified this close to the last poll are re-read to tolerate clock skew
+_SYNC_OVERLAP = timedelta(seconds=2)
+
+# Stop widening a search once its probe postings exceed this many entries
+# (exact matches are always found)
+MAX_CANDIDATES = 50000
+
+
+def normalize(batch_number):
+    """
+    Normalize a batch number for fuzzy matching.
+
+    >>> normalize('pcm-2026-ke 00142')
+    'PCM2026KE00142'
+    """
+    return _SEPARATORS.sub('', (batch_number or '').upper())
+
+
+def trigrams(key, padded=True):
+    """
+    Distinct trigrams of a normalized key.
+
+    Padded trigrams ("$$P", "$PC", ..., "42$") make prefixes and suffixes
+    count, which matters for short codes. Partial lookups use unpadded
+    trigrams since the query may come from the middle of a code.
+    """
+    if padded:
+        key = f'$${key}$$'
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+def edit_distance(query, key, max_distance, partial=False):
+    """
+    Bounded Levenshtein distance.
+
+    Args:
+        query: Normalized query
+        key: Normalized batch number
+        max_distance: Give up (return None) once the distance must exceed this
+        partial: Match the query against the best substring of `key`
+            (leading and trailing characters of `key` are free)
+
+    Returns:
+        int or None: The distance, or None if it exceeds max_distance
+    """
+    if not partial and abs(len(query) - len(key)) > max_distance:
+        return None
+
+    previous = [0] * (len(key) + 1) if partial else list(range(len(key) + 1))
+    for i, query_char in enumerate(query, start=1):
+        current = [i] + [0] * len(key)
+        row_min = current[0]
+        for j, key_char in enumerate(key, start=1):
+            cost = 0 if query_char == key_char else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return None
+        previous = current
+
+    distance = min(previous) if partial else previous[-1]
+    return distance if distance <= max_distance else None
+
+
+class BatchNumberIndex:
+    """Trigram index from normalized batch numbers to lot ids."""
+
+    def __init__(self):
+        self._keys = []  # slot -> normalized batch number, None once removed
+        self._lot_ids = bytearray()  # slot -> 16-byte lot UUID
+        self._slots = {}  # lot UUID bytes -> current slot
+        self._postings = {}  # trigram -> array('I') of slots (padded and unpadded)
+        self._live = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._live
+
+    def upsert(self, lot_id, batch_number):
+        """Add a lot, or re-index it if its batch number changed."""
+        key = normalize(batch_number)
+        lot_bytes = uuid.UUID(str(lot_id)).bytes
+        with self._lock:
+            slot = self._slots.get(lot_bytes)
+            if slot is not None:
+                if self._keys[slot] == key:
+                    return
+                self._keys[slot] = None  # Tombstone the old batch number
+                self._live -= 1
+
+            slot = len(self._keys)
+            self._keys.append(key)
+            self._lot_ids += lot_bytes
+            self._slots[lot_bytes] = slot
+            self._live += 1
+            for gram in trigrams(key) | trigrams(key, padded=False):
+                postings = self._postings.get(gram)
+                if postings is None:
+                    postings = self._postings[gram] = array('I')
+                postings.append(slot)
+
+    def remove(self, lot_id):
+        """Drop a lot from the index."""
+        lot_bytes = uuid.UUID(str(lot_id)).bytes
+        with self._lock:
+            slot = self._slots.pop(lot_bytes, None)
+            if slot is not None and self._keys[slot] is not None:
+                self._keys[slot] = None
+                self._live -= 1
+
+    def search(self, batch_number, limit=5, max_distance=3, partial=False):
+        """
+        Find the lots whose batch numbers are nearest to the query.
+
+        Args:
+            batch_number: Raw query as typed
+            limit: Maximum number of matches
+            max_distance: Largest edit distance to return
+            partial: Match the query against any part of the batch number
+
+        Returns:
+            list: (lot UUID, distance) tuples, nearest first
+        """
+        query = normalize(batch_number)
+        if not query:
+            return []
+
+        grams = trigrams(query, padded=not partial)
+        if not grams:
+            return []
+
+        # Rarest trigrams first: any key within distance d contains one of the
+        # first 3d + 1 of them, and shares at least len(grams) - 3d overall
+        ranked = sorted(grams, key=lambda gram: len(self._postings.get(gram, ())))
+
+        # Exact matches contain every query trigram, so a plain comparison
+        # over the rarest trigram's postings finds them however common it is
+        matches = self._exact_matches(query, ranked[0], partial)
+
+        # Widen the distance one step at a time. Once `limit` matches are
+        # found nothing further away can displace them, and batch numbers that
+        # share a common prefix (PCM-2026-KE-...) make the wide probes costly.
+        for distance in range(1, max_distance + 1):
+            if len(matches) >= limit:
+                break
+            probe = ranked[:3 * distance + 1]
+            if sum(len(self._postings.get(gram, ())) for gram in probe) > MAX_CANDIDATES:
+                break
+            matches = self._matches(query, grams, probe, distance, partial)
+
+        best = heapq.nsmallest(limit, matches)
+        return [
+            (uuid.UUID(bytes=bytes(self._lot_ids[slot * 16:slot * 16 + 16])), distance)
+            for distance, _, _, slot in best
+        ]
+
+    def _exact_matches(self, query, gram, partial):
+        """Keys equal to (or, if partial, containing) the query: (0, length, key, slot)."""
+        matches = []
+        for slot in self._postings.get(gram, ()):
+            key = self._keys[slot]
+            if key is not None and (query in key if partial else key == query):
+                matches.append((0, len(key), key, slot))
+        return matches
+
+    def _matches(self, query, grams, probe, max_distance, partial):
+        """Score the candidates from the probe postings: (distance, length, key, slot)."""
+        candidates = set()
+        for gram in probe:
+            candidates.update(self._postings.get(gram, ()))
+
+        min_shared = len(grams) - 3 * max_distance
+        matches = []
+        for slot in candidates:
+            key = self._keys[slot]
+            if key is None:
+                continue
+            # Cheap trigram count filter before the quadratic edit distance
+            if min_shared > 0 and len(grams & trigrams(key, padded=not partial)) < min_shared:
+                continue
+            distance = edit_distance(query, key, max_distance, partial=partial)
+            if distance is not None:
+                matches.append((distance, len(key), key, slot))
+        return matches
+
+
+_index = None
+_built_at = 0.0
+_synced_at = None
+_position = None
+_rebuilding = False
+_syncing = False
+_index_lock = threading.Lock()
+
+
+def _build():
+    """Build a fresh index from the database."""
+    from .models import LotManifest
+
+    # Read first: changes published later are replayed by the next sync
+    position = lot_changes.position()
+    index = BatchNumberIndex()
+    started = timezone.now()
+    rows = LotManifest.objects.order_by().values_list('id', 'batch_number')
+    for lot_id, batch_number in rows.iterator(chunk_size=10000):
+        index.upsert(lot_id, batch_number)
+    return index, started, position
+
+
+def _sync(index, since):
+    """Pull in lots created or renamed since `since` (e.g. by other workers)."""
+    from .models import LotManifest
+
+    rows = LotManifest.objects.order_by().filter(updated_at__gte=since)
+    for lot_id, batch_number in rows.values_list('id', 'batch_number').iterator(chunk_size=10000):
+        index.upsert(lot_id, batch_number)
+
+
+def _claim_sync():
+    """
+    Let one thread sync at a time; the others search the index as it is.
+
+    Returns:
+        tuple: (index, feed position, last poll time) to sync from, or None
+        if another thread is already syncing
+    """
+    global _syncing
+    with _index_lock:
+        if _syncing:
+            return None
+        _syncing = True
+        return _index, _position, _synced_at
+
+
+def _finish_sync(index, position, synced_at):
+    """Record how far a sync got, unless a rebuild replaced the index meanwhile."""
+    global _position, _synced_at, _syncing
+    with _index_lock:
+        if index is _index:
+            _position, _synced_at = position, synced_at
+        _syncing = False
+
+
+def _rebuild_in_background():
+    """Rebuild (and compact) the index in a thread while the old one keeps serving."""
+    global _rebuilding
+
+    def rebuild():
+        global _index, _built_at, _synced_at, _position, _rebuilding
+        try:
+            index, started, position = _build()
+            with _index_lock:
+                _index, _synced_at, _position = index, started, position
+                _built_at = time.monotonic()
+        finally:
+            _rebuilding = False
+            connection.close()
+
+    with _index_lock:
+        if _rebuilding:
+            return
+        _rebuilding = True
+    threading.Thread(target=rebuild, name='batch-index-rebuild', daemon=True).start()
+
+
+def _catch_up():
+    """Replay the lot change feed, or schedule a rebuild if it can't tell what changed."""
+    claimed = _claim_sync()
+    if claimed is None:
+        return
+    index, position, synced_at = claimed
+    changes = None
+    try:
+        # Outside the lock: lookups keep searching while the database is read
+        changes = lot_changes.changes_since(position)
+        if changes is not None:
+            for lot_id in changes[2]:
+                index.remove(lot_id)
+            if changes[1] is not None:
+                _sync(index, changes[1])
+            position = changes[0]
+    finally:
+        _finish_sync(index, position, synced_at)
+    if changes is None and lot_changes.position() is not None:
+        _rebuild_in_background()
+
+
+def _poll(sync_interval):
+    """Pull in lots modified since the last poll (caches not shared between workers)."""
+    if (timezone.now() - _synced_at).total_seconds() < sync_interval:
+        return
+    claimed = _claim_sync()
+    if claimed is None:
+        return
+    index, position, synced_at = claimed
+    try:
+        if (timezone.now() - synced_at).total_seconds() >= sync_interval:
+            started = timezone.now()
+            _sync(index, synced_at - _SYNC_OVERLAP)
+            synced_at = started
+    finally:
+        _finish_sync(index, position, synced_at)
+
+
+def get_index():
+    """
+    Return the process-wide batch number index, building or syncing it as needed.
+
+    The first call builds the index synchronously. Afterwards changes other
+    processes published to the lot change feed are replayed (or, without a
+    shared cache, lots they modified are polled every
+    LOT_BATCH_INDEX_SYNC_INTERVAL seconds), and a compacting rebuild runs in
+    the background every LOT_BATCH_INDEX_REBUILD_INTERVAL seconds.
+
+    Returns:
+        BatchNumberIndex: The current index
+    """
+    global _index, _built_at, _synced_at, _position
+    rebuild_interval = getattr(settings, 'LOT_BATCH_INDEX_REBUILD_INTERVAL', 3600)
+
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index, _synced_at, _position = _build()
+                _built_at = time.monotonic()
+                _index = index
+        return _index
+
+    if time.monotonic() - _built_at >= rebuild_interval:
+        _rebuild_in_background()
+
+    if lot_changes.is_shared():
+        _catch_up()
+    else:
+        _poll(getattr(settings, 'LOT_BATCH_INDEX_SYNC_INTERVAL', 5))
+    return _index
+
+
+def index_lot(lot):
+    """Upsert a saved lot into the index if it has been built in this process."""
+    if _index is not None:
+        _index.upsert(lot.id, lot.batch_number)
+
+
+def unindex_lot(lot):
+    """Remove a deleted lot from the index if it has been built in this process."""
+    if _index is not None:
+        _index.remove(lot.id)
@@ -0,0 +1,271 @@
+"""
+Lean WSGI entry point for patient QR scans.
+
+A GET /api/manifests/{id}/verify-qr/ through the full Django application
+passes through sessions, CSRF, authentication, messages, WhiteNoise and
+clickjacking middleware, URL resolution, and DRF's request wrapping,
+authentication, permission checks and content negotiation. The endpoint is
+public and needs none of them.
+
+VerifyQrFastPath wraps the Django WSGI application (see core/wsgi.py) and
+answers these requests itself, with the same building blocks as
+LotManifestViewSet.verify_qr: the negative-lookup filter, the response
+cache (same keys and entries), single-flight coalescing, the
+LotVerificationView row and hot-lot counting. It keeps the parts that
+matter for a public JSON endpoint: host validation (ALLOWED_HOSTS), CORS
+headers from django-cors-headers, the security headers the middleware
+would add, and the request_started/request_finished signals that manage
+database connections.
+
+Everything else goes to the Django application unchanged, including:
+- other methods (OPTIONS preflights, HEAD) and paths
+- clients asking for HTML (the browsable API) or ?format=
+- lots without a LotVerificationView row, disallowed hosts, and errors
+
+AsyncVerifyFastPath is the ASGI counterpart (see core/asgi.py). Under ASGI
+each of Django's MiddlewareMixin middleware runs its hooks on a thread, a
+dozen thread hand-offs per request; it answers verify-qr scans and admin
+verify calls (Bearer tokens) with the async views' own coroutines
+(async_views.py) inside the same request context and signals Django's
+ASGIHandler uses.
+"""
+import logging
+import re
+import uuid
+
+from asgiref.sync import ThreadSensitiveContext
+from corsheaders.middleware import CorsMiddleware
+from django.conf import settings
+from django.core import signals
+from django.core.exceptions import DisallowedHost, RequestAborted
+from django.core.handlers.asgi import ASGIRequest
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from . import hot_lots, lot_filter, verification_view
+from core.cache import is_enabled, lookup_response, response_cache_key, store_response, tag_tokens
+from core.singleflight import coalesce
+
+logger = logging.getLogger(__name__)
+
+VERIFY_QR_PATH = re.compile(r'^/api/manifests/(?P<pk>[0-9a-fA-F-]{32,36})/verify-qr/$')
+VERIFY_PATH = re.compile(r'^/api/manifests/(?P<pk>[0-9a-fA-F-]{32,36})/verify/$')
+
+# Response cache namespace of LotManifestViewSet.verify_qr (shared entries)
+CACHE_NAMESPACE = 'lotmanifest.verify_qr'
+
+_NOT_FOUND = {'detail': 'Not found.'}
+
+
+class _FastPath:
+    """Headers the skipped middleware would add to a JSON response."""
+
+    def __init__(self, application):
+        self.application = application
+        self.renderer = JSONRenderer()
+        # Only its header logic is used (CORS allow-lists, credentials, signals)
+        self.cors = CorsMiddleware(lambda request: None)
+        self.security_headers = {
+            'X-Frame-Options': getattr(settings, 'X_FRAME_OPTIONS', 'DENY'),
+        }
+        if getattr(settings, 'SECURE_CONTENT_TYPE_NOSNIFF', True):
+            self.security_headers['X-Content-Type-Options'] = 'nosniff'
+        referrer_policy = getattr(settings, 'SECURE_REFERRER_POLICY', 'same-origin')
+        if referrer_policy:
+            self.security_headers['Referrer-Policy'] = referrer_policy
+        opener_policy = getattr(settings, 'SECURE_CROSS_ORIGIN_OPENER_POLICY', 'same-origin')
+        if opener_policy:
+            self.security_headers['Cross-Origin-Opener-Policy'] = opener_policy
+
+    def _finish(self, request, response):
+        for header, value in self.security_headers.items():
+            response[header] = value
+        response['Content-Length'] = str(len(response.content))
+        patch_vary_headers(response, ('Accept',))
+        self.cors.add_response_headers(request, response)
+        return response
+
+
+class VerifyQrFastPath(_FastPath):
+    """
+    WSGI middleware serving verify-qr scans without the Django and DRF stacks.
+
+    Args:
+        application: The Django WSGI application, used for everything else
+    """
+
+    def __call__(self, environ, start_response):
+        match = VERIFY_QR_PATH.match(environ.get('PATH_INFO', ''))
+        if match is None or environ.get('REQUEST_METHOD') != 'GET' or not self._wants_json(environ):
+            return self.application(environ, start_response)
+
+        signals.request_started.send(sender=self.__class__, environ=environ)
+        try:
+            request = WSGIRequest(environ)
+            response = self.verify_qr(request, match['pk'])
+        except DisallowedHost:
+            response = None  # Django answers 400 and logs it
+        except Exception:
+            logger.exception('verify-qr fast path failed for %s', environ.get('PATH_INFO'))
+            response = None
+        if response is None:
+            signals.request_finished.send(sender=self.__class__)
+            return self.application(environ, start_response)
+
+        # Same hand-off as django.core.handlers.wsgi.WSGIHandler; closing the
+        # response sends request_finished
+        response._handler_class = self.__class__
+        start_response(f'{response.status_code} {response.reason_phrase}', list(response.items()))
+        return response
+
+    @staticmethod
+    def _wants_json(environ):
+        """False for requests DRF would answer differently (browsable API, ?format=)."""
+        if 'text/html' in environ.get('HTTP_ACCEPT', ''):
+            return False
+        return 'format=' not in environ.get('QUERY_STRING', '')
+
+    def verify_qr(self, request, pk):
+        """
+        Answer a verify-qr scan like LotManifestViewSet.verify_qr does.
+
+        Returns:
+            HttpResponse: The JSON response, or None to hand the request to Django
+        """
+        host = request.get_host()
+        if not lot_filter.lot_might_exist(pk):
+            return self._json(request, _NOT_FOUND, status=404)
+        lot_id = uuid.UUID(pk)
+
+        key = None
+        if is_enabled():
+            key = response_cache_key(CACHE_NAMESPACE, host, request.path, request.GET.lists())
+            entry = lookup_response(CACHE_NAMESPACE, key)
+            if entry is not None:
+                hot_lots.record_scan(lot_id)
+                return self._json(request, entry['data'], status=entry['status'], cache='HIT')
+
+        tokens = tag_tokens([f'lot:{lot_id}']) if key else None
+        result = coalesce(f'verify-qr:{lot_id}', lambda: verification_view.read_payload(lot_id))
+        if result is None:
+            return None  # No row yet: the full view builds it (or answers 404)
+        payload, tags = result
+        if key:
+            tokens.update(tag_tokens(tags))
+            store_response(CACHE_NAMESPACE, key, payload, 200, tokens, admitted=hot_lots.is_hot(lot_id))
+        hot_lots.record_scan(lot_id)
+        return self._json(request, payload, status=200, cache='MISS' if key else None)
+
+    def _json(self, request, data, status, cache=None):
+        response = HttpResponse(self.renderer.render(data), status=status, content_type='application/json')
+        response['Allow'] = 'GET, HEAD, OPTIONS'
+        if cache:
+            response['X-Cache'] = cache
+        return self._finish(request, response)
+
+
+class AsyncVerifyFastPath(_FastPath):
+    """
+    ASGI middleware serving verify-qr scans and admin verify calls without
+    Django's middleware stack.
+
+    Args:
+        application: The Django ASGI application (ASGIHandler), used for
+            everything else; its body reading and response sending are reused
+    """
+
+    def __init__(self, application):
+        super().__init__(application)
+        from .async_views import scan_response, signature_response
+
+        self.scan_response = scan_response
+        self.signature_response = signature_response
+
+    async def __call__(self, scope, receive, send):
+        route = self._route(scope)
+        if route is None:
+            return await self.application(scope, receive, send)
+
+        answer, lot_id = route
+        async with ThreadSensitiveContext():
+            try:
+                body_file = await self.application.read_body(receive)
+            except RequestAborted:
+                return
+            with body_file:
+                response = await self._respond(scope, body_file, answer, lot_id)
+                if response is not None:
+                    await self.application.send_response(response, send)
+                    return
+                body_file.seek(0)
+                body = body_file.read()
+        # Django answers it; the body was read already, so hand it over again
+        await self.application(scope, _replay(body, receive), send)
+
+    def _route(self, scope):
+        """(answer coroutine, lot id) for requests this path serves, else None."""
+        if scope['type'] != 'http':
+            return None
+        headers = dict(scope['headers'])
+        match = VERIFY_QR_PATH.match(scope['path'])
+        if match is not None:
+            if (
+                scope['method'] != 'GET'
+                or b'text/html' in headers.get(b'accept', b'')
+                or b'format=' in scope.get('query_string', b'')
+            ):
+                return None
+            answer = self.scan_response
+        else:
+            match = VERIFY_PATH.match(scope['path'])
+            if (
+                match is None
+                or scope['method'] != 'POST'
+                or not headers.get(b'authorization', b'').startswith(b'Bearer ')
+            ):
+                return None
+            answer = self.signature_response
+        try:
+            return answer, uuid.UUID(match['pk'])
+        except ValueError:
+            return None
+
+    async def _respond(self, scope, body_file, answer, lot_id):
+        """
+        Run an async view's answer like ASGIHandler runs a view.
+
+        Returns:
+            HttpResponse: The response, or None to hand the request to Django
+        """
+        await signals.request_started.asend(sender=self.__class__, scope=scope)
+        try:
+            request = ASGIRequest(scope, body_file)
+            request.get_host()
+            response = await answer(request, lot_id)
+        except DisallowedHost:
+            response = None  # Django answers 400 and logs it
+        except Exception:
+            logger.exception('verify fast path failed for %s', scope['path'])
+            response = None
+        if response is None:
+            await signals.request_finished.asend(sender=self.__class__)
+            return None
+        # ASGIHandler.send_response() closes the response, which sends request_finished
+        response._handler_class = self.__class__
+        return self._finish(request, response)
+
+
+def _replay(body, receive):
+    """ASGI receive callable returning an already read body, then the client's messages."""
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if replayed:
+            return await receive()
+        replayed = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    return replay
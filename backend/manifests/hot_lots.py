@@ -0,0 +1,301 @@
+"""
+Heavy-hitter tracking of scanned lots.
+
+verify-qr and verify calls are counted per lot in a count-min sketch, and
+the most-scanned lots are kept in a top-k heap. Memory is fixed (DEPTH x
+WIDTH 32-bit counters plus TOP_K entries, about 1 MB by default) however
+many distinct lots are scanned.
+
+Count-min estimates never undercount. With conservative updates they
+overcount by at most e/WIDTH of the scans seen, with probability
+1 - e^-DEPTH (about 0.004% of traffic per lot at the defaults). Every
+DECAY_INTERVAL seconds all counts are halved, so "hot" means hot recently.
+
+What it drives:
+- Response cache admission: only lots this worker has seen at least
+  ADMISSION_THRESHOLD times (after decay) get their verify-qr and detail
+  responses cached (see LotManifestViewSet.admit_response). One-off scans
+  no longer evict the lots everyone is scanning.
+- Pre-warming: each worker publishes its top-k to the cache every
+  PUBLISH_INTERVAL seconds. GET /api/admin/hot-lots/ merges the snapshots,
+  and `manage.py warm_hot_lots` fills the response cache for the merged
+  top lots, e.g. after a deploy or a cache flush.
+"""
+import hashlib
+import heapq
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+
+_MASK64 = (1 << 64) - 1
+_WORKERS_KEY = 'hot-lots:workers'
+
+
+def _settings():
+    return getattr(settings, 'HOT_LOTS', {})
+
+
+def _lot_key(lot_id):
+    """Canonical string form of a lot id (raises ValueError for malformed ids)."""
+    return str(uuid.UUID(str(lot_id)))
+
+
+class CountMinSketch:
+    """
+    Count-min sketch with conservative update.
+
+    Row r counts a key in column (h1 + r * h2) mod 2**64 mod width.
+    """
+
+    def __init__(self, width=65536, depth=4):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self._counts = np.zeros((depth, width), dtype=np.uint32)
+        self._rows = np.arange(depth)
+
+    @property
+    def size_bytes(self):
+        return self._counts.nbytes
+
+    def _columns(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [((h1 + row * h2) & _MASK64) % self.width for row in range(self.depth)]
+
+    def add(self, key):
+        """
+        Count one occurrence of a key.
+
+        Conservative update: only the counters at the current minimum are
+        raised, which tightens estimates without ever undercounting.
+
+        Returns:
+            int: The key's new estimate
+        """
+        columns = self._columns(key)
+        current = self._counts[self._rows, columns]
+        estimate = int(current.min()) + 1
+        self._counts[self._rows, columns] = np.maximum(current, estimate)
+        self.total += 1
+        return estimate
+
+    def estimate(self, key):
+        """Estimated count of a key (never below the true count)."""
+        return int(self._counts[self._rows, self._columns(key)].min())
+
+    def decay(self):
+        """Halve every counter."""
+        self._counts >>= 1
+        self.total //= 2
+
+
+class TopK:
+    """
+    The k keys with the highest counts, in a min-heap with lazy updates.
+
+    Heap entries of members are refreshed only when they reach the top of
+    the heap, which is fine because counts only grow between decays.
+    """
+
+    def __init__(self, k=100):
+        self.k = k
+        self._counts = {}
+        self._heap = []
+
+    def offer(self, key, count):
+        """Record a key's latest count, replacing the smallest member if it beats it."""
+        if key in self._counts:
+            self._counts[key] = count
+            return
+        if len(self._counts) < self.k:
+            self._counts[key] = count
+            heapq.heappush(self._heap, (count, key))
+            return
+        while True:
+            lowest, lowest_key = self._heap[0]
+            current = self._counts[lowest_key]
+            if current == lowest:
+                break
+            heapq.heapreplace(self._heap, (current, lowest_key))
+        if count > lowest:
+            heapq.heapreplace(self._heap, (count, key))
+            del self._counts[lowest_key]
+            self._counts[key] = count
+
+    def items(self):
+        """Members and counts, highest first."""
+        return sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+
+    def decay(self):
+        """Halve every count (with the sketch) and drop members that reach zero."""
+        self._counts = {key: count // 2 for key, count in self._counts.items() if count // 2}
+        self._heap = [(count, key) for key, count in self._counts.items()]
+        heapq.heapify(self._heap)
+
+
+class HotLotTracker:
+    """Per-process sketch, top-k and their decay and publishing schedule."""
+
+    def __init__(self, width, depth, k):
+        self.sketch = CountMinSketch(width=width, depth=depth)
+        self.top = TopK(k)
+        self._lock = threading.Lock()
+        self._decayed_at = time.monotonic()
+        self._published_at = 0.0
+
+    def record(self, key):
+        """Count a scan of a lot id key. Returns its estimated scan count."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._decayed_at >= _settings().get('DECAY_INTERVAL', 600):
+                self.sketch.decay()
+                self.top.decay()
+                self._decayed_at = now
+            estimate = self.sketch.add(key)
+            self.top.offer(key, estimate)
+            publish = now - self._published_at >= _settings().get('PUBLISH_INTERVAL', 10)
+            if publish:
+                self._published_at = now
+                snapshot = dict(self.top.items())
+        if publish:
+            _publish(snapshot)
+        return estimate
+
+    def estimate(self, key):
+        with self._lock:
+            return self.sketch.estimate(key)
+
+
+def _worker_key():
+    return f'hot-lots:worker:{socket.gethostname()}:{os.getpid()}'
+
+
+def _publish(snapshot):
+    """Publish this worker's top-k so other processes can merge it."""
+    config = _settings()
+    cache = caches[config.get('CACHE', 'default')]
+    # Snapshots of stopped workers expire
+    timeout = 3 * config.get('PUBLISH_INTERVAL', 10)
+    key = _worker_key()
+    try:
+        cache.set(key, snapshot, timeout=timeout)
+        workers = set(cache.get(_WORKERS_KEY) or ())
+        if key not in workers:
+            workers.add(key)
+            cache.set(_WORKERS_KEY, sorted(workers), timeout=None)
+    except Exception:
+        pass  # Hot-lot reporting must never fail a scan
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+_admit_all = threading.local()
+
+
+def get_tracker():
+    """The process-wide HotLotTracker, sized from HOT_LOTS settings."""
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                config = _settings()
+                _tracker = HotLotTracker(
+                    width=config.get('WIDTH', 65536),
+                    depth=config.get('DEPTH', 4),
+                    k=config.get('TOP_K', 100),
+                )
+    return _tracker
+
+
+def record_scan(lot_id):
+    """
+    Count a verify-qr or verify call for a lot.
+
+    No-op when HOT_LOTS is disabled and for warming requests (forced_admission()).
+    """
+    if _settings().get('ENABLED', True) and not getattr(_admit_all, 'active', False):
+        get_tracker().record(_lot_key(lot_id))
+
+
+def is_hot(lot_id):
+    """
+    Return True if a lot is scanned often enough to be admitted to the response cache.
+
+    Always True when HOT_LOTS is disabled or inside forced_admission().
+    """
+    if not _settings().get('ENABLED', True) or getattr(_admit_all, 'active', False):
+        return True
+    try:
+        key = _lot_key(lot_id)
+    except ValueError:
+        return False
+    return get_tracker().estimate(key) >= _settings().get('ADMISSION_THRESHOLD', 5)
+
+
+@contextmanager
+def forced_admission():
+    """Admit every lot to the response cache in this thread (used for warming)."""
+    _admit_all.active = True
+    try:
+        yield
+    finally:
+        _admit_all.active = False
+
+
+def merged_hot_lots(limit=None):
+    """
+    Top lots across all workers that published a snapshot, plus this one.
+
+    Returns:
+        list: (lot_id, estimated_scans) tuples, highest first
+    """
+    config = _settings()
+    cache = caches[config.get('CACHE', 'default')]
+    workers = cache.get(_WORKERS_KEY) or []
+    snapshots = cache.get_many(workers)
+    if _tracker is not None:
+        with _tracker._lock:
+            snapshots[_worker_key()] = dict(_tracker.top.items())
+
+    merged = {}
+    for snapshot in snapshots.values():
+        for lot_id, count in snapshot.items():
+            merged[lot_id] = merged.get(lot_id, 0) + count
+    ranked = sorted(merged.items(), key=lambda item: item[1], reverse=True)
+    return ranked[:limit] if limit else ranked
+
+
+def tracker_stats():
+    """
+    Sketch sizing and error bound for this worker.
+
+    Returns:
+        dict: Scans counted, memory and the count-min overcount bound
+    """
+    config = _settings()
+    tracker = _tracker
+    width = tracker.sketch.width if tracker else config.get('WIDTH', 65536)
+    depth = tracker.sketch.depth if tracker else config.get('DEPTH', 4)
+    total = tracker.sketch.total if tracker else 0
+    return {
+        'enabled': bool(config.get('ENABLED', True)),
+        'scans_counted': total,
+        'width': width,
+        'depth': depth,
+        'top_k': config.get('TOP_K', 100),
+        'size_bytes': tracker.sketch.size_bytes if tracker else 0,
+        'admission_threshold': config.get('ADMISSION_THRESHOLD', 5),
+        'decay_interval': config.get('DECAY_INTERVAL', 600),
+        # Overcount bound e/width * N, holding with probability 1 - e^-depth
+        'max_overcount': round(np.e / width * total, 2),
+        'confidence': round(1 - np.exp(-depth), 4),
+    }
@@ -0,0 +1,192 @@
+"""
+Rendered QR label cache and streaming ZIP archives.
+
+GET /api/manifests/{id}/qr.png serves single labels and
+GET /api/manifests/qr-archive/ renders the selected lots' labels on the fly and
+streams them to the client as a ZIP. Three things keep that cheap:
+
+- Rendered PNGs are cached under their content hash (see label_hashes.py),
+  so a label is only rendered again when its batch number, medicine name or
+  the render settings change. They go to their own size-bounded cache alias
+  (QR_LABEL_CACHE), so big downloads don't evict other cached data.
+- Cache misses are rendered on a shared thread pool with a bounded window of
+  chunks in flight, so memory per download stays flat however many lots are
+  selected.
+- The ZIP is written to a non-seekable buffer that is drained after every
+  entry. Beyond the entry being written, only zipfile's central directory
+  record per member (a few hundred bytes) is kept until the end.
+"""
+import re
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .label_hashes import label_hash, render_fingerprint
+from .qr_generator import render_label_bytes
+
+_UNSAFE_FILENAME = re.compile(r'[^A-Za-z0-9._-]+')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Process-wide render pool, shared by all archive downloads."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'QR_ARCHIVE_RENDER_THREADS', 4),
+                    thread_name_prefix='qr-render',
+                )
+    return _executor
+
+
+def _cache():
+    return caches[getattr(settings, 'QR_LABEL_CACHE', 'qr_labels')]
+
+
+def _cache_key(digest):
+    return f'qr-label:{digest}'
+
+
+def _cache_timeout():
+    return getattr(settings, 'QR_LABEL_CACHE_TIMEOUT', 7 * 24 * 3600)
+
+
+def get_label(spec, label_format='png'):
+    """
+    Rendered label bytes, rendering and caching them on the first request only.
+
+    Args:
+        spec: LabelSpec for the lot
+        label_format: 'png', 'svg' or 'zpl'
+
+    Returns:
+        tuple: (content hash, bytes)
+    """
+    digest = label_hash(spec, render_fingerprint(label_format))
+    cache = _cache()
+    content = cache.get(_cache_key(digest))
+    if content is None:
+        content = render_label_bytes(spec, label_format)
+        cache.set(_cache_key(digest), content, timeout=_cache_timeout())
+    return digest, content
+
+
+def _resolve_chunk(specs, fingerprint):
+    """
+    Pool task: PNG bytes for a chunk of labels, from the cache where possible.
+
+    Returns:
+        list: (spec, png bytes, cache hit) in input order
+    """
+    cache = _cache()
+    keys = [_cache_key(label_hash(spec, fingerprint)) for spec in specs]
+    cached = cache.get_many(keys)
+
+    results = []
+    rendered = {}
+    for spec, key in zip(specs, keys):
+        png = cached.get(key)
+        hit = png is not None
+        if not hit:
+            png = rendered[key] = render_label_bytes(spec, 'png')
+        results.append((spec, png, hit))
+
+    if rendered:
+        cache.set_many(rendered, timeout=_cache_timeout())
+    return results
+
+
+def iter_label_pngs(specs, chunk_size=32, max_in_flight=None):
+    """
+    Yield (spec, png bytes, cache hit) for every spec, in order.
+
+    Args:
+        specs: Iterable of LabelSpec (see qr_generator.iter_label_specs)
+        chunk_size: Labels per pool task (one cache round trip each)
+        max_in_flight: Chunks queued or rendering at once (default: 2 per thread)
+    """
+    executor = _get_executor()
+    if max_in_flight is None:
+        max_in_flight = 2 * getattr(settings, 'QR_ARCHIVE_RENDER_THREADS', 4)
+    fingerprint = render_fingerprint()
+
+    pending = deque()
+    chunk = []
+    for spec in specs:
+        chunk.append(spec)
+        if len(chunk) >= chunk_size:
+            pending.append(executor.submit(_resolve_chunk, chunk, fingerprint))
+            chunk = []
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+    if chunk:
+        pending.append(executor.submit(_resolve_chunk, chunk, fingerprint))
+    while pending:
+        yield from pending.popleft().result()
+
+
+def archive_member_name(spec):
+    """
+    Archive member name for a label: the batch number, made filename-safe.
+
+    Batch numbers are unique, but making them safe is not one-to-one (`A/1`
+    and `A_1`), and unzip tools silently overwrite duplicate members. Names
+    that had to be changed therefore also carry the lot id.
+    """
+    safe = _UNSAFE_FILENAME.sub('_', spec.batch_number)
+    if safe != spec.batch_number:
+        return f"{safe}-{spec.lot_id}.png"
+    return f"{safe}.png"
+
+
+class _ZipOutput:
+    """Write-only, non-seekable sink that zipfile writes into and we drain."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries):
+    """
+    Stream a ZIP archive.
+
+    Members are stored uncompressed since PNGs are already compressed.
+    zipfile writes data descriptors when it cannot seek, so each member is
+    emitted as soon as it is written.
+
+    Args:
+        entries: Iterable of (member name, bytes)
+
+    Yields:
+        bytes: Archive data
+    """
+    output = _ZipOutput()
+    date_time = timezone.localtime().timetuple()[:6]
+    with zipfile.ZipFile(output, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for name, data in entries:
+            info = zipfile.ZipInfo(name, date_time=date_time)
+            info.compress_type = zipfile.ZIP_STORED
+            archive.writestr(info, data)
+            yield output.drain()
+    yield output.drain()
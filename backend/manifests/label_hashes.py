@@ -0,0 +1,134 @@
+"""
+Content-hash manifest for incremental QR label regeneration.
+
+Every label written by generate_qr_codes is recorded in a small JSON file
+next to the PNGs, keyed by lot id, with a hash of everything that affects
+how the label looks: the lot id, batch number, medicine name, short-code URL
+(if encoded), output format and that format's render settings from
+qr_generator.render_settings(). A nightly refresh then only re-renders
+labels whose hash changed, and deletes the files of lots that no longer
+exist (or whose batch number, and so file name, changed).
+
+Each label format has its own manifest (see manifest_name()), so rendering
+another format into the same directory leaves the existing labels alone.
+"""
+import hashlib
+import json
+import os
+
+from .qr_generator import label_payload, render_settings
+
+MANIFEST_NAME = '.qr_manifest.json'
+
+
+def manifest_name(label_format='png'):
+    """Manifest file name for a label format; PNG keeps the original name."""
+    if label_format == 'png':
+        return MANIFEST_NAME
+    return f'.qr_manifest.{label_format}.json'
+
+
+def render_fingerprint(label_format='png'):
+    """Serialized render settings and output format, part of every label hash."""
+    return json.dumps({**render_settings(label_format), 'format': label_format}, sort_keys=True)
+
+
+def label_hash(spec, fingerprint=None):
+    """
+    Content hash of a label.
+
+    Args:
+        spec: LabelSpec
+        fingerprint: Serialized render settings (computed if not given)
+
+    Returns:
+        str: 32 hex characters
+    """
+    fingerprint = fingerprint if fingerprint is not None else render_fingerprint()
+    fields = [fingerprint, spec.lot_id, spec.batch_number, spec.medicine_name]
+    if spec.short_code:
+        fields.append(label_payload(spec))
+    data = '\x1f'.join(fields)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:32]
+
+
+class LabelHashes:
+    """
+    Lot id -> (content hash, file name) for the labels of one format in an output directory.
+
+    Changes are kept in memory until save(), which replaces the manifest
+    atomically. An interrupted run therefore only costs re-rendering the
+    labels it had already written.
+    """
+
+    def __init__(self, output_dir, label_format='png'):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, manifest_name(label_format))
+        self.fingerprint = render_fingerprint(label_format)
+        self.entries = {}
+        self._replaced_files = []
+        try:
+            with open(self.path, encoding='utf-8') as manifest:
+                self.entries = json.load(manifest).get('labels', {})
+        except FileNotFoundError:
+            pass
+        except (ValueError, AttributeError):
+            # Corrupt manifest: start over, which re-renders every label once
+            self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def hash(self, spec):
+        """Content hash of a label under the current render settings."""
+        return label_hash(spec, self.fingerprint)
+
+    def is_current(self, spec):
+        """True if the label on disk was rendered from exactly this content."""
+        entry = self.entries.get(spec.lot_id)
+        return entry is not None and entry[0] == self.hash(spec)
+
+    def record(self, spec, filename):
+        """Record a freshly written label, remembering the file it replaces."""
+        previous = self.entries.get(spec.lot_id)
+        if previous is not None and previous[1] != filename:
+            self._replaced_files.append(previous[1])
+        self.entries[spec.lot_id] = [self.hash(spec), filename]
+
+    def prune(self, existing_lot_ids):
+        """
+        Delete labels of lots that no longer exist and files left behind by renames.
+
+        Args:
+            existing_lot_ids: Set of lot id strings currently in the database
+
+        Returns:
+            int: Number of files deleted
+        """
+        orphans = [lot_id for lot_id in self.entries if lot_id not in existing_lot_ids]
+        stale_files = self._replaced_files + [self.entries.pop(lot_id)[1] for lot_id in orphans]
+        self._replaced_files = []
+        if not stale_files:
+            return 0
+
+        # Batch numbers can be swapped between lots, so never delete a file
+        # that another entry now points at
+        claimed = {filename for _, filename in self.entries.values()}
+        deleted = 0
+        for filename in stale_files:
+            if filename in claimed:
+                continue
+            try:
+                os.remove(os.path.join(self.output_dir, filename))
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def save(self):
+        """Atomically replace the manifest on disk."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as manifest:
+            json.dump({'render': self.fingerprint, 'labels': self.entries}, manifest, separators=(',', ':'))
+        os.replace(temp_path, self.path)
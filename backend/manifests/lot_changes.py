@@ -0,0 +1,161 @@
+"""
+Cross-worker feed of lot changes for the in-process lot indexes.
+
+The negative-lookup filter (lot_filter.py) and the fuzzy batch number index
+(batch_index.py) keep a copy of every lot in each worker. Changes made in
+the worker itself are applied by signals; changes made by other workers
+reach them through this feed in LOT_CHANGES_CACHE.
+
+Every committed transaction that saves or deletes lots appends one entry:
+the earliest updated_at of the lots it saved, and the ids it deleted.
+Entries are numbered by a generation counter, and a reader remembers the
+position it has caught up to. To catch up it re-reads the lots whose
+updated_at is at or after the earliest `since` of the entries it missed.
+
+Syncing from "the last sync time minus a margin" instead would miss rows
+whose transaction commits long after their updated_at is set (a shipment
+bulk-creating and signing 100k lots), and rows stamped by a host whose clock
+lags. Entries are published after their transaction commits and carry the
+writer's own timestamps, so neither matters here.
+
+When the feed can't tell what changed (cache unavailable, an entry expired,
+evicted or not written yet, or the feed restarted), changes_since() returns
+None and the reader must not trust its copy: the filter falls through to
+the database and both rebuild.
+
+The cache must be shared by all workers and increment atomically (redis,
+see CACHE_BACKEND). With locmem each worker only sees its own changes. The
+file backend is shared, but its incr() is a read followed by a write, so
+two workers publishing at once can take the same generation and one entry
+overwrites the other; readers would then miss those lots. is_shared() is
+False for both, and the readers don't rely on the feed.
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Entries outlive any reader that is still syncing; older readers rebuild
+ENTRY_TIMEOUT = 24 * 3600
+
+# Readers further behind than this rebuild instead of replaying entries
+MAX_ENTRIES = 1000
+
+# Lots are re-read from this much before an entry's `since`, for databases
+# that store timestamps with less precision than Python
+SINCE_MARGIN = timedelta(seconds=1)
+
+_FEED_KEY = 'lot-changes:feed'
+
+
+def _cache():
+    return caches[getattr(settings, 'LOT_CHANGES_CACHE', 'default')]
+
+
+def is_shared():
+    """Whether the feed's cache is shared between workers and numbers entries atomically."""
+    return isinstance(_cache(), (RedisCache, BaseMemcachedCache))
+
+
+def _key(feed, name):
+    return f'lot-changes:{feed}:{name}'
+
+
+def record(lots=(), deleted=()):
+    """
+    Publish saved or deleted lots to other workers once the transaction commits.
+
+    Args:
+        lots: LotManifest instances that were created or updated
+        deleted: LotManifest instances that were deleted
+    """
+    since = min((lot.updated_at for lot in lots if lot.updated_at is not None), default=None)
+    if lots and since is None:
+        since = timezone.now()
+    deleted_ids = [str(lot.pk) for lot in deleted]
+
+    def publish():
+        try:
+            _publish(since, deleted_ids)
+        except Exception:
+            # Readers see the gap in the generation numbers and rebuild
+            logger.warning('Could not publish lot changes', exc_info=True)
+
+    transaction.on_commit(publish)
+
+
+def _publish(since, deleted_ids):
+    cache = _cache()
+    feed = cache.get(_FEED_KEY)
+    generation = None
+    if feed is not None:
+        try:
+            generation = cache.incr(_key(feed, 'generation'))
+        except ValueError:
+            pass  # Counter evicted
+    if generation is None:
+        # First change, or the counter was evicted: start a new feed. Readers
+        # of the old one can't tell what they missed, and rebuild.
+        feed, generation = uuid.uuid4().hex, 1
+        cache.set(_key(feed, 'generation'), generation, timeout=None)
+        cache.set(_FEED_KEY, feed, timeout=None)
+    cache.set(_key(feed, generation), (since, deleted_ids), timeout=ENTRY_TIMEOUT)
+
+
+def position():
+    """
+    Return the current feed position, to read before building an index.
+
+    Returns:
+        tuple: (feed id, generation), or None if the cache is unavailable
+    """
+    try:
+        cache = _cache()
+        feed = cache.get(_FEED_KEY)
+        if feed is None:
+            return None, 0
+        return feed, cache.get(_key(feed, 'generation')) or 0
+    except Exception:
+        logger.warning('Could not read the lot change feed', exc_info=True)
+        return None
+
+
+def changes_since(start):
+    """
+    Collect the changes published after a position.
+
+    Args:
+        start: Position returned by position() or a previous call
+
+    Returns:
+        tuple: (new position, earliest updated_at of saved lots or None,
+        list of deleted lot ids), or None if the changes can't be known
+    """
+    current = position()
+    if current is None or start is None or current[0] != start[0] or current[1] < start[1]:
+        return None
+    if current == start:
+        return current, None, []
+    if current[1] - start[1] > MAX_ENTRIES:
+        return None
+
+    keys = [_key(start[0], generation) for generation in range(start[1] + 1, current[1] + 1)]
+    try:
+        entries = _cache().get_many(keys)
+    except Exception:
+        logger.warning('Could not read the lot change feed', exc_info=True)
+        return None
+    if len(entries) < len(keys):
+        return None  # Expired, evicted or not written yet
+
+    since = min((since for since, _ in entries.values() if since is not None), default=None)
+    deleted_ids = [lot_id for _, ids in entries.values() for lot_id in ids]
+    return current, since - SINCE_MARGIN if since is not None else None, deleted_ids
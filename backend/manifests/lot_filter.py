@@ -0,0 +1,379 @@
+"""
+Negative-lookup filter for the public verification endpoints.
+
+Scrapers and counterfeiters probe GET /api/manifests/{id}/verify-qr/ and
+/api/v/{code} with made-up ids. Each probe used to cost a database lookup
+ending in a 404. This module keeps an in-process Bloom filter of every lot
+id and short code, so most unknown ids are rejected without a query.
+
+A Bloom filter never forgets a key it was given, so "absent" is exact and
+"present" is right except for a small, configurable false-positive rate
+(LOT_FILTER['FALSE_POSITIVE_RATE']). False positives just take the normal
+path and get their 404 from the database.
+
+Keeping the filter complete matters more than keeping it small, because a
+missing key would turn a real lot into a 404:
+- Lots saved in this process are added by the LotManifest post_save signal,
+  and shipments add their bulk-created lots explicitly.
+- Lots created by other workers are pulled in through the lot change feed
+  (see lot_changes.py). A lookup that would reject a key first replays the
+  feed entries published since the last sync. If the feed can't tell what
+  changed, the key is passed on to the database and the filter is rebuilt.
+- The feed is only trusted in a cache that is shared and increments
+  atomically (see lot_changes.is_shared()). With locmem or the file
+  backend the filter stays off, even if LOT_FILTER['ENABLED'] is set.
+- A rebuild every REBUILD_INTERVAL seconds, or once the filter holds more
+  keys than it was sized for, runs in the background and drops deleted
+  lots (Bloom filters can't remove keys).
+
+Sizing: about 9.6 bits per key at a 1% false-positive rate, and each lot has
+two keys (id and short code), so ten million lots take about 30 MB per
+worker with the 25% growth headroom.
+"""
+import hashlib
+import math
+import threading
+import time
+import uuid
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import lot_changes
+
+_MASK64 = (1 << 64) - 1
+
+
+def _settings():
+    return getattr(settings, 'LOT_FILTER', {})
+
+
+def is_enabled():
+    """LOT_FILTER['ENABLED'], and the lot change feed can be trusted."""
+    return bool(_settings().get('ENABLED', True)) and lot_changes.is_shared()
+
+
+def lot_id_key(lot_id):
+    """Filter key of a lot id (raises ValueError for malformed ids)."""
+    return b'i' + uuid.UUID(str(lot_id)).bytes
+
+
+def short_code_key(code):
+    """Filter key of a normalized short code."""
+    return b's' + code.encode('ascii')
+
+
+def _hash_pair(key):
+    """Two independent 64-bit hashes of a key, for double hashing."""
+    digest = hashlib.blake2b(key, digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomFilter:
+    """
+    Bloom filter with k positions per key derived by double hashing.
+
+    Position i of a key is (h1 + i * h2) mod 2**64 mod bit_count, computed
+    identically by the scalar path (add, __contains__) and the vectorized
+    NumPy path (add_many).
+    """
+
+    def __init__(self, capacity, false_positive_rate=0.01):
+        self.capacity = max(int(capacity), 1024)
+        self.false_positive_rate = false_positive_rate
+        bits = math.ceil(-self.capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        self.bit_count = (bits + 63) // 64 * 64
+        self.hash_count = max(1, round(self.bit_count / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray(self.bit_count // 8)
+        self._lock = threading.Lock()
+
+    @property
+    def size_bytes(self):
+        return len(self._bits)
+
+    def _positions(self, key):
+        h1, h2 = _hash_pair(key)
+        bit_count = self.bit_count
+        return [((h1 + i * h2) & _MASK64) % bit_count for i in range(self.hash_count)]
+
+    def add(self, key):
+        """Add one key."""
+        positions = self._positions(key)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def add_many(self, keys):
+        """Add keys in bulk (vectorized)."""
+        if not keys:
+            return
+        pairs = np.array([_hash_pair(key) for key in keys], dtype=np.uint64)
+        h1, h2 = pairs[:, 0], pairs[:, 1]
+        steps = np.arange(self.hash_count, dtype=np.uint64)
+        # uint64 arithmetic wraps mod 2**64, like the scalar path's mask
+        positions = ((h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.bit_count)).ravel()
+        masks = np.left_shift(np.uint8(1), (positions & np.uint64(7)).astype(np.uint8))
+        with self._lock:
+            bits = np.frombuffer(self._bits, dtype=np.uint8)
+            np.bitwise_or.at(bits, (positions >> np.uint64(3)).astype(np.intp), masks)
+            self.count += len(keys)
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def expected_false_positive_rate(self):
+        """False-positive rate predicted from the number of keys added."""
+        return (1 - math.exp(-self.hash_count * self.count / self.bit_count)) ** self.hash_count
+
+
+_filter = None
+_built_at = 0.0
+_synced_at = None
+_position = None
+_rebuilding = False
+_filter_lock = threading.Lock()
+
+_stats = {
+    'checks': 0, 'rejected': 0, 'passed': 0, 'false_positives': 0,
+    'fallthroughs': 0, 'syncs': 0, 'rebuilds': 0,
+}
+
+
+def _keys(rows):
+    keys = []
+    for lot_id, short_code in rows:
+        keys.append(b'i' + lot_id.bytes)
+        if short_code:
+            keys.append(short_code_key(short_code))
+    return keys
+
+
+def _build():
+    """Build a filter sized for the current lot count plus headroom."""
+    from .models import LotManifest
+
+    # Read first: changes published later are replayed by the next sync
+    position = lot_changes.position()
+    count = LotManifest.objects.count()
+    bloom = BloomFilter(
+        capacity=2 * count * _settings().get('HEADROOM', 1.25),
+        false_positive_rate=_settings().get('FALSE_POSITIVE_RATE', 0.01),
+    )
+    rows = LotManifest.objects.order_by().values_list('id', 'short_code')
+    chunk = []
+    for row in rows.iterator(chunk_size=10000):
+        chunk.append(row)
+        if len(chunk) >= 10000:
+            bloom.add_many(_keys(chunk))
+            chunk = []
+    bloom.add_many(_keys(chunk))
+    return bloom, position
+
+
+def _sync(bloom, since):
+    """Add lots saved since `since` (e.g. by other workers)."""
+    from .models import LotManifest
+
+    rows = (
+        LotManifest.objects.order_by()
+        .filter(updated_at__gte=since)
+        .values_list('id', 'short_code')
+    )
+    # Skip keys already in the filter (lots updated rather than created), so
+    # count keeps tracking distinct keys
+    bloom.add_many([key for key in _keys(rows.iterator(chunk_size=10000)) if key not in bloom])
+    _stats['syncs'] += 1
+
+
+def _rebuild_in_background():
+    """Rebuild (dropping deleted lots, resizing) while the old filter keeps serving."""
+    global _rebuilding
+
+    def rebuild():
+        global _filter, _built_at, _synced_at, _position, _rebuilding
+        try:
+            bloom, position = _build()
+            with _filter_lock:
+                _filter, _position = bloom, position
+                _built_at = time.monotonic()
+                _synced_at = timezone.now()
+            _stats['rebuilds'] += 1
+        finally:
+            _rebuilding = False
+            connection.close()
+
+    with _filter_lock:
+        if _rebuilding:
+            return
+        _rebuilding = True
+    threading.Thread(target=rebuild, name='lot-filter-rebuild', daemon=True).start()
+
+
+def get_filter():
+    """
+    Return the process-wide filter, building it on first use.
+
+    Schedules a background rebuild when it is older than REBUILD_INTERVAL or
+    holds more keys than it was sized for.
+
+    Returns:
+        BloomFilter: The current filter
+    """
+    global _filter, _built_at, _synced_at, _position
+    if _filter is None:
+        with _filter_lock:
+            if _filter is None:
+                bloom, _position = _build()
+                _built_at = time.monotonic()
+                _synced_at = timezone.now()
+                _filter = bloom
+        return _filter
+
+    if (
+        time.monotonic() - _built_at >= _settings().get('REBUILD_INTERVAL', 3600)
+        or _filter.count > _filter.capacity
+    ):
+        _rebuild_in_background()
+    return _filter
+
+
+def _catch_up():
+    """
+    Replay the lot change feed into the filter.
+
+    Returns:
+        bool: True if the filter now holds every committed lot, False if the
+        feed can't tell (a rebuild is scheduled when the feed is readable)
+    """
+    global _synced_at, _position
+    with _filter_lock:
+        changes = lot_changes.changes_since(_position)
+        if changes is not None:
+            position, since, _ = changes
+            if since is not None:
+                _sync(_filter, since)
+                _synced_at = timezone.now()
+            _position = position
+            return True
+    if lot_changes.position() is not None:
+        _rebuild_in_background()
+    return False
+
+
+def _might_exist(key):
+    _stats['checks'] += 1
+    bloom = get_filter()
+    if key in bloom:
+        _stats['passed'] += 1
+        return True
+    if not _catch_up():
+        # Lots may be missing: let the caller look the key up in the database
+        _stats['fallthroughs'] += 1
+        return True
+    if key in _filter:
+        _stats['passed'] += 1
+        return True
+    _stats['rejected'] += 1
+    return False
+
+
+def lot_might_exist(lot_id):
+    """
+    Return False if no lot has this id (no database query), True if one may.
+
+    Always True when the filter is off (see is_enabled()). Malformed ids are rejected.
+    """
+    if not is_enabled():
+        return True
+    try:
+        key = lot_id_key(lot_id)
+    except ValueError:
+        _stats['checks'] += 1
+        _stats['rejected'] += 1
+        return False
+    return _might_exist(key)
+
+
+async def alot_might_exist(lot_id):
+    """
+    Async lot_might_exist(), for the ASGI views (see async_views.py).
+
+    Ids the built filter holds are passed without leaving the event loop;
+    the first build and rejections (which may sync from the database) run
+    on a thread.
+    """
+    if _filter is not None and is_enabled():
+        try:
+            key = lot_id_key(lot_id)
+        except ValueError:
+            key = None
+        if key is not None and key in get_filter():
+            _stats['checks'] += 1
+            _stats['passed'] += 1
+            return True
+    return await sync_to_async(lot_might_exist)(lot_id)
+
+
+def short_code_might_exist(code):
+    """Return False if no lot has this (normalized) short code, True if one may."""
+    if not is_enabled():
+        return True
+    return _might_exist(short_code_key(code))
+
+
+def record_false_positive():
+    """Count a key that passed the filter but had no lot in the database."""
+    _stats['false_positives'] += 1
+
+
+def add_lots(lots):
+    """
+    Add new lots to this process's filter.
+
+    Called from the LotManifest post_save signal and for bulk-created lots;
+    other workers learn about them from the lot change feed.
+    """
+    if _filter is None:
+        return
+    keys = [
+        key for key in _keys((uuid.UUID(str(lot.id)), lot.short_code) for lot in lots)
+        if key not in _filter
+    ]
+    if len(keys) > 16:
+        _filter.add_many(keys)
+    else:
+        for key in keys:
+            _filter.add(key)
+
+
+def filter_stats():
+    """
+    Filter size and false-positive metrics for this process.
+
+    observed_false_positive_rate is the share of lookups for nonexistent
+    keys that got past the filter: false_positives / (false_positives + rejected).
+
+    Returns:
+        dict: Metrics
+    """
+    bloom = _filter
+    absent = _stats['false_positives'] + _stats['rejected']
+    return {
+        'enabled': is_enabled(),
+        'built': bloom is not None,
+        'keys': bloom.count if bloom else 0,
+        'capacity': bloom.capacity if bloom else 0,
+        'size_bytes': bloom.size_bytes if bloom else 0,
+        'hash_count': bloom.hash_count if bloom else 0,
+        'target_false_positive_rate': _settings().get('FALSE_POSITIVE_RATE', 0.01),
+        'expected_false_positive_rate': round(bloom.expected_false_positive_rate(), 6) if bloom else None,
+        'observed_false_positive_rate': round(_stats['false_positives'] / absent, 6) if absent else None,
+        'synced_at': _synced_at.isoformat() if _synced_at else None,
+        **_stats,
+    }
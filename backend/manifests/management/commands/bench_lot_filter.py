@@ -0,0 +1,99 @@
+"""
+Django management command to benchmark the negative-lookup filter.
+
+Two measurements:
+- Filter only: build a Bloom filter of synthetic lot keys, then probe it
+  with keys that were never added. Reports build rate, memory, probe rate
+  and the measured false-positive rate against the target.
+- 404 path: call the verify-qr view with random (nonexistent) lot ids with
+  the filter off and on, and report 404s per second and database queries
+  per probe. Uses the lots in the database.
+
+Usage:
+    # Default: 1M synthetic lots, 200k probes, 2,000 verify-qr probes
+    python manage.py bench_lot_filter
+
+    # Bigger filter, tighter false-positive target
+    python manage.py bench_lot_filter --lots 5000000 --fpr 0.001
+"""
+import time
+import uuid
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from core.benchmarking import format_stats, time_calls
+from manifests import lot_filter
+from manifests.lot_filter import BloomFilter, lot_id_key
+from manifests.short_codes import generate_short_code
+from manifests.views import LotManifestViewSet
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the Bloom filter and the verify-qr 404 path for unknown lot ids'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lots', type=int, default=1000000, help='Synthetic lots in the filter (default: 1,000,000)')
+        parser.add_argument('--probes', type=int, default=200000, help='Filter probes with absent keys (default: 200,000)')
+        parser.add_argument('--fpr', type=float, default=0.01, help='Target false-positive rate (default: 0.01)')
+        parser.add_argument('--requests', type=int, default=2000, help='verify-qr probes per run (default: 2,000)')
+
+    def handle(self, *args, **options):
+        self._bench_filter(options)
+        self._bench_404_path(options)
+
+    def _bench_filter(self, options):
+        lots = options['lots']
+        self.stdout.write(f'Filter of {lots:,} lots (id + short code), target FPR {options["fpr"]}')
+        keys = []
+        for _ in range(lots):
+            keys.append(lot_id_key(uuid.uuid4()))
+            keys.append(b's' + generate_short_code().encode('ascii'))
+
+        bloom = BloomFilter(capacity=len(keys), false_positive_rate=options['fpr'])
+        started = time.perf_counter()
+        for start in range(0, len(keys), 10000):
+            bloom.add_many(keys[start:start + 10000])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'  build: {len(keys) / elapsed:,.0f} keys/s, {bloom.size_bytes / 2**20:.1f} MB, '
+            f'{bloom.hash_count} hashes, {bloom.bit_count / len(keys):.1f} bits/key'
+        )
+
+        missing = sum(key not in bloom for key in keys[:10000])
+        probes = [lot_id_key(uuid.uuid4()) for _ in range(options['probes'])]
+        passed = [0]
+
+        def probe(key):
+            if key in bloom:
+                passed[0] += 1
+
+        self.stdout.write(format_stats('  probe (absent keys)', time_calls(probe, probes)))
+        self.stdout.write(
+            f'  false positives: {passed[0] / len(probes):.4%} measured, '
+            f'{bloom.expected_false_positive_rate():.4%} expected; false negatives: {missing}'
+        )
+
+    def _bench_404_path(self, options):
+        self.stdout.write(f'\nverify-qr with {options["requests"]:,} random lot ids')
+        view = LotManifestViewSet.as_view({'get': 'verify_qr'}, **LotManifestViewSet.verify_qr.kwargs)
+        factory = APIRequestFactory()
+        lot_ids = [str(uuid.uuid4()) for _ in range(options['requests'])]
+
+        def scan(lot_id):
+            response = view(factory.get(f'/api/manifests/{lot_id}/verify-qr/'), pk=lot_id)
+            assert response.status_code == 404, response.status_code
+
+        lot_filter.get_filter()  # Build outside the timed run
+        for enabled in (False, True):
+            # One process, so the filter is used whatever the cache backend
+            with mock.patch.object(lot_filter, 'is_enabled', return_value=enabled):
+                with CaptureQueriesContext(connection) as queries:
+                    stats = time_calls(scan, lot_ids)
+            self.stdout.write(
+                format_stats(f'  filter {"on" if enabled else "off"}', stats)
+                + f'   {len(queries) / len(lot_ids):.3f} queries/probe'
+            )
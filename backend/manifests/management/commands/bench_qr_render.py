@@ -0,0 +1,146 @@
+"""
+Django management command to benchmark QR label rendering.
+
+Compares the PIL drawing path (qrcode's image factory, a second canvas and
+ImageDraw text) with the NumPy rasterizer used by generate_qr_codes, and the
+PNG path with the SVG and ZPL vector formats (labels per second and bytes
+per label), and the UUID verification URL with the short-code URL (QR
+version, modules and render time). Labels are rendered for synthetic lots,
+so no database rows are needed.
+
+Usage:
+    # Render 500 labels with each renderer
+    python manage.py bench_qr_render
+
+    # Include PNG encoding, as generate_qr_codes does
+    python manage.py bench_qr_render --labels 2000 --png
+
+    # Compare output formats: PNG vs SVG vs ZPL
+    python manage.py bench_qr_render --formats
+    
+    # Compare QR payloads: UUID URL vs short-code URL
+    python manage.py bench_qr_render --payloads
+"""
+import uuid
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarking import format_stats, time_calls
+from manifests.short_codes import generate_short_code
+from manifests.qr_generator import (
+    LABEL_FORMATS,
+    QR_BORDER,
+    LabelSpec,
+    label_payload,
+    qr_modules,
+    qr_payload,
+    qr_version,
+    render_label,
+    render_label_bytes,
+    render_label_pil,
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark QR label renderers and output formats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--labels', type=int, default=500, help='Labels to render per renderer')
+        parser.add_argument('--png', action='store_true', help='Also encode each label as PNG')
+        parser.add_argument('--formats', action='store_true', help='Compare PNG, SVG and ZPL output')
+        parser.add_argument('--payloads', action='store_true', help='Compare UUID and short-code QR payloads')
+
+    def handle(self, *args, **options):
+        specs = [
+            LabelSpec(str(uuid.uuid4()), f'PCM-2026-KE-{i:05d}', 'Paracetamol Tablets 500mg')
+            for i in range(options['labels'])
+        ]
+
+        if options['formats']:
+            self._compare_formats(specs)
+            return
+        if options['payloads']:
+            self._compare_payloads(specs)
+            return
+
+        def encoded(render):
+            if not options['png']:
+                return render
+
+            def render_and_encode(spec):
+                render(spec).save(BytesIO(), format='PNG')
+            return render_and_encode
+
+        # Warm up font and glyph caches so both paths are measured steady-state
+        render_label_pil(specs[0])
+        render_label(specs[0])
+
+        encode_stats = time_calls(lambda spec: qr_modules(qr_payload(spec.lot_id)), specs)
+        before = time_calls(encoded(render_label_pil), specs)
+        after = time_calls(encoded(render_label), specs)
+
+        suffix = ' + PNG' if options['png'] else ''
+        self.stdout.write(format_stats('QR encoding only (floor)', encode_stats))
+        self.stdout.write(format_stats(f'PIL drawing (before){suffix}', before))
+        self.stdout.write(format_stats(f'NumPy raster (after){suffix}', after))
+        if after['p50_us']:
+            self.stdout.write(self.style.SUCCESS(
+                f"{after['per_second']:,.0f} vs {before['per_second']:,.0f} images/s "
+                f"({before['p50_us'] / after['p50_us']:.1f}x faster at p50)"
+            ))
+
+    def _compare_formats(self, specs):
+        """Labels per second and bytes per label for every output format."""
+        def encode_pil_png(spec):
+            buffer = BytesIO()
+            render_label_pil(spec).save(buffer, format='PNG')
+            return buffer.getvalue()
+
+        renderers = [('png (PIL drawing)', encode_pil_png)] + [
+            (label_format, lambda spec, label_format=label_format: render_label_bytes(spec, label_format))
+            for label_format in LABEL_FORMATS
+        ]
+        for _, render in renderers:
+            render(specs[0])  # Warm up caches
+
+        baseline = None
+        for label, render in renderers:
+            sizes = []
+            stats = time_calls(lambda spec: sizes.append(len(render(spec))), specs)
+            bytes_per_label = sum(sizes) / len(sizes)
+            baseline = baseline or stats
+            self.stdout.write(
+                f"{format_stats(label, stats)}   {bytes_per_label:>8,.0f} B/label   "
+                f"{stats['per_second'] / baseline['per_second']:>6.1f}x"
+            )
+
+    def _compare_payloads(self, specs):
+        """QR version, module count and render time of the UUID and short-code URLs."""
+        short_specs = [spec._replace(short_code=generate_short_code()) for spec in specs]
+        # A lowercase code forces byte mode: shows what the uppercase URL buys
+        byte_mode_specs = [spec._replace(short_code=spec.short_code.lower()) for spec in short_specs]
+        variants = [
+            ('uuid url', specs),
+            ('short url (byte mode)', byte_mode_specs),
+            ('short url', short_specs),
+        ]
+        
+        baseline = None
+        for label, variant_specs in variants:
+            data = label_payload(variant_specs[0])
+            version = qr_version(data)
+            modules = 17 + 4 * version
+            render_label(variant_specs[0])  # Warm up caches
+            encode = time_calls(lambda spec: qr_modules(label_payload(spec)), variant_specs)
+            render = time_calls(lambda spec: render_label_bytes(spec, 'png'), variant_specs)
+            baseline = baseline or render
+            self.stdout.write(
+                f'{label:<22} {len(data):>3} chars  version {version:>2}  '
+                f'{modules}x{modules} modules ({modules + 2 * QR_BORDER} with quiet zone)'
+            )
+            self.stdout.write(format_stats('  QR encoding', encode))
+            self.stdout.write(
+                f"{format_stats('  label render + PNG', render)}   "
+                f"{render['per_second'] / baseline['per_second']:>6.1f}x"
+            )
@@ -0,0 +1,193 @@
+"""
+Django management command to check the query plans of every list endpoint.
+
+Seeds a large dataset inside a transaction, runs EXPLAIN on the first page
+query each list endpoint would issue, and fails if any of them falls back to
+a sequential scan of the endpoint's main table. The transaction is rolled
+back afterwards so the database is left untouched.
+
+Requires PostgreSQL (the plan check reads PostgreSQL's EXPLAIN output).
+
+Usage:
+    # Default dataset (20k lots, 200k receipts, 50k flags)
+    python manage.py bench_query_plans
+
+    # Bigger dataset, print every plan
+    python manage.py bench_query_plans --lots 100000 --receipts 1000000 --verbose-plans
+"""
+import random
+import secrets
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.settings import api_settings
+
+from accounts.models import User
+from core.benchmarking import Rollback, list_queryset
+from entities.models import Distributor
+from logs.chain import append_receipts
+from logs.models import ReceiptEvent
+from logs.views import ReceiptEventViewSet
+from manifests.models import LotManifest
+from manifests.views import LotManifestViewSet
+from pharmaceuticals.models import Medicine
+from pharmaceuticals.views import MedicineViewSet
+from reports.models import CrowdFlag
+from reports.views import CrowdFlagViewSet
+
+
+class Command(BaseCommand):
+    help = 'Seed a large dataset and fail if any list endpoint plans a sequential scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lots', type=int, default=20000, help='Number of lot manifests to seed')
+        parser.add_argument('--receipts', type=int, default=200000, help='Number of receipt events to seed')
+        parser.add_argument('--flags', type=int, default=50000, help='Number of crowd flags to seed')
+        parser.add_argument('--keep', action='store_true', help='Commit the seeded data instead of rolling back')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the plan of every query')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('bench_query_plans requires PostgreSQL (got %s)' % connection.vendor)
+
+        failures = []
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                seed = self._seed(options)
+                self.stdout.write(f'Seeded dataset in {time.perf_counter() - started:.1f}s')
+
+                with connection.cursor() as cursor:
+                    for table in ['users', 'distributors', 'medicines', 'lot_manifests', 'receipt_events', 'crowd_flags']:
+                        cursor.execute(f'ANALYZE {table}')
+
+                for label, viewset_class, params, table in self._cases(seed):
+                    queryset = list_queryset(viewset_class, params, seed['user'])
+                    plan = queryset[:api_settings.PAGE_SIZE].explain()
+                    seq_scan = f'Seq Scan on {table}' in plan
+                    if seq_scan:
+                        failures.append(label)
+                        self.stdout.write(self.style.ERROR(f'✗ {label}: sequential scan on {table}'))
+                    else:
+                        self.stdout.write(self.style.SUCCESS(f'✓ {label}'))
+                    if seq_scan or options['verbose_plans']:
+                        for line in plan.splitlines():
+                            self.stdout.write(f'    {line}')
+
+                if not options['keep']:
+                    raise Rollback()
+        except Rollback:
+            self.stdout.write('Rolled back seeded dataset')
+
+        if failures:
+            raise CommandError(f'{len(failures)} list queries fall back to a sequential scan: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All list endpoint queries use an index'))
+
+    def _cases(self, seed):
+        """Return (label, viewset, query params, main table) for every filter and ordering path."""
+        today = timezone.localdate()
+        return [
+            ('GET /api/manifests/', LotManifestViewSet, {}, 'lot_manifests'),
+            ('GET /api/manifests/?distributor=', LotManifestViewSet, {'distributor': seed['distributor'].id}, 'lot_manifests'),
+            ('GET /api/manifests/?medicine=', LotManifestViewSet, {'medicine': seed['medicine'].id}, 'lot_manifests'),
+            ('GET /api/manifests/?min_trust_score=', LotManifestViewSet, {'min_trust_score': '99'}, 'lot_manifests'),
+            ('GET /api/medicines/', MedicineViewSet, {}, 'medicines'),
+            ('GET /api/medicines/?distributor=', MedicineViewSet, {'distributor': seed['distributor'].id}, 'medicines'),
+            ('GET /api/receipts/', ReceiptEventViewSet, {}, 'receipt_events'),
+            ('GET /api/receipts/?lot=', ReceiptEventViewSet, {'lot': seed['lot'].id}, 'receipt_events'),
+            ('GET /api/receipts/?user=', ReceiptEventViewSet, {'user': seed['user'].id}, 'receipt_events'),
+            (
+                'GET /api/receipts/?date_from=&date_to=',
+                ReceiptEventViewSet,
+                {'date_from': (today - timedelta(days=7)).isoformat(), 'date_to': today.isoformat()},
+                'receipt_events',
+            ),
+            ('GET /api/flags/', CrowdFlagViewSet, {}, 'crowd_flags'),
+            ('GET /api/flags/?lot=', CrowdFlagViewSet, {'lot': seed['lot'].id}, 'crowd_flags'),
+            ('GET /api/flags/?lot=&resolved=false', CrowdFlagViewSet, {'lot': seed['lot'].id, 'resolved': 'false'}, 'crowd_flags'),
+            ('GET /api/flags/?resolved=false', CrowdFlagViewSet, {'resolved': 'false'}, 'crowd_flags'),
+            ('GET /api/flags/?severity=CRITICAL', CrowdFlagViewSet, {'severity': 'CRITICAL'}, 'crowd_flags'),
+            ('GET /api/flags/?my_flags=true', CrowdFlagViewSet, {'my_flags': 'true'}, 'crowd_flags'),
+        ]
+
+    def _seed(self, options):
+        """Bulk-insert a dataset large enough for the planner to prefer indexes."""
+        rng = random.Random(42)
+        batch_size = 5000
+
+        users = User.objects.bulk_create(
+            [User(username=f'bench-{uuid.uuid4().hex[:12]}', role='Pharmacist') for _ in range(200)],
+            batch_size=batch_size,
+        )
+        distributors = Distributor.objects.bulk_create(
+            [Distributor(name=f'Bench Distributor {i}', public_key=secrets.token_hex(32)) for i in range(100)],
+            batch_size=batch_size,
+        )
+        medicines = Medicine.objects.bulk_create(
+            [
+                Medicine(name=f'Bench Medicine {i}', category='Bench', distributor=rng.choice(distributors))
+                for i in range(1000)
+            ],
+            batch_size=batch_size,
+        )
+
+        base_expiry = date.today()
+        lots = LotManifest.objects.bulk_create(
+            [
+                LotManifest(
+                    batch_number=f'BENCH-{uuid.uuid4().hex[:16].upper()}',
+                    expiry_date=base_expiry + timedelta(days=rng.randint(0, 3650)),
+                    trust_score=Decimal(rng.randint(0, 10000)) / 100,
+                    medicine=rng.choice(medicines),
+                    distributor=rng.choice(distributors),
+                )
+                for _ in range(options['lots'])
+            ],
+            batch_size=batch_size,
+        )
+
+        for start in range(0, options['receipts'], batch_size):
+            count = min(batch_size, options['receipts'] - start)
+            append_receipts([
+                ReceiptEvent(
+                    location_coord={'lat': -1.2921, 'lng': 36.8219},
+                    user=rng.choice(users),
+                    lot=rng.choice(lots),
+                )
+                for _ in range(count)
+            ])
+
+        severities = [choice for choice, _ in CrowdFlag.SEVERITY_CHOICES]
+        for start in range(0, options['flags'], batch_size):
+            count = min(batch_size, options['flags'] - start)
+            CrowdFlag.objects.bulk_create([
+                CrowdFlag(
+                    reporter_type='Pharmacist',
+                    issue_type='Quality Issue',
+                    severity=rng.choice(severities),
+                    description='Seeded by bench_query_plans',
+                    user=rng.choice(users),
+                    lot=rng.choice(lots),
+                    is_resolved=rng.random() < 0.8,
+                )
+                for _ in range(count)
+            ])
+
+        # created_at is set on insert, so spread the seeded rows over two years afterwards
+        with connection.cursor() as cursor:
+            for table in ['receipt_events', 'crowd_flags']:
+                cursor.execute(
+                    f"UPDATE {table} SET created_at = created_at - random() * interval '730 days'"
+                )
+
+        return {
+            'user': users[0],
+            'distributor': distributors[0],
+            'medicine': medicines[0],
+            'lot': lots[0],
+        }
@@ -0,0 +1,220 @@
+"""
+Django management command to benchmark the async verification views (ASGI)
+against the sync WSGI path.
+
+Drives both applications in-process (no HTTP server) with many concurrent
+clients, each sending its requests back to back, and reports throughput and
+p50/p99 latency (time from sending a request to its last byte, queueing
+included):
+- wsgi: the application of core/wsgi.py (verify-qr fast path in front of
+  Django) on a fixed pool of worker threads, like gunicorn's gthread workers
+- asgi: Django's ASGI handler routing to the async views (core/urls_asgi.py)
+  through the full middleware stack, on one event loop like one uvicorn worker
+- asgi-fast: the application of core/asgi.py, the same async views behind
+  AsyncVerifyFastPath (manifests/fast_path.py)
+
+Every query is delayed by --db-latency-ms to stand in for a remote or busy
+database; with zero latency the comparison is mostly framework overhead.
+
+Scenarios:
+- verify-qr: response cache off, scans spread over many lots
+- verify: admin POSTs with a JWT (needs an active Admin user)
+
+Usage:
+    # Default: 200 clients, 8 WSGI threads, 5 ms per query
+    python manage.py bench_verify_async
+
+    # Heavier load on a slower database
+    python manage.py bench_verify_async --clients 500 --requests 10000 --db-latency-ms 20
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from core.benchmarking import format_stats, summarize
+from manifests import verification_view
+from manifests.fast_path import AsyncVerifyFastPath, VerifyQrFastPath
+from manifests.management.commands.bench_verify_fast_path import call
+from manifests.models import LotManifest
+
+
+async def asgi_call(application, path, host, method='GET', headers=None):
+    """
+    Run one request through an ASGI application.
+
+    Args:
+        application: ASGI application
+        path: Request path
+        host: Host header
+        method: HTTP method
+        headers: Optional dict of extra request headers
+
+    Returns:
+        tuple: (status code, headers dict, body bytes)
+    """
+    request_headers = [(b'host', host.encode()), (b'accept', b'application/json')]
+    request_headers += [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': request_headers,
+        'client': ('127.0.0.1', 40000),
+        'server': (host, 80),
+    }
+    body_sent = False
+    messages = []
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client stays connected; Django cancels this wait once it responds
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    start = messages[0]
+    headers = {name.decode(): value.decode() for name, value in start['headers']}
+    return start['status'], headers, b''.join(message.get('body', b'') for message in messages[1:])
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the async verification views (ASGI) against the sync WSGI path under concurrency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=4000, help='Requests per run (default: 4,000)')
+        parser.add_argument('--clients', type=int, default=200, help='Concurrent clients (default: 200)')
+        parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads (default: 8)')
+        parser.add_argument('--db-latency-ms', type=float, default=5.0, help='Delay added to every query (default: 5)')
+        parser.add_argument('--lots', type=int, default=500, help='Lots to spread scans over (default: 500)')
+        parser.add_argument('--host', default='localhost', help='Host header (must be allowed; default: localhost)')
+
+    def handle(self, *args, **options):
+        lot_ids = [str(pk) for pk in LotManifest.objects.order_by('pk').values_list('pk', flat=True)[:options['lots']]]
+        if not lot_ids:
+            raise CommandError('No lots in the database; seed some first')
+        verification_view.refresh_lots(lot_ids)
+
+        wsgi = WSGIHandler()
+        if settings.VERIFY_FAST_PATH_ENABLED:
+            wsgi = VerifyQrFastPath(wsgi)
+        with override_settings(ROOT_URLCONF='core.urls_asgi'):
+            asgi = ASGIHandler()
+        asgi_applications = {'asgi': asgi, 'asgi-fast': AsyncVerifyFastPath(asgi)}
+        self.host = options['host']
+        count, clients = options['requests'], options['clients']
+
+        admin = User.objects.filter(role='Admin', is_active=True).first()
+        scenarios = [('verify-qr', 'GET', [f'/api/manifests/{lot_id}/verify-qr/' for lot_id in lot_ids], None)]
+        if admin is not None:
+            token = {'Authorization': f'Bearer {AccessToken.for_user(admin)}'}
+            scenarios.append(('verify', 'POST', [f'/api/manifests/{lot_id}/verify/' for lot_id in lot_ids], token))
+        else:
+            self.stdout.write(self.style.WARNING('No active Admin user; skipping the verify scenario'))
+
+        self.stdout.write(
+            f'{count:,} requests, {clients} clients, {options["threads"]} WSGI threads, '
+            f'{options["db_latency_ms"]:g} ms per query\n'
+        )
+        with override_settings(
+            RESPONSE_CACHE={**settings.RESPONSE_CACHE, 'ENABLED': False},
+            SINGLE_FLIGHT={**settings.SINGLE_FLIGHT, 'ENABLED': False},
+        ), self._db_latency(options['db_latency_ms'] / 1000):
+            for name, method, paths, headers in scenarios:
+                paths = [paths[i % len(paths)] for i in range(count)]
+                self.stdout.write(f'{name}:')
+                stats = self._run_wsgi(wsgi, method, paths, headers, clients, options['threads'])
+                self.stdout.write(format_stats('  wsgi', stats))
+                with override_settings(ROOT_URLCONF='core.urls_asgi'):
+                    for label, application in asgi_applications.items():
+                        self._check_same(wsgi, application, method, paths[0], headers)
+                        stats = asyncio.run(self._run_asgi(application, method, paths, headers, clients))
+                        self.stdout.write(format_stats(f'  {label}', stats))
+
+    def _check_same(self, wsgi, asgi, method, path, headers):
+        """Both applications must answer identically (timestamps aside)."""
+        environ_headers = {f'HTTP_{name.upper()}': value for name, value in (headers or {}).items()}
+        status, _, wsgi_body = call(wsgi, path, self.host, method, environ_headers)
+        asgi_status, _, asgi_body = asyncio.run(asgi_call(asgi, path, self.host, method, headers))
+        if not status.startswith('200') or asgi_status != 200:
+            raise CommandError(f'{method} {path}: wsgi {status}, asgi {asgi_status}')
+        if method == 'GET' and wsgi_body != asgi_body:
+            raise CommandError(f'Responses differ:\n{wsgi_body}\n{asgi_body}')
+
+    @staticmethod
+    @contextmanager
+    def _db_latency(seconds):
+        """Delay every query on connections opened inside the block."""
+        def delay(execute, sql, params, many, context):
+            time.sleep(seconds)
+            return execute(sql, params, many, context)
+
+        def install(sender, connection, **kwargs):
+            connection.execute_wrappers.append(delay)
+
+        connections.close_all()
+        if seconds > 0:
+            connection_created.connect(install, weak=False)
+        try:
+            yield
+        finally:
+            connection_created.disconnect(install)
+            connections.close_all()
+
+    def _run_wsgi(self, application, method, paths, headers, clients, threads):
+        """Closed-loop clients queueing for a pool of `threads` worker threads."""
+        environ_headers = {f'HTTP_{name.upper()}': value for name, value in (headers or {}).items()}
+        latencies = []
+
+        def client(share):
+            for path in share:
+                sent = time.perf_counter()
+                status, _, _ = workers.submit(call, application, path, self.host, method, environ_headers).result()
+                latencies.append(time.perf_counter() - sent)
+                assert status.startswith('200'), status
+
+        client_threads = [threading.Thread(target=client, args=(paths[i::clients],)) for i in range(clients)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as workers:
+            for thread in client_threads:
+                thread.start()
+            for thread in client_threads:
+                thread.join()
+        return summarize(latencies, time.perf_counter() - started)
+
+    async def _run_asgi(self, application, method, paths, headers, clients):
+        """Closed-loop clients as coroutines on one event loop."""
+        latencies = []
+
+        async def client(share):
+            for path in share:
+                sent = time.perf_counter()
+                status, _, _ = await asgi_call(application, path, self.host, method, headers)
+                latencies.append(time.perf_counter() - sent)
+                assert status == 200, status
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(paths[i::clients]) for i in range(clients)))
+        return summarize(latencies, time.perf_counter() - started)
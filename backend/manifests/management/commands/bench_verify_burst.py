@@ -0,0 +1,120 @@
+"""
+Django management command to benchmark verify-qr bursts on a single lot.
+
+Simulates many patients scanning the same lot at once: N threads call the
+verify-qr view for one lot as fast as they can, with request coalescing
+(core/singleflight.py) off and on. Reports requests and database queries
+per second at each concurrency level. With coalescing, queries per second
+stay flat as concurrency grows, because concurrent scans share one
+computation and its result is reused for SINGLE_FLIGHT['RESULT_TTL'].
+
+The response cache is disabled during the run so that only coalescing is
+measured.
+
+Usage:
+    # Burst on the first lot in the database
+    python manage.py bench_verify_burst
+
+    # A specific lot, more concurrency levels, longer runs
+    python manage.py bench_verify_burst --lot 3f2b...-uuid --concurrency 1 8 32 128 --seconds 5
+"""
+import threading
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from core import singleflight
+from manifests.models import LotManifest
+from manifests.views import LotManifestViewSet
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent verify-qr scans of one lot with and without request coalescing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=str, help='Lot id to scan (default: the first lot)')
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[1, 4, 16, 64],
+            help='Concurrent scanners per run (default: 1 4 16 64)',
+        )
+        parser.add_argument('--seconds', type=float, default=2.0, help='Duration of each run (default: 2)')
+
+    def handle(self, *args, **options):
+        try:
+            lot = LotManifest.objects.get(pk=options['lot']) if options['lot'] else LotManifest.objects.first()
+        except (LotManifest.DoesNotExist, ValidationError):
+            raise CommandError(f'Lot not found: {options["lot"]}')
+        if lot is None:
+            raise CommandError('No lots in the database; create one or pass --lot')
+
+        # The action's own kwargs carry its AllowAny permission
+        view = LotManifestViewSet.as_view({'get': 'verify_qr'}, **LotManifestViewSet.verify_qr.kwargs)
+        path = f'/api/manifests/{lot.pk}/verify-qr/'
+        self.stdout.write(f'Scanning lot {lot.batch_number} for {options["seconds"]:.1f}s per run\n')
+        self.stdout.write(
+            f'{"threads":>8} {"coalescing":>11} {"requests/s":>12} {"queries/s":>11} {"queries/req":>12}'
+        )
+        for concurrency in options['concurrency']:
+            for enabled in (False, True):
+                with override_settings(
+                    RESPONSE_CACHE={'ENABLED': False},
+                    SINGLE_FLIGHT={**singleflight._settings(), 'ENABLED': enabled},
+                ):
+                    requests, queries, elapsed = self._run(view, path, lot.pk, concurrency, options['seconds'])
+                self.stdout.write(
+                    f'{concurrency:>8} {"on" if enabled else "off":>11} {requests / elapsed:>12,.0f} '
+                    f'{queries / elapsed:>11,.0f} {queries / max(requests, 1):>12.3f}'
+                )
+
+    def _run(self, view, path, pk, concurrency, seconds):
+        """Scan the lot from `concurrency` threads. Returns (requests, queries, seconds)."""
+        factory = APIRequestFactory()
+        counts = {'requests': 0, 'queries': 0, 'errors': []}
+        counts_lock = threading.Lock()
+        start = threading.Barrier(concurrency + 1)
+        stop = threading.Event()
+
+        def scanner():
+            requests = queries = 0
+
+            def count_query(execute, sql, params, many, context):
+                nonlocal queries
+                queries += 1
+                return execute(sql, params, many, context)
+
+            try:
+                with connection.execute_wrapper(count_query):
+                    start.wait()
+                    while not stop.is_set():
+                        response = view(factory.get(path), pk=str(pk))
+                        if response.status_code != 200:
+                            raise CommandError(f'verify-qr returned {response.status_code}')
+                        requests += 1
+            except Exception as e:
+                stop.set()
+                counts['errors'].append(e)
+            finally:
+                connection.close()
+                with counts_lock:
+                    counts['requests'] += requests
+                    counts['queries'] += queries
+
+        threads = [threading.Thread(target=scanner) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        if counts['errors']:
+            raise counts['errors'][0]
+        return counts['requests'], counts['queries'], time.perf_counter() - started
@@ -0,0 +1,139 @@
+"""
+Django management command to benchmark the verify-qr WSGI fast path.
+
+Calls the WSGI application in-process (no HTTP server), one request at a
+time, so the numbers are requests per second of a single worker thread:
+- full: the Django application (all middleware, URL resolution, DRF view)
+- fast: the same application wrapped in VerifyQrFastPath (core/wsgi.py)
+
+Two scenarios:
+- cache hit: one hot lot, served from the response cache
+- cache miss: response cache and single-flight off, scans spread over many
+  lots, so every request reads a LotVerificationView row
+
+Uses lots from the database (run bench_query_plans or seed some first) and
+refreshes their verification rows before measuring.
+
+Usage:
+    # Default: 2,000 requests per run over up to 500 lots
+    python manage.py bench_verify_fast_path
+
+    # Longer runs
+    python manage.py bench_verify_fast_path --requests 20000
+"""
+import io
+import sys
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core.benchmarking import format_stats, time_calls
+from manifests import verification_view
+from manifests.fast_path import VerifyQrFastPath
+from manifests.models import LotManifest
+
+
+def wsgi_environ(path, host, method='GET', headers=None):
+    """
+    Minimal WSGI environ of a JSON request.
+
+    Args:
+        path: Request path
+        host: Host header
+        method: HTTP method
+        headers: Optional dict of extra environ keys (e.g. HTTP_AUTHORIZATION)
+    """
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': '',
+        'SERVER_NAME': host,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': host,
+        'HTTP_ACCEPT': 'application/json',
+        'HTTP_ORIGIN': 'http://localhost:5173',
+        'wsgi.input': io.BytesIO(b''),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'wsgi.version': (1, 0),
+    }
+    environ.update(headers or {})
+    return environ
+
+
+def call(application, path, host, method='GET', headers=None):
+    """Run one request through a WSGI application; returns (status, headers, body)."""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'], started['headers'] = status, dict(headers)
+
+    result = application(wsgi_environ(path, host, method, headers), start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return started['status'], started['headers'], body
+
+
+class Command(BaseCommand):
+    help = 'Benchmark verify-qr through the full Django stack vs the WSGI fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per run (default: 2,000)')
+        parser.add_argument('--lots', type=int, default=500, help='Lots to spread cache-miss scans over (default: 500)')
+        parser.add_argument('--host', default='localhost', help='Host header (must be allowed; default: localhost)')
+
+    def handle(self, *args, **options):
+        lot_ids = [str(pk) for pk in LotManifest.objects.order_by('pk').values_list('pk', flat=True)[:options['lots']]]
+        if not lot_ids:
+            raise CommandError('No lots in the database; seed some first')
+        verification_view.refresh_lots(lot_ids)
+
+        full = WSGIHandler()
+        applications = {'full': full, 'fast': VerifyQrFastPath(full)}
+        host = options['host']
+        count = options['requests']
+
+        # Both paths must answer identically
+        path = f'/api/manifests/{lot_ids[0]}/verify-qr/'
+        with override_settings(RESPONSE_CACHE={**settings.RESPONSE_CACHE, 'ENABLED': False}):
+            answers = {name: call(app, path, host) for name, app in applications.items()}
+        if answers['full'][0] != '200 OK' or answers['full'][2] != answers['fast'][2]:
+            raise CommandError(f'Responses differ: {answers}')
+        self.stdout.write(f'Responses identical ({len(answers["fast"][2])} bytes)\n')
+
+        self.stdout.write(f'Cache hit: {count:,} scans of one hot lot')
+        hot_path = f'/api/manifests/{lot_ids[0]}/verify-qr/'
+        with override_settings(
+            RESPONSE_CACHE={**settings.RESPONSE_CACHE, 'ENABLED': True},
+            HOT_LOTS={**settings.HOT_LOTS, 'ADMISSION_THRESHOLD': 0},
+        ):
+            for name, application in applications.items():
+                call(application, hot_path, host)  # Fill the cache
+                stats = time_calls(lambda path: self._expect(application, path, host, 'HIT'), [hot_path] * count)
+                self.stdout.write(format_stats(f'  {name}', stats))
+
+        self.stdout.write(f'\nCache miss: {count:,} scans over {len(lot_ids):,} lots (one row read each)')
+        paths = [f'/api/manifests/{lot_ids[i % len(lot_ids)]}/verify-qr/' for i in range(count)]
+        with override_settings(
+            RESPONSE_CACHE={**settings.RESPONSE_CACHE, 'ENABLED': False},
+            SINGLE_FLIGHT={**settings.SINGLE_FLIGHT, 'ENABLED': False},
+        ):
+            for name, application in applications.items():
+                stats = time_calls(lambda path: self._expect(application, path, host, None), paths)
+                self.stdout.write(format_stats(f'  {name}', stats))
+
+    @staticmethod
+    def _expect(application, path, host, cache):
+        status, headers, _ = call(application, path, host)
+        assert status == '200 OK', status
+        assert headers.get('X-Cache') == cache, headers.get('X-Cache')
@@ -10,16 +10,68 @@ Usage:
     
     # Specify custom output directory
     python manage.py generate_qr_codes --all --output my_qr_codes/
+    
+    # Render in parallel on 8 processes (0 = one per CPU)
+    python manage.py generate_qr_codes --all --workers 8
+    
+    # Imposed print sheets: 3x4 labels per A4 page in one PDF (or TIFF)
+    python manage.py generate_qr_codes --all --sheet pdf --output labels.pdf
+    python manage.py generate_qr_codes --all --sheet tiff --page-size Letter --grid 4x5 --dpi 600
+    
+    # Nightly refresh: only lots (or medicines) modified in the last day
+    python manage.py generate_qr_codes --all --changed-since 2026-01-31T00:00
+    
+    # Ignore the content-hash manifest and re-render every label
+    python manage.py generate_qr_codes --all --force
+    
+    # Vector output: SVG files, or ZPL for Zebra printers (printer draws the QR)
+    python manage.py generate_qr_codes --all --format svg
+    python manage.py generate_qr_codes --all --format zpl
+    
+    # Compact QR codes encoding the lots' short-code URLs (see short_codes.py)
+    python manage.py generate_qr_codes --all --short-url
+
+Per-lot output is incremental: a content-hash manifest per format (.qr_manifest.json
+for PNG, .qr_manifest.<format>.json otherwise, in the output directory) records what each label was rendered from, so only labels
+whose batch number, medicine name or render settings changed are rewritten,
+and labels of deleted lots are removed.
 """
+import os
+import time
+from datetime import datetime, time as datetime_time
+
 from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from manifests.label_hashes import LabelHashes
 from manifests.models import LotManifest
-from manifests.qr_generator import batch_generate_qr_codes, generate_qr_with_label
+from manifests.print_sheets import PAGE_SIZES, SHEET_FORMATS, SheetLayout, write_sheets
+from manifests.qr_generator import (
+    LABEL_FORMATS,
+    LabelSpec,
+    iter_generate_qr_codes,
+    iter_label_specs,
+    iter_render_labels,
+    label_filename,
+    render_label_bytes,
+)
 
 
 class Command(BaseCommand):
     help = 'Generate QR codes for lot manifests'
 
     def add_arguments(self, parser):
+        parser.add_argument(
+            '--changed-since',
+            type=str,
+            help='Only lots whose lot or medicine changed since this ISO date/datetime',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render every selected label even if its content hash is unchanged',
+        )
         parser.add_argument(
             '--all',
             action='store_true',
@@ -36,31 +88,91 @@ class Command(BaseCommand):
             default='qr_codes',
             help='Output directory for QR codes (default: qr_codes/)',
         )
+        parser.add_argument(
+            '--format',
+            choices=list(LABEL_FORMATS),
+            default='png',
+            help='Per-lot label file format (default: png)',
+        )
+        parser.add_argument(
+            '--short-url',
+            action='store_true',
+            help='Encode the short-code URL (smaller, faster-scanning QR codes) instead of the UUID URL',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Worker processes for --all (default: 1, 0 = one per CPU)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50,
+            help='Labels per worker task (default: 50)',
+        )
+        parser.add_argument(
+            '--progress-every',
+            type=int,
+            default=1000,
+            help='Report progress every N labels (default: 1000)',
+        )
+        parser.add_argument(
+            '--sheet',
+            choices=SHEET_FORMATS,
+            help='Write labels N-up into one multi-page PDF or TIFF instead of one PNG per lot',
+        )
+        parser.add_argument(
+            '--page-size',
+            choices=list(PAGE_SIZES),
+            default='A4',
+            help='Sheet page size (default: A4)',
+        )
+        parser.add_argument(
+            '--grid',
+            type=str,
+            default='3x4',
+            help='Labels per page as COLUMNSxROWS (default: 3x4)',
+        )
+        parser.add_argument(
+            '--margin',
+            type=float,
+            default=10.0,
+            help='Sheet page margin in mm (default: 10)',
+        )
+        parser.add_argument(
+            '--gap',
+            type=float,
+            default=3.0,
+            help='Gap between labels in mm (default: 3)',
+        )
+        parser.add_argument(
+            '--dpi',
+            type=int,
+            default=300,
+            help='Sheet resolution (default: 300)',
+        )
 
     def handle(self, *args, **options):
         if options['all']:
             # Generate for all lots
             self.stdout.write('Generating QR codes for all lot manifests...')
             
-            queryset = LotManifest.objects.all().select_related('medicine')
-            
+            queryset = LotManifest.objects.order_by('batch_number')
             if not queryset.exists():
                 raise CommandError('No lot manifests found in database')
             
-            results = batch_generate_qr_codes(queryset, output_dir=options['output'])
-            
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'✓ Generated {len(results)} QR codes in {options["output"]}/'
-                )
-            )
+            if options['changed_since']:
+                since = self._parse_since(options['changed_since'])
+                queryset = queryset.filter(Q(updated_at__gte=since) | Q(medicine__updated_at__gte=since))
             
-            # List generated files
-            for lot, filepath in results[:5]:  # Show first 5
-                self.stdout.write(f'  - {filepath}')
-            
-            if len(results) > 5:
-                self.stdout.write(f'  ... and {len(results) - 5} more')
+            workers = options['workers'] or os.cpu_count() or 1
+            if options['sheet'] and options['format'] != 'png':
+                raise CommandError('--format applies to per-lot files; sheets are always raster')
+            if options['sheet']:
+                self._write_sheets(queryset, queryset.count(), workers, options)
+            else:
+                self._write_files(queryset, workers, options)
             
         elif options['batch']:
             # Generate for specific batch
@@ -71,8 +183,16 @@ class Command(BaseCommand):
                     batch_number=options['batch']
                 )
                 
-                filepath = f"{options['output']}/{lot.batch_number}.png"
-                generate_qr_with_label(lot, save_path=filepath)
+                spec = LabelSpec.from_lot(lot, short_url=options['short_url'])
+                os.makedirs(options['output'], exist_ok=True)
+                filepath = os.path.join(options['output'], label_filename(spec, options['format']))
+                with open(filepath, 'wb') as label_file:
+                    label_file.write(render_label_bytes(spec, options['format']))
+                
+                # Keep the content-hash manifest in step with the file
+                hashes = LabelHashes(options['output'], options['format'])
+                hashes.record(spec, os.path.basename(filepath))
+                hashes.save()
                 
                 self.stdout.write(
                     self.style.SUCCESS(f'✓ Generated QR code: {filepath}')
@@ -84,3 +204,134 @@ class Command(BaseCommand):
                 raise CommandError(f'Batch not found: {options["batch"]}')
         else:
             raise CommandError('Please specify --all or --batch <batch_number>')
+
+    def _parse_since(self, value):
+        """Parse --changed-since as an ISO datetime or date (midnight)."""
+        since = parse_datetime(value)
+        if since is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f'Invalid --changed-since {value!r}, expected an ISO date or datetime')
+            since = datetime.combine(day, datetime_time.min)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
+
+    def _write_files(self, queryset, workers, options):
+        """Write one PNG per lot, skipping labels whose content hash is unchanged."""
+        output_dir = options['output']
+        hashes = LabelHashes(output_dir, options['format'])
+        self.stdout.write(
+            f'Checking labels against {len(hashes)} recorded hashes with {workers} worker(s)...'
+        )
+        
+        counts = {'scanned': 0}
+        
+        def stale(specs):
+            for spec in specs:
+                counts['scanned'] += 1
+                if options['force'] or not hashes.is_current(spec):
+                    yield spec
+        
+        # Stream lots from the database and keep only the first few paths
+        generated = 0
+        examples = []
+        started = time.perf_counter()
+        results = iter_generate_qr_codes(
+            stale(iter_label_specs(queryset, short_url=options['short_url'])),
+            output_dir=output_dir,
+            workers=workers,
+            chunk_size=options['chunk_size'],
+            label_format=options['format'],
+        )
+        for spec, filepath in results:
+            hashes.record(spec, os.path.basename(filepath))
+            generated += 1
+            if len(examples) < 5:
+                examples.append(filepath)
+            if generated % options['progress_every'] == 0:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'  {generated} regenerated, {counts["scanned"]} checked ({generated / elapsed:,.0f} labels/s)'
+                )
+        
+        # Remove labels of deleted lots (an id-only scan, cheap next to rendering)
+        existing = {str(lot_id) for lot_id in LotManifest.objects.values_list('id', flat=True).iterator()}
+        deleted = hashes.prune(existing)
+        hashes.save()
+        elapsed = time.perf_counter() - started
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Generated {generated} QR codes in {output_dir}/ '
+                f'({counts["scanned"] - generated} unchanged, {deleted} stale files removed, '
+                f'{elapsed:.1f}s, {generated / elapsed if elapsed else 0:,.0f} labels/s)'
+            )
+        )
+        
+        # List generated files
+        for filepath in examples:  # Show first 5
+            self.stdout.write(f'  - {filepath}')
+        
+        if generated > 5:
+            self.stdout.write(f'  ... and {generated - 5} more')
+
+    def _write_sheets(self, queryset, total, workers, options):
+        """Render every lot into one imposed PDF or TIFF."""
+        if not total:
+            self.stdout.write(self.style.SUCCESS('✓ No lots selected, no sheet written'))
+            return
+        
+        try:
+            columns, rows = (int(value) for value in options['grid'].lower().split('x'))
+        except ValueError:
+            raise CommandError(f'Invalid --grid {options["grid"]!r}, expected e.g. 3x4')
+        layout = SheetLayout(
+            page_size=options['page_size'],
+            columns=columns,
+            rows=rows,
+            margin_mm=options['margin'],
+            gap_mm=options['gap'],
+            dpi=options['dpi'],
+        )
+        try:
+            layout.validate()
+        except ValueError as e:
+            raise CommandError(str(e))
+        
+        # --output is a file path for sheets; a directory gets qr_labels.<format>
+        path = options['output']
+        if not path.lower().endswith(f".{options['sheet']}"):
+            os.makedirs(path, exist_ok=True)
+            path = os.path.join(path, f"qr_labels.{options['sheet']}")
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        self.stdout.write(
+            f'Imposing {total} labels {columns}x{rows} on {options["page_size"]} pages '
+            f'at {layout.dpi} dpi with {workers} worker(s)...'
+        )
+        started = time.perf_counter()
+        progress_pages = max(1, options['progress_every'] // layout.labels_per_page)
+        
+        def progress(pages, labels):
+            if pages % progress_pages == 0:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'  {pages} pages, {labels}/{total} labels ({labels / elapsed:,.0f} labels/s)')
+        
+        labels = (
+            image for _, image in iter_render_labels(
+                iter_label_specs(queryset, short_url=options['short_url']),
+                workers=workers,
+                chunk_size=options['chunk_size'],
+            )
+        )
+        result = write_sheets(labels, path, layout, sheet_format=options['sheet'], progress=progress)
+        elapsed = time.perf_counter() - started
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ Wrote {result['labels']} labels on {result['pages']} pages to {path} "
+                f"({elapsed:.1f}s, {result['labels'] / elapsed if elapsed else 0:,.0f} labels/s)"
+            )
+        )
@@ -0,0 +1,73 @@
+"""
+Django management command to publish static verification pages.
+
+Writes every lot's verification page and JSON (or one distributor's) from
+its LotVerificationView row to VERIFICATION_PAGES['ROOT'] (see
+published_pages.py). Pages whose content hasn't changed are skipped, so
+re-running it only writes what changed. Run once after enabling
+publishing; afterwards pages are re-published as rows change. Lots without
+a row are skipped (run rebuild_verification_views first).
+
+Usage:
+    # Publish every lot and remove pages of deleted lots
+    python manage.py publish_verification_pages --prune
+
+    # Only one distributor's lots
+    python manage.py publish_verification_pages --distributor 3f2b...-uuid
+
+    # Publish to another directory (e.g. before syncing it to a CDN)
+    python manage.py publish_verification_pages --root /srv/pages
+"""
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from manifests import published_pages
+from manifests.models import LotVerificationView
+
+
+class Command(BaseCommand):
+    help = 'Publish static verification pages for CDN or WhiteNoise serving'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--distributor', type=str, help='Only publish this distributor\'s lots')
+        parser.add_argument('--root', type=str, help='Publish here instead of VERIFICATION_PAGES[\'ROOT\']')
+        parser.add_argument('--prune', action='store_true', help='Remove pages of lots that no longer exist')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per query (default: 1,000)')
+
+    def handle(self, *args, **options):
+        pages = dict(settings.VERIFICATION_PAGES)
+        if options['root']:
+            pages['ROOT'] = options['root']
+        elif not pages.get('ENABLED'):
+            self.stdout.write(self.style.WARNING(
+                'VERIFICATION_PAGES is disabled: pages published now are not kept up to date'
+            ))
+
+        rows = LotVerificationView.objects.all()
+        if options['distributor']:
+            rows = rows.filter(distributor_id=options['distributor'])
+        try:
+            total = rows.count()
+        except ValidationError:
+            raise CommandError(f"Invalid distributor id: {options['distributor']}")
+        started = time.perf_counter()
+
+        with override_settings(VERIFICATION_PAGES=pages):
+            checked, written = published_pages.publish_queryset(
+                rows,
+                chunk_size=options['chunk_size'],
+                progress=lambda count, changed: self.stdout.write(
+                    f'  checked {count:,}/{total:,} lots, {changed:,} pages written'
+                ),
+            )
+            removed = published_pages.prune(chunk_size=options['chunk_size']) if options['prune'] else 0
+            root = published_pages.root()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Published {written:,} of {checked:,} pages to {root} '
+            f'({checked - written:,} unchanged, {removed:,} pruned) in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,53 @@
+"""
+Django management command to rebuild the lot verification projection.
+
+Recomputes the LotVerificationView row of every lot (or of one
+distributor's lots) from the source rows, including the signature check and
+the unresolved flag count. Run once after deploying the projection, and
+whenever rows may have drifted (e.g. after editing the database by hand).
+
+Usage:
+    # Rebuild every lot's row
+    python manage.py rebuild_verification_views
+
+    # Only one distributor's lots
+    python manage.py rebuild_verification_views --distributor 3f2b...-uuid
+
+    # Larger chunks: fewer transactions, more memory per chunk
+    python manage.py rebuild_verification_views --chunk-size 5000
+"""
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from manifests import verification_view
+from manifests.models import LotManifest
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized verification rows read by verify-qr'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--distributor', type=str, help='Only rebuild this distributor\'s lots')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Lots per transaction (default: 1,000)')
+
+    def handle(self, *args, **options):
+        lots = LotManifest.objects.all()
+        if options['distributor']:
+            lots = lots.filter(distributor_id=options['distributor'])
+        try:
+            total = lots.count()
+        except ValidationError:
+            raise CommandError(f"Invalid distributor id: {options['distributor']}")
+        started = time.perf_counter()
+
+        refreshed = verification_view.refresh_queryset(
+            lots,
+            chunk_size=options['chunk_size'],
+            progress=lambda count: self.stdout.write(f'  refreshed {count:,}/{total:,} lots'),
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {refreshed:,} verification rows in {elapsed:.1f}s ({refreshed / elapsed if elapsed else 0:,.0f} lots/s)'
+        ))
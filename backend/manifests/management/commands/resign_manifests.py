@@ -0,0 +1,124 @@
+"""
+Django management command to re-sign a distributor's lot manifests.
+
+Run after a distributor's key changes. Lots are signed in keyset chunks with
+one cached key and written with bulk_update; progress is checkpointed on a
+ResignJob after every chunk, so an interrupted run resumes where it stopped.
+
+Usage:
+    # Re-sign every lot of a distributor (resumes its unfinished job if any)
+    python manage.py resign_manifests --distributor 3f2b...-uuid
+
+    # Resume every unfinished job (e.g. after a crash or a deploy)
+    python manage.py resign_manifests --resume
+
+    # Larger chunks: fewer transactions, more memory per chunk
+    python manage.py resign_manifests --distributor 3f2b...-uuid --chunk-size 5000
+
+    # List jobs and their progress
+    python manage.py resign_manifests --list
+"""
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from entities.models import Distributor
+from manifests.models import ResignJob
+from manifests.signing import claim_job, create_resign_job, run_resign_job
+
+
+class Command(BaseCommand):
+    help = "Re-sign all lot manifests of a distributor after a key change (resumable)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--distributor',
+            type=str,
+            help='Distributor id whose lots to re-sign',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Resume all pending, failed and interrupted jobs',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List re-sign jobs and exit',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Lots signed and committed per transaction (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for job in ResignJob.objects.select_related('distributor')[:50]:
+                self.stdout.write(
+                    f'#{job.pk} {job.distributor.name}: {job.status} '
+                    f'{job.signed_count}/{job.total if job.total is not None else "?"} '
+                    f'(updated {job.updated_at:%Y-%m-%d %H:%M:%S})'
+                    + (f' - {job.error}' if job.error else '')
+                )
+            return
+
+        if options['distributor']:
+            try:
+                distributor = Distributor.objects.get(pk=options['distributor'])
+            except (Distributor.DoesNotExist, ValidationError):
+                raise CommandError(f'Distributor not found: {options["distributor"]}')
+            job, created = create_resign_job(distributor)
+            self.stdout.write(f'{"Created" if created else "Resuming"} re-sign job #{job.pk} for {distributor.name}')
+            job_ids = [job.pk]
+        elif options['resume']:
+            job_ids = list(
+                ResignJob.objects.exclude(status=ResignJob.Status.COMPLETED)
+                .order_by('created_at')
+                .values_list('pk', flat=True)
+            )
+            if not job_ids:
+                self.stdout.write(self.style.SUCCESS('✓ No unfinished re-sign jobs'))
+                return
+        else:
+            raise CommandError('Please specify --distributor <id>, --resume or --list')
+
+        failed = 0
+        for job_id in job_ids:
+            job = claim_job(job_id)
+            if job is None:
+                self.stdout.write(self.style.WARNING(f'Job #{job_id} is finished or running elsewhere, skipped'))
+                continue
+            if not self._run(job, options['chunk_size']):
+                failed += 1
+        if failed:
+            raise CommandError(f'{failed} job(s) failed; fix the cause and run --resume')
+
+    def _run(self, job, chunk_size):
+        """Run one claimed job with progress output. Returns False if it failed."""
+        resumed_from = job.signed_count
+        started = time.perf_counter()
+
+        def progress(job):
+            elapsed = time.perf_counter() - started
+            rate = (job.signed_count - resumed_from) / elapsed if elapsed else 0
+            self.stdout.write(f'  #{job.pk}: {job.signed_count}/{job.total} lots ({rate:,.0f} lots/s)')
+
+        if resumed_from:
+            self.stdout.write(f'Job #{job.pk}: resuming after {resumed_from} lots')
+        try:
+            run_resign_job(job, chunk_size=chunk_size, progress=progress)
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f'✗ Job #{job.pk} failed after {job.signed_count} lots: {e}'))
+            return False
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Job #{job.pk}: re-signed {job.signed_count} lots of {job.distributor.name} '
+                f'in {elapsed:.1f}s'
+            )
+        )
+        return True
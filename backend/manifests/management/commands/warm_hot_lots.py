@@ -0,0 +1,81 @@
+"""
+Django management command to pre-warm the response cache for hot lots.
+
+Fills the verify-qr response cache for the most scanned lots, as published
+by the web workers (see manifests/hot_lots.py), so the first scans after a
+deploy or a cache flush are hits. Warming bypasses the admission threshold.
+
+The response cache key includes the request host, so pass the host patients'
+scans arrive on. Warming only helps with a cache shared across processes
+(CACHE_BACKEND=file or redis); with the local memory backend it fills this
+command's own cache and exits.
+
+Usage:
+    # Warm the 100 most scanned lots
+    python manage.py warm_hot_lots --host api.rxverify.app
+
+    # Warm specific lots
+    python manage.py warm_hot_lots --host api.rxverify.app --lot 3f2b...-uuid --lot 9c1d...-uuid
+
+    # Show what would be warmed
+    python manage.py warm_hot_lots --dry-run
+"""
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+
+from core.cache import get_cache, is_enabled
+from manifests import hot_lots
+from manifests.views import LotManifestViewSet
+
+
+class Command(BaseCommand):
+    help = 'Pre-fill the verify-qr response cache for the most scanned lots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help='Number of hot lots to warm (default: 100)')
+        parser.add_argument('--lot', action='append', default=[], help='Lot id to warm (repeatable; replaces the hot list)')
+        parser.add_argument('--host', default='localhost', help='Host the verify-qr requests arrive on (default: localhost)')
+        parser.add_argument('--dry-run', action='store_true', help='List the lots without warming them')
+
+    def handle(self, *args, **options):
+        if options['lot']:
+            lots = [(lot_id, None) for lot_id in options['lot']]
+        else:
+            lots = hot_lots.merged_hot_lots(limit=options['limit'])
+        if not lots:
+            self.stdout.write('No hot lots published yet (do the web workers have HOT_LOTS enabled?)')
+            return
+
+        if options['dry_run']:
+            for lot_id, count in lots:
+                self.stdout.write(f'{lot_id}  {count if count is not None else "-"} scans')
+            return
+
+        if not is_enabled():
+            raise CommandError('RESPONSE_CACHE is disabled; there is nothing to warm')
+        if isinstance(get_cache(), LocMemCache):
+            self.stdout.write(self.style.WARNING(
+                'The response cache is per-process (local memory); warming will not reach the web workers'
+            ))
+
+        # basename as registered in manifests/urls.py, which the cache key includes
+        view = LotManifestViewSet.as_view(
+            {'get': 'verify_qr'}, basename='lotmanifest', **LotManifestViewSet.verify_qr.kwargs
+        )
+        factory = APIRequestFactory()
+        warmed = cached = missing = 0
+        with hot_lots.forced_admission():
+            for lot_id, _ in lots:
+                request = factory.get(f'/api/manifests/{lot_id}/verify-qr/', HTTP_HOST=options['host'])
+                response = view(request, pk=lot_id)
+                if response.status_code != 200:
+                    missing += 1
+                elif response.get('X-Cache') == 'HIT':
+                    cached += 1
+                else:
+                    warmed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed {warmed} lots ({cached} already cached, {missing} not found)'
+        ))
@@ -0,0 +1,102 @@
+"""
+Merkle trees over lot manifests for shipment-level signing.
+
+Instead of one Ed25519 signature per lot, a shipment's lots are hashed into
+a Merkle tree and only the root is signed (see ShipmentRoot). Each lot
+keeps its leaf index and an inclusion proof: the sibling hashes on the path
+from its leaf to the root, about 17 hashes for a 100,000-lot shipment.
+
+Tree shape:
+- Leaves are SHA-256(0x00 || signing message) and inner nodes are
+  SHA-256(0x01 || left || right). The prefixes keep a leaf from ever being
+  passed off as an inner node (second-preimage attacks).
+- A level with an odd number of nodes promotes its last node unchanged
+  rather than duplicating it, so no two leaf sets share a root.
+
+Because of the promotion rule, which side each sibling is on (and which
+levels have no sibling at all) follows from the leaf index and the leaf
+count, so proofs store only the hashes.
+"""
+import hashlib
+
+HASH_SIZE = 32
+
+
+def leaf_hash(message):
+    """Hash of a leaf (a lot's signing message, see signing.signing_message)."""
+    return hashlib.sha256(b'\x00' + message).digest()
+
+
+def node_hash(left, right):
+    """Hash of an inner node."""
+    return hashlib.sha256(b'\x01' + left + right).digest()
+
+
+def build_tree(leaves):
+    """
+    Build a Merkle tree and the inclusion proof of every leaf.
+
+    Args:
+        leaves: List of leaf hashes (bytes)
+
+    Returns:
+        tuple: (root bytes, list of proofs as bytes, one per leaf in order)
+    """
+    if not leaves:
+        raise ValueError('Cannot build a Merkle tree without leaves')
+
+    proofs = [bytearray() for _ in leaves]
+    # Leaves under each node of the current level, so siblings can be
+    # appended to their proofs as the tree is built bottom-up
+    members = [[index] for index in range(len(leaves))]
+    level = list(leaves)
+    while len(level) > 1:
+        next_level = []
+        next_members = []
+        for position in range(0, len(level) - 1, 2):
+            left, right = level[position], level[position + 1]
+            for index in members[position]:
+                proofs[index] += right
+            for index in members[position + 1]:
+                proofs[index] += left
+            next_level.append(node_hash(left, right))
+            next_members.append(members[position] + members[position + 1])
+        if len(level) % 2:
+            # Odd node out is promoted to the next level as is
+            next_level.append(level[-1])
+            next_members.append(members[-1])
+        level, members = next_level, next_members
+    return level[0], [bytes(proof) for proof in proofs]
+
+
+def root_from_proof(leaf, index, leaf_count, proof):
+    """
+    Recompute the root from a leaf and its inclusion proof.
+
+    Args:
+        leaf: Leaf hash
+        index: Leaf index in the tree
+        leaf_count: Number of leaves in the tree
+        proof: Concatenated sibling hashes (bytes)
+
+    Returns:
+        bytes or None: The root, or None if the proof doesn't fit the tree shape
+    """
+    if not 0 <= index < leaf_count or len(proof) % HASH_SIZE:
+        return None
+
+    node = leaf
+    offset = 0
+    size = leaf_count
+    while size > 1:
+        has_sibling = index % 2 or index + 1 < size
+        if has_sibling:
+            sibling = proof[offset:offset + HASH_SIZE]
+            if len(sibling) < HASH_SIZE:
+                return None
+            offset += HASH_SIZE
+            node = node_hash(sibling, node) if index % 2 else node_hash(node, sibling)
+        # else: last node of an odd level, promoted without a sibling
+        index //= 2
+        size = (size + 1) // 2
+    return node if offset == len(proof) else None
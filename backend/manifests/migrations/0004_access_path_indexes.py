@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entities', '0001_initial'),
+        ('manifests', '0003_alter_lotmanifest_digital_signature'),
+        ('pharmaceuticals', '0002_medicine_active_ingredient_medicine_dosage_form_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lotmanifest',
+            index=models.Index(fields=['-expiry_date'], name='lot_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lotmanifest',
+            index=models.Index(fields=['distributor', '-expiry_date'], name='lot_distributor_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lotmanifest',
+            index=models.Index(fields=['medicine', '-expiry_date'], name='lot_medicine_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lotmanifest',
+            index=models.Index(fields=['trust_score'], name='lot_trust_score_idx'),
+        ),
+    ]
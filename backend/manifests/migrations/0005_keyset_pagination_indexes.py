@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entities', '0001_initial'),
+        ('manifests', '0004_access_path_indexes'),
+        ('pharmaceuticals', '0003_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='lotmanifest',
+            name='lot_expiry_idx',
+        ),
+        migrations.AddIndex(
+            model_name='lotmanifest',
+            index=models.Index(fields=['-expiry_date', '-id'], name='lot_expiry_id_idx'),
+        ),
+    ]
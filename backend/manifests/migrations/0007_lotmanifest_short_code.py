@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:10
+
+from django.db import migrations, models
+
+import manifests.short_codes
+
+
+def assign_short_codes(apps, schema_editor):
+    """Give every existing lot its own random short code."""
+    LotManifest = apps.get_model('manifests', 'LotManifest')
+    batch = []
+    for lot in LotManifest.objects.filter(short_code__isnull=True).only('id').iterator(chunk_size=2000):
+        lot.short_code = manifests.short_codes.generate_short_code()
+        batch.append(lot)
+        if len(batch) >= 2000:
+            LotManifest.objects.bulk_update(batch, ['short_code'])
+            batch = []
+    if batch:
+        LotManifest.objects.bulk_update(batch, ['short_code'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manifests', '0006_lotmanifest_updated_at'),
+    ]
+
+    operations = [
+        # A callable default would give every existing row the same code, so
+        # add the column as nullable, fill it, then make it unique
+        migrations.AddField(
+            model_name='lotmanifest',
+            name='short_code',
+            field=models.CharField(editable=False, max_length=10, null=True),
+        ),
+        migrations.RunPython(assign_short_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='lotmanifest',
+            name='short_code',
+            field=models.CharField(default=manifests.short_codes.generate_short_code, editable=False, help_text='Short base32 code with check symbol, encoded in compact QR codes (see short_codes.py)', max_length=10, unique=True),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entities', '0001_initial'),
+        ('manifests', '0007_lotmanifest_short_code'),
+        ('pharmaceuticals', '0004_medicine_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResignJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], db_index=True, default='PENDING', max_length=10)),
+                ('public_key', models.TextField(blank=True, help_text='Distributor key the job is signing with (the job restarts if it changes)')),
+                ('last_lot_id', models.UUIDField(blank=True, help_text='Checkpoint: id of the last lot signed (lots are processed in id order)', null=True)),
+                ('signed_count', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(blank=True, help_text='Lots to sign when the job started', null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Last checkpoint (heartbeat)')),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Re-sign Job',
+                'verbose_name_plural': 'Re-sign Jobs',
+                'db_table': 'resign_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='lotmanifest',
+            index=models.Index(fields=['distributor', 'id'], name='lot_distributor_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='resignjob',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='resignjob',
+            name='distributor',
+            field=models.ForeignKey(help_text='Distributor whose lots are re-signed', on_delete=django.db.models.deletion.CASCADE, related_name='resign_jobs', to='entities.distributor'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:15
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entities', '0001_initial'),
+        ('manifests', '0008_resignjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lotmanifest',
+            name='merkle_index',
+            field=models.PositiveIntegerField(blank=True, help_text="Leaf index in the shipment's Merkle tree", null=True),
+        ),
+        migrations.AddField(
+            model_name='lotmanifest',
+            name='merkle_proof',
+            field=models.TextField(blank=True, help_text="Hex-encoded sibling hashes from the lot's leaf to the root"),
+        ),
+        migrations.CreateModel(
+            name='ShipmentRoot',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('merkle_root', models.CharField(help_text='Hex-encoded SHA-256 Merkle root', max_length=64)),
+                ('leaf_count', models.PositiveIntegerField(help_text='Number of lots in the tree')),
+                ('root_signature', models.TextField(help_text='Ed25519 signature of the root (128 hex chars)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('distributor', models.ForeignKey(help_text='Distributor whose key signed the root', on_delete=django.db.models.deletion.CASCADE, related_name='shipment_roots', to='entities.distributor')),
+            ],
+            options={
+                'verbose_name': 'Shipment Root',
+                'verbose_name_plural': 'Shipment Roots',
+                'db_table': 'shipment_roots',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='lotmanifest',
+            name='shipment',
+            field=models.ForeignKey(blank=True, help_text='Shipment whose signed Merkle root covers this lot (empty for per-lot signatures)', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='lots', to='manifests.shipmentroot'),
+        ),
+    ]
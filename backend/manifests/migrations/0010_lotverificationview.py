@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entities', '0001_initial'),
+        ('manifests', '0009_shipmentroot'),
+        ('pharmaceuticals', '0004_medicine_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LotVerificationView',
+            fields=[
+                ('lot', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='verification_view', serialize=False, to='manifests.lotmanifest')),
+                ('short_code', models.CharField(max_length=10, unique=True)),
+                ('batch_number', models.CharField(max_length=100)),
+                ('expiry_date', models.DateField()),
+                ('medicine_name', models.CharField(max_length=255)),
+                ('active_ingredient', models.CharField(blank=True, max_length=255)),
+                ('strength', models.CharField(blank=True, max_length=100)),
+                ('dosage_form', models.CharField(blank=True, max_length=100)),
+                ('distributor_name', models.CharField(max_length=255)),
+                ('trust_score', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('trust_status', models.CharField(help_text='SAFE, CAUTION or WARNING', max_length=10)),
+                ('is_authentic', models.BooleanField(help_text='Signature check result when the row was refreshed')),
+                ('flags_count', models.PositiveIntegerField(help_text='Unresolved crowd flags')),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('distributor', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='entities.distributor')),
+                ('medicine', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='pharmaceuticals.medicine')),
+            ],
+            options={
+                'verbose_name': 'Lot Verification View',
+                'verbose_name_plural': 'Lot Verification Views',
+                'db_table': 'lot_verification_views',
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-19 00:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manifests', '0010_lotverificationview'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lotmanifest',
+            name='shipment',
+            field=models.ForeignKey(blank=True, help_text='Shipment whose signed Merkle root covers this lot (empty for per-lot signatures)', null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='lots', to='manifests.shipmentroot'),
+        ),
+    ]
@@ -1,9 +1,9 @@
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from decimal import Decimal
-import nacl.signing
-import nacl.encoding
-import nacl.exceptions
+
+from .short_codes import CODE_LENGTH, MAX_DRAWS, generate_short_code
+from .signing import verify_manifest
 
 
 class LotManifest(models.Model):
@@ -19,6 +19,13 @@ class LotManifest(models.Model):
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     batch_number = models.CharField(max_length=100, unique=True)
+    short_code = models.CharField(
+        max_length=CODE_LENGTH,
+        unique=True,
+        default=generate_short_code,
+        editable=False,
+        help_text="Short base32 code with check symbol, encoded in compact QR codes (see short_codes.py)"
+    )
     expiry_date = models.DateField()
     digital_signature = models.TextField(
         help_text="Auto-generated Ed25519 digital signature (128 hex chars)",
@@ -42,48 +49,61 @@ class LotManifest(models.Model):
         related_name='lot_manifests',
         help_text="Distributor who provided this lot"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        help_text="Last modification time (used for incremental index syncs)"
+    )
+    # Shipment-signed lots (see merkle.py): no per-lot signature, instead the
+    # lot's leaf index and inclusion proof under the shipment's signed root.
+    # RESTRICT: a root can't be deleted while its lots exist, except together
+    # with them (deleting the distributor cascades to both)
+    shipment = models.ForeignKey(
+        'manifests.ShipmentRoot',
+        on_delete=models.RESTRICT,
+        null=True,
+        blank=True,
+        related_name='lots',
+        help_text="Shipment whose signed Merkle root covers this lot (empty for per-lot signatures)"
+    )
+    merkle_index = models.PositiveIntegerField(null=True, blank=True, help_text="Leaf index in the shipment's Merkle tree")
+    merkle_proof = models.TextField(blank=True, help_text="Hex-encoded sibling hashes from the lot's leaf to the root")
+    
+    def save(self, *args, **kwargs):
+        """
+        Save the lot, drawing a new short code if a new lot's code is taken.
+        
+        Short codes are random (see short_codes.py), so across millions of
+        lots an occasional clash is expected. The insert runs in a savepoint
+        and is retried with a fresh code, up to MAX_DRAWS times; other
+        integrity errors (e.g. a duplicate batch number) are raised as usual.
+        """
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        for draw in range(1, MAX_DRAWS + 1):
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if draw == MAX_DRAWS or not LotManifest.objects.filter(short_code=self.short_code).exists():
+                    raise
+                self.short_code = generate_short_code()
     
     def verify_signature(self):
         """
         Verify the Ed25519 digital signature of this lot manifest.
         
         Verification Process:
-        1. Derive the signing key from distributor's public key
+        1. Derive the signing key from distributor's public key (cached per key)
         2. Construct the message
-        3. Verify the signature using Ed25519
+        3. Verify the signature using Ed25519, or for shipment-signed lots
+           check the inclusion proof against the shipment's root and the
+           root's signature (cached per shipment)
         
         Returns:
             bool: True if signature is valid, False otherwise
         """
-        try:
-            # Check if signature exists
-            if not self.digital_signature:
-                return False
-            
-            # Construct the message
-            message = f"{self.batch_number}:{self.expiry_date.isoformat()}:{str(self.distributor_id)}"
-            message_bytes = message.encode('utf-8')
-            
-            # Derive the signing key from distributor's public key
-            seed = bytes.fromhex(self.distributor.public_key)[:32]
-            signing_key = nacl.signing.SigningKey(seed)
-            verify_key = signing_key.verify_key
-            
-            # Convert hex signature to bytes
-            signature_bytes = bytes.fromhex(self.digital_signature)
-            
-            # Verify the signature
-            verify_key.verify(message_bytes, signature_bytes)
-            
-            # If we reach here, signature is valid
-            return True
-            
-        except nacl.exceptions.BadSignatureError:
-            return False
-        except (ValueError, TypeError, AttributeError):
-            return False
-        except Exception:
-            return False
+        return verify_manifest(self)
     
     def calculate_trust_score(self):
         """
@@ -140,7 +160,7 @@ class LotManifest(models.Model):
             Decimal: The updated trust score
         """
         self.trust_score = self.calculate_trust_score()
-        self.save(update_fields=['trust_score'])
+        self.save(update_fields=['trust_score', 'updated_at'])
         return self.trust_score
     
     def __str__(self):
@@ -151,3 +171,162 @@ class LotManifest(models.Model):
         verbose_name = 'Lot Manifest'
         verbose_name_plural = 'Lot Manifests'
         ordering = ['-expiry_date']
+        indexes = [
+            # Default listing (id breaks ties for keyset pagination) and the
+            # distributor/medicine filters, all ordered by expiry
+            models.Index(fields=['-expiry_date', '-id'], name='lot_expiry_id_idx'),
+            models.Index(fields=['distributor', '-expiry_date'], name='lot_distributor_expiry_idx'),
+            # Keyset scan of a distributor's lots by id (re-sign jobs)
+            models.Index(fields=['distributor', 'id'], name='lot_distributor_id_idx'),
+            models.Index(fields=['medicine', '-expiry_date'], name='lot_medicine_expiry_idx'),
+            # min_trust_score range filter
+            models.Index(fields=['trust_score'], name='lot_trust_score_idx'),
+        ]
+
+
+class ShipmentRoot(models.Model):
+    """
+    Signed Merkle root covering every lot registered in one shipment.
+    
+    Created by POST /api/manifests/shipments/. Signing the root once replaces
+    one Ed25519 signature per lot; each lot stores its inclusion proof
+    (LotManifest.merkle_index and merkle_proof).
+    """
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    distributor = models.ForeignKey(
+        'entities.Distributor',
+        on_delete=models.CASCADE,
+        related_name='shipment_roots',
+        help_text="Distributor whose key signed the root"
+    )
+    merkle_root = models.CharField(max_length=64, help_text="Hex-encoded SHA-256 Merkle root")
+    leaf_count = models.PositiveIntegerField(help_text="Number of lots in the tree")
+    root_signature = models.TextField(help_text="Ed25519 signature of the root (128 hex chars)")
+    created_by = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Shipment {self.merkle_root[:12]} ({self.leaf_count} lots)"
+    
+    class Meta:
+        db_table = 'shipment_roots'
+        verbose_name = 'Shipment Root'
+        verbose_name_plural = 'Shipment Roots'
+        ordering = ['-created_at']
+
+
+class ResignJob(models.Model):
+    """
+    Resumable job re-signing all lot manifests of one distributor.
+    
+    Created when a distributor's key changes (admin action or the
+    resign_manifests command) and run by manifests.signing.run_resign_job.
+    The job's cursor (last_lot_id) is committed with every chunk of
+    signatures, so an interrupted job resumes where it stopped.
+    """
+    
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        COMPLETED = 'COMPLETED', 'Completed'
+        FAILED = 'FAILED', 'Failed'
+    
+    distributor = models.ForeignKey(
+        'entities.Distributor',
+        on_delete=models.CASCADE,
+        related_name='resign_jobs',
+        help_text="Distributor whose lots are re-signed"
+    )
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, db_index=True)
+    public_key = models.TextField(
+        blank=True,
+        help_text="Distributor key the job is signing with (the job restarts if it changes)"
+    )
+    last_lot_id = models.UUIDField(
+        null=True,
+        blank=True,
+        help_text="Checkpoint: id of the last lot signed (lots are processed in id order)"
+    )
+    signed_count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True, help_text="Lots to sign when the job started")
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="Last checkpoint (heartbeat)")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Re-sign {self.distributor} ({self.status}, {self.signed_count}/{self.total or '?'})"
+    
+    class Meta:
+        db_table = 'resign_jobs'
+        verbose_name = 'Re-sign Job'
+        verbose_name_plural = 'Re-sign Jobs'
+        ordering = ['-created_at']
+
+
+class LotVerificationView(models.Model):
+    """
+    Denormalized read model of a lot's patient verification result.
+    
+    One row per lot with everything GET /api/manifests/{id}/verify-qr/ and
+    GET /api/v/{code} return, so a scan is a single primary-key (or short
+    code) read with no joins, flag count or signature check. Rows are
+    refreshed from the source models by signals (see verification_view.py)
+    and can be rebuilt with `manage.py rebuild_verification_views`.
+    """
+    
+    lot = models.OneToOneField(
+        LotManifest,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='verification_view',
+    )
+    short_code = models.CharField(max_length=CODE_LENGTH, unique=True)
+    batch_number = models.CharField(max_length=100)
+    expiry_date = models.DateField()
+    # Source rows of the denormalized fields (no constraint: rows are deleted with their lot)
+    medicine = models.ForeignKey(
+        'pharmaceuticals.Medicine',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    distributor = models.ForeignKey(
+        'entities.Distributor',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    medicine_name = models.CharField(max_length=255)
+    active_ingredient = models.CharField(max_length=255, blank=True)
+    strength = models.CharField(max_length=100, blank=True)
+    dosage_form = models.CharField(max_length=100, blank=True)
+    distributor_name = models.CharField(max_length=255)
+    trust_score = models.DecimalField(max_digits=5, decimal_places=2)
+    trust_status = models.CharField(max_length=10, help_text="SAFE, CAUTION or WARNING")
+    is_authentic = models.BooleanField(help_text="Signature check result when the row was refreshed")
+    flags_count = models.PositiveIntegerField(help_text="Unresolved crowd flags")
+    refreshed_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Verification view of lot {self.batch_number}"
+    
+    class Meta:
+        db_table = 'lot_verification_views'
+        verbose_name = 'Lot Verification View'
+        verbose_name_plural = 'Lot Verification Views'
@@ -0,0 +1,19 @@
+"""
+URL configuration of the verification pages QR codes link to.
+
+Included at the site root (not under api/), at the paths of
+qr_generator.VERIFY_URL and SHORT_VERIFY_URL. Published pages with the same
+paths are served ahead of these views (see published_pages.py).
+"""
+from django.urls import path, re_path
+
+from .page_views import short_code_page, verification_page
+
+urlpatterns = [
+    path('verify/<uuid:lot_id>', verification_page, name='verification-page'),
+    path('verify/<uuid:lot_id>/', verification_page),
+    path('verify/<uuid:lot_id>/index.html', verification_page, {'file_name': 'index.html'}),
+    path('verify/<uuid:lot_id>/index.json', verification_page, {'file_name': 'index.json'}),
+    re_path(r'^[Vv]/(?P<code>[0-9A-Za-z-]+)/?$', short_code_page, name='short-code-page'),
+    re_path(r'^[Vv]/(?P<code>[0-9A-Za-z-]+)/(?P<file_name>index\.(?:html|json))$', short_code_page),
+]
@@ -0,0 +1,96 @@
+"""
+Live verification pages at the QR code URLs.
+
+A lot's QR code opens https://rxverify.app/verify/{lot_id} (or
+/V/{short_code} for compact codes). When verification pages are published
+(see published_pages.py), the static host or WhiteNoise answers these paths
+from the published files; these views answer the paths that have no file
+yet, and every request while publishing is off. The content is rendered
+exactly like the published files: the HTML page, or the verify-qr JSON for
+clients that ask for application/json (or request index.json).
+"""
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from . import hot_lots, lot_filter, published_pages, short_codes, verification_view
+from .models import LotManifest, LotVerificationView
+from .verification import build_verification_payload, payload_from_view
+
+
+def _page(request, payload, file_name):
+    """Render a page response; file_name is the requested file name or None."""
+    _, data, html = published_pages.render(payload)
+    if file_name is None:
+        accept = request.headers.get('Accept', '')
+        wants_json = 'application/json' in accept and 'text/html' not in accept
+    else:
+        wants_json = file_name.endswith('.json')
+    if wants_json:
+        response = HttpResponse(data, content_type='application/json')
+    else:
+        response = HttpResponse(html, content_type='text/html; charset=utf-8')
+    if file_name is None:
+        patch_vary_headers(response, ('Accept',))
+    hot_lots.record_scan(payload['lot_id'])
+    return response
+
+
+def _from_source(lot_manifest):
+    """Payload of a lot without a projection row yet (the row is created on commit)."""
+    if lot_manifest is None:
+        lot_filter.record_false_positive()
+        raise Http404
+    verification_view.refresh_lots_on_commit([lot_manifest.pk])
+    return build_verification_payload(lot_manifest)
+
+
+@require_safe
+def verification_page(request, lot_id, file_name=None):
+    """
+    GET /verify/{lot_id} (also /verify/{lot_id}/index.html and index.json).
+
+    Args:
+        request: The HTTP request object
+        lot_id: uuid.UUID of the lot (from the URL converter)
+        file_name: Requested file name, if any
+
+    Returns:
+        HttpResponse: Verification page or JSON
+    """
+    if not lot_filter.lot_might_exist(lot_id):
+        raise Http404
+    result = verification_view.read_payload(lot_id)
+    if result is not None:
+        payload = result[0]
+    else:
+        payload = _from_source(
+            LotManifest.objects.select_related('medicine', 'distributor', 'shipment').filter(pk=lot_id).first()
+        )
+    return _page(request, payload, file_name)
+
+
+@require_safe
+def short_code_page(request, code, file_name=None):
+    """
+    GET /V/{short_code} (also .../index.html and .../index.json).
+
+    Args:
+        request: The HTTP request object
+        code: Short code as scanned or typed
+        file_name: Requested file name, if any
+
+    Returns:
+        HttpResponse: Verification page or JSON
+    """
+    code = short_codes.normalize(code)
+    if not short_codes.is_valid(code) or not lot_filter.short_code_might_exist(code):
+        raise Http404
+    view = LotVerificationView.objects.filter(short_code=code).first()
+    if view is not None:
+        payload = payload_from_view(view)
+    else:
+        payload = _from_source(
+            LotManifest.objects.select_related('medicine', 'distributor', 'shipment').filter(short_code=code).first()
+        )
+    return _page(request, payload, file_name)
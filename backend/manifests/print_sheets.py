@@ -0,0 +1,270 @@
+"""
+Print sheet output for QR labels.
+
+Print houses want imposed sheets rather than one PNG per lot. This module
+lays rendered labels out N-up on A4 or Letter pages and streams the pages
+into a multi-page PDF or TIFF. Only the page being composed is held in
+memory, so a catalogue of any size can be written in one pass.
+"""
+import zlib
+from typing import NamedTuple
+
+from PIL import Image, TiffImagePlugin
+
+MM_PER_INCH = 25.4
+POINTS_PER_INCH = 72
+
+# Page sizes in millimetres (width, height)
+PAGE_SIZES = {
+    'A4': (210.0, 297.0),
+    'Letter': (215.9, 279.4),
+}
+
+SHEET_FORMATS = ('pdf', 'tiff')
+
+
+class SheetLayout(NamedTuple):
+    """
+    Grid of labels on a page.
+
+    Labels are scaled to fit their cell (by whole pixel multiples when
+    enlarging, so QR modules stay sharp) and centred in it.
+    """
+    page_size: str = 'A4'
+    columns: int = 3
+    rows: int = 4
+    margin_mm: float = 10.0
+    gap_mm: float = 3.0
+    dpi: int = 300
+
+    @property
+    def labels_per_page(self):
+        return self.columns * self.rows
+
+    @property
+    def page_mm(self):
+        return PAGE_SIZES[self.page_size]
+
+    @property
+    def page_pixels(self):
+        width_mm, height_mm = self.page_mm
+        return self._pixels(width_mm), self._pixels(height_mm)
+
+    @property
+    def cell_pixels(self):
+        page_width, page_height = self.page_pixels
+        margin, gap = self._pixels(self.margin_mm), self._pixels(self.gap_mm)
+        cell_width = (page_width - 2 * margin - (self.columns - 1) * gap) // self.columns
+        cell_height = (page_height - 2 * margin - (self.rows - 1) * gap) // self.rows
+        return cell_width, cell_height
+
+    def cell_origin(self, index):
+        """Top-left pixel of the index-th cell on a page (row-major)."""
+        cell_width, cell_height = self.cell_pixels
+        margin, gap = self._pixels(self.margin_mm), self._pixels(self.gap_mm)
+        row, column = divmod(index, self.columns)
+        return margin + column * (cell_width + gap), margin + row * (cell_height + gap)
+
+    def validate(self):
+        """
+        Check the layout fits on the page.
+
+        Raises:
+            ValueError: If the page size is unknown or the cells are empty
+        """
+        if self.page_size not in PAGE_SIZES:
+            raise ValueError(f'Unknown page size: {self.page_size} (choose from {", ".join(PAGE_SIZES)})')
+        if self.columns < 1 or self.rows < 1 or self.dpi < 1:
+            raise ValueError('Grid and DPI must be positive')
+        cell_width, cell_height = self.cell_pixels
+        if cell_width < 1 or cell_height < 1:
+            raise ValueError('Margins and gaps leave no room for labels')
+
+    def _pixels(self, mm):
+        return int(round(mm / MM_PER_INCH * self.dpi))
+
+
+def fit_label(label, cell_width, cell_height):
+    """
+    Scale a label to fit a cell, keeping its aspect ratio.
+
+    Enlarging uses a whole-number nearest-neighbour factor so QR modules stay
+    crisp; shrinking uses Lanczos resampling.
+    """
+    scale = min(cell_width / label.width, cell_height / label.height)
+    if scale >= 1:
+        factor = int(scale)
+        if factor == 1:
+            return label
+        return label.resize((label.width * factor, label.height * factor), Image.NEAREST)
+    size = (max(1, int(label.width * scale)), max(1, int(label.height * scale)))
+    return label.resize(size, Image.LANCZOS)
+
+
+def compose_pages(labels, layout):
+    """
+    Lay labels out on pages, yielding each page as soon as it is full.
+
+    Args:
+        labels: Iterable of PIL Images (grayscale, see iter_render_labels)
+        layout: SheetLayout
+
+    Yields:
+        PIL Image: One grayscale page at a time
+    """
+    page_size = layout.page_pixels
+    cell_width, cell_height = layout.cell_pixels
+    page = None
+    index = 0
+
+    for label in labels:
+        if page is None:
+            page = Image.new('L', page_size, 255)
+        fitted = fit_label(label, cell_width, cell_height)
+        x, y = layout.cell_origin(index)
+        page.paste(fitted, (x + (cell_width - fitted.width) // 2, y + (cell_height - fitted.height) // 2))
+        index += 1
+        if index == layout.labels_per_page:
+            yield page
+            page, index = None, 0
+
+    if page is not None:
+        yield page
+
+
+class PdfSheetWriter:
+    """
+    Minimal streaming PDF writer with one full-page image per page.
+
+    Objects are written to disk as each page arrives; only the byte offsets
+    needed for the cross-reference table are kept until close(). Pages are
+    stored as Flate-compressed 8-bit grayscale.
+    """
+
+    def __init__(self, path, layout):
+        self.layout = layout
+        self._file = open(path, 'wb')
+        self._offsets = {}
+        self._page_ids = []
+        self._next_id = 3  # 1 = catalog, 2 = page tree (written on close)
+        self._file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_page(self, page):
+        """Append a grayscale page image."""
+        width_pt, height_pt = (mm / MM_PER_INCH * POINTS_PER_INCH for mm in self.layout.page_mm)
+        image_id, content_id, page_id = self._allocate(3)
+
+        pixels = zlib.compress(page.tobytes(), 6)
+        self._write_stream(
+            image_id,
+            f'/Type /XObject /Subtype /Image /Width {page.width} /Height {page.height} '
+            f'/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode',
+            pixels,
+        )
+        self._write_stream(content_id, '', f'q {width_pt:.2f} 0 0 {height_pt:.2f} 0 0 cm /Im0 Do Q'.encode('ascii'))
+        self._write_object(
+            page_id,
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width_pt:.2f} {height_pt:.2f}] '
+            f'/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>',
+        )
+        self._page_ids.append(page_id)
+
+    def close(self):
+        """Write the page tree, catalog and cross-reference table."""
+        if self._file.closed:
+            return
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self._page_ids)
+        self._write_object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>')
+        self._write_object(1, '<< /Type /Catalog /Pages 2 0 R >>')
+
+        xref_offset = self._file.tell()
+        size = self._next_id
+        lines = [f'xref\n0 {size}\n', '0000000000 65535 f \n']
+        lines += [f'{self._offsets[object_id]:010d} 00000 n \n' for object_id in range(1, size)]
+        lines.append(f'trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n')
+        self._file.write(''.join(lines).encode('ascii'))
+        self._file.close()
+
+    def _allocate(self, count):
+        ids = list(range(self._next_id, self._next_id + count))
+        self._next_id += count
+        return ids
+
+    def _write_object(self, object_id, body):
+        self._offsets[object_id] = self._file.tell()
+        self._file.write(f'{object_id} 0 obj\n{body}\nendobj\n'.encode('ascii'))
+
+    def _write_stream(self, object_id, dictionary, data):
+        self._offsets[object_id] = self._file.tell()
+        self._file.write(f'{object_id} 0 obj\n<< {dictionary} /Length {len(data)} >>\nstream\n'.encode('ascii'))
+        self._file.write(data)
+        self._file.write(b'\nendstream\nendobj\n')
+
+
+class TiffSheetWriter:
+    """Multi-page TIFF writer that appends one Deflate-compressed page at a time."""
+
+    def __init__(self, path, layout):
+        self.layout = layout
+        self._tiff = TiffImagePlugin.AppendingTiffWriter(path, new=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_page(self, page):
+        """Append a grayscale page image."""
+        page.save(self._tiff, format='TIFF', compression='tiff_deflate', dpi=(self.layout.dpi, self.layout.dpi))
+        self._tiff.newFrame()
+
+    def close(self):
+        self._tiff.close()
+
+
+SHEET_WRITERS = {
+    'pdf': PdfSheetWriter,
+    'tiff': TiffSheetWriter,
+}
+
+
+def write_sheets(labels, path, layout, sheet_format='pdf', progress=None):
+    """
+    Write labels to a multi-page print sheet.
+
+    Args:
+        labels: Iterable of grayscale PIL Images, in print order
+        path: Output file path
+        layout: SheetLayout
+        sheet_format: 'pdf' or 'tiff'
+        progress: Optional callable(pages, labels), called after every page
+
+    Returns:
+        dict: {'pages': ..., 'labels': ...}
+    """
+    layout.validate()
+    if sheet_format not in SHEET_WRITERS:
+        raise ValueError(f'Unknown sheet format: {sheet_format}')
+
+    counted = {'labels': 0}
+
+    def counting(images):
+        for image in images:
+            counted['labels'] += 1
+            yield image
+
+    pages = 0
+    with SHEET_WRITERS[sheet_format](path, layout) as writer:
+        for page in compose_pages(counting(labels), layout):
+            writer.add_page(page)
+            pages += 1
+            if progress:
+                progress(pages, counted['labels'])
+    return {'pages': pages, 'labels': counted['labels']}
@@ -0,0 +1,337 @@
+"""
+Static publishing of patient verification pages.
+
+Most lots change rarely, yet every scan computes its result live. With
+VERIFICATION_PAGES enabled, each lot's verification result is also written
+to static files under VERIFICATION_PAGES['ROOT'], at the paths its QR codes
+point to (see qr_generator.VERIFY_URL and SHORT_VERIFY_URL):
+
+    verify/{lot_id}/index.json      verify-qr JSON (same bytes as the API)
+    verify/{lot_id}/index.html      small patient page
+    verify/{lot_id}/{digest}.json   the same files under their content hash,
+    verify/{lot_id}/{digest}.html   cacheable forever
+    V/{short_code}/index.json       copies for short-code QR codes
+    V/{short_code}/index.html
+
+The digest is the first 12 hex characters of the SHA-256 of both files, so
+a page is rewritten only when its content changes.
+
+Pages are re-published when a lot's LotVerificationView row changes (trust
+score, flags, signature, medicine or distributor names; see
+verification_view.py), once the transaction commits, and removed when the
+lot is deleted. Publishing a lot holds its lock (one of LOCK_STRIPES lock
+files under ROOT/.locks, shared by all processes on the host) and re-reads
+its row inside it, so concurrent refreshes of a lot can't leave an older
+row's page in place: whichever publisher goes last writes the last
+committed row. `manage.py publish_verification_pages` publishes every lot
+(unchanged pages are skipped) and prunes pages of deleted lots.
+
+The files (all but .locks) can be synced to any static host or CDN that
+falls back to the API host for missing paths. With SERVE on, WhiteNoise serves them in-process
+(see core/middleware.py); paths without a published page go on to the live
+views in page_views.py, which render the same content.
+"""
+import fcntl
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from rest_framework.renderers import JSONRenderer
+
+from . import short_codes
+from .verification import payload_from_view
+
+logger = logging.getLogger(__name__)
+
+LOT_DIR = 'verify'
+CODE_DIR = 'V'
+LOCK_DIR = '.locks'
+LOCK_STRIPES = 256
+TEMPLATE = 'manifests/verification_page.html'
+
+_VERSIONED = re.compile(r'^[0-9a-f]{12}\.(?:html|json)$')
+_LOT_URL = re.compile(
+    r'^/verify/(?P<lot_id>[0-9a-f-]{36})(?:/(?P<name>index\.(?:html|json)|[0-9a-f]{12}\.(?:html|json))?)?$'
+)
+_CODE_URL = re.compile(r'^/[Vv]/(?P<code>[0-9A-Za-z-]+)(?:/(?P<name>index\.(?:html|json))?)?$')
+
+_renderer = JSONRenderer()
+
+
+def _settings():
+    return getattr(settings, 'VERIFICATION_PAGES', {})
+
+
+def is_enabled():
+    """Whether pages are published on verification row changes."""
+    return _settings().get('ENABLED', False)
+
+
+def is_served():
+    """Whether WhiteNoise serves the published pages in-process."""
+    return is_enabled() and _settings().get('SERVE', True)
+
+
+def root():
+    """Absolute path of the published tree."""
+    return os.path.abspath(_settings()['ROOT'])
+
+
+def render(payload):
+    """
+    Render a lot's published files.
+
+    Args:
+        payload: Verification data (see verification.py)
+
+    Returns:
+        tuple: (digest, JSON bytes, HTML bytes)
+    """
+    data = _renderer.render(payload)
+    html = render_to_string(TEMPLATE, payload).encode('utf-8')
+    digest = hashlib.sha256(data + b'\0' + html).hexdigest()[:12]
+    return digest, data, html
+
+
+def _write(path, content):
+    """Replace a file atomically, so readers see the old or the new content."""
+    temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(content)
+    os.replace(temporary, path)
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def _locked(lot_ids):
+    """Hold the publish locks of the given lots (striped lock files, taken in order)."""
+    directory = os.path.join(root(), LOCK_DIR)
+    os.makedirs(directory, exist_ok=True)
+    stripes = sorted({uuid.UUID(str(lot_id)).int % LOCK_STRIPES for lot_id in lot_ids})
+    descriptors = []
+    try:
+        for stripe in stripes:
+            descriptor = os.open(os.path.join(directory, f'{stripe:02x}'), os.O_RDWR | os.O_CREAT, 0o640)
+            descriptors.append(descriptor)
+            fcntl.flock(descriptor, fcntl.LOCK_EX)
+        yield
+    finally:
+        for descriptor in descriptors:
+            os.close(descriptor)  # Releases the lock
+
+
+def publish_payload(payload, short_code):
+    """
+    Publish a lot's page unless the published one is identical.
+
+    Callers hold the lot's lock (see publish_lots()).
+
+    Args:
+        payload: Verification data (see verification.py)
+        short_code: The lot's short code
+
+    Returns:
+        bool: True if files were written
+    """
+    digest, data, html = render(payload)
+    base = root()
+    lot_dir = os.path.join(base, LOT_DIR, payload['lot_id'])
+    code_dir = os.path.join(base, CODE_DIR, short_code)
+    if _read(os.path.join(lot_dir, 'index.json')) == data and _read(os.path.join(code_dir, 'index.json')) == data:
+        return False
+
+    os.makedirs(lot_dir, exist_ok=True)
+    os.makedirs(code_dir, exist_ok=True)
+    # Versioned files first, so an index never names content that isn't there
+    _write(os.path.join(lot_dir, f'{digest}.json'), data)
+    _write(os.path.join(lot_dir, f'{digest}.html'), html)
+    for directory in (lot_dir, code_dir):
+        _write(os.path.join(directory, 'index.json'), data)
+        _write(os.path.join(directory, 'index.html'), html)
+    for name in os.listdir(lot_dir):
+        if _VERSIONED.match(name) and not name.startswith(f'{digest}.'):
+            os.remove(os.path.join(lot_dir, name))
+    return True
+
+
+def publish_lots(lot_ids, chunk_size=1000):
+    """
+    Publish the pages of lots from their current LotVerificationView rows.
+
+    Rows are read while the lots' locks are held, so the page left behind is
+    that of the last committed row even when refreshes race. Lots without a
+    row (deleted meanwhile) are skipped.
+
+    Args:
+        lot_ids: Iterable of lot ids
+        chunk_size: Lots locked and read per query
+
+    Returns:
+        int: Number of pages written (unchanged pages are skipped)
+    """
+    from .models import LotVerificationView
+
+    lot_ids = list(lot_ids)
+    written = 0
+    for start in range(0, len(lot_ids), chunk_size):
+        chunk = lot_ids[start:start + chunk_size]
+        with _locked(chunk):
+            for row in LotVerificationView.objects.filter(pk__in=chunk):
+                written += publish_payload(payload_from_view(row), row.short_code)
+    return written
+
+
+def publish_queryset(queryset, chunk_size=1000, progress=None):
+    """
+    Publish the pages of every row of a LotVerificationView queryset.
+
+    Args:
+        queryset: LotVerificationView queryset
+        chunk_size: Rows fetched per query
+        progress: Optional callable(checked_count, written_count), called per chunk
+
+    Returns:
+        tuple: (rows checked, pages written)
+    """
+    checked = written = 0
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    last_id = None
+    while True:
+        chunk = list((ids if last_id is None else ids.filter(pk__gt=last_id))[:chunk_size])
+        if not chunk:
+            return checked, written
+        written += publish_lots(chunk, chunk_size=chunk_size)
+        checked += len(chunk)
+        last_id = chunk[-1]
+        if progress is not None:
+            progress(checked, written)
+
+
+def unpublish(lot_id, short_code):
+    """Remove a lot's published pages."""
+    base = root()
+    with _locked([lot_id]):
+        shutil.rmtree(os.path.join(base, LOT_DIR, str(lot_id)), ignore_errors=True)
+        if short_code:
+            shutil.rmtree(os.path.join(base, CODE_DIR, short_code), ignore_errors=True)
+
+
+def prune(chunk_size=1000):
+    """
+    Remove published pages of lots that no longer exist.
+
+    Returns:
+        int: Number of page directories removed
+    """
+    from .models import LotManifest
+
+    removed = 0
+    for directory, field in ((LOT_DIR, 'pk'), (CODE_DIR, 'short_code')):
+        path = os.path.join(root(), directory)
+        if not os.path.isdir(path):
+            continue
+        names = sorted(os.listdir(path))
+        for start in range(0, len(names), chunk_size):
+            chunk = names[start:start + chunk_size]
+            if field == 'pk':
+                chunk = [name for name in chunk if _is_uuid(name)]
+            existing = {
+                str(value) for value in
+                LotManifest.objects.filter(**{f'{field}__in': chunk}).values_list(field, flat=True)
+            }
+            for name in chunk:
+                if name not in existing:
+                    shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+                    removed += 1
+    return removed
+
+
+def _is_uuid(value):
+    try:
+        return str(uuid.UUID(value)) == value
+    except ValueError:
+        return False
+
+
+def file_for_url(url, wants_json):
+    """
+    Map a request path to its published file.
+
+    Args:
+        url: Request path, e.g. /verify/{lot_id} or /V/{code}/index.json
+        wants_json: For paths without a file name: serve index.json rather
+            than index.html
+
+    Returns:
+        tuple: (path relative to root(), whether the file was chosen by the
+        Accept header), or None for paths that aren't page paths
+    """
+    match = _LOT_URL.match(url)
+    if match is not None:
+        directory, key = LOT_DIR, match['lot_id']
+        if not _is_uuid(key):
+            return None
+    else:
+        match = _CODE_URL.match(url)
+        if match is None:
+            return None
+        directory, key = CODE_DIR, short_codes.normalize(match['code'])
+        if not short_codes.is_valid(key):
+            return None
+    name = match['name']
+    if name is None:
+        return os.path.join(directory, key, 'index.json' if wants_json else 'index.html'), True
+    return os.path.join(directory, key, name), False
+
+
+def is_versioned(url):
+    """Whether a page path names content-hashed (immutable) files."""
+    match = _LOT_URL.match(url)
+    return match is not None and match['name'] is not None and _VERSIONED.match(match['name']) is not None
+
+
+def _on_commit(publish):
+    """Run a publish when the current transaction commits (now, outside one)."""
+    def run():
+        try:
+            publish()
+        except Exception:
+            # The rows have committed; the next change to the lot or
+            # publish_verification_pages rewrites the page
+            logger.exception('Failed to publish verification pages')
+
+    transaction.on_commit(run)
+
+
+def publish_lots_on_commit(lot_ids):
+    """Publish the pages of lots once the current transaction commits."""
+    lot_ids = list(lot_ids)
+    if lot_ids and is_enabled():
+        _on_commit(lambda: publish_lots(lot_ids))
+
+
+def publish_queryset_on_commit(queryset):
+    """Publish the pages of a LotVerificationView queryset once the current transaction commits."""
+    if is_enabled():
+        _on_commit(lambda: publish_queryset(queryset))
+
+
+def unpublish_on_commit(lot_id, short_code):
+    """Remove a lot's pages once the current transaction commits."""
+    if is_enabled():
+        _on_commit(lambda: unpublish(lot_id, short_code))
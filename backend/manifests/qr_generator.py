@@ -2,39 +2,171 @@
 QR Code generation utilities for lot manifests.
 
 Distributors use this to generate QR codes for printing on medicine packages.
-Each QR code contains the lot_id that patients can scan to verify authenticity.
+Each QR code contains the lot_id that patients can scan to verify authenticity,
+or, for specs carrying a short code, the much shorter SHORT_VERIFY_URL (see
+short_codes.py).
+
+Labels are rasterized with NumPy: the boolean module matrix from qrcode is
+scaled straight into a preallocated grayscale canvas, and text is composed
+from a per-font-size glyph atlas. render_label_pil() keeps the original
+PIL drawing path as a reference (see bench_qr_render).
+
+Labels can also be produced as SVG (module path plus text) or as ZPL for
+Zebra printers, which draw the QR code themselves from a ^BQ command.
 """
-import qrcode
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from io import BytesIO
+from typing import NamedTuple, Optional
+from xml.sax.saxutils import escape
+
+import numpy as np
+import qrcode
 from PIL import Image, ImageDraw, ImageFont
-import os
 
+VERIFY_URL = "https://rxverify.app/verify/{lot_id}"
+# Uppercase so the whole URL encodes in QR alphanumeric mode; scheme and host
+# are case-insensitive, and the /V/ route resolves codes case-insensitively
+SHORT_VERIFY_URL = "HTTPS://RXVERIFY.APP/V/{short_code}"
+FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+FONT_SIZE = 16
+QR_BOX_SIZE = 10
+QR_BORDER = 4
+LABEL_HEIGHT = 60
+MEDICINE_NAME_LENGTH = 30
 
-def generate_qr_code(lot_manifest, include_url=True):
+# Zebra ZPL labels, in printer dots (203 dpi: 8 dots per mm)
+ZPL_LABEL_WIDTH = 400
+ZPL_MODULE_DOTS = 4  # ^BQ magnification
+ZPL_FONT_DOTS = 22
+
+# Bump when the label layout changes in a way the settings above don't capture,
+# so incremental runs (see label_hashes.py) re-render every label
+LABEL_RENDER_VERSION = 2
+
+
+def render_settings(label_format='png'):
     """
-    Generate QR code for a lot manifest.
+    Settings that affect how a label looks in one format (part of its content hash).
     
+    Only the format's own settings are included, so changing a ZPL setting
+    doesn't re-render the PNG and SVG labels, and vice versa.
+    """
+    settings = {
+        'version': LABEL_RENDER_VERSION,
+        'verify_url': VERIFY_URL,
+        'qr_border': QR_BORDER,
+        'medicine_name_length': MEDICINE_NAME_LENGTH,
+    }
+    if label_format == 'zpl':
+        settings.update({
+            'zpl_label_width': ZPL_LABEL_WIDTH,
+            'zpl_module_dots': ZPL_MODULE_DOTS,
+            'zpl_font_dots': ZPL_FONT_DOTS,
+        })
+    else:
+        # PNG and SVG share the raster layout
+        settings.update({
+            'font_path': FONT_PATH,
+            'font_size': FONT_SIZE,
+            'qr_box_size': QR_BOX_SIZE,
+            'label_height': LABEL_HEIGHT,
+        })
+    return settings
+
+
+class LabelSpec(NamedTuple):
+    """
+    Everything needed to render one label.
+
+    Plain data rather than a LotManifest, so specs can be streamed from
+    values_list() and pickled cheaply to worker processes.
+    """
+    lot_id: str
+    batch_number: str
+    medicine_name: str
+    short_code: Optional[str] = None  # Set to encode SHORT_VERIFY_URL instead
+
+    @classmethod
+    def from_lot(cls, lot_manifest, short_url=False):
+        return cls(
+            str(lot_manifest.id),
+            lot_manifest.batch_number,
+            lot_manifest.medicine.name,
+            lot_manifest.short_code if short_url else None,
+        )
+
+
+def qr_payload(lot_id, include_url=True):
+    """
+    Data encoded in a lot's QR code.
+
     Args:
-        lot_manifest: LotManifest instance
+        lot_id: LotManifest id
         include_url: If True, encode full URL; if False, just lot_id
-    
+
     Returns:
-        PIL Image object
+        str: QR code payload
     """
-    # QR code data
     if include_url:
         # Full URL for direct app deep linking
-        qr_data = f"https://rxverify.app/verify/{lot_manifest.id}"
-    else:
-        # Just the lot ID (app will construct URL)
-        qr_data = str(lot_manifest.id)
+        return VERIFY_URL.format(lot_id=lot_id)
+    # Just the lot ID (app will construct URL)
+    return str(lot_id)
+
+
+def label_payload(spec):
+    """
+    Data encoded in a label's QR code.
+    
+    Args:
+        spec: LabelSpec for the lot
+    
+    Returns:
+        str: SHORT_VERIFY_URL if the spec has a short code, else the UUID URL
+    """
+    if spec.short_code:
+        return SHORT_VERIFY_URL.format(short_code=spec.short_code)
+    return qr_payload(spec.lot_id)
+
+
+@lru_cache(maxsize=None)
+def load_font(size=FONT_SIZE):
+    """Load the label font once per process."""
+    try:
+        # Try to load TrueType font
+        return ImageFont.truetype(FONT_PATH, size)
+    except OSError:
+        # Fallback to default font
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=8)
+def _blank_label(width, height):
+    """White label canvas, created once per size and copied for each label."""
+    return Image.new('RGB', (width, height), 'white')
+
+
+def make_qr_image(qr_data):
+    """
+    Render a QR code image for arbitrary data.
     
+    Args:
+        qr_data: String to encode
+    
+    Returns:
+        PIL Image object
+    """
     # Create QR code with explicit image factory
     qr = qrcode.QRCode(
         version=1,  # Size (1-40, 1 is smallest)
         error_correction=qrcode.constants.ERROR_CORRECT_H,  # High error correction
-        box_size=10,  # Pixel size of each box
-        border=4,  # Border size
+        box_size=QR_BOX_SIZE,  # Pixel size of each box
+        border=QR_BORDER,  # Border size
     )
     
     qr.add_data(qr_data)
@@ -51,38 +183,48 @@ def generate_qr_code(lot_manifest, include_url=True):
     return img
 
 
-def generate_qr_with_label(lot_manifest, save_path=None):
+def generate_qr_code(lot_manifest, include_url=True):
     """
-    Generate QR code with batch number label below it.
+    Generate QR code for a lot manifest.
     
     Args:
         lot_manifest: LotManifest instance
-        save_path: Optional path to save the image
+        include_url: If True, encode full URL; if False, just lot_id
+    
+    Returns:
+        PIL Image object
+    """
+    return make_qr_image(qr_payload(lot_manifest.id, include_url))
+
+
+def render_label_pil(spec):
+    """
+    Render a label by drawing with PIL (reference implementation).
+    
+    Produces the same layout as render_label() in RGB, drawing the QR code
+    through qrcode's PIL image factory and the text with ImageDraw.
+    
+    Args:
+        spec: LabelSpec for the lot
     
     Returns:
         PIL Image object with label
     """
     # Generate QR code
-    qr_img = generate_qr_code(lot_manifest)
+    qr_img = make_qr_image(label_payload(spec))
     
-    # Create new image with space for label
-    label_height = 60
-    new_img = Image.new('RGB', (qr_img.width, qr_img.height + label_height), 'white')
+    # Copy a cached blank canvas with space for the label
+    new_img = _blank_label(qr_img.width, qr_img.height + LABEL_HEIGHT).copy()
     
     # Paste QR code
     new_img.paste(qr_img, (0, 0))
     
     # Add text label
     draw = ImageDraw.Draw(new_img)
-    try:
-        # Try to load TrueType font
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 16)
-    except:
-        # Fallback to default font
-        font = ImageFont.load_default()
+    font = load_font()
     
-    text = f"Batch: {lot_manifest.batch_number}"
-    medicine_text = lot_manifest.medicine.name[:30]  # Truncate if too long
+    text = f"Batch: {spec.batch_number}"
+    medicine_text = spec.medicine_name[:MEDICINE_NAME_LENGTH]  # Truncate if too long
     
     # Calculate text position (centered)
     bbox = draw.textbbox((0, 0), text, font=font)
@@ -100,33 +242,447 @@ def generate_qr_with_label(lot_manifest, save_path=None):
     
     draw.text((text_x2, text_y2), medicine_text, fill='black', font=font)
     
-    # Save if path provided
+    return new_img
+
+
+def qr_modules(qr_data):
+    """
+    Boolean module matrix of a QR code, quiet zone included.
+    
+    Args:
+        qr_data: String to encode
+    
+    Returns:
+        numpy.ndarray: Square bool array, True for dark modules
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        box_size=QR_BOX_SIZE,
+        border=QR_BORDER,
+    )
+    qr.add_data(qr_data)
+    qr.make(fit=True)
+    return np.array(qr.get_matrix(), dtype=bool)
+
+
+class GlyphAtlas:
+    """
+    Glyphs of one font rendered once and composed into text with NumPy.
+    
+    Each character is drawn the first time it is seen; afterwards a line of
+    text is a few array copies instead of a FreeType layout and rasterization.
+    Kerning is not applied, which is invisible for the batch numbers and
+    medicine names printed on labels.
+    """
+    
+    def __init__(self, font):
+        self.font = font
+        ascent, descent = font.getmetrics()
+        self.height = ascent + descent
+        self.padding = max(2, int(getattr(font, 'size', FONT_SIZE)) // 2)
+        self._glyphs = {}
+    
+    def glyph(self, char):
+        """Return (coverage array, advance) for a character."""
+        cached = self._glyphs.get(char)
+        if cached is None:
+            advance = self.font.getlength(char)
+            # Pad both sides: ink can overhang the advance width
+            width = int(math.ceil(advance)) + 2 * self.padding
+            image = Image.new('L', (width, self.height), 0)
+            ImageDraw.Draw(image).text((self.padding, 0), char, fill=255, font=self.font)
+            cached = self._glyphs[char] = (np.asarray(image), advance)
+        return cached
+    
+    def render(self, text):
+        """
+        Compose a line of text.
+        
+        Returns:
+            numpy.ndarray: uint8 coverage (0 = paper, 255 = ink), cropped to
+            the ink horizontally; its top row is the font's ascender line
+        """
+        glyphs = [self.glyph(char) for char in text]
+        width = int(math.ceil(sum(advance for _, advance in glyphs))) + 2 * self.padding
+        strip = np.zeros((self.height, width), dtype=np.uint8)
+        x = 0.0
+        for coverage, advance in glyphs:
+            left = int(round(x))
+            target = strip[:, left:left + coverage.shape[1]]
+            np.maximum(target, coverage, out=target)
+            x += advance
+        
+        inked = np.flatnonzero(strip.any(axis=0))
+        if not len(inked):
+            return strip[:, :0]
+        return strip[:, inked[0]:inked[-1] + 1]
+
+
+@lru_cache(maxsize=None)
+def get_glyph_atlas(size=FONT_SIZE):
+    """Glyph atlas for the label font, built once per process and size."""
+    return GlyphAtlas(load_font(size))
+
+
+def _draw_centered(canvas, coverage, y):
+    """Darken `canvas` with a text coverage strip, centred horizontally at row y."""
+    height, width = coverage.shape
+    width = min(width, canvas.shape[1])
+    x = (canvas.shape[1] - width) // 2
+    height = min(height, canvas.shape[0] - y)
+    target = canvas[y:y + height, x:x + width]
+    np.minimum(target, 255 - coverage[:height, :width], out=target)
+
+
+def qr_image(qr_data):
+    """
+    Render a bare QR code with NumPy.
+    
+    Args:
+        qr_data: String to encode
+    
+    Returns:
+        PIL Image object (grayscale)
+    """
+    modules = qr_modules(qr_data)
+    return Image.fromarray(np.where(modules, 0, 255).astype(np.uint8).repeat(QR_BOX_SIZE, 0).repeat(QR_BOX_SIZE, 1))
+
+
+def render_label(spec):
+    """
+    Render a QR code with the batch number and medicine name below it.
+    
+    The module matrix is broadcast straight into a preallocated grayscale
+    canvas (each module becomes a QR_BOX_SIZE square) and both text lines
+    come from the cached glyph atlas.
+    
+    Args:
+        spec: LabelSpec for the lot
+    
+    Returns:
+        PIL Image object with label (grayscale)
+    """
+    modules = qr_modules(label_payload(spec))
+    count = modules.shape[0]
+    size = count * QR_BOX_SIZE
+    
+    canvas = np.empty((size + LABEL_HEIGHT, size), dtype=np.uint8)
+    canvas[size:] = 255
+    # View the QR area as (module row, y in box, module column, x in box) and
+    # broadcast the module colours into it: no intermediate scaled image
+    boxes = canvas[:size].reshape(count, QR_BOX_SIZE, count, QR_BOX_SIZE)
+    boxes[...] = np.where(modules, 0, 255).astype(np.uint8)[:, None, :, None]
+    
+    atlas = get_glyph_atlas()
+    _draw_centered(canvas, atlas.render(f"Batch: {spec.batch_number}"), size + 5)
+    _draw_centered(canvas, atlas.render(spec.medicine_name[:MEDICINE_NAME_LENGTH]), size + 25)
+    
+    return Image.fromarray(canvas)
+
+
+def _module_path(modules):
+    """SVG path data for the dark modules, one rectangle per horizontal run."""
+    count = modules.shape[0]
+    padded = np.zeros((count, count + 2), dtype=np.int8)
+    padded[:, 1:-1] = modules
+    edges = np.diff(padded, axis=1)
+    # Run starts and ends come out in the same row-major order, so they pair up
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return ''.join(
+        f'M{start} {row}h{end - start}v1h-{end - start}z'
+        for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist())
+    )
+
+
+def render_label_svg(spec):
+    """
+    Render a label as SVG: the QR modules as a single path, text as text.
+    
+    Same layout and pixel size as render_label(), but scales to any print
+    resolution and is typically a fraction of the PNG's size.
+    
+    Args:
+        spec: LabelSpec for the lot
+    
+    Returns:
+        str: SVG document
+    """
+    modules = qr_modules(label_payload(spec))
+    size = modules.shape[0] * QR_BOX_SIZE
+    height = size + LABEL_HEIGHT
+    ascent = load_font().getmetrics()[0]
+    batch_text = escape(f"Batch: {spec.batch_number}")
+    medicine_text = escape(spec.medicine_name[:MEDICINE_NAME_LENGTH])
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{height}" viewBox="0 0 {size} {height}">'
+        f'<rect width="{size}" height="{height}" fill="#fff"/>'
+        f'<path transform="scale({QR_BOX_SIZE})" shape-rendering="crispEdges" d="{_module_path(modules)}"/>'
+        f'<g font-family="DejaVu Sans, Verdana, sans-serif" font-size="{FONT_SIZE}" text-anchor="middle">'
+        f'<text x="{size // 2}" y="{size + 5 + ascent}">{batch_text}</text>'
+        f'<text x="{size // 2}" y="{size + 25 + ascent}">{medicine_text}</text>'
+        f'</g></svg>\n'
+    )
+
+
+def qr_version(qr_data):
+    """QR version the encoder picks for the data, without encoding or masking it."""
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_H)
+    qr.add_data(qr_data)
+    return qr.best_fit()
+
+
+def zpl_escape(text):
+    """
+    Escape ZPL field data for use after ^FH.
+    
+    ^, ~ and _ (ZPL command and escape characters), control characters and
+    non-ASCII text are written as _XX hex bytes of their UTF-8 encoding.
+    """
+    return ''.join(
+        f'_{byte:02X}' if byte < 0x20 or byte > 0x7e or byte in b'^~_' else chr(byte)
+        for byte in text.encode('utf-8')
+    )
+
+
+def render_label_zpl(spec):
+    """
+    Render a label as ZPL II for Zebra printers.
+    
+    The printer draws the QR code from a ^BQ command (model 2, error
+    correction H) so nothing is rasterized here; the server only computes
+    the symbol size to centre it. Text uses the printer's scalable font 0
+    in field blocks centred across the label.
+    
+    Args:
+        spec: LabelSpec for the lot
+    
+    Returns:
+        str: One ^XA...^XZ label
+    """
+    qr_data = label_payload(spec)
+    qr_dots = (17 + 4 * qr_version(qr_data)) * ZPL_MODULE_DOTS
+    quiet_zone = QR_BORDER * ZPL_MODULE_DOTS
+    qr_x = max(0, (ZPL_LABEL_WIDTH - qr_dots) // 2)
+    text_y = quiet_zone + qr_dots + quiet_zone // 2
+    line_height = ZPL_FONT_DOTS + 6
+    label_length = text_y + 2 * line_height + quiet_zone // 2
+    
+    def text_field(y, text):
+        return (
+            f'^FO0,{y}^FB{ZPL_LABEL_WIDTH},1,0,C^A0N,{ZPL_FONT_DOTS},{ZPL_FONT_DOTS}'
+            f'^FH^FD{zpl_escape(text)}^FS'
+        )
+    
+    return '\n'.join([
+        '^XA',
+        '^CI28',  # UTF-8 field data
+        f'^PW{ZPL_LABEL_WIDTH}',
+        f'^LL{label_length}',
+        f'^FO{qr_x},{quiet_zone}^BQN,2,{ZPL_MODULE_DOTS}^FH^FDHA,{zpl_escape(qr_data)}^FS',
+        text_field(text_y, f"Batch: {spec.batch_number}"),
+        text_field(text_y + line_height, spec.medicine_name[:MEDICINE_NAME_LENGTH]),
+        '^XZ',
+        '',
+    ])
+
+
+def _png_bytes(spec):
+    buffer = BytesIO()
+    render_label(spec).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+# Per-lot output formats: file extension and renderer returning bytes
+LABEL_FORMATS = {
+    'png': ('.png', _png_bytes),
+    'svg': ('.svg', lambda spec: render_label_svg(spec).encode('utf-8')),
+    'zpl': ('.zpl', lambda spec: render_label_zpl(spec).encode('ascii')),
+}
+
+
+def render_label_bytes(spec, label_format='png'):
+    """
+    Render a label in one of LABEL_FORMATS.
+    
+    Args:
+        spec: LabelSpec for the lot
+        label_format: 'png', 'svg' or 'zpl'
+    
+    Returns:
+        bytes: File contents
+    """
+    return LABEL_FORMATS[label_format][1](spec)
+
+
+def label_filename(spec, label_format='png'):
+    """File name of a lot's label: the batch number plus the format's extension."""
+    return f"{spec.batch_number}{LABEL_FORMATS[label_format][0]}"
+
+
+def save_label(spec, save_path):
+    """Render a label and save it as PNG, creating the directory if needed."""
+    img = render_label(spec)
+    os.makedirs(os.path.dirname(save_path) if os.path.dirname(save_path) else '.', exist_ok=True)
+    img.save(save_path)
+    return img
+
+
+def generate_qr_with_label(lot_manifest, save_path=None):
+    """
+    Generate QR code with batch number label below it.
+    
+    Args:
+        lot_manifest: LotManifest instance
+        save_path: Optional path to save the image
+    
+    Returns:
+        PIL Image object with label
+    """
+    spec = LabelSpec.from_lot(lot_manifest)
     if save_path:
-        os.makedirs(os.path.dirname(save_path) if os.path.dirname(save_path) else '.', exist_ok=True)
-        new_img.save(save_path)
+        return save_label(spec, save_path)
+    return render_label(spec)
+
+
+def iter_label_specs(queryset, chunk_size=2000, short_url=False):
+    """
+    Stream LabelSpecs from a LotManifest queryset without loading model instances.
     
-    return new_img
+    Lots are yielded in the queryset's order.
+    
+    Args:
+        queryset: QuerySet of LotManifest objects
+        chunk_size: Rows fetched per database round trip
+        short_url: Encode the lots' short-code URLs instead of UUID URLs
+    
+    Yields:
+        LabelSpec: One per lot
+    """
+    if short_url:
+        rows = queryset.values_list('id', 'batch_number', 'medicine__name', 'short_code')
+        for lot_id, batch_number, medicine_name, short_code in rows.iterator(chunk_size=chunk_size):
+            yield LabelSpec(str(lot_id), batch_number, medicine_name or '', short_code)
+        return
+    rows = queryset.values_list('id', 'batch_number', 'medicine__name')
+    for lot_id, batch_number, medicine_name in rows.iterator(chunk_size=chunk_size):
+        yield LabelSpec(str(lot_id), batch_number, medicine_name or '')
+
+
+def _init_worker():
+    """Pool initializer: load the font once when the worker starts."""
+    load_font()
+
+
+def _render_chunk(specs, output_dir, label_format):
+    """Worker task: render and save a chunk of labels, returning their paths."""
+    results = []
+    for spec in specs:
+        filepath = os.path.join(output_dir, label_filename(spec, label_format))
+        with open(filepath, 'wb') as label_file:
+            label_file.write(render_label_bytes(spec, label_format))
+        results.append((spec, filepath))
+    return results
+
+
+def _render_chunk_images(specs, mode):
+    """Worker task: render a chunk of labels and return the images."""
+    return [(spec, render_label(spec).convert(mode)) for spec in specs]
+
 
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
-def batch_generate_qr_codes(queryset, output_dir='qr_codes'):
+
+def _map_chunks(task, chunks, workers, *args):
+    """
+    Run task(chunk, *args) for every chunk, yielding the results in input order.
+    
+    With workers > 1 chunks run in a process pool. Chunks are read lazily and
+    at most 4 per worker are in flight, so memory stays flat however many
+    lots are streamed in.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield from task(chunk, *args)
+        return
+    
+    max_in_flight = workers * 4
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(task, chunk, *args))
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def iter_generate_qr_codes(specs, output_dir='qr_codes', workers=1, chunk_size=50, label_format='png'):
+    """
+    Render and save one label file per lot, yielding (spec, file_path) in order.
+    
+    Args:
+        specs: Iterable of LabelSpec (see iter_label_specs)
+        output_dir: Directory to save QR codes
+        workers: Number of worker processes (1 renders in this process)
+        chunk_size: Labels per worker task
+        label_format: 'png', 'svg' or 'zpl' (see LABEL_FORMATS)
+    
+    Yields:
+        tuple: (LabelSpec, file_path)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    yield from _map_chunks(_render_chunk, _chunks(specs, chunk_size), workers, output_dir, label_format)
+
+
+def iter_render_labels(specs, workers=1, chunk_size=50, mode='L'):
+    """
+    Render labels in memory, yielding (spec, image) in order.
+    
+    Used for print sheets (see print_sheets.py). Labels are converted to
+    `mode` in the worker, so grayscale labels cross the process boundary at a
+    third of the RGB size.
+    
+    Args:
+        specs: Iterable of LabelSpec (see iter_label_specs)
+        workers: Number of worker processes (1 renders in this process)
+        chunk_size: Labels per worker task
+        mode: PIL image mode of the returned labels
+    
+    Yields:
+        tuple: (LabelSpec, PIL Image)
+    """
+    yield from _map_chunks(_render_chunk_images, _chunks(specs, chunk_size), workers, mode)
+
+
+def batch_generate_qr_codes(queryset, output_dir='qr_codes', workers=1, progress=None, progress_every=1000):
     """
     Generate QR codes for multiple lot manifests.
     
     Args:
         queryset: QuerySet of LotManifest objects
         output_dir: Directory to save QR codes
+        workers: Number of worker processes (1 renders in this process)
+        progress: Optional callable(done, elapsed_seconds), called every
+                  `progress_every` labels
+        progress_every: Labels between progress callbacks
     
     Returns:
-        List of (lot_manifest, file_path) tuples
+        List of (LabelSpec, file_path) tuples
     """
-    os.makedirs(output_dir, exist_ok=True)
-    
     results = []
-    for lot_manifest in queryset:
-        filename = f"{lot_manifest.batch_number}.png"
-        filepath = os.path.join(output_dir, filename)
-        
-        img = generate_qr_with_label(lot_manifest, save_path=filepath)
-        results.append((lot_manifest, filepath))
-    
+    started = time.perf_counter()
+    for result in iter_generate_qr_codes(iter_label_specs(queryset), output_dir, workers=workers):
+        results.append(result)
+        if progress and len(results) % progress_every == 0:
+            progress(len(results), time.perf_counter() - started)
     return results
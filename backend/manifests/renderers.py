@@ -0,0 +1,26 @@
+"""
+Renderers for binary lot manifest endpoints.
+"""
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class LabelImageRenderer(BaseRenderer):
+    """
+    Lets GET /api/manifests/{id}/qr.png pass content negotiation for image
+    Accept headers (e.g. `Accept: image/png` from an <img> tag).
+
+    The view returns the image bytes in a plain HttpResponse; this renderer
+    only ever sees error payloads, which it writes as JSON.
+    """
+
+    media_type = 'image/*'
+    format = 'image'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        return json.dumps(data).encode('utf-8')
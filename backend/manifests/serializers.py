@@ -1,8 +1,15 @@
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
 from rest_framework import serializers
-from .models import LotManifest
-import hashlib
-import hmac
-from nacl.signing import SigningKey
+from core.cache import invalidate_tags
+from entities.models import Distributor
+from pharmaceuticals.models import Medicine
+from . import lot_changes, lot_filter, short_codes, verification_view
+from .label_hashes import label_hash, render_fingerprint
+from .models import LotManifest, ShipmentRoot
+from .qr_generator import LabelSpec
+from .signing import sign_manifest, sign_shipment
 
 
 class LotManifestSerializer(serializers.ModelSerializer):
@@ -16,7 +23,10 @@ class LotManifestSerializer(serializers.ModelSerializer):
     - distributor: Distributor ID
     
     IMMUTABLE FIELDS (Auto-Managed):
+    - short_code: Random base32 code for compact QR codes
     - digital_signature: ALWAYS auto-regenerated on create/update
+    - shipment: Set for lots signed as part of a shipment's Merkle tree
+      (empty digital_signature); updating such a lot re-signs it individually
     - trust_score: IMMUTABLE - cannot be changed after creation
     - is_authentic: Computed field (verification result)
     
@@ -30,16 +40,21 @@ class LotManifestSerializer(serializers.ModelSerializer):
     is_authentic = serializers.SerializerMethodField(
         help_text="Boolean result of signature verification"
     )
+    qr_image_url = serializers.SerializerMethodField(
+        help_text="Cache-friendly URL of the lot's QR label PNG (changes when the label does)"
+    )
     
     class Meta:
         model = LotManifest
         fields = [
-            'id', 'batch_number', 'expiry_date', 'digital_signature', 
+            'id', 'batch_number', 'short_code', 'expiry_date', 'digital_signature', 
             'trust_score', 'medicine', 'medicine_name', 'distributor', 
-            'distributor_name', 'is_authentic'
+            'distributor_name', 'shipment', 'is_authentic', 'qr_image_url'
         ]
         # Immutable fields - cannot be updated by user
-        read_only_fields = ['id', 'digital_signature', 'trust_score', 'is_authentic']
+        read_only_fields = [
+            'id', 'short_code', 'digital_signature', 'trust_score', 'shipment', 'is_authentic', 'qr_image_url'
+        ]
         extra_kwargs = {
             'digital_signature': {'required': False},
             'trust_score': {'required': False},
@@ -58,19 +73,8 @@ class LotManifestSerializer(serializers.ModelSerializer):
         Returns:
             str: 128-character hex signature
         """
-        # Construct the message
-        message = f"{lot_manifest.batch_number}:{lot_manifest.expiry_date.isoformat()}:{str(lot_manifest.distributor_id)}"
-        
-        # Derive a signing key from distributor's public key
-        # Use the public key as seed material (deterministic)
-        seed = bytes.fromhex(lot_manifest.distributor.public_key)[:32]  # Take first 32 bytes
-        signing_key = SigningKey(seed)
-        
-        # Sign the message
-        signed = signing_key.sign(message.encode('utf-8'))
-        
-        # Return hex-encoded signature
-        return signed.signature.hex()
+        # Key objects are cached per public key (see signing.py)
+        return sign_manifest(lot_manifest)
     
     def create(self, validated_data):
         """
@@ -125,8 +129,12 @@ class LotManifestSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
         
         # ALWAYS regenerate signature on any update
-        # This ensures signature matches current data
+        # This ensures signature matches current data. A shipment-signed lot
+        # leaves its Merkle tree, whose proof covered the old data.
         instance.digital_signature = self._generate_ed25519_signature(instance)
+        instance.shipment = None
+        instance.merkle_index = None
+        instance.merkle_proof = ''
         
         instance.save()
         
@@ -141,3 +149,107 @@ class LotManifestSerializer(serializers.ModelSerializer):
         """
         return obj.verify_signature()
 
+    
+    def get_qr_image_url(self, obj) -> str:
+        """
+        URL of the lot's QR label, versioned by the label's content hash.
+        
+        Returns:
+            str: e.g. "/api/manifests/{id}/qr.png?v={hash}"
+        """
+        digest = label_hash(LabelSpec.from_lot(obj), render_fingerprint('png'))
+        url = reverse('lotmanifest-qr-image', kwargs={'pk': obj.pk, 'image_format': 'png'})
+        return f'{url}?v={digest}'
+
+
+class ShipmentLotSerializer(serializers.Serializer):
+    """One lot of a shipment registration."""
+    
+    batch_number = serializers.CharField(max_length=100)
+    expiry_date = serializers.DateField()
+    medicine = serializers.UUIDField(help_text="Medicine ID")
+
+
+class ShipmentRootSerializer(serializers.ModelSerializer):
+    """Serializer for ShipmentRoot (the signed Merkle root of a shipment)."""
+    
+    class Meta:
+        model = ShipmentRoot
+        fields = ['id', 'distributor', 'merkle_root', 'leaf_count', 'root_signature', 'created_at']
+        read_only_fields = fields
+
+
+class ShipmentCreateSerializer(serializers.Serializer):
+    """
+    Register a shipment of lots signed with ONE Ed25519 signature.
+    
+    The lots are hashed into a Merkle tree, only the root is signed, and every
+    lot stores its inclusion proof (see manifests/merkle.py). Lots are
+    inserted with bulk_create in one transaction.
+    
+    VALIDATION (in bulk, not per lot):
+    - Batch numbers must be unique within the shipment and not yet registered
+    - Every medicine must exist
+    - At most SHIPMENT_MAX_LOTS lots per request
+    """
+    
+    distributor = serializers.PrimaryKeyRelatedField(queryset=Distributor.objects.all())
+    lots = ShipmentLotSerializer(many=True, allow_empty=False)
+    
+    def validate_lots(self, lots):
+        max_lots = getattr(settings, 'SHIPMENT_MAX_LOTS', 100000)
+        if len(lots) > max_lots:
+            raise serializers.ValidationError(f"A shipment can have at most {max_lots} lots")
+        
+        batch_numbers = [lot['batch_number'] for lot in lots]
+        if len(set(batch_numbers)) != len(batch_numbers):
+            raise serializers.ValidationError("Batch numbers must be unique within a shipment")
+        
+        # Look up in chunks to stay under database parameter limits
+        existing = []
+        for start in range(0, len(batch_numbers), 1000):
+            existing += LotManifest.objects.filter(
+                batch_number__in=batch_numbers[start:start + 1000]
+            ).values_list('batch_number', flat=True)
+        if existing:
+            raise serializers.ValidationError(
+                f"{len(existing)} batch number(s) already exist, e.g. {', '.join(sorted(existing)[:5])}"
+            )
+        
+        medicine_ids = {lot['medicine'] for lot in lots}
+        found = set(Medicine.objects.filter(id__in=medicine_ids).values_list('id', flat=True))
+        missing = medicine_ids - found
+        if missing:
+            raise serializers.ValidationError(f"Unknown medicine(s): {', '.join(sorted(map(str, missing)))}")
+        return lots
+    
+    def create(self, validated_data):
+        """
+        Create the shipment root and all lots in one transaction.
+        
+        Returns:
+            ShipmentRoot: The signed shipment root (lots available as .created_lots)
+        """
+        distributor = validated_data['distributor']
+        lots = [
+            LotManifest(
+                batch_number=lot['batch_number'],
+                expiry_date=lot['expiry_date'],
+                medicine_id=lot['medicine'],
+                distributor=distributor,
+            )
+            for lot in validated_data['lots']
+        ]
+        request = self.context.get('request')
+        with transaction.atomic():
+            # bulk_create can't retry a clashing short code per row
+            short_codes.redraw_taken(lots)
+            shipment = sign_shipment(distributor, lots, created_by=getattr(request, 'user', None))
+            LotManifest.objects.bulk_create(lots, batch_size=1000)
+            # bulk_create sends no post_save signals
+            invalidate_tags('lots')
+            lot_filter.add_lots(lots)
+            lot_changes.record(lots=lots)
+            verification_view.refresh_lots_on_commit([lot.pk for lot in lots])
+        shipment.created_lots = lots
+        return shipment
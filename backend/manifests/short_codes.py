@@ -0,0 +1,120 @@
+"""
+Short lot codes for compact QR codes.
+
+A lot's QR code normally encodes https://rxverify.app/verify/{uuid}: 64
+bytes, which at error correction H needs a version 7 symbol (45x45
+modules). A short code is 9 random Crockford base32 symbols (45 bits) plus a
+check symbol, e.g. "7K3QX0DMA5". The short URL fits in a version 3 symbol
+(29x29 modules), whose larger modules cheap phone cameras lock onto faster.
+
+- Crockford's alphabet drops I, L, O and U, so codes read aloud or typed
+  from a damaged label survive the usual confusions (normalize() maps
+  O -> 0 and I/L -> 1).
+- The check symbol is Luhn mod 32, which catches every single-symbol error
+  and most adjacent transpositions before the database is hit.
+- Codes are random rather than sequential so valid codes cannot be
+  enumerated and printed on counterfeit packs.
+- Uppercase letters and digits are all in QR alphanumeric mode (5.5 bits
+  per character instead of 8), which is why the short URL is uppercase.
+- Random codes do clash: about n^2 / 2^46 times over n lots, so ~1.4 times
+  at ten million. New lots draw again when their code is taken (see
+  LotManifest.save() and redraw_taken()) instead of failing the insert.
+"""
+import re
+import secrets
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+BODY_LENGTH = 9
+CODE_LENGTH = BODY_LENGTH + 1
+
+# Draws per lot before leaving a clash to the unique constraint
+MAX_DRAWS = 5
+
+_VALUES = {symbol: value for value, symbol in enumerate(ALPHABET)}
+_SEPARATORS = re.compile(r'[\s-]+')
+_CONFUSABLE = str.maketrans({'O': '0', 'I': '1', 'L': '1'})
+
+
+def check_symbol(body):
+    """
+    Luhn mod 32 check symbol for a code body.
+
+    >>> check_symbol('7K3QX0DMA')
+    '5'
+    """
+    total = 0
+    factor = 2
+    for symbol in reversed(body):
+        addend = factor * _VALUES[symbol]
+        total += addend // len(ALPHABET) + addend % len(ALPHABET)
+        factor = 3 - factor
+    return ALPHABET[-total % len(ALPHABET)]
+
+
+def generate_short_code():
+    """
+    New random short code (body plus check symbol).
+
+    Used as the default of LotManifest.short_code. Any one draw clashes with
+    an existing lot with probability n / 2^45 (one in three million at ten
+    million lots); inserts draw again when that happens.
+    """
+    value = secrets.randbits(5 * BODY_LENGTH)
+    body = ''.join(ALPHABET[(value >> shift) & 31] for shift in range(5 * (BODY_LENGTH - 1), -1, -5))
+    return body + check_symbol(body)
+
+
+def normalize(code):
+    """
+    Canonical form of a typed or scanned code.
+
+    >>> normalize('7k3q-x0dm a5')
+    '7K3QX0DMA5'
+    """
+    return _SEPARATORS.sub('', (code or '').upper()).translate(_CONFUSABLE)
+
+
+def is_valid(code):
+    """True if a normalized code has the right length, alphabet and check symbol."""
+    return (
+        len(code) == CODE_LENGTH
+        and all(symbol in _VALUES for symbol in code)
+        and check_symbol(code[:-1]) == code[-1]
+    )
+
+
+def redraw_taken(lots, chunk_size=1000):
+    """
+    Give new codes to unsaved lots whose short code is already taken.
+
+    bulk_create can't retry a single row, so a clash would roll back the
+    whole batch; callers run this on the lots first. A code is taken if a
+    stored lot or an earlier lot in `lots` has it.
+
+    Args:
+        lots: Unsaved LotManifest instances
+        chunk_size: Codes looked up per query
+    """
+    from .models import LotManifest
+
+    pending = list(lots)
+    seen = set()
+    for _ in range(MAX_DRAWS):
+        codes = [lot.short_code for lot in pending]
+        taken = set()
+        for start in range(0, len(codes), chunk_size):
+            taken.update(
+                LotManifest.objects.filter(short_code__in=codes[start:start + chunk_size])
+                .values_list('short_code', flat=True)
+            )
+        clashing = []
+        for lot in pending:
+            if lot.short_code in taken or lot.short_code in seen:
+                clashing.append(lot)
+            else:
+                seen.add(lot.short_code)
+        if not clashing:
+            return
+        for lot in clashing:
+            lot.short_code = generate_short_code()
+        pending = clashing
@@ -0,0 +1,196 @@
+"""
+Django signals for lot manifests.
+
+This module keeps the in-process fuzzy batch number index and the
+negative-lookup filter in sync with LotManifest changes, keeps the
+LotVerificationView projection in sync with its source models (and with
+it the published verification pages), and invalidates cached lot responses.
+"""
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from . import batch_index, lot_changes, lot_filter, published_pages, verification_view
+from .models import LotManifest, ShipmentRoot
+from core.cache import invalidate_tags
+from entities.models import Distributor
+from pharmaceuticals.models import Medicine
+
+
+@receiver(post_save, sender=LotManifest)
+def refresh_verification_view(sender, instance, **kwargs):
+    """
+    Refresh a lot's verification view row when the lot is saved.
+    
+    Connected before invalidate_lot_responses, so on commit the row is
+    refreshed before cached responses are invalidated.
+    
+    Args:
+        sender: The LotManifest model class
+        instance: The LotManifest instance being saved
+        **kwargs: Additional keyword arguments
+    """
+    verification_view.refresh_lots_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=LotManifest)
+def index_batch_number(sender, instance, **kwargs):
+    """
+    Add or re-index a lot's batch number when it is saved.
+    
+    Args:
+        sender: The LotManifest model class
+        instance: The LotManifest instance being saved
+        **kwargs: Additional keyword arguments
+    """
+    batch_index.index_lot(instance)
+
+
+@receiver(post_delete, sender=LotManifest)
+def unindex_batch_number(sender, instance, **kwargs):
+    """
+    Remove a lot's batch number from the index when it is deleted.
+    
+    Args:
+        sender: The LotManifest model class
+        instance: The LotManifest instance being deleted
+        **kwargs: Additional keyword arguments
+    """
+    batch_index.unindex_lot(instance)
+
+
+@receiver(post_save, sender=LotManifest)
+def publish_lot_change(sender, instance, **kwargs):
+    """
+    Publish a saved lot to the lot indexes of other workers (see lot_changes.py).
+    
+    Args:
+        sender: The LotManifest model class
+        instance: The LotManifest instance being saved
+        **kwargs: Additional keyword arguments
+    """
+    lot_changes.record(lots=[instance])
+
+
+@receiver(post_delete, sender=LotManifest)
+def publish_lot_deletion(sender, instance, **kwargs):
+    """
+    Publish a deleted lot to the lot indexes of other workers (see lot_changes.py).
+    
+    Args:
+        sender: The LotManifest model class
+        instance: The LotManifest instance being deleted
+        **kwargs: Additional keyword arguments
+    """
+    lot_changes.record(deleted=[instance])
+
+
+@receiver(post_delete, sender=LotManifest)
+def unpublish_verification_page(sender, instance, **kwargs):
+    """
+    Remove a deleted lot's published verification pages (see published_pages.py).
+    
+    Args:
+        sender: The LotManifest model class
+        instance: The LotManifest instance being deleted
+        **kwargs: Additional keyword arguments
+    """
+    published_pages.unpublish_on_commit(instance.pk, instance.short_code)
+
+
+@receiver(post_save, sender=LotManifest)
+@receiver(post_delete, sender=LotManifest)
+def invalidate_lot_responses(sender, instance, **kwargs):
+    """
+    Invalidate cached responses of a lot and cached lot lists.
+    
+    Args:
+        sender: The LotManifest model class
+        instance: The LotManifest instance being saved or deleted
+        **kwargs: Additional keyword arguments
+    """
+    invalidate_tags(f'lot:{instance.pk}', 'lots')
+
+
+@receiver(post_save, sender=LotManifest)
+def add_to_lot_filter(sender, instance, created, **kwargs):
+    """
+    Add a new lot's id and short code to the negative-lookup filter.
+    
+    Args:
+        sender: The LotManifest model class
+        instance: The LotManifest instance being saved
+        created: Boolean indicating if this is a new instance
+        **kwargs: Additional keyword arguments
+    """
+    if created:
+        lot_filter.add_lots([instance])
+
+
+@receiver(post_save, sender=Medicine)
+def update_medicine_verification_views(sender, instance, created, **kwargs):
+    """
+    Copy a medicine's changes into the verification view rows of its lots.
+    
+    Args:
+        sender: The Medicine model class
+        instance: The Medicine instance being saved
+        created: Boolean indicating if this is a new instance
+        **kwargs: Additional keyword arguments
+    """
+    if not created:
+        verification_view.update_medicine(instance)
+
+
+@receiver(pre_save, sender=Distributor)
+def detect_distributor_key_change(sender, instance, **kwargs):
+    """
+    Note whether a distributor's public key is changing.
+    
+    Args:
+        sender: The Distributor model class
+        instance: The Distributor instance about to be saved
+        **kwargs: Additional keyword arguments
+    """
+    if instance._state.adding:
+        instance._public_key_changed = False
+        return
+    previous = Distributor.objects.filter(pk=instance.pk).values_list('public_key', flat=True).first()
+    instance._public_key_changed = previous != instance.public_key
+
+
+@receiver(post_save, sender=Distributor)
+def update_distributor_verification_views(sender, instance, created, **kwargs):
+    """
+    Copy a distributor's name into its lots' verification view rows.
+    
+    After a key change the lots' signatures no longer check out (until they
+    are re-signed), so their rows are refreshed.
+    
+    Args:
+        sender: The Distributor model class
+        instance: The Distributor instance being saved
+        created: Boolean indicating if this is a new instance
+        **kwargs: Additional keyword arguments
+    """
+    if created:
+        return
+    verification_view.update_distributor(instance)
+    if getattr(instance, '_public_key_changed', True):
+        verification_view.refresh_queryset_on_commit(LotManifest.objects.filter(distributor_id=instance.pk))
+
+
+@receiver(post_save, sender=ShipmentRoot)
+def refresh_shipment_verification_views(sender, instance, created, **kwargs):
+    """
+    Refresh the verification view rows of a shipment's lots when its root is re-saved.
+    
+    New shipments have no lots yet; the shipment serializer refreshes them.
+    
+    Args:
+        sender: The ShipmentRoot model class
+        instance: The ShipmentRoot instance being saved
+        created: Boolean indicating if this is a new instance
+        **kwargs: Additional keyword arguments
+    """
+    if not created:
+        verification_view.refresh_queryset_on_commit(LotManifest.objects.filter(shipment_id=instance.pk))
@@ -0,0 +1,366 @@
+"""
+Ed25519 signing of lot manifests, one at a time or a distributor at a time.
+
+A manifest's signature covers "{batch_number}:{expiry_date}:{distributor_id}"
+and is made with a signing key derived from the distributor's public key
+(see LotManifestSerializer). Deriving that key costs about as much as a
+signature, so key objects are cached per public key.
+
+Shipment-signed lots (see merkle.py) carry an inclusion proof instead of a
+signature: verifying one costs a few hashes plus one root-signature check
+that is cached per shipment.
+
+When a distributor's key changes, every one of its lots must be re-signed.
+run_resign_job() does that as a resumable job: lots are streamed in keyset
+chunks ordered by id, signed with one cached key and written with
+bulk_update. Each chunk is committed together with the job's cursor, so a
+job that crashes resumes after the last committed chunk. Shipment-signed
+lots only need their shipment roots re-signed.
+"""
+import logging
+import threading
+from datetime import timedelta
+from functools import lru_cache
+
+import nacl.exceptions
+import nacl.signing
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .merkle import build_tree, leaf_hash, root_from_proof
+from .verification_view import refresh_lots, refresh_queryset
+from core.cache import invalidate_tags
+
+logger = logging.getLogger(__name__)
+
+
+def signing_message(batch_number, expiry_date, distributor_id):
+    """
+    The bytes a manifest's signature covers.
+
+    Returns:
+        bytes: UTF-8 "{batch_number}:{expiry_date}:{distributor_id}"
+    """
+    return f"{batch_number}:{expiry_date.isoformat()}:{distributor_id}".encode('utf-8')
+
+
+@lru_cache(maxsize=1024)
+def get_signing_key(public_key):
+    """
+    Signing key derived from a distributor's public key (first 32 bytes as seed).
+
+    Args:
+        public_key: Hex-encoded public key
+
+    Returns:
+        nacl.signing.SigningKey: Cached per public key
+    """
+    return nacl.signing.SigningKey(bytes.fromhex(public_key)[:32])
+
+
+def sign_manifest(lot_manifest, public_key=None):
+    """
+    Sign a lot manifest.
+
+    Args:
+        lot_manifest: LotManifest instance
+        public_key: Distributor public key (read from lot_manifest.distributor if not given)
+
+    Returns:
+        str: 128-character hex signature
+    """
+    public_key = public_key if public_key is not None else lot_manifest.distributor.public_key
+    message = signing_message(lot_manifest.batch_number, lot_manifest.expiry_date, lot_manifest.distributor_id)
+    return get_signing_key(public_key).sign(message).signature.hex()
+
+
+def shipment_root_message(distributor_id, leaf_count, merkle_root):
+    """
+    The bytes a shipment root's signature covers.
+
+    Returns:
+        bytes: UTF-8 "shipment:{distributor_id}:{leaf_count}:{merkle_root}"
+    """
+    return f"shipment:{distributor_id}:{leaf_count}:{merkle_root}".encode('utf-8')
+
+
+def sign_shipment_root(shipment, public_key):
+    """
+    Sign a shipment's Merkle root.
+
+    Returns:
+        str: 128-character hex signature
+    """
+    message = shipment_root_message(shipment.distributor_id, shipment.leaf_count, shipment.merkle_root)
+    return get_signing_key(public_key).sign(message).signature.hex()
+
+
+def sign_shipment(distributor, lots, created_by=None):
+    """
+    Hash a shipment of new lots into a Merkle tree and sign only the root.
+
+    Sets shipment, merkle_index and merkle_proof on the (unsaved) lots and
+    saves the ShipmentRoot; the caller saves the lots, normally with
+    bulk_create in the same transaction.
+
+    Args:
+        distributor: Distributor registering the lots
+        lots: List of unsaved LotManifest instances of that distributor
+        created_by: Optional User who registered the shipment
+
+    Returns:
+        ShipmentRoot: The saved shipment root
+    """
+    from .models import ShipmentRoot
+
+    leaves = [
+        leaf_hash(signing_message(lot.batch_number, lot.expiry_date, distributor.id))
+        for lot in lots
+    ]
+    root, proofs = build_tree(leaves)
+    shipment = ShipmentRoot(
+        distributor=distributor,
+        merkle_root=root.hex(),
+        leaf_count=len(lots),
+        created_by=created_by,
+    )
+    shipment.root_signature = sign_shipment_root(shipment, distributor.public_key)
+    shipment.save()
+
+    for index, (lot, proof) in enumerate(zip(lots, proofs)):
+        lot.shipment = shipment
+        lot.merkle_index = index
+        lot.merkle_proof = proof.hex()
+        lot.digital_signature = ''
+    return shipment
+
+
+@lru_cache(maxsize=4096)
+def _root_signature_valid(public_key, distributor_id, leaf_count, merkle_root, root_signature):
+    """One Ed25519 check per shipment root and key, then served from the cache."""
+    try:
+        get_signing_key(public_key).verify_key.verify(
+            shipment_root_message(distributor_id, leaf_count, merkle_root),
+            bytes.fromhex(root_signature),
+        )
+        return True
+    except nacl.exceptions.BadSignatureError:
+        return False
+    except (ValueError, TypeError):
+        return False
+
+
+def _verify_inclusion(lot_manifest):
+    """Check a shipment-signed lot's proof against the shipment's signed root."""
+    shipment = lot_manifest.shipment
+    if shipment.distributor_id != lot_manifest.distributor_id or lot_manifest.merkle_index is None:
+        return False
+    try:
+        proof = bytes.fromhex(lot_manifest.merkle_proof)
+        expected_root = bytes.fromhex(shipment.merkle_root)
+    except ValueError:
+        return False
+
+    message = signing_message(lot_manifest.batch_number, lot_manifest.expiry_date, lot_manifest.distributor_id)
+    root = root_from_proof(leaf_hash(message), lot_manifest.merkle_index, shipment.leaf_count, proof)
+    if root != expected_root:
+        return False
+    return _root_signature_valid(
+        lot_manifest.distributor.public_key,
+        str(shipment.distributor_id),
+        shipment.leaf_count,
+        shipment.merkle_root,
+        shipment.root_signature,
+    )
+
+
+def verify_manifest(lot_manifest):
+    """
+    Verify a lot manifest against its distributor's current key.
+
+    Accepts either a per-lot signature or, for shipment-signed lots, an
+    inclusion proof under the shipment's signed Merkle root.
+
+    Returns:
+        bool: True if the signature (or proof and root signature) is valid
+    """
+    if lot_manifest.shipment_id is not None:
+        try:
+            return _verify_inclusion(lot_manifest)
+        except AttributeError:
+            return False
+    if not lot_manifest.digital_signature:
+        return False
+    try:
+        message = signing_message(lot_manifest.batch_number, lot_manifest.expiry_date, lot_manifest.distributor_id)
+        verify_key = get_signing_key(lot_manifest.distributor.public_key).verify_key
+        verify_key.verify(message, bytes.fromhex(lot_manifest.digital_signature))
+        return True
+    except nacl.exceptions.BadSignatureError:
+        return False
+    except (ValueError, TypeError, AttributeError):
+        return False
+
+
+def create_resign_job(distributor, created_by=None):
+    """
+    Queue a re-sign of all of a distributor's lots.
+
+    Returns the distributor's unfinished job instead if there is one, so
+    repeated requests don't start competing jobs.
+
+    Args:
+        distributor: Distributor whose lots are re-signed
+        created_by: Optional User who requested it
+
+    Returns:
+        tuple: (ResignJob, created)
+    """
+    from .models import ResignJob
+
+    job = (
+        ResignJob.objects.filter(distributor=distributor)
+        .exclude(status=ResignJob.Status.COMPLETED)
+        .order_by('created_at')
+        .first()
+    )
+    if job is not None:
+        return job, False
+    return ResignJob.objects.create(distributor=distributor, created_by=created_by), True
+
+
+def claim_job(job_id):
+    """
+    Mark a re-sign job as running, unless another process is already running it.
+
+    A RUNNING job whose last checkpoint is older than RESIGN_JOB_STALE_AFTER
+    seconds is assumed to have crashed and can be claimed again.
+
+    Args:
+        job_id: ResignJob id
+
+    Returns:
+        ResignJob or None: The claimed job, or None if it is finished or busy
+    """
+    from .models import ResignJob
+
+    stale_after = timedelta(seconds=getattr(settings, 'RESIGN_JOB_STALE_AFTER', 300))
+    with transaction.atomic():
+        job = ResignJob.objects.select_for_update().select_related('distributor').get(pk=job_id)
+        if job.status == ResignJob.Status.COMPLETED:
+            return None
+        if job.status == ResignJob.Status.RUNNING and job.updated_at > timezone.now() - stale_after:
+            return None
+        job.status = ResignJob.Status.RUNNING
+        job.error = ''
+        if job.started_at is None:
+            job.started_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'started_at', 'updated_at'])
+    return job
+
+
+def run_resign_job(job, chunk_size=2000, progress=None):
+    """
+    Re-sign every lot of the job's distributor, resuming from its checkpoint.
+
+    Lots are read in keyset chunks (distributor, id > cursor ORDER BY id), so
+    each chunk is an index range scan however far the job has got. Lots
+    created while the job runs are signed by the API with the new key anyway.
+    If the distributor's key changes again mid-job, the job starts over.
+    Shipment-signed lots are skipped; their shipment roots are re-signed
+    at the end instead.
+
+    Args:
+        job: ResignJob claimed with claim_job()
+        chunk_size: Lots signed and written per transaction
+        progress: Optional callable(job) called after every chunk
+
+    Returns:
+        ResignJob: The completed job
+    """
+    from .models import LotManifest, ResignJob, ShipmentRoot
+
+    public_key = job.distributor.public_key
+    if job.public_key != public_key:
+        # Key rotated since the job was created (or last ran): re-sign everything
+        job.public_key = public_key
+        job.last_lot_id = None
+        job.signed_count = 0
+    if job.total is None or job.last_lot_id is None:
+        job.total = LotManifest.objects.filter(distributor_id=job.distributor_id, shipment__isnull=True).count()
+    job.save(update_fields=['public_key', 'last_lot_id', 'signed_count', 'total', 'updated_at'])
+
+    try:
+        get_signing_key(public_key)  # Validate the key before touching any lot
+        lots = (
+            LotManifest.objects.filter(distributor_id=job.distributor_id, shipment__isnull=True)
+            .order_by('id')
+            .only('id', 'batch_number', 'expiry_date', 'distributor_id', 'digital_signature')
+        )
+        while True:
+            chunk = lots
+            if job.last_lot_id is not None:
+                chunk = chunk.filter(id__gt=job.last_lot_id)
+            chunk = list(chunk[:chunk_size])
+            if not chunk:
+                break
+
+            # bulk_update skips auto_now, so updated_at (HTTP validators) is set here
+            now = timezone.now()
+            for lot in chunk:
+                lot.digital_signature = sign_manifest(lot, public_key)
+                lot.updated_at = now
+
+            # The chunk and the cursor commit together: a crash never skips lots
+            with transaction.atomic():
+                LotManifest.objects.bulk_update(chunk, ['digital_signature', 'updated_at'], batch_size=chunk_size)
+                job.last_lot_id = chunk[-1].id
+                job.signed_count += len(chunk)
+                job.save(update_fields=['last_lot_id', 'signed_count', 'updated_at'])
+            # bulk_update sends no post_save signals
+            refresh_lots([lot.pk for lot in chunk])
+            invalidate_tags(f'distributor:{job.distributor_id}', 'lots')
+            if progress is not None:
+                progress(job)
+
+        # One signature per shipment covers all of its lots
+        roots = list(ShipmentRoot.objects.filter(distributor_id=job.distributor_id))
+        for shipment in roots:
+            shipment.root_signature = sign_shipment_root(shipment, public_key)
+        ShipmentRoot.objects.bulk_update(roots, ['root_signature'], batch_size=1000)
+        # Their lots' is_authentic changes with the root signature
+        LotManifest.objects.filter(shipment__in=roots).update(updated_at=timezone.now())
+        refresh_queryset(LotManifest.objects.filter(shipment__in=roots))
+        invalidate_tags(f'distributor:{job.distributor_id}', 'lots')
+    except Exception as e:
+        logger.exception('Re-sign job %s failed', job.pk)
+        job.status = ResignJob.Status.FAILED
+        job.error = str(e)[:1000]
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        raise
+
+    job.status = ResignJob.Status.COMPLETED
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    return job
+
+
+def start_resign_job(job_id, chunk_size=2000):
+    """
+    Run a re-sign job in a background thread of this process (admin action).
+
+    If the process exits mid-job, the job is left RUNNING with its last
+    checkpoint and `manage.py resign_manifests --resume` picks it up.
+    """
+    def run():
+        try:
+            job = claim_job(job_id)
+            if job is not None:
+                run_resign_job(job, chunk_size=chunk_size)
+        except Exception:
+            pass  # Recorded on the job by run_resign_job
+        finally:
+            connection.close()
+
+    threading.Thread(target=run, name=f'resign-job-{job_id}', daemon=True).start()
@@ -1,3 +1,1320 @@
-from django.test import TestCase
+import io
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from PIL import Image
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.redis import RedisCache
+from django.core import signals
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.db import IntegrityError, close_old_connections
+from django.db.models import RestrictedError
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from core import singleflight
+from core.cache import cache_stats as response_cache_stats
+from entities.models import Distributor
+from pharmaceuticals.models import Medicine
+from reports.models import CrowdFlag
+
+from . import (
+    async_views, batch_index, hot_lots, lot_changes, lot_filter, merkle, published_pages, qr_generator, short_codes,
+    signing, verification_view,
+)
+from .print_sheets import SheetLayout, fit_label, write_sheets
+from .label_cache import archive_member_name
+from .label_hashes import LabelHashes, label_hash, render_fingerprint
+from .models import LotManifest, LotVerificationView, ResignJob, ShipmentRoot
+from .qr_generator import (
+    LabelSpec,
+    get_glyph_atlas,
+    iter_generate_qr_codes,
+    label_filename,
+    label_payload,
+    qr_image,
+    render_label,
+    render_label_pil,
+    render_label_svg,
+    render_label_zpl,
+    zpl_escape,
+)
+from .fast_path import VerifyQrFastPath
+from .signing import claim_job, create_resign_job, run_resign_job, sign_manifest, sign_shipment, verify_manifest
+from .verification import build_verification_payload
+
+LOT_FILTER = {'ENABLED': True, 'FALSE_POSITIVE_RATE': 0.01, 'HEADROOM': 1.25, 'REBUILD_INTERVAL': 3600}
+
+
+def reset_lot_filter():
+    lot_filter._filter = None
+    lot_filter._position = None
+    lot_filter._stats.update(dict.fromkeys(lot_filter._stats, 0))
+
+
+def reset_batch_index():
+    batch_index._index = None
+    batch_index._position = None
+    batch_index._syncing = False
+
+
+def label_specs(count):
+    return [LabelSpec(str(uuid.uuid4()), f'PCM-2026-KE-{i:05d}', 'Paracetamol Tablets') for i in range(count)]
+
+
+def start_lot_changes(test):
+    """Start the lot change feed, as the first change in a deployment does."""
+    with test.captureOnCommitCallbacks(execute=True):
+        lot_changes.record()
+
+
+@override_settings(LOT_FILTER=LOT_FILTER)
+class LotFilterTests(TestCase):
+    """Negative-lookup filter (lot_filter.py) with lots created by other workers."""
+
+    def setUp(self):
+        cache.clear()
+        reset_lot_filter()
+        self.addCleanup(reset_lot_filter)
+        # locmem stands in for redis: "other workers" commit in this process
+        shared = mock.patch.object(lot_changes, 'is_shared', return_value=True)
+        shared.start()
+        self.addCleanup(shared.stop)
+        start_lot_changes(self)
+        self.distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        self.medicine = Medicine.objects.create(name='Paracetamol', distributor=self.distributor)
+
+    def create_lots_elsewhere(self, count, updated_at):
+        """Commit lots the way another worker would: no signals here, one feed entry."""
+        lots = LotManifest.objects.bulk_create([
+            LotManifest(
+                batch_number=f'BATCH-{uuid.uuid4().hex[:12]}',
+                expiry_date=date(2030, 1, 1),
+                medicine=self.medicine,
+                distributor=self.distributor,
+            )
+            for _ in range(count)
+        ])
+        LotManifest.objects.filter(pk__in=[lot.pk for lot in lots]).update(updated_at=updated_at)
+        for lot in lots:
+            lot.updated_at = updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            lot_changes.record(lots=lots)
+        return lots
+
+    def test_unknown_lot_is_rejected(self):
+        lot_filter.get_filter()
+        self.assertFalse(lot_filter.lot_might_exist(uuid.uuid4()))
+        self.assertFalse(lot_filter.short_code_might_exist('ZZZZZZZZZ'))
+
+    def test_lot_saved_in_this_process_passes(self):
+        lot_filter.get_filter()
+        lot = LotManifest.objects.create(
+            batch_number='BATCH-LOCAL', expiry_date=date(2030, 1, 1),
+            medicine=self.medicine, distributor=self.distributor,
+        )
+        self.assertTrue(lot_filter.lot_might_exist(lot.pk))
+        self.assertTrue(lot_filter.short_code_might_exist(lot.short_code))
+
+    def test_lots_committed_long_after_their_updated_at_pass(self):
+        # A shipment signed in a long transaction, or stamped by a host whose
+        # clock lags: updated_at is far older than this worker's last sync
+        lot_filter.get_filter()
+        self.assertFalse(lot_filter.lot_might_exist(uuid.uuid4()))  # Syncs now
+        lots = self.create_lots_elsewhere(50, timezone.now() - timedelta(hours=1))
+        for lot in lots:
+            self.assertTrue(lot_filter.lot_might_exist(lot.pk))
+            self.assertTrue(lot_filter.short_code_might_exist(lot.short_code))
+        self.assertEqual(lot_filter.filter_stats()['fallthroughs'], 0)
+
+    def test_lookups_fall_through_when_the_feed_is_lost(self):
+        lot_filter.get_filter()
+        lots = self.create_lots_elsewhere(3, timezone.now() - timedelta(hours=1))
+        feed, generation = lot_changes.position()
+        cache.delete(lot_changes._key(feed, generation))  # Evicted
+        with mock.patch.object(lot_filter, '_rebuild_in_background') as rebuild:
+            for lot in lots:
+                self.assertTrue(lot_filter.lot_might_exist(lot.pk))
+        rebuild.assert_called()
+        self.assertEqual(lot_filter.filter_stats()['fallthroughs'], 3)
+
+
+@override_settings(LOT_FILTER=LOT_FILTER)
+class LotFilterBackendTests(TestCase):
+    """The filter is only used when the lot change feed's cache increments atomically."""
+
+    def setUp(self):
+        reset_lot_filter()
+        self.addCleanup(reset_lot_filter)
+
+    def test_filter_is_off_with_locmem_and_file_caches(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for backend in (caches['default'], FileBasedCache(directory, {})):
+            with mock.patch.object(lot_changes, '_cache', return_value=backend):
+                self.assertFalse(lot_changes.is_shared())
+                self.assertFalse(lot_filter.is_enabled())
+                self.assertTrue(lot_filter.lot_might_exist(uuid.uuid4()))
+        self.assertIsNone(lot_filter._filter)
+
+    def test_filter_is_on_with_redis(self):
+        with mock.patch.object(lot_changes, '_cache', return_value=RedisCache('redis://127.0.0.1:6379/1', {})):
+            self.assertTrue(lot_changes.is_shared())
+            self.assertTrue(lot_filter.is_enabled())
+
+
+class LotChangesTests(TestCase):
+    """Lot change feed (lot_changes.py)."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_changes_since_collects_entries(self):
+        start = lot_changes.position()
+        old, new = timezone.now() - timedelta(hours=2), timezone.now()
+        lot = LotManifest(updated_at=new)
+        with self.captureOnCommitCallbacks(execute=True):
+            lot_changes.record(lots=[lot])
+        # A new feed was started by the first change
+        self.assertIsNone(lot_changes.changes_since(start))
+
+        start = lot_changes.position()
+        with self.captureOnCommitCallbacks(execute=True):
+            lot_changes.record(lots=[LotManifest(updated_at=new), LotManifest(updated_at=old)])
+            lot_changes.record(deleted=[lot])
+        position, since, deleted = lot_changes.changes_since(start)
+        self.assertEqual(position, lot_changes.position())
+        self.assertEqual(since, old - lot_changes.SINCE_MARGIN)
+        self.assertEqual(deleted, [str(lot.pk)])
+        self.assertEqual(lot_changes.changes_since(position), (position, None, []))
+
+    def test_missing_entry_is_unknown(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lot_changes.record(lots=[LotManifest(updated_at=timezone.now())])
+        start = lot_changes.position()
+        with self.captureOnCommitCallbacks(execute=True):
+            lot_changes.record(lots=[LotManifest(updated_at=timezone.now())])
+        cache.delete(lot_changes._key(start[0], start[1] + 1))
+        self.assertIsNone(lot_changes.changes_since(start))
+
+
+@mock.patch.object(lot_changes, 'is_shared', return_value=True)
+class BatchIndexTests(TestCase):
+    """Fuzzy batch number index (batch_index.py) with changes made by other workers."""
+
+    def setUp(self):
+        cache.clear()
+        reset_batch_index()
+        self.addCleanup(reset_batch_index)
+        start_lot_changes(self)
+        distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        self.medicine = Medicine.objects.create(name='Paracetamol', distributor=distributor)
+        self.distributor = distributor
+
+    def test_lots_saved_and_deleted_elsewhere(self, is_shared):
+        kept = LotManifest.objects.create(
+            batch_number='PCM-2026-KE-00142', expiry_date=date(2030, 1, 1),
+            medicine=self.medicine, distributor=self.distributor,
+        )
+        batch_index.get_index()
+        # Another worker commits a lot stamped an hour ago, and deletes one
+        late = LotManifest.objects.bulk_create([LotManifest(
+            batch_number='AMX-2026-UG-77310', expiry_date=date(2030, 1, 1),
+            medicine=self.medicine, distributor=self.distributor,
+        )])[0]
+        late.updated_at = timezone.now() - timedelta(hours=1)
+        LotManifest.objects.filter(pk=late.pk).update(updated_at=late.updated_at)
+        with self.captureOnCommitCallbacks(execute=True):
+            lot_changes.record(lots=[late])
+        with mock.patch.object(batch_index, 'unindex_lot'), self.captureOnCommitCallbacks(execute=True):
+            kept.delete()
+
+        index = batch_index.get_index()
+        self.assertEqual(index.search('AMX2026UG77310', limit=1), [(late.pk, 0)])
+        self.assertEqual(index.search('PCM2026KE00142', max_distance=0), [])
+
+    def test_lookups_do_not_wait_for_a_running_sync(self, is_shared):
+        batch_index.get_index()
+        batch_index._syncing = True  # Another thread is reading the database
+        with mock.patch.object(lot_changes, 'changes_since') as changes_since:
+            batch_index.get_index()
+        changes_since.assert_not_called()
+
+
+class BatchNumberIndexTests(SimpleTestCase):
+    """Searches of the trigram index (batch_index.BatchNumberIndex)."""
+
+    def setUp(self):
+        self.index = batch_index.BatchNumberIndex()
+        self.lot_ids = {}
+        for number in range(200):
+            batch_number = f'PCM-2026-KE-{number:05d}'
+            self.lot_ids[batch_number] = uuid.uuid4()
+            self.index.upsert(self.lot_ids[batch_number], batch_number)
+
+    def test_nearest_first(self):
+        results = self.index.search('PCM-2026-KE-0O142', limit=3)
+        self.assertEqual(results[0], (self.lot_ids['PCM-2026-KE-00142'], 1))
+        self.assertTrue(all(distance >= 1 for _, distance in results))
+
+    def test_exact_match_survives_the_candidate_limit(self):
+        # All 200 batch numbers contain KE00, so even the narrowest probe is too wide
+        with mock.patch.object(batch_index, 'MAX_CANDIDATES', 10):
+            results = self.index.search('ke-00', partial=True, limit=5)
+        self.assertEqual([distance for _, distance in results], [0] * 5)
+
+    def test_removed_and_renamed_lots(self):
+        lot_id = self.lot_ids['PCM-2026-KE-00142']
+        self.index.upsert(lot_id, 'AMX-2026-UG-77310')
+        self.index.remove(self.lot_ids['PCM-2026-KE-00143'])
+        self.assertEqual(self.index.search('PCM2026KE00142', max_distance=0), [])
+        self.assertEqual(self.index.search('PCM2026KE00143', max_distance=0), [])
+        self.assertEqual(self.index.search('AMX2026UG77310'), [(lot_id, 0)])
+        self.assertEqual(len(self.index), 199)
+
+
+class MerkleTreeTests(SimpleTestCase):
+    """Shipment Merkle trees and inclusion proofs (merkle.py)."""
+
+    def leaves(self, count):
+        return [merkle.leaf_hash(f'PCM-{index}:2030-01-01:distributor'.encode()) for index in range(count)]
+
+    def test_every_proof_verifies_for_odd_and_even_sizes(self):
+        for count in (1, 2, 3, 4, 5, 7, 8, 9, 16, 17, 100):
+            leaves = self.leaves(count)
+            root, proofs = merkle.build_tree(leaves)
+            for index, (leaf, proof) in enumerate(zip(leaves, proofs)):
+                with self.subTest(count=count, index=index):
+                    self.assertEqual(merkle.root_from_proof(leaf, index, count, proof), root)
+
+    def test_odd_node_is_promoted_not_duplicated(self):
+        a, b, c = self.leaves(3)
+        root, proofs = merkle.build_tree([a, b, c])
+        self.assertEqual(root, merkle.node_hash(merkle.node_hash(a, b), c))
+        self.assertEqual(proofs[2], merkle.node_hash(a, b))
+        # Duplicating the last leaf would give [a, b, c, c] the same root
+        self.assertNotEqual(merkle.build_tree([a, b, c, c])[0], root)
+
+    def test_single_leaf_is_its_own_root(self):
+        leaf = self.leaves(1)[0]
+        self.assertEqual(merkle.build_tree([leaf]), (leaf, [b'']))
+
+    def test_empty_tree_is_rejected(self):
+        with self.assertRaises(ValueError):
+            merkle.build_tree([])
+
+    def test_tampered_proofs_do_not_verify(self):
+        leaves = self.leaves(9)
+        root, proofs = merkle.build_tree(leaves)
+        leaf, proof = leaves[4], proofs[4]
+
+        flipped = bytearray(proof)
+        flipped[0] ^= 1
+        self.assertNotEqual(merkle.root_from_proof(leaf, 4, 9, bytes(flipped)), root)
+        self.assertNotEqual(merkle.root_from_proof(leaves[5], 4, 9, proof), root)  # Other leaf
+        self.assertNotEqual(merkle.root_from_proof(leaf, 5, 9, proof), root)  # Other index
+        # Proofs that don't fit the tree shape
+        self.assertIsNone(merkle.root_from_proof(leaf, 4, 9, proof[:-merkle.HASH_SIZE]))
+        self.assertIsNone(merkle.root_from_proof(leaf, 4, 9, proof + proof[:merkle.HASH_SIZE]))
+        self.assertIsNone(merkle.root_from_proof(leaf, 4, 9, proof[:-1]))
+        self.assertIsNone(merkle.root_from_proof(leaf, 9, 9, proof))
+        self.assertIsNone(merkle.root_from_proof(leaf, -1, 9, proof))
+        # The last leaf of 9 has a single sibling; a tree of 8 expects three
+        self.assertIsNone(merkle.root_from_proof(leaves[8], 8, 8, proofs[8]))
+
+    def test_inner_node_is_not_a_valid_leaf(self):
+        leaves = self.leaves(4)
+        root, _ = merkle.build_tree(leaves)
+        inner = merkle.node_hash(leaves[0], leaves[1])
+        sibling = merkle.node_hash(leaves[2], leaves[3])
+        # Presenting an inner node as the leaf of a two-leaf tree
+        self.assertNotEqual(merkle.root_from_proof(merkle.leaf_hash(inner), 0, 2, sibling), root)
+
+
+class KeysetPaginationTests(APITestCase):
+    """?pagination=cursor and ?pagination=estimated on /api/manifests/ (core/pagination.py)."""
+
+    def setUp(self):
+        cache.clear()
+        distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        medicine = Medicine.objects.create(name='Paracetamol', distributor=distributor)
+        # Ties on expiry_date are ordered by id
+        expiry_dates = [date(2030, 1, 1)] * 3 + [date(2029, 6, 1)] * 2 + [date(2031, 3, 1), date(2028, 1, 1)]
+        for i, expiry_date in enumerate(expiry_dates):
+            LotManifest.objects.create(
+                batch_number=f'PCM-2026-KE-{i:05d}', expiry_date=expiry_date,
+                medicine=medicine, distributor=distributor,
+            )
+        self.expected = [str(pk) for pk in LotManifest.objects.order_by('-expiry_date', '-id').values_list('pk', flat=True)]
+        user = User.objects.create_user(username='pharmacist', password='pw', role='Pharmacist')
+        self.client.force_authenticate(user)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_cursor_pages_forward_and_back_without_gaps(self):
+        pages = [self.get('/api/manifests/?pagination=cursor&page_size=2')]
+        self.assertIsNone(pages[0]['previous'])
+        while pages[-1]['next']:
+            pages.append(self.get(pages[-1]['next']))
+        forward = [[lot['id'] for lot in page['results']] for page in pages]
+        self.assertEqual([lot_id for page in forward for lot_id in page], self.expected)
+        self.assertEqual(len(forward), 4)
+
+        backward = [forward[-1]]
+        page = pages[-1]
+        while page['previous']:
+            page = self.get(page['previous'])
+            backward.append([lot['id'] for lot in page['results']])
+        self.assertEqual(backward[::-1], forward)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/manifests/?pagination=cursor&cursor=bm90LWpzb24')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_estimated_count_pages(self):
+        data = self.get('/api/manifests/?pagination=estimated')
+        self.assertEqual(data['count'], 7)
+        self.assertTrue(data['count_is_estimate'])
+
+    def test_default_pagination_is_unchanged(self):
+        data = self.get('/api/manifests/')
+        self.assertEqual(data['count'], 7)
+        self.assertNotIn('count_is_estimate', data)
+        self.assertEqual(data['results'][0]['id'], self.expected[0])
+
+
+class ParallelQrGenerationTests(SimpleTestCase):
+    """Rendering label files on a process pool (qr_generator.iter_generate_qr_codes)."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def generate(self, specs, output, **kwargs):
+        return list(iter_generate_qr_codes(specs, os.path.join(self.directory, output), **kwargs))
+
+    def test_workers_write_the_same_files_in_input_order(self):
+        specs = label_specs(7)
+        serial = self.generate(specs, 'serial')
+        parallel = self.generate(specs, 'parallel', workers=2, chunk_size=2)
+        self.assertEqual([spec for spec, _ in parallel], specs)
+        for (_, serial_path), (_, parallel_path) in zip(serial, parallel):
+            self.assertEqual(os.path.basename(serial_path), os.path.basename(parallel_path))
+            with open(serial_path, 'rb') as expected, open(parallel_path, 'rb') as written:
+                self.assertEqual(written.read(), expected.read())
+
+    def test_specs_are_read_lazily(self):
+        consumed = []
+
+        def specs():
+            for spec in label_specs(300):
+                consumed.append(spec)
+                yield spec
+
+        results = iter_generate_qr_codes(specs(), os.path.join(self.directory, 'lazy'), workers=2, chunk_size=5)
+        next(results)
+        # At most 4 chunks per worker are in flight
+        self.assertLessEqual(len(consumed), 2 * 4 * 5 + 5)
+        results.close()
+
+
+class GenerateQrCodesCommandTests(TestCase):
+    """manage.py generate_qr_codes --all."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        medicine = Medicine.objects.create(name='Paracetamol', distributor=distributor)
+        for i in range(5):
+            LotManifest.objects.create(
+                batch_number=f'PCM-2026-KE-{i:05d}', expiry_date=date(2030, 1, 1),
+                medicine=medicine, distributor=distributor,
+            )
+
+    def generate(self, *args):
+        call_command('generate_qr_codes', '--all', '--output', self.directory, *args, stdout=io.StringIO())
+        return sorted(name for name in os.listdir(self.directory) if not name.startswith('.'))
+
+    def test_parallel_run_writes_every_label(self):
+        self.assertEqual(self.generate('--workers', '2', '--chunk-size', '2'), [
+            f'PCM-2026-KE-{i:05d}.png' for i in range(5)
+        ])
+
+    def test_sheet_goes_into_one_file(self):
+        self.assertEqual(self.generate('--sheet', 'tiff', '--grid', '2x2', '--dpi', '72'), ['qr_labels.tiff'])
+        with Image.open(os.path.join(self.directory, 'qr_labels.tiff')) as sheet:
+            self.assertEqual(sheet.n_frames, 2)
+
+
+class LabelRasterizerTests(SimpleTestCase):
+    """The NumPy label renderer against the PIL reference (qr_generator.py)."""
+
+    def test_labels_match_the_pil_reference(self):
+        specs = [
+            LabelSpec(str(uuid.uuid4()), 'PCM-2026-KE-00142', 'Paracetamol Tablets 500mg, a very long name'),
+            LabelSpec(str(uuid.uuid4()), 'AMX/2026/UG-77310', 'Paracétamol Comprimés'),
+            LabelSpec(str(uuid.uuid4()), 'X1', '', short_code='7K3M9Q2WXD'),
+        ]
+        for spec in specs:
+            with self.subTest(batch_number=spec.batch_number):
+                label = render_label(spec)
+                self.assertEqual(label.mode, 'L')
+                pixels = np.asarray(label)
+                reference = np.asarray(render_label_pil(spec).convert('L'))
+                self.assertEqual(pixels.shape, reference.shape)
+                qr_size = pixels.shape[1]
+                np.testing.assert_array_equal(pixels[:qr_size], reference[:qr_size])
+
+                # Text has the same glyphs, but no kerning or subpixel placement
+                text, reference_text = pixels[qr_size:] < 128, reference[qr_size:] < 128
+                self.assertAlmostEqual(text.sum(), reference_text.sum(), delta=reference_text.sum() * 0.02)
+                for axis in (0, 1):
+                    inked, reference_inked = np.flatnonzero(text.any(axis)), np.flatnonzero(reference_text.any(axis))
+                    self.assertLessEqual(abs(inked[0] - reference_inked[0]), 2)
+                    self.assertLessEqual(abs(inked[-1] - reference_inked[-1]), 2)
+
+    def test_bare_qr_code_is_the_label_top(self):
+        spec = label_specs(1)[0]
+        qr = np.asarray(qr_image(label_payload(spec)))
+        np.testing.assert_array_equal(np.asarray(render_label(spec))[:qr.shape[0]], qr)
+
+    def test_glyph_atlas_crops_to_ink(self):
+        atlas = get_glyph_atlas()
+        self.assertEqual(atlas.render('').shape[1], 0)
+        self.assertEqual(atlas.render('   ').shape[1], 0)
+        strip = atlas.render('PCM')
+        self.assertEqual(strip.shape[0], atlas.height)
+        self.assertTrue(strip[:, 0].any() and strip[:, -1].any())
+
+
+class VectorLabelTests(SimpleTestCase):
+    """SVG and ZPL label output (qr_generator.py)."""
+
+    spec = LabelSpec(str(uuid.uuid4()), 'PCM-2026-KE-00142', 'Paracetamol <500mg> & Co')
+
+    def test_svg_has_the_png_layout(self):
+        svg = ElementTree.fromstring(render_label_svg(self.spec))
+        self.assertEqual((int(svg.get('width')), int(svg.get('height'))), render_label(self.spec).size)
+        texts = [element.text for element in svg.iter('{http://www.w3.org/2000/svg}text')]
+        self.assertEqual(texts, ['Batch: PCM-2026-KE-00142', 'Paracetamol <500mg> & Co'])
+
+    def test_zpl_escapes_field_data(self):
+        self.assertEqual(zpl_escape('A^B~C_D'), 'A_5EB_7EC_5FD')
+        self.assertEqual(zpl_escape('Paracétamol'), 'Parac_C3_A9tamol')
+        zpl = render_label_zpl(self.spec._replace(medicine_name='Amox^XZ'))
+        self.assertTrue(zpl.startswith('^XA\n'))
+        self.assertEqual(zpl.count('^XZ'), 1)
+        self.assertIn('^FDAmox_5EXZ^FS', zpl)
+        self.assertIn(f'^FDHA,https://rxverify.app/verify/{self.spec.lot_id}^FS', zpl)
+
+    def test_format_settings_only_change_their_own_hashes(self):
+        before = {label_format: label_hash(self.spec, render_fingerprint(label_format)) for label_format in ('png', 'svg', 'zpl')}
+        self.assertEqual(len(set(before.values())), 3)
+        with mock.patch.object(qr_generator, 'ZPL_FONT_DOTS', 30):
+            after = {label_format: label_hash(self.spec, render_fingerprint(label_format)) for label_format in before}
+        self.assertEqual(after['png'], before['png'])
+        self.assertEqual(after['svg'], before['svg'])
+        self.assertNotEqual(after['zpl'], before['zpl'])
+
+
+class PrintSheetTests(SimpleTestCase):
+    """N-up PDF and TIFF print sheets (print_sheets.py)."""
+
+    layout = SheetLayout(columns=3, rows=4, dpi=72)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def labels(self, count):
+        return (Image.new('L', (40, 48), 0) for _ in range(count))
+
+    def test_layout_validation(self):
+        SheetLayout().validate()
+        for layout in (SheetLayout(page_size='A3'), SheetLayout(columns=0), SheetLayout(margin_mm=120)):
+            with self.assertRaises(ValueError):
+                layout.validate()
+
+    def test_labels_are_enlarged_by_whole_factors_and_shrunk_to_fit(self):
+        label = Image.new('L', (40, 48), 0)
+        self.assertEqual(fit_label(label, 130, 200).size, (120, 144))
+        self.assertIs(fit_label(label, 60, 60), label)
+        self.assertEqual(fit_label(label, 20, 48).size, (20, 24))
+
+    def test_tiff_pages(self):
+        path = os.path.join(self.directory, 'labels.tiff')
+        result = write_sheets(self.labels(14), path, self.layout, sheet_format='tiff')
+        self.assertEqual(result, {'pages': 2, 'labels': 14})
+        with Image.open(path) as sheet:
+            self.assertEqual(sheet.n_frames, 2)
+            self.assertEqual(sheet.size, self.layout.page_pixels)
+            # Labels are centred in their cells; margins stay blank
+            cell_width, cell_height = self.layout.cell_pixels
+            x, y = self.layout.cell_origin(1)
+            self.assertEqual(sheet.getpixel((x + cell_width // 2, y + cell_height // 2)), 0)
+            self.assertEqual(sheet.getpixel((1, 1)), 255)
+            sheet.seek(1)
+            x, y = self.layout.cell_origin(2)
+            self.assertEqual(sheet.getpixel((x + cell_width // 2, y + cell_height // 2)), 255)
+
+    def test_pdf_cross_references(self):
+        path = os.path.join(self.directory, 'labels.pdf')
+        pages = []
+        write_sheets(self.labels(13), path, self.layout, progress=lambda *args: pages.append(args))
+        self.assertEqual(pages, [(1, 12), (2, 13)])
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.assertIn(b'/Type /Pages /Kids [5 0 R 8 0 R] /Count 2', data)
+        xref = int(data.rsplit(b'startxref\n', 1)[1].split(b'\n')[0])
+        entries = data[xref:].split(b'\n')[3:]
+        for object_id, entry in enumerate(entries[:8], start=1):
+            offset = int(entry.split()[0])
+            self.assertTrue(data[offset:].startswith(f'{object_id} 0 obj'.encode()))
+
+
+class LabelHashesTests(SimpleTestCase):
+    """Content-hash manifests of label directories (label_hashes.py)."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.spec = LabelSpec(str(uuid.uuid4()), 'PCM-2026-KE-00142', 'Paracetamol')
+
+    def write(self, label_format):
+        hashes = LabelHashes(self.directory, label_format)
+        filename = label_filename(self.spec, label_format)
+        open(os.path.join(self.directory, filename), 'wb').close()
+        hashes.record(self.spec, filename)
+        hashes.save()
+
+    def test_formats_in_one_directory_are_tracked_separately(self):
+        self.write('png')
+        self.write('svg')
+
+        png = LabelHashes(self.directory, 'png')
+        self.assertTrue(png.is_current(self.spec))
+        self.assertEqual(png.prune({self.spec.lot_id}), 0)
+        self.assertTrue(LabelHashes(self.directory, 'svg').is_current(self.spec))
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.directory) if not name.startswith('.')),
+            ['PCM-2026-KE-00142.png', 'PCM-2026-KE-00142.svg'],
+        )
+
+    def test_prune_only_deletes_its_own_format(self):
+        self.write('png')
+        self.write('svg')
+        self.assertEqual(LabelHashes(self.directory, 'svg').prune(set()), 1)
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.directory) if not name.startswith('.')),
+            ['PCM-2026-KE-00142.png'],
+        )
+
+
+@override_settings(QR_IMAGE_MAX_AGE=600)
+class QrImageTests(APITestCase):
+    """GET /api/manifests/{id}/qr.png and qr.svg."""
+
+    def setUp(self):
+        caches['qr_labels'].clear()
+        distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        self.medicine = Medicine.objects.create(name='Paracetamol', distributor=distributor)
+        self.lot = LotManifest.objects.create(
+            batch_number='PCM-2026-KE-00142', expiry_date=date(2030, 1, 1),
+            medicine=self.medicine, distributor=distributor,
+        )
+        self.url = f'/api/manifests/{self.lot.pk}/qr.png'
+
+    def test_label_with_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=600')
+        self.assertTrue(response.content.startswith(b'\x89PNG'))
+
+        with mock.patch('manifests.views.get_label') as get_label:
+            revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+        get_label.assert_not_called()
+
+        svg = self.client.get(f'/api/manifests/{self.lot.pk}/qr.svg')
+        self.assertEqual(svg['Content-Type'], 'image/svg+xml')
+        self.assertNotEqual(svg['ETag'], response['ETag'])
+
+    def test_etag_changes_with_the_label_content(self):
+        etag = self.client.get(self.url)['ETag']
+        self.medicine.name = 'Panadol'
+        self.medicine.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_versioned_url_is_immutable(self):
+        self.client.force_authenticate(User.objects.create_user(username='patient', password='pw'))
+        versioned = self.client.get(f'/api/manifests/{self.lot.pk}/').data['qr_image_url']
+        self.client.force_authenticate(None)
+        response = self.client.get(versioned)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['ETag'], f'"{versioned.rsplit("=", 1)[1]}"')
+
+    def test_unknown_lot(self):
+        self.assertEqual(self.client.get(f'/api/manifests/{uuid.uuid4()}/qr.png').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/manifests/not-a-uuid/qr.png').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class QrArchiveTests(APITestCase):
+    """GET /api/manifests/qr-archive/."""
+
+    def setUp(self):
+        cache.clear()
+        caches['qr_labels'].clear()
+        distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        medicine = Medicine.objects.create(name='Paracetamol', distributor=distributor)
+        for batch_number in ('PCM-2026-KE-00142', 'A/1', 'A_1'):
+            LotManifest.objects.create(
+                batch_number=batch_number, expiry_date=date(2030, 1, 1),
+                medicine=medicine, distributor=distributor,
+            )
+        self.admin = User.objects.create_user(username='admin', password='pw', role='Admin')
+
+    def download(self):
+        response = self.client.get('/api/manifests/qr-archive/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_distributor_accounts_cannot_download(self):
+        # Accounts aren't linked to a distributor, so they could read any distributor's labels
+        user = User.objects.create_user(username='distributor', password='pw', role='Distributor')
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/manifests/qr-archive/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_labels_are_cached_apart_from_the_default_cache(self):
+        self.client.force_authenticate(self.admin)
+        archive = self.download()
+        names = archive.namelist()
+        self.assertEqual(len(set(names)), 3)
+        self.assertIn('A_1.png', names)
+        self.assertTrue(archive.read('A_1.png').startswith(b'\x89PNG'))
+
+        with mock.patch('manifests.label_cache.render_label_bytes') as render:
+            self.assertEqual(self.download().namelist(), names)
+        render.assert_not_called()
+        lot = LotManifest.objects.select_related('medicine').get(batch_number='A_1')
+        key = f'qr-label:{label_hash(LabelSpec.from_lot(lot), render_fingerprint())}'
+        self.assertIsNotNone(caches['qr_labels'].get(key))
+        self.assertIsNone(cache.get(key))
+
+
+class ArchiveMemberNameTests(SimpleTestCase):
+    """Member names of the label ZIP (label_cache.archive_member_name)."""
+
+    def test_safe_batch_number_is_kept(self):
+        spec = LabelSpec(str(uuid.uuid4()), 'PCM-2026-KE-00142', 'Paracetamol')
+        self.assertEqual(archive_member_name(spec), 'PCM-2026-KE-00142.png')
+
+    def test_sanitized_batch_numbers_stay_unique(self):
+        specs = [
+            LabelSpec(str(uuid.uuid4()), batch_number, 'Paracetamol')
+            for batch_number in ('A/1', 'A_1', 'A 1', 'A\\1')
+        ]
+        names = [archive_member_name(spec) for spec in specs]
+        self.assertEqual(len(set(names)), len(names))
+        self.assertEqual(names[0], f'A_1-{specs[0].lot_id}.png')
+
+
+class ShortCodeTests(APITestCase):
+    """Short lot codes (short_codes.py) and what happens when they clash."""
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='pw', role='Admin'))
+        self.distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        self.medicine = Medicine.objects.create(name='Paracetamol', distributor=self.distributor)
+        with self.draws([1]):
+            self.existing = self.create_lot('PCM-2026-KE-00001')
+
+    def draws(self, values):
+        """Make generate_short_code() draw these values, then fresh ones."""
+        return mock.patch.object(short_codes.secrets, 'randbits', side_effect=itertools.chain(values, itertools.count(1000)))
+
+    def create_lot(self, batch_number):
+        return LotManifest.objects.create(
+            batch_number=batch_number, expiry_date=date(2030, 1, 1),
+            medicine=self.medicine, distributor=self.distributor,
+        )
+
+    def test_codes_validate_and_normalize(self):
+        code = short_codes.generate_short_code()
+        self.assertTrue(short_codes.is_valid(code))
+        self.assertEqual(short_codes.normalize(f' {code[:4].lower()}-{code[4:]} '), code)
+        self.assertEqual(short_codes.normalize('7k3q-xodm a5'), '7K3QX0DMA5')
+        # A single changed symbol fails the check
+        self.assertFalse(short_codes.is_valid(code[:3] + ('1' if code[3] != '1' else '2') + code[4:]))
+
+    def test_clashing_code_is_drawn_again(self):
+        with self.draws([1, 1, 2]):
+            lot = self.create_lot('PCM-2026-KE-00002')
+        self.assertNotEqual(lot.short_code, self.existing.short_code)
+        self.assertEqual(LotManifest.objects.count(), 2)
+
+    def test_other_integrity_errors_are_raised(self):
+        with self.assertRaises(IntegrityError):
+            self.create_lot(self.existing.batch_number)
+
+    def test_shipment_with_clashing_codes_is_created(self):
+        lots = [
+            {'batch_number': f'PCM-2026-KE-{index:05d}', 'expiry_date': '2030-01-01', 'medicine': str(self.medicine.pk)}
+            for index in range(2, 5)
+        ]
+        # The first code is taken by a stored lot, the third by the second
+        with self.draws([1, 2, 2]):
+            response = self.client.post(
+                '/api/manifests/shipments/', {'distributor': str(self.distributor.pk), 'lots': lots}, format='json',
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        codes = list(LotManifest.objects.values_list('short_code', flat=True))
+        self.assertEqual(len(set(codes)), 4)
+
+
+class ResignJobTests(TestCase):
+    """Re-signing a distributor's lots after a key change (signing.run_resign_job)."""
+
+    def setUp(self):
+        self.distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        medicine = Medicine.objects.create(name='Paracetamol', distributor=self.distributor)
+        self.lots = [
+            LotManifest.objects.create(
+                batch_number=f'PCM-2026-KE-{index:05}', expiry_date=date(2030, 1, 1),
+                medicine=medicine, distributor=self.distributor,
+            )
+            for index in range(5)
+        ]
+        for lot in self.lots:
+            lot.digital_signature = sign_manifest(lot)
+            lot.save(update_fields=['digital_signature'])
+        shipment_lots = [
+            LotManifest(
+                batch_number=f'PCM-2026-SH-{index:05}', expiry_date=date(2030, 1, 1),
+                medicine=medicine, distributor=self.distributor,
+            )
+            for index in range(3)
+        ]
+        sign_shipment(self.distributor, shipment_lots)
+        LotManifest.objects.bulk_create(shipment_lots)
+
+    def rotate_key(self):
+        self.distributor.public_key = 'cd' * 32
+        self.distributor.save()
+
+    def verified(self):
+        return [verify_manifest(lot) for lot in LotManifest.objects.select_related('distributor', 'shipment')]
+
+    def test_signature_round_trip(self):
+        lot = self.lots[0]
+        self.assertTrue(verify_manifest(lot))
+        lot.batch_number = 'PCM-2026-KE-99999'
+        self.assertFalse(verify_manifest(lot))
+
+    def test_job_resigns_every_lot_after_a_key_change(self):
+        self.rotate_key()
+        self.assertFalse(any(self.verified()))
+
+        job, created = create_resign_job(self.distributor)
+        self.assertTrue(created)
+        job = run_resign_job(claim_job(job.pk), chunk_size=2)
+
+        self.assertEqual(job.status, ResignJob.Status.COMPLETED)
+        self.assertEqual((job.signed_count, job.total), (5, 5))
+        self.assertTrue(all(self.verified()))
+
+    def test_failed_job_resumes_after_its_last_chunk(self):
+        self.rotate_key()
+        job, _ = create_resign_job(self.distributor)
+
+        def fail(job):
+            raise RuntimeError('worker killed')
+
+        with self.assertRaises(RuntimeError), self.assertLogs('manifests.signing', 'ERROR'):
+            run_resign_job(claim_job(job.pk), chunk_size=2, progress=fail)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.signed_count), (ResignJob.Status.FAILED, 2))
+        self.assertEqual(job.last_lot_id, sorted(lot.pk for lot in self.lots)[1])
+
+        with mock.patch.object(signing, 'sign_manifest', wraps=sign_manifest) as sign:
+            job = run_resign_job(claim_job(job.pk), chunk_size=2)
+        self.assertEqual(sign.call_count, 3)
+        self.assertEqual((job.status, job.signed_count), (ResignJob.Status.COMPLETED, 5))
+        self.assertTrue(all(self.verified()))
+
+    def test_unfinished_job_is_reused_and_not_claimed_twice(self):
+        job, _ = create_resign_job(self.distributor)
+        self.assertEqual(create_resign_job(self.distributor), (job, False))
+        self.assertIsNotNone(claim_job(job.pk))
+        self.assertIsNone(claim_job(job.pk))  # Running, with a fresh heartbeat
+
+    def test_command_resigns_and_lists(self):
+        self.rotate_key()
+        out = io.StringIO()
+        call_command('resign_manifests', distributor=str(self.distributor.pk), chunk_size=2, stdout=out)
+        self.assertIn('re-signed 5 lots', out.getvalue())
+        self.assertTrue(all(self.verified()))
+
+        out = io.StringIO()
+        call_command('resign_manifests', list=True, stdout=out)
+        self.assertIn('COMPLETED 5/5', out.getvalue())
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Coalescing of concurrent identical computations (core/singleflight.py)."""
+
+    def test_concurrent_callers_share_one_computation(self):
+        flight = singleflight.SingleFlight(result_ttl=60)
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return 'result'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('lot', compute))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        while flight.stats['leaders'] + flight.stats['shared'] < 8:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats, {'leaders': 1, 'shared': 7})
+        self.assertEqual(sorted(shared for _, shared in results), [False] + [True] * 7)
+        self.assertEqual({result for result, _ in results}, {'result'})
+        # Reused within result_ttl
+        self.assertEqual(flight.do('lot', compute), ('result', True))
+        self.assertEqual(len(calls), 1)
+
+    def test_failures_reach_waiters_and_are_not_reused(self):
+        flight = singleflight.SingleFlight(result_ttl=60)
+        release = threading.Event()
+        errors = []
+
+        def fail():
+            release.wait(5)
+            raise LookupError('lot not found')
+
+        def call():
+            try:
+                flight.do('lot', fail)
+            except LookupError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        while flight.stats['leaders'] + flight.stats['shared'] < 3:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(flight.do('lot', lambda: 'found'), ('found', False))
+
+    def test_results_expire(self):
+        flight = singleflight.SingleFlight(result_ttl=0)
+        self.assertEqual(flight.do('lot', lambda: 1), (1, False))
+        self.assertEqual(flight.do('lot', lambda: 2), (2, False))
+
+    @override_settings(SINGLE_FLIGHT={'ENABLED': True, 'RESULT_TTL': 0.5, 'CROSS_WORKER': True, 'CACHE': 'default',
+                                      'LOCK_TIMEOUT': 5.0, 'POLL_INTERVAL': 0.001})
+    def test_other_workers_result_is_awaited(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        # Another worker holds the lock and publishes while this one polls
+        cache.add(f'{singleflight.KEY_PREFIX}lock:lot', 'other-worker')
+        publish = threading.Timer(
+            0.05, cache.set, args=(f'{singleflight.KEY_PREFIX}result:lot', {'value': 'theirs'}),
+        )
+        publish.start()
+        compute = mock.Mock(return_value='ours')
+        self.assertEqual(singleflight._coalesce_across_workers('lot', compute), 'theirs')
+        publish.join()
+        compute.assert_not_called()
+
+    @override_settings(SINGLE_FLIGHT={'ENABLED': True, 'RESULT_TTL': 0.5, 'CROSS_WORKER': True, 'CACHE': 'default',
+                                      'LOCK_TIMEOUT': 5.0, 'POLL_INTERVAL': 0.001})
+    def test_lock_holder_failing_lets_a_waiter_compute(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        cache.add(f'{singleflight.KEY_PREFIX}lock:lot', 'other-worker')
+        release = threading.Timer(0.05, cache.delete, args=(f'{singleflight.KEY_PREFIX}lock:lot',))
+        release.start()
+        self.assertEqual(singleflight._coalesce_across_workers('lot', lambda: 'ours'), 'ours')
+        release.join()
+
+
+class HeavyHitterTests(SimpleTestCase):
+    """Count-min sketch and top-k of hot_lots.py."""
+
+    def test_sketch_never_undercounts(self):
+        # A narrow sketch, so keys collide
+        sketch = hot_lots.CountMinSketch(width=64, depth=4)
+        counts = {f'lot-{i}': (i % 7) + 1 for i in range(200)}
+        for key, count in counts.items():
+            for _ in range(count):
+                sketch.add(key)
+        self.assertEqual(sketch.total, sum(counts.values()))
+        for key, count in counts.items():
+            self.assertGreaterEqual(sketch.estimate(key), count)
+
+        sketch.decay()
+        self.assertEqual(sketch.total, sum(counts.values()) // 2)
+        for key, count in counts.items():
+            self.assertGreaterEqual(sketch.estimate(key), count // 2)
+
+    def test_estimates_are_exact_without_collisions(self):
+        sketch = hot_lots.CountMinSketch(width=65536, depth=4)
+        for _ in range(10):
+            sketch.add('hot')
+        sketch.add('cold')
+        self.assertEqual((sketch.estimate('hot'), sketch.estimate('cold'), sketch.estimate('unseen')), (10, 1, 0))
+        sketch.decay()
+        self.assertEqual((sketch.estimate('hot'), sketch.estimate('cold')), (5, 0))
+
+    def test_top_k_keeps_the_heaviest_keys(self):
+        top = hot_lots.TopK(k=3)
+        counts = {}
+        for key in ['a', 'b', 'c', 'd', 'a', 'e', 'd', 'a', 'd', 'b', 'f']:
+            counts[key] = counts.get(key, 0) + 1
+            top.offer(key, counts[key])
+        self.assertEqual(top.items(), [('a', 3), ('d', 3), ('b', 2)])
+        top.decay()
+        self.assertEqual(top.items(), [('a', 1), ('d', 1), ('b', 1)])
+
+
+@override_settings(
+    RESPONSE_CACHE={'ENABLED': True, 'ALIAS': 'default', 'TIMEOUT': 300},
+    HOT_LOTS={'ENABLED': True, 'WIDTH': 1024, 'DEPTH': 4, 'TOP_K': 10, 'ADMISSION_THRESHOLD': 3,
+              'DECAY_INTERVAL': 600, 'PUBLISH_INTERVAL': 10, 'CACHE': 'default'},
+)
+class HotLotAdmissionTests(APITestCase):
+    """Only frequently scanned lots are admitted to the response cache."""
+
+    def setUp(self):
+        cache.clear()
+        hot_lots._tracker = None
+        self.addCleanup(setattr, hot_lots, '_tracker', None)
+        distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        medicine = Medicine.objects.create(name='Paracetamol', distributor=distributor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lot = LotManifest.objects.create(
+                batch_number='PCM-2026-KE-00142', expiry_date=date(2030, 1, 1),
+                medicine=medicine, distributor=distributor,
+            )
+
+    def scan(self):
+        response = self.client.get(f'/api/manifests/{self.lot.pk}/verify-qr/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response['X-Cache']
+
+    def test_lot_is_cached_once_it_is_hot(self):
+        # Scans 1-3 see fewer than three earlier scans: built, not stored
+        self.assertEqual([self.scan() for _ in range(3)], ['MISS'] * 3)
+        self.assertEqual(self.scan(), 'MISS')  # Admitted and stored
+        self.assertEqual(self.scan(), 'HIT')
+        stats = response_cache_stats()['endpoints']['lotmanifest.verify_qr']
+        self.assertEqual((stats['not_admitted'], stats['stores'], stats['hits']), (3, 1, 1))
+        self.assertEqual(hot_lots.merged_hot_lots(), [(str(self.lot.pk), 5)])
+
+
+class VerificationViewTests(TestCase):
+    """LotVerificationView rows follow the rows they are built from (verification_view.py)."""
+
+    def setUp(self):
+        self.distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        self.medicine = Medicine.objects.create(name='Paracetamol', strength='500mg', distributor=self.distributor)
+        self.user = User.objects.create_user(username='pharmacist', password='pw', role='Pharmacist')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lot = LotManifest(
+                batch_number='PCM-2026-KE-00142', expiry_date=date(2030, 1, 1),
+                medicine=self.medicine, distributor=self.distributor,
+            )
+            self.lot.digital_signature = sign_manifest(self.lot)
+            self.lot.save()
+
+    def row(self):
+        return LotVerificationView.objects.get(pk=self.lot.pk)
+
+    def assert_matches_source(self):
+        """The stored payload equals the one built from the source rows."""
+        lot = LotManifest.objects.select_related('medicine', 'distributor').get(pk=self.lot.pk)
+        payload, _ = verification_view.read_payload(self.lot.pk)
+        self.assertEqual(payload, build_verification_payload(lot))
+
+    def test_row_is_written_with_the_lot(self):
+        row = self.row()
+        self.assertEqual((row.medicine_name, row.distributor_name, row.is_authentic), ('Paracetamol', 'Acme Pharma', True))
+        self.assert_matches_source()
+
+    def test_medicine_and_distributor_changes_reach_the_row(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.medicine.name = 'Paracetamol Tablets'
+            self.medicine.save()
+            self.distributor.name = 'Acme Pharmaceuticals'
+            self.distributor.save()
+        self.assertEqual(
+            (self.row().medicine_name, self.row().distributor_name), ('Paracetamol Tablets', 'Acme Pharmaceuticals'),
+        )
+        self.assert_matches_source()
+
+    def test_key_change_unverifies_the_lot(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.distributor.public_key = 'cd' * 32
+            self.distributor.save()
+        self.assertFalse(self.row().is_authentic)
+        self.assert_matches_source()
+
+    def test_crowd_flags_are_counted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            flag = CrowdFlag.objects.create(
+                reporter_type='Pharmacist', issue_type='Quality Issue', description='Broken seal',
+                user=self.user, lot=self.lot,
+            )
+        self.assertEqual(self.row().flags_count, 1)
+        self.assert_matches_source()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            flag.is_resolved = True
+            flag.save()
+        self.assertEqual(self.row().flags_count, 0)
+
+    def test_rebuild_fills_missing_rows(self):
+        LotVerificationView.objects.all().delete()
+        self.assertIsNone(verification_view.read_payload(self.lot.pk))
+        self.assertEqual(verification_view.rebuild(), 1)
+        self.assert_matches_source()
+
+
+class VerifyQrFastPathTests(TestCase):
+    """The WSGI fast path (fast_path.py) answers verify-qr like the DRF view."""
+
+    def setUp(self):
+        # As the test client does: the fast path sends these signals itself,
+        # and closing the connection would end the test's transaction
+        for signal in (signals.request_started, signals.request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+        self.django = mock.Mock(wraps=WSGIHandler())
+        self.fast_path = VerifyQrFastPath(self.django)
+        distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        medicine = Medicine.objects.create(name='Paracetamol', strength='500mg', distributor=distributor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lot = LotManifest(
+                batch_number='PCM-2026-KE-00142', expiry_date=date(2030, 1, 1),
+                medicine=medicine, distributor=distributor,
+            )
+            self.lot.digital_signature = sign_manifest(self.lot)
+            self.lot.save()
+        self.url = f'/api/manifests/{self.lot.pk}/verify-qr/'
+
+    def call(self, url, **headers):
+        started = {}
+
+        def start_response(status, response_headers):
+            started['status'] = int(status.split()[0])
+            started['headers'] = dict(response_headers)
+
+        body = b''.join(self.fast_path(RequestFactory().get(url, **headers).environ, start_response))
+        return started['status'], started['headers'], body
+
+    def test_same_response_as_the_view(self):
+        status_code, headers, body = self.call(self.url)
+        self.django.assert_not_called()
+        expected = self.client.get(self.url)
+        self.assertEqual(status_code, expected.status_code)
+        self.assertEqual(json.loads(body), expected.json())
+        for header in ('Content-Type', 'X-Frame-Options', 'X-Content-Type-Options', 'Referrer-Policy'):
+            self.assertEqual(headers.get(header), expected.get(header), header)
+        # No session is read, so unlike Django it doesn't vary on Cookie
+        self.assertEqual(headers['Vary'], 'Accept, origin')
+
+    def test_lot_without_a_row_is_handed_to_django(self):
+        LotVerificationView.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            status_code, _, body = self.call(self.url)
+        self.django.assert_called_once()
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertTrue(json.loads(body)['is_authentic'])
+        self.assertTrue(LotVerificationView.objects.filter(pk=self.lot.pk).exists())
+
+    def test_unknown_lot_is_404_either_way(self):
+        url = f'/api/manifests/{uuid.uuid4()}/verify-qr/'
+        status_code, _, _ = self.call(url)
+        self.assertEqual(status_code, self.client.get(url).status_code)
+        self.assertEqual(status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_browsable_api_and_other_paths_go_to_django(self):
+        self.call(self.url, HTTP_ACCEPT='text/html')
+        self.call(f'/api/manifests/{self.lot.pk}/')
+        self.assertEqual(self.django.call_count, 2)
+
+
+@override_settings(ROOT_URLCONF='core.urls_asgi')
+class AsyncVerifyViewTests(TestCase):
+    """The async views of the ASGI URLconf (async_views.py) answer like the DRF views."""
+
+    def setUp(self):
+        distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        medicine = Medicine.objects.create(name='Paracetamol', strength='500mg', distributor=distributor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lot = LotManifest(
+                batch_number='PCM-2026-KE-00142', expiry_date=date(2030, 1, 1),
+                medicine=medicine, distributor=distributor,
+            )
+            self.lot.digital_signature = sign_manifest(self.lot)
+            self.lot.save()
+        self.admin = User.objects.create_user(username='admin', password='pw', role='Admin')
+
+    def test_routes(self):
+        self.assertIs(resolve(f'/api/manifests/{self.lot.pk}/verify-qr/').func, async_views.verify_qr)
+        self.assertIs(resolve(f'/api/manifests/{self.lot.pk}/verify/').func, async_views.verify)
+        # Ids that aren't UUIDs fall through to the DRF routes
+        self.assertIsNot(resolve('/api/manifests/not-a-uuid/verify-qr/').func, async_views.verify_qr)
+
+    async def test_verify_qr_same_response_as_the_view(self):
+        url = f'/api/manifests/{self.lot.pk}/verify-qr/'
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.settings(ROOT_URLCONF='core.urls'):
+            expected = await sync_to_async(self.client.get)(url)
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual(response['Allow'], expected['Allow'])
+
+    async def test_verify_qr_unknown_lot(self):
+        response = await self.async_client.get(f'/api/manifests/{uuid.uuid4()}/verify-qr/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_verify_with_an_admin_token(self):
+        token = await sync_to_async(lambda: str(AccessToken.for_user(self.admin)))()
+        response = await self.async_client.post(
+            f'/api/manifests/{self.lot.pk}/verify/', headers={'Authorization': f'Bearer {token}'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()['is_authentic'])
+
+        response = await self.async_client.post(
+            f'/api/manifests/{uuid.uuid4()}/verify/', headers={'Authorization': f'Bearer {token}'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_verify_without_a_token_is_answered_by_drf(self):
+        response = await self.async_client.post(f'/api/manifests/{self.lot.pk}/verify/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ShipmentDeletionTests(APITestCase):
+    """Deleting shipment-signed lots and their distributor."""
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='pw', role='Admin'))
+        self.distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        medicine = Medicine.objects.create(name='Paracetamol', distributor=self.distributor)
+        lots = [
+            LotManifest(
+                batch_number=f'PCM-2026-KE-{index:05}', expiry_date=date(2030, 1, 1),
+                medicine=medicine, distributor=self.distributor,
+            )
+            for index in range(5)
+        ]
+        self.shipment = sign_shipment(self.distributor, lots)
+        LotManifest.objects.bulk_create(lots)
+        self.lots = lots
+
+    def test_shipment_lots_verify(self):
+        for lot in LotManifest.objects.filter(shipment=self.shipment):
+            self.assertTrue(lot.verify_signature())
+
+    def test_distributor_with_shipment_lots_is_deleted(self):
+        response = self.client.delete(f'/api/distributors/{self.distributor.pk}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(ShipmentRoot.objects.exists())
+        self.assertFalse(LotManifest.objects.exists())
+
+    def test_root_is_not_deleted_while_its_lots_exist(self):
+        with self.assertRaises(RestrictedError):
+            self.shipment.delete()
+        self.assertEqual(LotManifest.objects.filter(shipment=self.shipment).count(), 5)
+
+
+class PublishedPagesTests(TestCase):
+    """Static verification pages (published_pages.py)."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(VERIFICATION_PAGES={'ENABLED': True, 'ROOT': directory, 'SERVE': False})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        medicine = Medicine.objects.create(name='Paracetamol', distributor=distributor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lot = LotManifest.objects.create(
+                batch_number='PCM-2026-KE-00142', expiry_date=date(2030, 1, 1),
+                medicine=medicine, distributor=distributor,
+            )
+        self.lot_dir = os.path.join(directory, published_pages.LOT_DIR, str(self.lot.pk))
+
+    def published(self):
+        with open(os.path.join(self.lot_dir, 'index.json'), 'rb') as f:
+            return json.loads(f.read())
+
+    def test_lot_is_published_on_commit(self):
+        self.assertEqual(self.published()['trust_status'], 'SAFE')
+
+    def test_late_publish_of_an_older_refresh_keeps_the_latest_row(self):
+        # A refresh commits a counterfeit flag and publishes; a refresh that
+        # committed earlier publishes after it. Both publish the current row.
+        LotVerificationView.objects.filter(pk=self.lot.pk).update(
+            trust_score=Decimal('40.00'), trust_status='WARNING', flags_count=3,
+        )
+        self.assertEqual(published_pages.publish_lots([self.lot.pk]), 1)
+        self.assertEqual(published_pages.publish_lots([self.lot.pk]), 0)
+        self.assertEqual(self.published()['trust_status'], 'WARNING')
+
+        digest, _, _ = published_pages.render(self.published())
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.lot_dir) if not name.startswith('index.')),
+            [f'{digest}.html', f'{digest}.json'],
+        )
+
+    def test_deleted_lot_is_not_republished(self):
+        lot_id = self.lot.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lot.delete()
+        self.assertEqual(published_pages.publish_lots([lot_id]), 0)
+        self.assertFalse(os.path.exists(self.lot_dir))
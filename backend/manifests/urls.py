@@ -3,15 +3,35 @@ URL configuration for manifests app.
 
 This module defines URL patterns for lot manifest management and signature verification.
 """
-from django.urls import path, include
+from django.urls import path, include, re_path
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.routers import DefaultRouter
 
-from .views import LotManifestViewSet
+from .renderers import LabelImageRenderer
+from .views import LotManifestViewSet, hot_lots_report, lot_filter_stats, verify_short_code
 
 # Create a router for ViewSets
 router = DefaultRouter()
 router.register(r'manifests', LotManifestViewSet, basename='lotmanifest')
 
+# Per-lot label images (/manifests/{id}/qr.png); the router's format suffix
+# patterns would otherwise treat ".png" as a response format
+qr_image = LotManifestViewSet.as_view(
+    {'get': 'qr_image'},
+    permission_classes=[AllowAny],
+    renderer_classes=[JSONRenderer, LabelImageRenderer],
+)
+
 urlpatterns = [
+    re_path(
+        r'^manifests/(?P<pk>[^/.]+)/qr\.(?P<image_format>png|svg)$',
+        qr_image,
+        name='lotmanifest-qr-image',
+    ),
+    # Short-code verification (compact QR codes: https://rxverify.app/v/{code})
+    re_path(r'^v/(?P<code>[^/]+)/?$', verify_short_code, name='verify-short-code'),
+    path('admin/lot-filter/', lot_filter_stats, name='lot-filter-stats'),
+    path('admin/hot-lots/', hot_lots_report, name='hot-lots'),
     path('', include(router.urls)),
 ]
@@ -0,0 +1,153 @@
+"""
+Patient-facing verification results.
+
+Shared by the endpoints a patient's scan can land on:
+GET /api/manifests/{id}/verify-qr/ (UUID QR codes) and GET /api/v/{code}
+(short-code QR codes).
+
+Scans are answered from the LotVerificationView projection
+(payload_from_view); build_verification_payload computes the same result
+from the source rows, for projection refreshes and lots without a row yet.
+signature_result is the response of the signature check
+(POST /api/manifests/{id}/verify/). The sync DRF views and the async ASGI
+views (async_views.py) share these builders.
+"""
+import asyncio
+
+from django.utils import timezone
+
+
+def trust_status(trust_score):
+    """
+    Map a trust score to the traffic-light status shown to patients.
+
+    Args:
+        trust_score: Score from 0 to 100
+
+    Returns:
+        str: "SAFE" (>= 80), "CAUTION" (>= 60) or "WARNING"
+    """
+    if trust_score >= 80:
+        return "SAFE"
+    if trust_score >= 60:
+        return "CAUTION"
+    return "WARNING"
+
+
+def _verification_message(is_authentic):
+    return "Verified ✓" if is_authentic else "⚠️ Verification Failed - Possible Counterfeit"
+
+
+def build_verification_payload(lot_manifest):
+    """
+    Build the patient-friendly verification result for a lot.
+
+    Args:
+        lot_manifest: LotManifest instance (medicine and distributor are read)
+
+    Returns:
+        dict: Verification data
+    """
+    # Count unresolved flags
+    flags_count = lot_manifest.crowd_flags.filter(is_resolved=False).count()
+
+    # Verify signature
+    is_authentic = lot_manifest.verify_signature()
+
+    return _lot_payload(lot_manifest, flags_count, is_authentic)
+
+
+async def abuild_verification_payload(lot_manifest, executor=None):
+    """
+    Async build_verification_payload(), for the ASGI views (see async_views.py).
+
+    The flag count uses the async ORM; the Ed25519 check is CPU-bound and
+    runs on a thread pool so it doesn't block the event loop.
+
+    Args:
+        lot_manifest: LotManifest with medicine, distributor and shipment loaded
+        executor: concurrent.futures executor for the signature check
+            (None: the event loop's default executor)
+
+    Returns:
+        dict: Verification data
+    """
+    flags_count = await lot_manifest.crowd_flags.filter(is_resolved=False).acount()
+    loop = asyncio.get_running_loop()
+    is_authentic = await loop.run_in_executor(executor, lot_manifest.verify_signature)
+    return _lot_payload(lot_manifest, flags_count, is_authentic)
+
+
+def _lot_payload(lot_manifest, flags_count, is_authentic):
+    trust_score = float(lot_manifest.trust_score)
+    return {
+        "lot_id": str(lot_manifest.id),
+        "batch_number": lot_manifest.batch_number,
+        "medicine": {
+            "name": lot_manifest.medicine.name,
+            "active_ingredient": lot_manifest.medicine.active_ingredient,
+            "strength": lot_manifest.medicine.strength,
+            "dosage_form": lot_manifest.medicine.dosage_form,
+        },
+        "distributor": lot_manifest.distributor.name,
+        "expiry_date": lot_manifest.expiry_date.isoformat(),
+        "trust_score": trust_score,
+        "trust_status": trust_status(trust_score),
+        "is_authentic": is_authentic,
+        "verification_message": _verification_message(is_authentic),
+        "flags_count": flags_count,
+        "can_report": True,
+        "report_url": "/api/flags/"
+    }
+
+
+def signature_result(lot_manifest, is_authentic):
+    """
+    Build the response of POST /api/manifests/{id}/verify/.
+
+    Args:
+        lot_manifest: LotManifest that was checked
+        is_authentic: Result of its signature check
+
+    Returns:
+        dict: is_authentic, trust_score, status, signature_mode and timestamp
+    """
+    return {
+        "is_authentic": is_authentic,
+        "trust_score": str(lot_manifest.trust_score),
+        "status": "Verified" if is_authentic else "Forged/Tampered",
+        "signature_mode": "shipment" if lot_manifest.shipment_id else "lot",
+        "timestamp": timezone.now().isoformat()
+    }
+
+
+def payload_from_view(view):
+    """
+    Build the verification result from a lot's projection row.
+
+    Args:
+        view: LotVerificationView instance
+
+    Returns:
+        dict: Verification data, identical to build_verification_payload()
+    """
+    trust_score = float(view.trust_score)
+    return {
+        "lot_id": str(view.lot_id),
+        "batch_number": view.batch_number,
+        "medicine": {
+            "name": view.medicine_name,
+            "active_ingredient": view.active_ingredient,
+            "strength": view.strength,
+            "dosage_form": view.dosage_form,
+        },
+        "distributor": view.distributor_name,
+        "expiry_date": view.expiry_date.isoformat(),
+        "trust_score": trust_score,
+        "trust_status": view.trust_status,
+        "is_authentic": view.is_authentic,
+        "verification_message": _verification_message(view.is_authentic),
+        "flags_count": view.flags_count,
+        "can_report": True,
+        "report_url": "/api/flags/"
+    }
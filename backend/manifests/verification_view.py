@@ -0,0 +1,227 @@
+"""
+Maintenance of the LotVerificationView projection.
+
+verify-qr used to join lot_manifests, medicines and distributors, count the
+lot's unresolved crowd flags and check its Ed25519 signature on every scan.
+The projection stores that result per lot, so a scan reads one row by
+primary key (or short code), and the work moves to the writes that change it:
+
+- LotManifest saved: its row is refreshed. Crowd flag changes reach the row
+  this way too, because LotManifest.update_trust_score() saves the lot.
+- Medicine saved: the medicine columns of its lots' rows are updated in place.
+- Distributor saved: the name is updated in place; if the public key
+  changed, its lots are refreshed (their signatures now check against the
+  new key).
+- ShipmentRoot saved: its lots are refreshed (root signature changed).
+- Writes that send no signals (shipment bulk_create, re-sign bulk_update,
+  crowd flag admin actions) refresh the affected lots explicitly.
+
+Refreshes run when the transaction commits, and lock the lots' rows while
+they read them, so concurrent writes to a lot leave its row as of the last
+commit. LotManifest deletes cascade to the row.
+
+With VERIFICATION_PAGES enabled, every row written or updated here also
+re-publishes the lot's static page (see published_pages.py).
+
+Lots without a row (created before the projection existed, or by code
+that bypasses the above) are answered from the source rows and get their
+row on first scan; `manage.py rebuild_verification_views` fills them all.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from . import published_pages
+from .verification import payload_from_view, trust_status
+
+logger = logging.getLogger(__name__)
+
+# Columns rewritten on refresh (everything but the primary key)
+REFRESHED_FIELDS = [
+    'short_code', 'batch_number', 'expiry_date', 'medicine', 'distributor',
+    'medicine_name', 'active_ingredient', 'strength', 'dosage_form', 'distributor_name',
+    'trust_score', 'trust_status', 'is_authentic', 'flags_count', 'refreshed_at',
+]
+
+
+def project(lot_manifest, flags_count):
+    """
+    Build the projection row of a lot.
+
+    Args:
+        lot_manifest: LotManifest with medicine, distributor and shipment loaded
+        flags_count: Number of unresolved crowd flags on the lot
+
+    Returns:
+        LotVerificationView: Unsaved row
+    """
+    from .models import LotVerificationView
+
+    medicine = lot_manifest.medicine
+    return LotVerificationView(
+        lot_id=lot_manifest.pk,
+        short_code=lot_manifest.short_code,
+        batch_number=lot_manifest.batch_number,
+        expiry_date=lot_manifest.expiry_date,
+        medicine_id=lot_manifest.medicine_id,
+        distributor_id=lot_manifest.distributor_id,
+        medicine_name=medicine.name,
+        active_ingredient=medicine.active_ingredient,
+        strength=medicine.strength,
+        dosage_form=medicine.dosage_form,
+        distributor_name=lot_manifest.distributor.name,
+        trust_score=lot_manifest.trust_score,
+        trust_status=trust_status(float(lot_manifest.trust_score)),
+        is_authentic=lot_manifest.verify_signature(),
+        flags_count=flags_count,
+    )
+
+
+def refresh_lots(lot_ids):
+    """
+    Recompute and upsert the rows of the given lots (ids of deleted lots are ignored).
+
+    Args:
+        lot_ids: Iterable of lot ids
+
+    Returns:
+        int: Number of rows written
+    """
+    from .models import LotManifest, LotVerificationView
+
+    lot_ids = list(lot_ids)
+    if not lot_ids:
+        return 0
+    with transaction.atomic():
+        # Serialize refreshes of the same lot; the read below then sees every
+        # committed change (the aggregate can't be combined with FOR UPDATE)
+        list(LotManifest.objects.select_for_update().filter(pk__in=lot_ids).values_list('pk', flat=True))
+        lots = (
+            LotManifest.objects.filter(pk__in=lot_ids)
+            .select_related('medicine', 'distributor', 'shipment')
+            .annotate(unresolved_flags=Count('crowd_flags', filter=Q(crowd_flags__is_resolved=False)))
+        )
+        rows = [project(lot, lot.unresolved_flags) for lot in lots]
+        LotVerificationView.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['lot'],
+            update_fields=REFRESHED_FIELDS,
+        )
+    published_pages.publish_lots_on_commit([row.lot_id for row in rows])
+    return len(rows)
+
+
+def refresh_queryset(queryset, chunk_size=1000, progress=None):
+    """
+    Refresh the rows of every lot in a LotManifest queryset, in id-ordered chunks.
+
+    Args:
+        queryset: LotManifest queryset
+        chunk_size: Lots per refresh transaction
+        progress: Optional callable(refreshed_count)
+
+    Returns:
+        int: Number of rows written
+    """
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    refreshed, last_id = 0, None
+    while True:
+        chunk = ids if last_id is None else ids.filter(pk__gt=last_id)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return refreshed
+        refreshed += refresh_lots(chunk)
+        last_id = chunk[-1]
+        if progress is not None:
+            progress(refreshed)
+
+
+def read_payload(lot_id):
+    """
+    Read a lot's verification result with one primary-key lookup.
+
+    Shared by LotManifestViewSet.verify_qr and the WSGI fast path (fast_path.py).
+
+    Args:
+        lot_id: uuid.UUID of the lot
+
+    Returns:
+        tuple: (payload, response cache tags of the distributor and medicine),
+        or None if the lot has no row (unknown lot, or not projected yet)
+    """
+    from .models import LotVerificationView
+
+    return _row_payload(LotVerificationView.objects.filter(pk=lot_id).first())
+
+
+async def aread_payload(lot_id):
+    """Async read_payload(), for the ASGI views (see async_views.py)."""
+    from .models import LotVerificationView
+
+    return _row_payload(await LotVerificationView.objects.filter(pk=lot_id).afirst())
+
+
+def _row_payload(row):
+    if row is None:
+        return None
+    return payload_from_view(row), [f'distributor:{row.distributor_id}', f'medicine:{row.medicine_id}']
+
+
+def _on_commit(refresh):
+    """Run a refresh when the current transaction commits (now, outside one)."""
+    def run():
+        try:
+            refresh()
+        except Exception:
+            # The write itself has committed; a stale row is fixed by the
+            # next change to the lot or by rebuild_verification_views
+            logger.exception('Failed to refresh lot verification views')
+
+    transaction.on_commit(run)
+
+
+def refresh_lots_on_commit(lot_ids):
+    """Refresh the rows of the given lots once the current transaction commits."""
+    lot_ids = list(lot_ids)
+    if lot_ids:
+        _on_commit(lambda: refresh_lots(lot_ids))
+
+
+def refresh_queryset_on_commit(queryset):
+    """Refresh the rows of every lot in a queryset once the current transaction commits."""
+    _on_commit(lambda: refresh_queryset(queryset))
+
+
+def update_medicine(medicine):
+    """Copy a medicine's displayed fields into its lots' rows (one UPDATE)."""
+    from .models import LotVerificationView
+
+    LotVerificationView.objects.filter(medicine_id=medicine.pk).update(
+        medicine_name=medicine.name,
+        active_ingredient=medicine.active_ingredient,
+        strength=medicine.strength,
+        dosage_form=medicine.dosage_form,
+    )
+    published_pages.publish_queryset_on_commit(LotVerificationView.objects.filter(medicine_id=medicine.pk))
+
+
+def update_distributor(distributor):
+    """Copy a distributor's name into its lots' rows (one UPDATE)."""
+    from .models import LotVerificationView
+
+    LotVerificationView.objects.filter(distributor_id=distributor.pk).update(distributor_name=distributor.name)
+    published_pages.publish_queryset_on_commit(LotVerificationView.objects.filter(distributor_id=distributor.pk))
+
+
+def rebuild(chunk_size=1000, progress=None):
+    """
+    Refresh the rows of all lots.
+
+    Returns:
+        int: Number of rows written
+    """
+    from .models import LotManifest
+
+    return refresh_queryset(LotManifest.objects.all(), chunk_size=chunk_size, progress=progress)
@@ -4,15 +4,69 @@ API views for lot manifest and signature verification management.
 This module provides ViewSets for lot manifest CRUD operations with a custom
 signature verification endpoint.
 """
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiResponse, OpenApiExample
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiResponse, OpenApiExample, OpenApiParameter
+from drf_spectacular.types import OpenApiTypes
+
+from . import batch_index, hot_lots, lot_filter, short_codes, verification_view
+from .label_cache import archive_member_name, get_label, iter_label_pngs, stream_zip
+from .label_hashes import label_hash, render_fingerprint
+from .models import LotManifest, LotVerificationView
+from .qr_generator import LabelSpec, iter_label_specs
+from .serializers import LotManifestSerializer, ShipmentCreateSerializer, ShipmentRootSerializer
+from .verification import build_verification_payload, payload_from_view, signature_result
+from accounts.permissions import IsAdmin, IsAdminOrReadOnly
+from core.cache import ResponseCacheMixin
+from core.conditional import ConditionalRequestMixin
+from core.singleflight import coalesce
+from core.pagination import (
+    EstimatedCountPageNumberPagination,
+    ExpiryDateKeysetPagination,
+    PaginationModeMixin,
+    pagination_mode_parameters,
+)
 
-from .models import LotManifest
-from .serializers import LotManifestSerializer
-from accounts.permissions import IsAdminOrReadOnly
+
+QR_IMAGE_CONTENT_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+# Patient verification result (see verification.build_verification_payload)
+VERIFICATION_RESPONSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'lot_id': {'type': 'string', 'format': 'uuid'},
+        'batch_number': {'type': 'string'},
+        'medicine': {
+            'type': 'object',
+            'properties': {
+                'name': {'type': 'string'},
+                'active_ingredient': {'type': 'string'},
+                'strength': {'type': 'string'},
+                'dosage_form': {'type': 'string'},
+            }
+        },
+        'distributor': {'type': 'string'},
+        'trust_score': {'type': 'number'},
+        'trust_status': {'type': 'string', 'enum': ['SAFE', 'CAUTION', 'WARNING']},
+        'is_authentic': {'type': 'boolean'},
+        'verification_message': {'type': 'string'},
+        'expiry_date': {'type': 'string', 'format': 'date'},
+        'flags_count': {'type': 'integer'},
+        'can_report': {'type': 'boolean'},
+        'report_url': {'type': 'string'},
+    }
+}
 
 
 @extend_schema_view(
@@ -20,6 +74,7 @@ from accounts.permissions import IsAdminOrReadOnly
         summary="List all lot manifests",
         description="Retrieve a paginated list of lot manifests with filtering options.",
         tags=['Manifests'],
+        parameters=pagination_mode_parameters(ExpiryDateKeysetPagination),
     ),
     retrieve=extend_schema(
         summary="Retrieve lot manifest details",
@@ -135,11 +190,11 @@ from accounts.permissions import IsAdminOrReadOnly
     ),
     destroy=extend_schema(
         summary="Delete lot manifest",
-        description="Permanently delete a lot manifest from the system. Requires admin role.",
+        description="Permanently delete a lot manifest from the system. Requires admin role. Its receipt events are kept, with the batch number recorded at the time.",
         tags=['Manifests'],
     ),
 )
-class LotManifestViewSet(viewsets.ModelViewSet):
+class LotManifestViewSet(ConditionalRequestMixin, ResponseCacheMixin, PaginationModeMixin, viewsets.ModelViewSet):
     """
     ViewSet for lot manifest management and signature verification.
     
@@ -152,13 +207,18 @@ class LotManifestViewSet(viewsets.ModelViewSet):
     - Verify digital signatures
     - Filter by expiry date, trust score, medicine, distributor
     - Search by batch number
+    - Fuzzy batch number lookup for mistyped or partial codes
+    - Streaming ZIP download of QR labels (admins and distributors)
+    - Opt-in cursor (?pagination=cursor) or estimated-count pagination
+    - Response cache for list, retrieve and verify-qr (see core/cache.py)
+    - ETag validators and 304 answers for list and retrieve (see core/conditional.py)
     
     Permissions:
     - Read, Verify: All authenticated users
     - Write (Create, Update, Delete): Admin users only
     """
     
-    queryset = LotManifest.objects.all().select_related('medicine', 'distributor')
+    queryset = LotManifest.objects.all().select_related('medicine', 'distributor', 'shipment')
     serializer_class = LotManifestSerializer
     permission_classes = [IsAdminOrReadOnly]
     
@@ -168,6 +228,52 @@ class LotManifestViewSet(viewsets.ModelViewSet):
     ordering_fields = ['expiry_date', 'trust_score', 'batch_number']
     ordering = ['-expiry_date']  # Default ordering (newest first)
     
+    # Opt-in pagination modes for large catalogues
+    pagination_modes = {
+        'cursor': ExpiryDateKeysetPagination,
+        'estimated': EstimatedCountPageNumberPagination,
+    }
+    
+    # Cached reads, invalidated by the lot, distributor, medicine and crowd
+    # flag signals (see manifests/signals.py)
+    response_cache_actions = ('list', 'retrieve', 'verify_qr')
+    response_cache_list_tags = ('lots',)
+    
+    # Serialized lots show their medicine's and distributor's names
+    conditional_related = ('medicine', 'distributor')
+    
+    def admit_response(self):
+        """
+        Only cache single-lot responses of frequently scanned lots (see hot_lots.py).
+        
+        Returns:
+            bool: True for list pages and lots at or above the admission threshold
+        """
+        if self.action in ('retrieve', 'verify_qr'):
+            return hot_lots.is_hot(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        return True
+    
+    def get_cache_tags(self, lot_manifest):
+        """
+        Response cache tags of a lot: the lot and the rows its payload shows.
+        
+        Returns:
+            list: lot, distributor and medicine tags
+        """
+        return [
+            f'lot:{lot_manifest.pk}',
+            f'distributor:{lot_manifest.distributor_id}',
+            f'medicine:{lot_manifest.medicine_id}',
+        ]
+    
+    def list(self, request, *args, **kwargs):
+        """List lot manifests (response cached, see core/cache.py)."""
+        return self.cached_response(super().list, request, *args, **kwargs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a lot manifest (response cached, see core/cache.py)."""
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+    
     def get_queryset(self):
         """
         Optionally filter lot manifests by various criteria.
@@ -203,6 +309,361 @@ class LotManifestViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    @extend_schema(
+        summary="Fuzzy batch number lookup",
+        description="""
+        Find lot manifests whose batch number is close to a mistyped or partially
+        legible code, e.g. `PCM-2026-KE-0O142` (letter O instead of zero).
+        
+        Served from an in-process trigram index, so the query never scans the
+        lot table. Separators and case are ignored.
+        
+        **Matching:**
+        - Results are ranked by edit distance (insertions, deletions, substitutions)
+        - `partial=true` matches the query against any part of the batch number,
+          for codes where only a fragment is readable
+        - Lots created or renamed on other workers show up within a few seconds
+        
+        Each result is the regular lot manifest representation plus `distance`.
+        """,
+        tags=['Manifests'],
+        parameters=[
+            OpenApiParameter(
+                name='batch',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description='Batch number as read from the packaging',
+                required=True,
+                examples=[
+                    OpenApiExample('Mistyped', value='PCM-2026-KE-0O142'),
+                    OpenApiExample('Fragment', value='KE-001'),
+                ]
+            ),
+            OpenApiParameter(
+                name='limit',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description='Maximum number of matches (default 5, max 20)'
+            ),
+            OpenApiParameter(
+                name='max_distance',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description='Largest edit distance to return (default 3, max 5)'
+            ),
+            OpenApiParameter(
+                name='partial',
+                type=OpenApiTypes.BOOL,
+                location=OpenApiParameter.QUERY,
+                description='Match the query against any part of the batch number'
+            ),
+        ],
+        responses={
+            200: OpenApiTypes.OBJECT,
+            400: OpenApiResponse(description="Missing batch parameter"),
+        },
+    )
+    @action(detail=False, methods=['get'])
+    def lookup(self, request):
+        """
+        Return the lots with the nearest batch numbers.
+        
+        Args:
+            request: The HTTP request object with ?batch= and optional
+                     ?limit=, ?max_distance= and ?partial=
+        
+        Returns:
+            Response: {"query": ..., "results": [lot manifest + distance, ...]}
+        """
+        query = request.query_params.get('batch', '').strip()
+        if not query:
+            return Response(
+                {'error': 'batch query parameter is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = max(min(int(request.query_params.get('limit', 5)), 20), 1)
+        except ValueError:
+            limit = 5  # Ignore invalid limit values
+        try:
+            max_distance = max(min(int(request.query_params.get('max_distance', 3)), 5), 0)
+        except ValueError:
+            max_distance = 3  # Ignore invalid distance values
+        partial = request.query_params.get('partial', '').lower() == 'true'
+        
+        matches = batch_index.get_index().search(
+            query, limit=limit, max_distance=max_distance, partial=partial
+        )
+        
+        # Fetch the matched lots in one query and keep the index's ranking
+        lots = self.get_queryset().in_bulk([lot_id for lot_id, _ in matches])
+        results = []
+        for lot_id, distance in matches:
+            lot = lots.get(lot_id)
+            if lot is None:
+                continue  # Deleted or filtered out since it was indexed
+            data = self.get_serializer(lot).data
+            data['distance'] = distance
+            results.append(data)
+        
+        return Response({'query': query, 'results': results}, status=status.HTTP_200_OK)
+    
+    @extend_schema(
+        summary="Register a shipment of lots with one signature",
+        description="""
+        Create many lot manifests at once, signed as a **Merkle tree**: the
+        lots are hashed into a tree, only the root is signed with Ed25519,
+        and each lot stores its inclusion proof.
+        
+        **Why:** one signature per shipment instead of one per lot, and
+        verification needs one cached root-signature check per shipment plus
+        a few SHA-256 hashes per lot.
+        
+        **Request:**
+        - **distributor**: Distributor ID (its key signs the root)
+        - **lots**: List of `{batch_number, expiry_date, medicine}`
+          (up to SHIPMENT_MAX_LOTS)
+        
+        All lots are validated in bulk and inserted in one transaction, so a
+        shipment is registered completely or not at all.
+        
+        **Admin only.**
+        """,
+        tags=['Manifests'],
+        request=ShipmentCreateSerializer,
+        responses={
+            201: OpenApiResponse(
+                description="Shipment root and created lots",
+                response={
+                    'type': 'object',
+                    'properties': {
+                        'shipment': {'type': 'object'},
+                        'lots': {
+                            'type': 'array',
+                            'items': {
+                                'type': 'object',
+                                'properties': {
+                                    'id': {'type': 'string', 'format': 'uuid'},
+                                    'batch_number': {'type': 'string'},
+                                    'short_code': {'type': 'string'},
+                                    'merkle_index': {'type': 'integer'},
+                                }
+                            }
+                        },
+                    }
+                }
+            ),
+            400: OpenApiResponse(description="Invalid lots (duplicates, unknown medicine, too many)"),
+            403: OpenApiResponse(description="Not an admin"),
+        },
+    )
+    @action(detail=False, methods=['post'], pagination_class=None)
+    def shipments(self, request):
+        """
+        Bulk-create a shipment of Merkle-signed lot manifests.
+        
+        Args:
+            request: The HTTP request object with distributor and lots
+        
+        Returns:
+            Response: The shipment root and the created lots' ids
+        """
+        serializer = ShipmentCreateSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        shipment = serializer.save()
+        
+        return Response({
+            'shipment': ShipmentRootSerializer(shipment).data,
+            'lots': [
+                {
+                    'id': str(lot.id),
+                    'batch_number': lot.batch_number,
+                    'short_code': lot.short_code,
+                    'merkle_index': lot.merkle_index,
+                }
+                for lot in shipment.created_lots
+            ],
+        }, status=status.HTTP_201_CREATED)
+    
+    @extend_schema(
+        summary="Download QR labels as a ZIP",
+        description="""
+        Stream a ZIP with one labelled QR code PNG (`{batch_number}.png`) per
+        selected lot, e.g. a distributor's lots for printing, without shell
+        access to the `generate_qr_codes` command. Batch numbers with characters other
+        than letters, digits, `.`, `_` and `-` have them replaced by `_` and
+        the lot id appended (`{batch_number}-{lot_id}.png`), keeping names unique.
+        
+        **How It Works:**
+        - Labels are rendered on the fly on a bounded worker pool
+        - Labels whose content (batch number, medicine name, layout) is unchanged
+          are served from the label cache instead of being re-rendered
+        - The archive is streamed as it is built, so downloads start immediately
+          and server memory stays flat for any number of lots
+        
+        **Admin-only access.** Distributor accounts aren't linked to a
+        distributor yet, so they can't be limited to their own lots.
+        """,
+        tags=['Manifests'],
+        parameters=[
+            OpenApiParameter(
+                name='distributor',
+                type=OpenApiTypes.UUID,
+                location=OpenApiParameter.QUERY,
+                description='Only lots of this distributor'
+            ),
+            OpenApiParameter(
+                name='medicine',
+                type=OpenApiTypes.UUID,
+                location=OpenApiParameter.QUERY,
+                description='Only lots of this medicine'
+            ),
+            OpenApiParameter(
+                name='expiry_after',
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description='Only lots expiring after this date (YYYY-MM-DD)'
+            ),
+        ],
+        responses={
+            (200, 'application/zip'): OpenApiTypes.BINARY,
+            400: OpenApiResponse(description="Invalid expiry_after date"),
+            403: OpenApiResponse(description="Not an admin"),
+            404: OpenApiResponse(description="No lot manifests match the filters"),
+        },
+    )
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAdmin],
+        url_path='qr-archive',
+        pagination_class=None,
+    )
+    def qr_archive(self, request):
+        """
+        Stream a ZIP of QR labels for the selected lots.
+        
+        Args:
+            request: The HTTP request object with optional ?distributor=,
+                     ?medicine= and ?expiry_after= filters
+        
+        Returns:
+            StreamingHttpResponse: application/zip attachment
+        """
+        queryset = self.get_queryset().order_by('batch_number')
+        
+        # Filter by expiry date if param provided
+        expiry_after = request.query_params.get('expiry_after', None)
+        if expiry_after:
+            expiry_date = parse_date(expiry_after)
+            if expiry_date is None:
+                return Response(
+                    {'error': 'expiry_after must be a date (YYYY-MM-DD)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = queryset.filter(expiry_date__gt=expiry_date)
+        
+        if not queryset.exists():
+            return Response(
+                {'error': 'No lot manifests match the filters'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        labels = iter_label_pngs(iter_label_specs(queryset))
+        entries = ((archive_member_name(spec), png) for spec, png, _ in labels)
+        response = StreamingHttpResponse(stream_zip(entries), content_type='application/zip')
+        filename = f"qr-labels-{timezone.localdate().isoformat()}.zip"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    @extend_schema(
+        summary="Get a lot's QR label image",
+        operation_id='manifests_qr_image_retrieve',
+        description="""
+        Return the labelled QR code of a single lot as PNG (`qr.png`) or SVG
+        (`qr.svg`), e.g. for an `<img>` tag in a dashboard.
+        
+        **Public endpoint - no authentication required.** The label only
+        encodes the public verification URL, and browsers cannot send a JWT
+        with image requests.
+        
+        **Caching:**
+        - Labels are rendered once and then served from the label cache,
+          keyed by a hash of their content and render settings
+        - The strong **ETag** is that content hash, so `If-None-Match`
+          revalidation returns **304 Not Modified** without rendering or
+          reading the cache
+        - `Cache-Control: public, max-age=QR_IMAGE_MAX_AGE` by default. URLs
+          carrying the current hash as `?v=` (the `qr_image_url` field of
+          lot manifests) are cached for a year as `immutable`, because a
+          changed label gets a new URL
+        """,
+        tags=['Manifests'],
+        parameters=[
+            OpenApiParameter(
+                name='image_format',
+                type=str,
+                location=OpenApiParameter.PATH,
+                enum=['png', 'svg'],
+                description='Image format (file extension)'
+            ),
+            OpenApiParameter(
+                name='v',
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description='Content hash from qr_image_url (enables immutable caching)'
+            ),
+        ],
+        responses={
+            (200, 'image/png'): OpenApiTypes.BINARY,
+            (200, 'image/svg+xml'): OpenApiTypes.BINARY,
+            304: OpenApiResponse(description="Label unchanged (ETag matched)"),
+            404: OpenApiResponse(description="Lot manifest not found"),
+        },
+    )
+    def qr_image(self, request, pk=None, image_format='png'):
+        """
+        Serve a lot's QR label with strong ETags and long-lived caching.
+        
+        Args:
+            request: The HTTP request object
+            pk: The primary key (UUID) of the lot manifest
+            image_format: 'png' or 'svg'
+        
+        Returns:
+            HttpResponse: The image, or 304 if the client's copy is current
+        """
+        # Only the label inputs are needed, so skip loading the full lot
+        try:
+            row = (
+                LotManifest.objects.filter(pk=pk)
+                .values_list('id', 'batch_number', 'medicine__name')
+                .first()
+            )
+        except ValidationError:
+            row = None  # Not a UUID
+        if row is None:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        
+        spec = LabelSpec(str(row[0]), row[1], row[2])
+        digest = label_hash(spec, render_fingerprint(image_format))
+        etag = f'"{digest}"'
+        if request.query_params.get('v') == digest:
+            cache_control = 'public, max-age=31536000, immutable'
+        else:
+            cache_control = f"public, max-age={getattr(settings, 'QR_IMAGE_MAX_AGE', 3600)}"
+        
+        # The ETag is the content hash, so a match needs no render or cache read
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+        else:
+            _, content = get_label(spec, image_format)
+            response = HttpResponse(content, content_type=QR_IMAGE_CONTENT_TYPES[image_format])
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        return response
+    
     @extend_schema(
         summary="Verify Ed25519 lot manifest signature",
         description="""
@@ -220,12 +681,18 @@ class LotManifestViewSet(viewsets.ModelViewSet):
         3. Use PyNaCl to verify the signature cryptographically
         4. Return verification result with timestamp
         
+        **Shipment-signed lots** (registered via `/api/manifests/shipments/`)
+        have no per-lot signature: the lot's Merkle inclusion proof is checked
+        against the shipment root, and the root's signature is verified once
+        per shipment and then cached.
+        
         **No Request Body Required** - Just POST to the endpoint.
         
         Returns a structured JSON response with:
         - **is_authentic**: Boolean - True if cryptographically valid
         - **trust_score**: Current trust score from database
         - **status**: "Verified" or "Forged/Tampered"
+        - **signature_mode**: "lot" (per-lot signature) or "shipment" (Merkle proof)
         - **timestamp**: Server time of verification (ISO 8601)
         """,
         tags=['Manifests'],
@@ -238,6 +705,7 @@ class LotManifestViewSet(viewsets.ModelViewSet):
                         'is_authentic': {'type': 'boolean'},
                         'trust_score': {'type': 'string'},
                         'status': {'type': 'string', 'enum': ['Verified', 'Forged/Tampered']},
+                        'signature_mode': {'type': 'string', 'enum': ['lot', 'shipment']},
                         'timestamp': {'type': 'string', 'format': 'date-time'},
                     }
                 }
@@ -276,31 +744,16 @@ class LotManifestViewSet(viewsets.ModelViewSet):
                 "timestamp": "2026-01-16T22:56:00Z"
             }
         """
-        from django.utils import timezone
-        
         # Get the lot manifest instance
         lot_manifest = self.get_object()
+        hot_lots.record_scan(lot_manifest.pk)
         
         # Perform Ed25519 cryptographic verification
         # This calls the model's verify_signature() method which uses PyNaCl
         is_authentic = lot_manifest.verify_signature()
         
-        # Determine status based on verification result
-        if is_authentic:
-            status_text = "Verified"
-        else:
-            status_text = "Forged/Tampered"
-        
-        # Get current server timestamp
-        current_timestamp = timezone.now().isoformat()
-        
-        # Construct the response
-        response_data = {
-            "is_authentic": is_authentic,
-            "trust_score": str(lot_manifest.trust_score),
-            "status": status_text,
-            "timestamp": current_timestamp
-        }
+        # Construct the response (status text and server timestamp)
+        response_data = signature_result(lot_manifest, is_authentic)
         
         return Response(response_data, status=status.HTTP_200_OK)
     
@@ -335,31 +788,7 @@ class LotManifestViewSet(viewsets.ModelViewSet):
         responses={
             200: OpenApiResponse(
                 description="Patient-friendly verification response",
-                response={
-                    'type': 'object',
-                    'properties': {
-                        'lot_id': {'type': 'string', 'format': 'uuid'},
-                        'batch_number': {'type': 'string'},
-                        'medicine': {
-                            'type': 'object',
-                            'properties': {
-                                'name': {'type': 'string'},
-                                'active_ingredient': {'type': 'string'},
-                                'strength': {'type': 'string'},
-                                'dosage_form': {'type': 'string'},
-                            }
-                        },
-                        'distributor': {'type': 'string'},
-                        'trust_score': {'type': 'number'},
-                        'trust_status': {'type': 'string', 'enum': ['SAFE', 'CAUTION', 'WARNING']},
-                        'is_authentic': {'type': 'boolean'},
-                        'verification_message': {'type': 'string'},
-                        'expiry_date': {'type': 'string', 'format': 'date'},
-                        'flags_count': {'type': 'integer'},
-                        'can_report': {'type': 'boolean'},
-                        'report_url': {'type': 'string'},
-                    }
-                }
+                response=VERIFICATION_RESPONSE_SCHEMA,
             ),
             404: OpenApiResponse(description="Lot manifest not found"),
         },
@@ -396,6 +825,13 @@ class LotManifestViewSet(viewsets.ModelViewSet):
         
         Public endpoint - no authentication required.
         Patients scan QR code on medicine packet to verify authenticity.
+        Concurrent scans of the same lot share one computation (see
+        core/singleflight.py), and ids of no existing lot are rejected by the
+        negative-lookup filter without a query (see lot_filter.py). The
+        result is read from the lot's LotVerificationView row with a single
+        primary-key lookup (see verification_view.py). Scans
+        are counted per lot, and only frequently scanned lots are kept in the
+        response cache (see hot_lots.py).
         
         Args:
             request: The HTTP request object
@@ -404,44 +840,201 @@ class LotManifestViewSet(viewsets.ModelViewSet):
         Returns:
             Response: Patient-friendly verification data
         """
-        lot_manifest = self.get_object()
+        if not lot_filter.lot_might_exist(pk):
+            raise NotFound()
+        try:
+            response = self.cached_response(self._verify_qr, request, pk=pk)
+        except Http404:
+            lot_filter.record_false_positive()
+            raise
+        hot_lots.record_scan(pk)
+        return response
+    
+    def _verify_qr(self, request, pk=None):
+        """
+        Build the verify-qr response (cache miss) from the lot's LotVerificationView row.
         
-        # Determine trust status based on score
-        trust_score = float(lot_manifest.trust_score)
-        if trust_score >= 80:
-            trust_status = "SAFE"
-        elif trust_score >= 60:
-            trust_status = "CAUTION"
+        A single primary-key read, shared by concurrent scans of the lot.
+        Lots without a row yet are answered from the source rows, and their
+        row is created (see verification_view.py).
+        """
+        try:
+            lot_id = uuid.UUID(str(pk))
+        except ValueError:
+            raise Http404
+        # The lot tag's token is taken before the read, so a refresh committed
+        # meanwhile leaves a cached response already stale
+        self.note_cache_tags([f'lot:{lot_id}'])
+        result = coalesce(f'verify-qr:{lot_id}', lambda: verification_view.read_payload(lot_id))
+        if result is None:
+            lot_manifest = self.get_object()
+            verification_view.refresh_lots_on_commit([lot_manifest.pk])
+            payload = build_verification_payload(lot_manifest)
         else:
-            trust_status = "WARNING"
-        
-        # Count unresolved flags
-        flags_count = lot_manifest.crowd_flags.filter(is_resolved=False).count()
-        
-        # Verify signature
-        is_authentic = lot_manifest.verify_signature()
-        verification_message = "Verified ✓" if is_authentic else "⚠️ Verification Failed - Possible Counterfeit"
-        
-        # Construct patient-friendly response
-        response_data = {
-            "lot_id": str(lot_manifest.id),
-            "batch_number": lot_manifest.batch_number,
-            "medicine": {
-                "name": lot_manifest.medicine.name,
-                "active_ingredient": lot_manifest.medicine.active_ingredient,
-                "strength": lot_manifest.medicine.strength,
-                "dosage_form": lot_manifest.medicine.dosage_form,
-            },
-            "distributor": lot_manifest.distributor.name,
-            "expiry_date": lot_manifest.expiry_date.isoformat(),
-            "trust_score": trust_score,
-            "trust_status": trust_status,
-            "is_authentic": is_authentic,
-            "verification_message": verification_message,
-            "flags_count": flags_count,
-            "can_report": True,
-            "report_url": "/api/flags/"
-        }
-        
-        return Response(response_data, status=status.HTTP_200_OK)
+            payload, tags = result
+            self.note_cache_tags(tags)
+        return Response(payload, status=status.HTTP_200_OK)
+
+
+
+@extend_schema(
+    summary="Verify a lot by short code (Public)",
+    description="""
+    Resolve the short code from a compact QR code (`https://rxverify.app/v/{code}`)
+    and return the same verification result as `/api/manifests/{id}/verify-qr/`.
+    
+    **Short codes:** 10 Crockford base32 symbols, the last one a check symbol.
+    Codes are matched case-insensitively, and spaces, hyphens and the
+    look-alikes O (for 0) and I/L (for 1) are accepted, so codes typed from
+    the printed label work too.
+    
+    **Errors:**
+    - **400**: The code is malformed or its check symbol does not match (a typo)
+    - **404**: Well-formed code that belongs to no lot
+    
+    **No authentication required** - Public access for patient verification.
+    """,
+    tags=['Patient Verification'],
+    responses={
+        200: OpenApiResponse(
+            description="Patient-friendly verification response",
+            response=VERIFICATION_RESPONSE_SCHEMA,
+        ),
+        400: OpenApiResponse(description="Invalid short code"),
+        404: OpenApiResponse(description="No lot with this short code"),
+    },
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def verify_short_code(request, code):
+    """
+    Public short-code verification endpoint.
+    
+    Args:
+        request: The HTTP request object
+        code: Short code as scanned or typed
+    
+    Returns:
+        Response: Patient-friendly verification data
+    """
+    code = short_codes.normalize(code)
+    if not short_codes.is_valid(code):
+        return Response(
+            {'error': 'Invalid code. Please check it against the label and try again.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if not lot_filter.short_code_might_exist(code):
+        return Response(
+            {'error': 'No lot manifest found for this code'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    def verify():
+        # One read by short code from the projection (see verification_view.py)
+        view = LotVerificationView.objects.filter(short_code=code).first()
+        if view is not None:
+            return payload_from_view(view)
+        lot_manifest = (
+            LotManifest.objects.select_related('medicine', 'distributor', 'shipment')
+            .filter(short_code=code)
+            .first()
+        )
+        if lot_manifest is None:
+            return None
+        verification_view.refresh_lots_on_commit([lot_manifest.pk])
+        return build_verification_payload(lot_manifest)
+    
+    # Concurrent scans of the same label share one lookup (see core/singleflight.py)
+    payload = coalesce(f'verify-short:{code}', verify)
+    if payload is None:
+        lot_filter.record_false_positive()
+        return Response(
+            {'error': 'No lot manifest found for this code'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    hot_lots.record_scan(payload['lot_id'])
+    return Response(payload, status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    summary="Negative-lookup filter statistics",
+    description="""
+    Size and false-positive metrics of this worker's lot filter, the Bloom
+    filter of lot ids and short codes that rejects verification requests for
+    nonexistent lots without a database query.
+    
+    - `expected_false_positive_rate`: predicted from the keys in the filter
+    - `observed_false_positive_rate`: share of lookups for nonexistent lots
+      that still reached the database
+    - `fallthroughs`: lookups sent to the database because the lot change
+      feed couldn't tell which lots other workers created
+
+    **Admin-only access.**
+    """,
+    tags=['Admin'],
+    responses={200: OpenApiTypes.OBJECT},
+)
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def lot_filter_stats(request):
+    """
+    Report negative-lookup filter metrics for this worker.
+    
+    Returns:
+        Response: Filter size, key count and false-positive rates
+    """
+    return Response(lot_filter.filter_stats(), status=status.HTTP_200_OK)
+
 
+
+@extend_schema(
+    summary="Most scanned lots",
+    description="""
+    Lots with the most verification scans (verify-qr, short-code and verify
+    calls), estimated with a count-min sketch and a top-k heap per worker and
+    merged across the workers that published a snapshot recently.
+    
+    Counts are halved every `decay_interval` seconds, so they reflect recent
+    traffic. Estimates may overcount by up to `max_overcount` (with the given
+    `confidence`) but never undercount.
+    
+    Lots at or above `admission_threshold` scans on a worker are admitted to
+    the response cache there; `python manage.py warm_hot_lots` pre-fills the
+    cache for the lots listed here.
+    
+    **Admin-only access.**
+    """,
+    tags=['Admin'],
+    parameters=[
+        OpenApiParameter('limit', OpenApiTypes.INT, description='Number of lots (default 20, max 100)'),
+    ],
+    responses={200: OpenApiTypes.OBJECT},
+)
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def hot_lots_report(request):
+    """
+    Report the most scanned lots across workers.
+    
+    Returns:
+        Response: Sketch metrics for this worker and the top lots with batch numbers
+    """
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    ranked = hot_lots.merged_hot_lots(limit=limit)
+    batch_numbers = dict(
+        LotManifest.objects.filter(pk__in=[lot_id for lot_id, _ in ranked]).values_list('id', 'batch_number')
+    )
+    lots = [
+        {
+            'lot_id': lot_id,
+            'batch_number': batch_numbers.get(uuid.UUID(lot_id)),
+            'estimated_scans': count,
+        }
+        for lot_id, count in ranked
+    ]
+    return Response({**hot_lots.tracker_stats(), 'lots': lots}, status=status.HTTP_200_OK)
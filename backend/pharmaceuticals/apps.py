@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PharmaceuticalsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pharmaceuticals'
+    
+    def ready(self):
+        """Import signals when the app is ready."""
+        import pharmaceuticals.signals
@@ -0,0 +1,180 @@
+"""
+In-process prefix index for medicine autocomplete.
+
+The catalog search (MedicineViewSet.search_fields) runs a four-column
+ILIKE '%q%' OR query per keystroke. Autocomplete only needs prefix matches on
+names and active ingredients, which a sorted array answers with two binary
+searches and no database round trip.
+
+The index is rebuilt lazily: Medicine signals mark it dirty in this process,
+and it is also rebuilt after MEDICINE_AUTOCOMPLETE_TTL seconds so changes
+made by other worker processes show up.
+"""
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from django.conf import settings
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text):
+    """
+    Normalize text for matching: strip accents, casefold, and collapse
+    punctuation and whitespace to single spaces.
+
+    >>> normalize('  Co-Amoxiclav 625mg ')
+    'co amoxiclav 625mg'
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(' ', text.casefold()).strip()
+
+
+class MedicineAutocompleteIndex:
+    """
+    Sorted-array prefix index over medicine names and active ingredients.
+
+    Two sorted arrays are kept:
+    - phrases: the full normalized name and active ingredient of each medicine,
+      so "amox" finds "Amoxicillin Capsules" first
+    - words: every word of those fields, so "tab" still finds
+      "Paracetamol Tablets"
+    """
+
+    def __init__(self, medicines):
+        """
+        Args:
+            medicines: Iterable of (id, name, active_ingredient, strength, dosage_form)
+        """
+        self.medicines = {}
+        self.words_by_medicine = {}
+        phrases = []
+        words = []
+
+        for medicine_id, name, active_ingredient, strength, dosage_form in medicines:
+            medicine_id = str(medicine_id)
+            self.medicines[medicine_id] = {
+                'id': medicine_id,
+                'name': name,
+                'active_ingredient': active_ingredient,
+                'strength': strength,
+                'dosage_form': dosage_form,
+            }
+            medicine_words = set()
+            for field in (name, active_ingredient):
+                phrase = normalize(field)
+                if not phrase:
+                    continue
+                phrases.append((phrase, medicine_id))
+                field_words = phrase.split()
+                medicine_words.update(field_words)
+                words.extend((word, medicine_id) for word in field_words)
+            self.words_by_medicine[medicine_id] = medicine_words
+
+        phrases.sort()
+        words.sort()
+        self._phrase_keys = [key for key, _ in phrases]
+        self._phrase_ids = [medicine_id for _, medicine_id in phrases]
+        self._word_keys = [key for key, _ in words]
+        self._word_ids = [medicine_id for _, medicine_id in words]
+
+    def __len__(self):
+        return len(self.medicines)
+
+    def search(self, query, limit=10):
+        """
+        Return up to `limit` medicines matching the query prefix.
+
+        Phrase-prefix matches come first, then medicines where every query
+        word is a prefix of one of their words. Within each group results
+        are alphabetical.
+
+        Args:
+            query: Raw user input
+            limit: Maximum number of results
+
+        Returns:
+            list: Medicine dicts (id, name, active_ingredient, strength, dosage_form)
+        """
+        query_words = normalize(query).split()
+        if not query_words or limit <= 0:
+            return []
+
+        results = []
+        seen = set()
+
+        def add(medicine_id):
+            if medicine_id not in seen:
+                seen.add(medicine_id)
+                results.append(self.medicines[medicine_id])
+
+        phrase = ' '.join(query_words)
+        for medicine_id in self._prefix_range(self._phrase_keys, self._phrase_ids, phrase):
+            add(medicine_id)
+            if len(results) >= limit:
+                return results
+
+        # Anchor the word scan on the longest (most selective) query word
+        anchor = max(query_words, key=len)
+        for medicine_id in self._prefix_range(self._word_keys, self._word_ids, anchor):
+            if medicine_id in seen:
+                continue
+            medicine_words = self.words_by_medicine[medicine_id]
+            if all(any(word.startswith(query_word) for word in medicine_words) for query_word in query_words):
+                add(medicine_id)
+                if len(results) >= limit:
+                    break
+        return results
+
+    @staticmethod
+    def _prefix_range(keys, ids, prefix):
+        """Yield ids whose key starts with `prefix`, in key order."""
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix):
+            yield ids[position]
+            position += 1
+
+
+_index = None
+_built_at = 0.0
+_dirty = True
+_lock = threading.Lock()
+
+
+def mark_dirty():
+    """Force a rebuild on the next lookup (called from Medicine signals)."""
+    global _dirty
+    _dirty = True
+
+
+def get_index():
+    """
+    Return the current autocomplete index, rebuilding it if stale.
+
+    Returns:
+        MedicineAutocompleteIndex: The process-wide index
+    """
+    global _index, _built_at, _dirty
+    ttl = getattr(settings, 'MEDICINE_AUTOCOMPLETE_TTL', 60)
+    if _index is not None and not _dirty and time.monotonic() - _built_at < ttl:
+        return _index
+
+    with _lock:
+        if _index is not None and not _dirty and time.monotonic() - _built_at < ttl:
+            return _index
+        from .models import Medicine
+
+        # Clear the flag first so changes during the rebuild trigger another one
+        _dirty = False
+        rows = Medicine.objects.order_by().values_list(
+            'id', 'name', 'active_ingredient', 'strength', 'dosage_form'
+        )
+        _index = MedicineAutocompleteIndex(rows.iterator(chunk_size=5000))
+        _built_at = time.monotonic()
+        return _index
@@ -0,0 +1,102 @@
+"""
+Django management command to benchmark medicine autocomplete.
+
+Compares the in-process prefix index behind GET /api/medicines/autocomplete/
+with the ?search= filter (four-column ILIKE) the UIs used per keystroke.
+
+Usage:
+    # Benchmark against the current catalog
+    python manage.py bench_medicine_autocomplete
+
+    # Add 50k synthetic medicines first (rolled back afterwards)
+    python manage.py bench_medicine_autocomplete --seed 50000 --queries 2000
+"""
+import random
+import secrets
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import User
+from core.benchmarking import Rollback, format_stats, list_queryset, time_calls
+from entities.models import Distributor
+from pharmaceuticals.autocomplete import MedicineAutocompleteIndex, normalize
+from pharmaceuticals.models import Medicine
+from pharmaceuticals.views import MedicineViewSet
+
+INGREDIENTS = [
+    'Paracetamol', 'Amoxicillin', 'Artemether', 'Lumefantrine', 'Ibuprofen', 'Metformin',
+    'Ciprofloxacin', 'Azithromycin', 'Omeprazole', 'Amlodipine', 'Cotrimoxazole', 'Doxycycline',
+]
+FORMS = ['Tablets', 'Capsules', 'Syrup', 'Injection', 'Suspension']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the medicine autocomplete index against the catalog search filter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Synthetic medicines to add (rolled back)')
+        parser.add_argument('--queries', type=int, default=1000, help='Number of prefix queries to run')
+        parser.add_argument('--limit', type=int, default=10, help='Results per query')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self._seed(options['seed'])
+                self._run(options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        rows = list(Medicine.objects.values_list('id', 'name', 'active_ingredient', 'strength', 'dosage_form'))
+        if not rows:
+            raise CommandError('No medicines found (use --seed N)')
+
+        started = time.perf_counter()
+        index = MedicineAutocompleteIndex(rows)
+        self.stdout.write(f'Built index over {len(index)} medicines in {(time.perf_counter() - started) * 1000:.1f}ms')
+
+        # Prefixes a user would type: 2-5 characters of real names and ingredients
+        rng = random.Random(7)
+        prefixes = []
+        for _ in range(options['queries']):
+            words = normalize(rng.choice(rows)[rng.choice([1, 2])]).split() or ['a']
+            word = rng.choice(words)
+            prefixes.append(word[:rng.randint(2, 5)])
+
+        user = User(role='Admin')
+        limit = options['limit']
+
+        index_stats = time_calls(lambda prefix: index.search(prefix, limit=limit), prefixes)
+        search_stats = time_calls(
+            lambda prefix: list(list_queryset(MedicineViewSet, {'search': prefix}, user)[:limit]),
+            prefixes,
+        )
+
+        self.stdout.write(format_stats('autocomplete index', index_stats))
+        self.stdout.write(format_stats('?search= filter (ILIKE)', search_stats))
+        if index_stats['p50_us']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Index is {search_stats['p50_us'] / index_stats['p50_us']:,.0f}x faster at p50"
+            ))
+
+    def _seed(self, count):
+        rng = random.Random(42)
+        distributor = Distributor.objects.create(name='Bench Distributor', public_key=secrets.token_hex(32))
+        Medicine.objects.bulk_create(
+            [
+                Medicine(
+                    name=f'{rng.choice(INGREDIENTS)} {rng.choice(FORMS)} {secrets.token_hex(3).upper()}',
+                    active_ingredient=rng.choice(INGREDIENTS),
+                    strength=f'{rng.choice([100, 250, 500, 1000])}mg',
+                    dosage_form=rng.choice(FORMS),
+                    category='Bench',
+                    distributor=distributor,
+                )
+                for _ in range(count)
+            ],
+            batch_size=5000,
+        )
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entities', '0001_initial'),
+        ('pharmaceuticals', '0002_medicine_active_ingredient_medicine_dosage_form_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['name'], name='medicine_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['distributor', 'name'], name='medicine_distributor_name_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmaceuticals', '0003_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicine',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Last modification time (used for incremental label regeneration)'),
+        ),
+    ]
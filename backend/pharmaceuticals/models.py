@@ -45,6 +45,11 @@ class Medicine(models.Model):
         related_name='medicines',
         help_text="Distributor responsible for this medicine"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        help_text="Last modification time (used for incremental label regeneration)"
+    )
     
     def __str__(self):
         return f"{self.name} ({self.active_ingredient} {self.strength})"
@@ -54,4 +59,9 @@ class Medicine(models.Model):
         verbose_name = 'Medicine'
         verbose_name_plural = 'Medicines'
         ordering = ['name']
+        indexes = [
+            # Default listing and the distributor filter, both ordered by name
+            models.Index(fields=['name'], name='medicine_name_idx'),
+            models.Index(fields=['distributor', 'name'], name='medicine_distributor_name_idx'),
+        ]
 
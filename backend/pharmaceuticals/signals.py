@@ -0,0 +1,42 @@
+"""
+Django signals for the medicine catalog.
+
+This module keeps the in-process autocomplete index in sync with
+Medicine changes, and invalidates cached medicine and lot responses.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import autocomplete
+from .models import Medicine
+from core.cache import invalidate_tags
+
+
+@receiver(post_save, sender=Medicine)
+@receiver(post_delete, sender=Medicine)
+def invalidate_autocomplete_index(sender, instance, **kwargs):
+    """
+    Mark the autocomplete index stale when a medicine is saved or deleted.
+    
+    Args:
+        sender: The Medicine model class
+        instance: The Medicine instance being saved or deleted
+        **kwargs: Additional keyword arguments
+    """
+    autocomplete.mark_dirty()
+
+
+@receiver(post_save, sender=Medicine)
+@receiver(post_delete, sender=Medicine)
+def invalidate_medicine_responses(sender, instance, **kwargs):
+    """
+    Invalidate cached responses showing a medicine.
+    
+    Lot payloads include the medicine's name, so lot lists are invalidated too.
+    
+    Args:
+        sender: The Medicine model class
+        instance: The Medicine instance being saved or deleted
+        **kwargs: Additional keyword arguments
+    """
+    invalidate_tags(f'medicine:{instance.pk}', 'medicines', 'lots')
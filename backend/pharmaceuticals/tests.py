@@ -1,3 +1,221 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from accounts.models import User
+from core import cache as response_cache
+from entities.models import Distributor
+
+from . import autocomplete
+from .autocomplete import MedicineAutocompleteIndex, normalize
+from .models import Medicine
+
+
+class MedicineAutocompleteIndexTests(SimpleTestCase):
+    """Prefix matching of the in-process index (autocomplete.py)."""
+
+    def setUp(self):
+        self.index = MedicineAutocompleteIndex([
+            (1, 'Paracetamol Tablets', 'Paracetamol', '500mg', 'Tablet'),
+            (2, 'Amoxicillin Capsules', 'Amoxicillin', '250mg', 'Capsule'),
+            (3, 'Co-Amoxiclav', 'Amoxicillin; Clavulanic acid', '625mg', 'Tablet'),
+            (4, 'Panadol', 'Paracétamol', '500mg', 'Tablet'),
+        ])
+
+    def names(self, query, limit=10):
+        return [medicine['name'] for medicine in self.index.search(query, limit=limit)]
+
+    def test_normalize(self):
+        self.assertEqual(normalize('  Co-Amoxiclav 625mg '), 'co amoxiclav 625mg')
+        self.assertEqual(normalize('PARACÉTAMOL'), 'paracetamol')
+
+    def test_phrase_prefix_matches_come_first(self):
+        self.assertEqual(self.names('amox'), ['Amoxicillin Capsules', 'Co-Amoxiclav'])
+
+    def test_every_query_word_must_start_a_word(self):
+        self.assertEqual(self.names('tab para'), ['Paracetamol Tablets'])
+        self.assertEqual(self.names('tab amox'), [])
+
+    def test_accents_and_limit(self):
+        self.assertEqual(self.names('parac'), ['Paracetamol Tablets', 'Panadol'])
+        self.assertEqual(self.names('parac', limit=1), ['Paracetamol Tablets'])
+        self.assertEqual(self.names('  '), [])
+
+
+@override_settings(MEDICINE_AUTOCOMPLETE_TTL=3600)
+class MedicineAutocompleteTests(APITestCase):
+    """/api/medicines/autocomplete/ follows medicine changes in this process."""
+
+    def setUp(self):
+        autocomplete.mark_dirty()
+        self.distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        self.medicine = Medicine.objects.create(
+            name='Paracetamol Tablets', active_ingredient='Paracetamol', distributor=self.distributor,
+        )
+        user = User.objects.create_user(username='pharmacist', password='pw', role='Pharmacist')
+        self.client.force_authenticate(user)
+
+    def names(self, query):
+        response = self.client.get('/api/medicines/autocomplete/', {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [medicine['name'] for medicine in response.data['results']]
+
+    def test_created_renamed_and_deleted_medicines(self):
+        self.assertEqual(self.names('para'), ['Paracetamol Tablets'])
+
+        Medicine.objects.create(name='Panadol', active_ingredient='Paracetamol', distributor=self.distributor)
+        self.assertEqual(self.names('pa'), ['Panadol', 'Paracetamol Tablets'])
+
+        self.medicine.name = 'Calpol'
+        self.medicine.save()
+        self.assertEqual(self.names('cal'), ['Calpol'])
+
+        self.medicine.delete()
+        self.assertEqual(self.names('cal'), [])
+
+
+RESPONSE_CACHE = {'ENABLED': True, 'ALIAS': 'default', 'TIMEOUT': 300}
+
+
+@override_settings(RESPONSE_CACHE=RESPONSE_CACHE)
+class MedicineResponseCacheTests(APITestCase):
+    """Medicine reads are cached until a tag they carry is invalidated (core/cache.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        self.medicine = Medicine.objects.create(name='Paracetamol Tablets', distributor=self.distributor)
+        user = User.objects.create_user(username='pharmacist', password='pw', role='Pharmacist')
+        self.client.force_authenticate(user)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_list_is_invalidated_by_a_medicine_change(self):
+        self.assertEqual(self.get('/api/medicines/')['X-Cache'], 'MISS')
+        self.assertEqual(self.get('/api/medicines/')['X-Cache'], 'HIT')
+
+        Medicine.objects.create(name='Amoxicillin Capsules', distributor=self.distributor)
+        response = self.get('/api/medicines/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_detail_is_invalidated_by_its_distributor(self):
+        url = f'/api/medicines/{self.medicine.pk}/'
+        self.get(url)
+        self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+
+        # Another medicine's change leaves this one cached
+        Medicine.objects.create(name='Amoxicillin Capsules', distributor=self.distributor)
+        self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+
+        self.distributor.name = 'Acme Pharmaceuticals'
+        self.distributor.save()
+        response = self.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['distributor_name'], 'Acme Pharmaceuticals')
+
+
+@override_settings(RESPONSE_CACHE=RESPONSE_CACHE)
+class TagInvalidationTests(TestCase):
+    """Tag tokens of core/cache.py."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_response_built_inside_the_writing_transaction_goes_stale_on_commit(self):
+        key = response_cache.response_cache_key('medicine.retrieve', 'testserver', '/api/medicines/1/', [])
+        with self.captureOnCommitCallbacks(execute=True):
+            response_cache.invalidate_tags('medicine:1')
+            # Another request rebuilds the response before the write commits
+            tokens = response_cache.tag_tokens(['medicine:1'])
+            response_cache.store_response('medicine.retrieve', key, {'name': 'old'}, 200, tokens)
+            self.assertIsNotNone(response_cache.lookup_response('medicine.retrieve', key))
+        self.assertIsNone(response_cache.lookup_response('medicine.retrieve', key))
+
+    def test_evicted_token_never_revalidates(self):
+        tokens = response_cache.tag_tokens(['lots'])
+        cache.delete('rc:tag:lots')
+        self.assertNotEqual(response_cache.tag_tokens(['lots']), tokens)
+
+
+@override_settings(CONDITIONAL_REQUESTS={'ENABLED': True, 'VERSION': '1'})
+class ConditionalRequestTests(APITestCase):
+    """ETag/Last-Modified validators and 304 answers (core/conditional.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.distributor = Distributor.objects.create(name='Acme Pharma', public_key='ab' * 32)
+        self.medicine = Medicine.objects.create(name='Paracetamol Tablets', distributor=self.distributor)
+        self.user = User.objects.create_user(username='pharmacist', password='pw', role='Pharmacist')
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/medicines/{self.medicine.pk}/'
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        return response['ETag']
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.etag('/api/medicines/')
+        response = self.client.get('/api/medicines/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        # Weak and listed validators match too
+        response = self.client.get('/api/medicines/', HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get('/api/medicines/', HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_changes_with_the_rows(self):
+        etag = self.etag('/api/medicines/')
+        other = Medicine.objects.create(name='Amoxicillin Capsules', distributor=self.distributor)
+        created = self.etag('/api/medicines/')
+        self.assertNotEqual(created, etag)
+
+        # Deleting an older row leaves the latest updated_at; the count moves
+        self.medicine.delete()
+        deleted = self.etag('/api/medicines/')
+        self.assertNotIn(deleted, (etag, created))
+
+        other.name = 'Calpol'
+        other.save()
+        response = self.client.get('/api/medicines/', HTTP_IF_NONE_MATCH=deleted)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['name'], 'Calpol')
+
+    def test_list_etag_covers_query_and_user(self):
+        etag = self.etag('/api/medicines/')
+        self.assertNotEqual(self.etag('/api/medicines/?ordering=name'), etag)
+        self.client.force_authenticate(User.objects.create_user(username='other', password='pw', role='Pharmacist'))
+        self.assertNotEqual(self.etag('/api/medicines/'), etag)
+
+    def test_detail_etag_follows_the_related_distributor(self):
+        etag = self.etag(self.url)
+        self.distributor.name = 'Acme Pharmaceuticals'
+        self.distributor.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['distributor_name'], 'Acme Pharmaceuticals')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since_on_retrieve_only(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get('/api/medicines/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unknown_row_and_disabled(self):
+        response = self.client.get('/api/medicines/999999/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
+        with self.settings(CONDITIONAL_REQUESTS={'ENABLED': False}):
+            response = self.client.get(self.url)
+        self.assertNotIn('ETag', response)
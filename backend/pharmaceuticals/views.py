@@ -3,13 +3,18 @@ API views for medicine catalog management.
 
 This module provides ViewSets for medicine CRUD operations with filtering and search capabilities.
 """
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiExample, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
+from . import autocomplete
 from .models import Medicine
 from .serializers import MedicineSerializer
 from accounts.permissions import IsAdminOrReadOnly
+from core.cache import ResponseCacheMixin
+from core.conditional import ConditionalRequestMixin
 
 
 @extend_schema_view(
@@ -160,12 +165,13 @@ from accounts.permissions import IsAdminOrReadOnly
         Permanently delete a medicine from the catalog.
         
         **Warning:** This will also affect any lot manifests referencing this medicine.
+        Receipt events of its lots are kept.
         Requires admin role.
         """,
         tags=['Medicines'],
     ),
 )
-class MedicineViewSet(viewsets.ModelViewSet):
+class MedicineViewSet(ConditionalRequestMixin, ResponseCacheMixin, viewsets.ModelViewSet):
     """
     ViewSet for pharmaceutical medicine catalog management.
     
@@ -181,6 +187,9 @@ class MedicineViewSet(viewsets.ModelViewSet):
     - Delete medicines (admin only)
     - Filter by category and distributor
     - Search by name, active ingredient, or manufacturer
+    - Prefix autocomplete on name and active ingredient (in-memory index)
+    - Response cache for list and retrieve (see core/cache.py)
+    - ETag validators and 304 answers for list and retrieve (see core/conditional.py)
     
     Permissions:
     - Read: All authenticated users
@@ -197,6 +206,30 @@ class MedicineViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'category', 'active_ingredient', 'strength']
     ordering = ['name']  # Default ordering
     
+    # Cached reads, invalidated by the medicine and distributor signals
+    response_cache_actions = ('list', 'retrieve')
+    response_cache_list_tags = ('medicines',)
+    
+    # Serialized medicines show their distributor's name
+    conditional_related = ('distributor',)
+    
+    def get_cache_tags(self, medicine):
+        """
+        Response cache tags of a medicine.
+        
+        Returns:
+            list: medicine and distributor tags
+        """
+        return [f'medicine:{medicine.pk}', f'distributor:{medicine.distributor_id}']
+    
+    def list(self, request, *args, **kwargs):
+        """List medicines (response cached, see core/cache.py)."""
+        return self.cached_response(super().list, request, *args, **kwargs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a medicine (response cached, see core/cache.py)."""
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+    
     def get_queryset(self):
         """
         Optionally filter medicines by category or distributor.
@@ -225,4 +258,60 @@ class MedicineViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(distributor_id=distributor_id)
         
         return queryset
-
+    
+    @extend_schema(
+        summary="Autocomplete medicine names",
+        description="""
+        Prefix autocomplete for medicine names and active ingredients.
+        
+        Served from an in-process sorted index that is rebuilt when medicines
+        change, so it does not query the database per keystroke. Use this for
+        type-ahead inputs and the regular `?search=` listing for full searches.
+        
+        **Matching:**
+        - Case- and accent-insensitive, punctuation ignored
+        - Medicines whose name or active ingredient starts with the query come first
+        - Then medicines where every query word starts one of their words
+          (e.g. `tab para` finds "Paracetamol Tablets")
+        """,
+        tags=['Medicines'],
+        parameters=[
+            OpenApiParameter(
+                name='q',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description='Prefix typed by the user',
+                required=True,
+                examples=[
+                    OpenApiExample('Paracetamol', value='parac'),
+                    OpenApiExample('Two words', value='amox cap'),
+                ]
+            ),
+            OpenApiParameter(
+                name='limit',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description='Maximum number of matches (default 10, max 50)'
+            ),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Return the top matches for a name or ingredient prefix.
+        
+        Args:
+            request: The HTTP request object with ?q= and optional ?limit=
+        
+        Returns:
+            Response: {"query": ..., "results": [medicine, ...]}
+        """
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            limit = 10  # Ignore invalid limit values
+        
+        results = autocomplete.get_index().search(query, limit=limit)
+        return Response({'query': query, 'results': results}, status=status.HTTP_200_OK)
@@ -1,5 +1,8 @@
 from django.contrib import admin
+from django.utils import timezone
 from .models import CrowdFlag
+from core.cache import invalidate_tags
+from manifests.verification_view import refresh_lots_on_commit
 
 
 @admin.register(CrowdFlag)
@@ -29,12 +32,18 @@ class CrowdFlagAdmin(admin.ModelAdmin):
     
     def mark_as_resolved(self, request, queryset):
         """Admin action to mark selected flags as resolved."""
-        count = queryset.update(is_resolved=True)
+        lot_ids = set(queryset.values_list('lot_id', flat=True))
+        count = queryset.update(is_resolved=True, updated_at=timezone.now())
+        refresh_lots_on_commit(lot_ids)
+        invalidate_tags(*(f'lot:{lot_id}' for lot_id in lot_ids))
         self.message_user(request, f"{count} flag(s) marked as resolved.")
     
     def mark_as_unresolved(self, request, queryset):
         """Admin action to mark selected flags as unresolved."""
-        count = queryset.update(is_resolved=False)
+        lot_ids = set(queryset.values_list('lot_id', flat=True))
+        count = queryset.update(is_resolved=False, updated_at=timezone.now())
+        refresh_lots_on_commit(lot_ids)
+        invalidate_tags(*(f'lot:{lot_id}' for lot_id in lot_ids))
         self.message_user(request, f"{count} flag(s) marked as unresolved.")
     
     mark_as_resolved.short_description = "Mark as resolved"
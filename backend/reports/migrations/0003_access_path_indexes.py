@@ -0,0 +1,40 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manifests', '0004_access_path_indexes'),
+        ('reports', '0002_crowdflag_severity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='crowdflag',
+            index=models.Index(fields=['lot', 'is_resolved', 'severity'], name='flag_lot_resolved_sev_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crowdflag',
+            index=models.Index(fields=['lot', '-created_at'], name='flag_lot_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crowdflag',
+            index=models.Index(fields=['user', '-created_at'], name='flag_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crowdflag',
+            index=models.Index(fields=['-created_at'], name='flag_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crowdflag',
+            index=models.Index(fields=['is_resolved', '-created_at'], name='flag_resolved_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crowdflag',
+            index=models.Index(fields=['severity', '-created_at'], name='flag_severity_created_idx'),
+        ),
+    ]
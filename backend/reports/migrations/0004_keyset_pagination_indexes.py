@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manifests', '0005_keyset_pagination_indexes'),
+        ('reports', '0003_access_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='crowdflag',
+            name='flag_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='crowdflag',
+            index=models.Index(fields=['-created_at', '-id'], name='flag_created_id_idx'),
+        ),
+    ]
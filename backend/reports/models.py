@@ -46,6 +46,11 @@ class CrowdFlag(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     is_resolved = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        help_text="Last modification time (used for HTTP validators, see core/conditional.py)"
+    )
     
     def __str__(self):
         return f"{self.issue_type} - Lot {self.lot.batch_number} by {self.user.username}"
@@ -55,3 +60,15 @@ class CrowdFlag(models.Model):
         verbose_name = 'Crowd Flag'
         verbose_name_plural = 'Crowd Flags'
         ordering = ['-created_at']
+        indexes = [
+            # Trust score calculation and unresolved flag counts per lot
+            models.Index(fields=['lot', 'is_resolved', 'severity'], name='flag_lot_resolved_sev_idx'),
+            # lot and my_flags filters, ordered newest first
+            models.Index(fields=['lot', '-created_at'], name='flag_lot_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='flag_user_created_idx'),
+            # Default listing and keyset pagination
+            models.Index(fields=['-created_at', '-id'], name='flag_created_id_idx'),
+            # resolved/severity filters
+            models.Index(fields=['is_resolved', '-created_at'], name='flag_resolved_created_idx'),
+            models.Index(fields=['severity', '-created_at'], name='flag_severity_created_idx'),
+        ]
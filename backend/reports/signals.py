@@ -2,11 +2,13 @@
 Django signals for automatic trust score updates.
 
 This module defines signals that automatically recalculate lot trust scores
-when crowd flags are created, updated (resolved/unresolved), or deleted.
+when crowd flags are created, updated (resolved/unresolved), or deleted, and
+invalidate the lot's cached responses (which show its unresolved flag count).
 """
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import CrowdFlag
+from core.cache import invalidate_tags
 
 
 @receiver(post_save, sender=CrowdFlag)
@@ -43,3 +45,17 @@ def update_trust_score_on_flag_delete(sender, instance, **kwargs):
     # Update the associated lot's trust score
     if instance.lot:
         instance.lot.update_trust_score()
+
+
+@receiver(post_save, sender=CrowdFlag)
+@receiver(post_delete, sender=CrowdFlag)
+def invalidate_flagged_lot_responses(sender, instance, **kwargs):
+    """
+    Invalidate cached responses of the flagged lot.
+    
+    Args:
+        sender: The CrowdFlag model class
+        instance: The CrowdFlag instance being saved or deleted
+        **kwargs: Additional keyword arguments
+    """
+    invalidate_tags(f'lot:{instance.lot_id}')
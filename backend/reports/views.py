@@ -13,6 +13,12 @@ from drf_spectacular.types import OpenApiTypes
 from .models import CrowdFlag
 from .serializers import CrowdFlagSerializer
 from accounts.permissions import IsPatientOrPharmacist
+from core.conditional import ConditionalRequestMixin
+from core.pagination import (
+    CreatedAtKeysetPagination,
+    EstimatedCountPageNumberPagination,
+    PaginationModeMixin,
+)
 
 
 @extend_schema_view(
@@ -74,6 +80,19 @@ from accounts.permissions import IsPatientOrPharmacist
                     OpenApiExample('My Flags Only', value='true'),
                 ]
             ),
+            OpenApiParameter(
+                name='pagination',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description='Opt into an alternative pagination mode: "cursor" (keyset on created_at, id, constant time per page) or "estimated" (page numbers with an estimated count)',
+                enum=['cursor', 'estimated'],
+            ),
+            OpenApiParameter(
+                name='cursor',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description='Opaque cursor from the next/previous link (pagination=cursor only)'
+            ),
         ],
     ),
     retrieve=extend_schema(
@@ -166,7 +185,7 @@ from accounts.permissions import IsPatientOrPharmacist
         tags=['Flags'],
     ),
 )
-class CrowdFlagViewSet(viewsets.ModelViewSet):
+class CrowdFlagViewSet(ConditionalRequestMixin, PaginationModeMixin, viewsets.ModelViewSet):
     """
     ViewSet for crowdsourced quality reporting.
     
@@ -179,6 +198,8 @@ class CrowdFlagViewSet(viewsets.ModelViewSet):
     - Automatic user association with authenticated user
     - Filter by resolution status, issue type, reporter type
     - Search by description
+    - Opt-in cursor (?pagination=cursor) or estimated-count pagination
+    - ETag validators and 304 answers for list and retrieve (see core/conditional.py)
     
     Permissions:
     - All operations: Patients and pharmacists can access
@@ -195,6 +216,15 @@ class CrowdFlagViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'issue_type', 'is_resolved']
     ordering = ['-created_at']  # Default ordering (newest first)
     
+    # Clients syncing long histories can opt into keyset pagination
+    pagination_modes = {
+        'cursor': CreatedAtKeysetPagination,
+        'estimated': EstimatedCountPageNumberPagination,
+    }
+    
+    # Serialized flags show their lot's batch number
+    conditional_related = ('lot',)
+    
     def get_queryset(self):
         """
         Optionally filter crowd flags by various criteria.